@@ -13,18 +13,45 @@ import random
 import uuid
 import unicodedata
 import time
+import threading
 import tempfile
 from urllib.parse import quote
+from functools import partial
+from bisect import bisect_right
 
 import pandas as pd
-from flask import Flask, render_template_string, request, redirect, url_for, session, send_file, flash, jsonify, abort, Response, send_from_directory
+from flask import Flask, request, redirect, url_for, session, send_file, flash, jsonify, abort, Response, send_from_directory, has_request_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
-from sqlalchemy import text, or_, func, and_, inspect
+from sqlalchemy import text, or_, func, and_, inspect, case
 from delivery_system import logi_bp # 배송 시스템 파일에서 Blueprint 가져오기
+from template_cache import render_template_string, template_cache_stats  # 컴파일된 템플릿 캐시 (프로세스당 1회 컴파일)
+from snapshot_cache import SnapshotCache, invalidate_on_commit  # 메인 페이지 스냅샷 캐시
+from product_search import ProductSearchIndex, SEARCH_INDEX_ATTRS, SEARCH_INDEX_TTL  # 상품 검색 역색인
+from product_sellable import sellable_clause, schedule_sellable_refresh  # product.is_sellable 유지 (목록 정렬 키)
+from keyset_cursor import decode_cursor, encode_cursor, with_next_cursor  # 무한 스크롤 keyset 커서
+from header_badges import badge_cache, badge_etag  # 회원별 헤더 배지(장바구니·미읽음 메시지) 캐시
+from message_push import broker as message_broker, missed_messages, stream_events, streams_supported  # 새 메시지 SSE 전달
+import integration_http  # 외부 연동 HTTP (호스트별 연결 풀·타임아웃·재시도·서킷 브레이커)
+from naver_price_refresh import schedule_naver_price_refresh, stored_price_list  # 네이버 최저가 백그라운드 갱신
+from price_compare_job import (  # 관리자 가격비교 백그라운드 작업 (상품명 색인 + 토큰 버킷 스레드 풀)
+    price_compare_jobs, split_names as split_price_compare_names, compare_names as compare_price_names,
+)
+from view_counter import view_counters  # 페이지뷰·상품 조회수 버퍼
+from geocode_cache import (  # 지오코딩 캐시 (메모리 LRU + geocode_cache 테이블)
+    geocode_cache, normalize_address, latlng_key, start_warmup as start_geocode_warmup, warmup_status as geocode_warmup_status,
+    MISS as GEOCODE_MISS, KIND_GEO as GEOCODE_KIND_GEO, KIND_ZIP as GEOCODE_KIND_ZIP, KIND_RZIP as GEOCODE_KIND_RZIP,
+)
+from notification_outbox import dispatcher as notification_dispatcher, enqueue as enqueue_notification, RetryLater  # 알림 아웃박스
+from domain_events import subscribe as subscribe_domain_event, DELIVERY_PICKED_UP, DELIVERY_COMPLETED  # logi → app 이벤트
+from blob_store import store_photo, store_photo_data_url  # 배송 사진 저장소 (해시 키, 서버 축소·재압축)
+from order_report import load_order_report, load_order_items, iter_order_reports  # 관리자 주문 리포트 (주문·품목 2쿼리 일괄 로드)
+from report_export import EXPORT_FORMATS, CSV_MIMETYPE, XLSX_MIMETYPE, export_jobs, export_response  # 엑셀·CSV 스트리밍 내보내기 + 백그라운드 작업
+from payment_reconcile import record_unconfirmed as record_unconfirmed_payment, resolve as resolve_unconfirmed_payment, schedule_payment_reconcile  # 토스 승인 확인 응답 유실 보정
+from schema_migrations import run_migrations as run_schema_migrations  # 버전 관리 스키마 마이그레이션
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
@@ -39,7 +66,7 @@ def now_kst():
 # --------------------------------------------------------------------------------
 # 1. 초기 설정 및 Flask 인스턴스 생성
 # --------------------------------------------------------------------------------
-from delivery_system import logi_bp, db_delivery, DeliveryTask, DeliveryLog
+from delivery_system import logi_bp, db_delivery, DeliveryTask, DeliveryTaskItem, DeliveryLog
 
 app = Flask(__name__)
 # 프록시(Render, nginx 등) 뒤에서 redirect_uri가 올바르게 https·실도메인으로 생성되도록
@@ -50,50 +77,25 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
 # 1. 모든 DB 경로 설정 (단일 DB 사용)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", "sqlite:///direct_trade_mall.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 커넥션 풀: gunicorn 스레드(GUNICORN_THREADS)마다 1개 + 백그라운드 스레드(스케줄러·알림 발송·조회수 반영·
+# 지오코딩 저장·최저가 갱신·가격비교·내보내기)용 여유. 기본값(5 + 10)이면 스레드 워커에서 QueuePool 대기 초과.
+# 워커 프로세스마다 풀이 따로 → DB 최대 연결 수 ≥ WEB_CONCURRENCY × (DB_POOL_SIZE + DB_MAX_OVERFLOW) 로 맞출 것
+if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI']:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.getenv("DB_POOL_SIZE") or os.getenv("GUNICORN_THREADS") or "32"),
+        'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    }
 
 # 2. DB 연결 (공백 제거 버전)
 db = db_delivery
 db.init_app(app)
+view_counters.init_app(app)
+geocode_cache.init_app(app)
+notification_dispatcher.init_app(app)
+export_jobs.init_app(app)
+price_compare_jobs.init_app(app)
 
 
-def _ensure_product_display_start_column():
-    """운영 DB에 product.display_start_at 컬럼이 없으면 자동으로 추가."""
-    try:
-        insp = inspect(db.engine)
-        cols = [c["name"] for c in insp.get_columns("product")]
-        if "display_start_at" in cols:
-            return
-        # PostgreSQL·SQLite 모두에서 동작 가능한 ADD COLUMN (존재 여부는 위에서 검사)
-        with db.engine.begin() as conn:
-            conn.execute(text("ALTER TABLE product ADD COLUMN display_start_at TIMESTAMP NULL"))
-        print("[DB MIGRATION] product.display_start_at 컬럼을 자동으로 추가했습니다.", flush=True)
-    except Exception as e:
-        # 컬럼 존재/권한 문제 등은 서비스에는 영향 없도록 로깅만
-        print(f"[DB MIGRATION] product.display_start_at 컬럼 점검/추가 중 오류: {e!r}", flush=True)
-
-
-def _ensure_supplier_columns():
-    """product.supplier, order_item.supplier 컬럼이 없으면 자동 추가 (공급사별 취합용)."""
-    try:
-        insp = inspect(db.engine)
-        pcols = [c["name"] for c in insp.get_columns("product")]
-        if "supplier" not in pcols:
-            with db.engine.begin() as conn:
-                conn.execute(text("ALTER TABLE product ADD COLUMN supplier VARCHAR(100)"))
-            print("[DB MIGRATION] product.supplier 컬럼을 추가했습니다.", flush=True)
-        oicols = [c["name"] for c in insp.get_columns("order_item")]
-        if "supplier" not in oicols:
-            with db.engine.begin() as conn:
-                conn.execute(text("ALTER TABLE order_item ADD COLUMN supplier VARCHAR(100)"))
-            print("[DB MIGRATION] order_item.supplier 컬럼을 추가했습니다.", flush=True)
-    except Exception as e:
-        print(f"[DB MIGRATION] supplier 컬럼 점검/추가 중 오류: {e!r}", flush=True)
-
-
-with app.app_context():
-    _ensure_product_display_start_column()
-    _ensure_supplier_columns()
-
 # 3. 배송 관리 시스템 Blueprint 등록 (주소 접두어 /logi 적용됨)
 app.register_blueprint(logi_bp)
 
@@ -167,7 +169,7 @@ def get_lowest_price(product_name: str):
     try:
         headers = {"X-Naver-Client-Id": NAVER_CLIENT_ID, "X-Naver-Client-Secret": NAVER_CLIENT_SECRET}
         params = {"query": cleaned, "display": 1, "start": 1, "sort": "sim"}
-        resp = requests.get("https://openapi.naver.com/v1/search/shop.json", headers=headers, params=params, timeout=2.5)
+        resp = integration_http.get("naver_shop", "https://openapi.naver.com/v1/search/shop.json", headers=headers, params=params, timeout=(2, 2.5))
         if resp.status_code != 200:
             return {"price": None, "link": None, "mall_name": None}
         try:
@@ -192,36 +194,42 @@ def get_lowest_price(product_name: str):
         return {"price": None, "link": None, "mall_name": None}
 
 
-def get_lowest_price_list(product_name: str, max_results: int = 3):
-    """최저가순(asc)으로 최대 max_results건 반환. 품명과 일치하는 검색 결과만 포함. 상세 페이지용."""
+def _naver_price_list(product_name: str, max_results: int = 3):
+    """최저가순(asc)으로 최대 max_results건. 품명과 일치하는 검색 결과만 포함.
+    API 오류(HTTP 오류·타임아웃·서킷 열림)는 예외로 올림 → 백그라운드 갱신(naver_price_refresh.py)이 나중에 재시도."""
     cleaned = _clean_product_name(product_name)
     if not cleaned or not NAVER_CLIENT_ID or not NAVER_CLIENT_SECRET or max_results < 1:
         return []
+    headers = {"X-Naver-Client-Id": NAVER_CLIENT_ID, "X-Naver-Client-Secret": NAVER_CLIENT_SECRET}
+    params = {"query": cleaned, "display": min(max_results * 10, 100), "start": 1, "sort": "asc"}
+    resp = integration_http.get("naver_shop", "https://openapi.naver.com/v1/search/shop.json", headers=headers, params=params)
+    if resp.status_code != 200:
+        raise RuntimeError(f"naver shop HTTP {resp.status_code}")
     try:
-        headers = {"X-Naver-Client-Id": NAVER_CLIENT_ID, "X-Naver-Client-Secret": NAVER_CLIENT_SECRET}
-        params = {"query": cleaned, "display": min(max_results * 10, 100), "start": 1, "sort": "asc"}
-        resp = requests.get("https://openapi.naver.com/v1/search/shop.json", headers=headers, params=params, timeout=4)
-        if resp.status_code != 200:
-            return []
+        items = (resp.json().get("items") or [])
+    except (ValueError, TypeError):
+        items = []
+    out = []
+    for item in items:
+        if len(out) >= max_results:
+            break
+        title = (item.get("title") or "").replace("<b>", "").replace("</b>", "")
+        if not _item_title_matches_product(title, product_name):
+            continue
+        lprice, link = item.get("lprice"), item.get("link")
         try:
-            items = (resp.json().get("items") or [])
-        except (ValueError, TypeError):
-            items = []
-        out = []
-        for item in items:
-            if len(out) >= max_results:
-                break
-            title = (item.get("title") or "").replace("<b>", "").replace("</b>", "")
-            if not _item_title_matches_product(title, product_name):
-                continue
-            lprice, link = item.get("lprice"), item.get("link")
-            try:
-                p = str(lprice).strip() if lprice is not None else ""
-                price_int = int(float(p)) if p else None
-            except (TypeError, ValueError):
-                price_int = None
-            out.append({"price": price_int, "link": link, "mall_name": item.get("mallName"), "title": title})
-        return out
+            p = str(lprice).strip() if lprice is not None else ""
+            price_int = int(float(p)) if p else None
+        except (TypeError, ValueError):
+            price_int = None
+        out.append({"price": price_int, "link": link, "mall_name": item.get("mallName"), "title": title})
+    return out
+
+
+def get_lowest_price_list(product_name: str, max_results: int = 3):
+    """최저가순(asc)으로 최대 max_results건 반환. 품명과 일치하는 검색 결과만 포함. 오류 시 빈 목록."""
+    try:
+        return _naver_price_list(product_name, max_results)
     except Exception:
         return []
 
@@ -245,11 +253,11 @@ def get_lowest_price_raw(search_query: str):
             "display": 1,
             "sort": "sim",
         }
-        resp = requests.get(
+        resp = integration_http.get(
+            "naver_shop",
             "https://openapi.naver.com/v1/search/shop.json",
             headers=headers,
             params=params,
-            timeout=3,
         )
         if resp.status_code != 200:
             return {"price": None, "link": None, "mall_name": None}
@@ -271,92 +279,71 @@ def get_lowest_price_raw(search_query: str):
         return {"price": None, "link": None, "mall_name": None}
 
 
-def get_naver_shop_compare(raw_text):
-    """관리자 비교검색 탭용. 줄 단위로 분리, 각 줄은 앞뒤 공백만 제거(띄어쓰기 유지). 네이버 쇼핑 API 호출. 입력한 품목 전부 처리. 반환: (results, truncated, total_lines)."""
-    raw_cleaned = (raw_text or "").strip().replace("\r", "")
-    product_names = [line.strip() for line in raw_cleaned.split("\n") if line.strip()]
-    total_lines = len(product_names)
-    results = []
-    if not product_names:
-        return results, False, 0
-    if not NAVER_CLIENT_ID or not NAVER_CLIENT_SECRET:
-        for name in product_names:
-            product = Product.query.filter_by(name=name).first() or Product.query.filter(Product.name.ilike("%" + name + "%")).first()
-            current_price = product.price if product else None
-            current_price_str = "{:,}원".format(current_price) if current_price is not None else "-"
-            results.append({"품명": name, "네이버 상품명": "API 키 미설정", "최저가": "-", "최저가_숫자": None, "현재_판매가": current_price, "현재_판매가_표시": current_price_str, "상품링크": None, "규격": "-", "택배비 포함 여부": "-"})
-        return results, False, total_lines
+def _naver_shop_compare_items(name):
+    """비교검색 1개 품명: 네이버 쇼핑 가격 낮은 순 30건 중 품명과 80% 이상 일치하는 최대 3건.
+    반환: [{"네이버 상품명", "최저가", "최저가_숫자", "상품링크", "규격", "택배비 포함 여부"}, ...] (일치 없으면 안내 1건).
+    연결 실패 등은 예외 (price_compare_job에서 '에러' 행으로 처리)."""
     headers = {
         "X-Naver-Client-Id": NAVER_CLIENT_ID,
         "X-Naver-Client-Secret": NAVER_CLIENT_SECRET,
     }
-    min_ratio = 0.8
-    for name in product_names:
-        encoded_query = quote(name)
-        api_url = f"https://openapi.naver.com/v1/search/shop.json?query={encoded_query}&display=30&sort=asc"
+    api_url = f"https://openapi.naver.com/v1/search/shop.json?query={quote(name)}&display=30&sort=asc"
+    resp = integration_http.get("naver_shop", api_url, headers=headers)
+    if resp.status_code != 200:
+        return [{"네이버 상품명": "API 오류"}]
+    try:
+        data = resp.json()
+    except (ValueError, TypeError):
+        data = {}
+    items = data.get("items") or []
+    matched = []
+    for item in items:
+        if len(matched) >= 3:
+            break
+        clean_title = (item.get("title") or "").replace("<b>", "").replace("</b>", "")
+        if not _item_title_matches_product(clean_title, name, min_ratio=0.8):
+            continue
+        price = item.get("lprice")
+        link = item.get("link") or "-"
         try:
-            product = Product.query.filter_by(name=name).first()
-            if not product:
-                product = Product.query.filter(Product.name.ilike("%" + name + "%")).first()
-            current_price = product.price if product else None
-            current_price_str = "{:,}원".format(current_price) if current_price is not None else "-"
-            resp = requests.get(api_url, headers=headers, timeout=30)
-            if resp.status_code == 200:
-                try:
-                    data = resp.json()
-                except (ValueError, TypeError):
-                    data = {}
-                items = data.get("items") or []
-                matched_any = False
-                count_for_name = 0
-                if items:
-                    for item in items:
-                        if count_for_name >= 3:
-                            break
-                        clean_title = (item.get("title") or "").replace("<b>", "").replace("</b>", "")
-                        if not _item_title_matches_product(clean_title, name, min_ratio=min_ratio):
-                            continue
-                        matched_any = True
-                        count_for_name += 1
-                        price = item.get("lprice")
-                        link = item.get("link") or "-"
-                        try:
-                            if price is None:
-                                price_int = None
-                            else:
-                                p = str(price).strip()
-                                price_int = int(float(p)) if p else None
-                        except (TypeError, ValueError):
-                            price_int = None
-                        price_str = "{:,}원".format(price_int) if price_int is not None else "-"
-                        cat_parts = [item.get("category1"), item.get("category2"), item.get("category3"), item.get("category4")]
-                        cat_parts = [str(x).strip() for x in cat_parts if x]
-                        spec_str = " > ".join(cat_parts) if cat_parts else (item.get("maker") or item.get("brand") or "").strip() or "-"
-                        results.append({
-                            "품명": name,
-                            "네이버 상품명": clean_title,
-                            "최저가": price_str,
-                            "최저가_숫자": price_int,
-                            "현재_판매가": current_price,
-                            "현재_판매가_표시": current_price_str,
-                            "상품링크": link if link and link != "-" else None,
-                            "규격": spec_str,
-                            "택배비 포함 여부": "상품페이지 참고",
-                        })
-                if not matched_any:
-                    msg = "검색 결과 없음(품목 불일치)" if items else "검색 결과 없음"
-                    results.append({"품명": name, "네이버 상품명": msg, "최저가": "-", "최저가_숫자": None, "현재_판매가": current_price, "현재_판매가_표시": current_price_str, "상품링크": None, "규격": "-", "택배비 포함 여부": "-"})
+            if price is None:
+                price_int = None
             else:
-                results.append({"품명": name, "네이버 상품명": "API 오류", "최저가": "-", "최저가_숫자": None, "현재_판매가": current_price, "현재_판매가_표시": current_price_str, "상품링크": None, "규격": "-", "택배비 포함 여부": "-"})
-        except Exception:
-            product = Product.query.filter_by(name=name).first()
-            if not product:
-                product = Product.query.filter(Product.name.ilike("%" + name + "%")).first()
-            current_price = product.price if product else None
-            current_price_str = "{:,}원".format(current_price) if current_price is not None else "-"
-            results.append({"품명": name, "네이버 상품명": "에러", "최저가": "-", "최저가_숫자": None, "현재_판매가": current_price, "현재_판매가_표시": current_price_str, "상품링크": None, "규격": "-", "택배비 포함 여부": "-"})
-        time.sleep(0.1)
-    return results, False, total_lines
+                p = str(price).strip()
+                price_int = int(float(p)) if p else None
+        except (TypeError, ValueError):
+            price_int = None
+        price_str = "{:,}원".format(price_int) if price_int is not None else "-"
+        cat_parts = [item.get("category1"), item.get("category2"), item.get("category3"), item.get("category4")]
+        cat_parts = [str(x).strip() for x in cat_parts if x]
+        spec_str = " > ".join(cat_parts) if cat_parts else (item.get("maker") or item.get("brand") or "").strip() or "-"
+        matched.append({
+            "네이버 상품명": clean_title,
+            "최저가": price_str,
+            "최저가_숫자": price_int,
+            "상품링크": link if link and link != "-" else None,
+            "규격": spec_str,
+            "택배비 포함 여부": "상품페이지 참고",
+        })
+    if not matched:
+        return [{"네이버 상품명": "검색 결과 없음(품목 불일치)" if items else "검색 결과 없음"}]
+    return matched
+
+
+def _naver_shop_compare_search():
+    """비교검색용 네이버 조회 함수. API 키가 없으면 None ('API 키 미설정' 행)."""
+    if not NAVER_CLIENT_ID or not NAVER_CLIENT_SECRET:
+        return None
+    return _naver_shop_compare_items
+
+
+def get_naver_shop_compare(raw_text):
+    """관리자 비교검색 탭용 (동기 실행). 줄 단위로 분리, 각 줄은 앞뒤 공백만 제거(띄어쓰기 유지). 입력한 품목 전부 처리.
+    관리자 탭은 price_compare_jobs 백그라운드 작업으로 같은 처리를 함. 반환: (results, truncated, total_lines)."""
+    product_names = split_price_compare_names(raw_text)
+    if not product_names:
+        return [], False, 0
+    return compare_price_names(product_names, _naver_shop_compare_search()), False, len(product_names)
 
 
 @app.context_processor
@@ -488,7 +475,7 @@ def serve_upload_or_bulk_redirect(filename):
         return redirect(row.url, code=302)
     abort(404)
 
-from utils import send_mail, send_mail_with_attachment, run_backup, run_product_stock_reset, send_alimtalk_order_event, send_alimtalk_welcome
+from utils import send_mail, send_mail_with_attachment, run_backup, schedule_product_stock_reset, reschedule_product_stock_reset, send_alimtalk_order_event, send_alimtalk_welcome
 
 # PWA: manifest (역할별 이름: 소비자=바구니삼촌, 관리자=바삼관리자, 기사=바삼배송관리)
 @app.route('/manifest.json')
@@ -641,157 +628,12 @@ from models import (
 )
 
 
-def _ensure_product_consumer_price_column():
-    """
-    product 테이블에 consumer_price 컬럼이 없으면 자동으로 추가.
-    - 서버 업로드 후 최초 실행 시 한 번만 ALTER TABLE 수행.
-    - SQLite / 대부분 RDB에서 동작 가능한 단순 INTEGER 컬럼 추가.
-    """
-    try:
-        insp = inspect(db.engine)
-        columns = [c["name"] for c in insp.get_columns("product")]
-        if "consumer_price" in columns:
-            return
-        # 컬럼이 없으면 추가 (NULL 허용, 기본값 없음)
-        db.session.execute(text("ALTER TABLE product ADD COLUMN consumer_price INTEGER"))
-        db.session.commit()
-        print("[DB MIGRATION] product.consumer_price 컬럼을 자동으로 추가했습니다.", flush=True)
-    except Exception as e:
-        # 마이그레이션 실패해도 서비스 전체가 죽지 않도록 로그만 남김
-        print(f"[DB MIGRATION] consumer_price 컬럼 자동 추가 실패: {e}", flush=True)
-
-
-def _ensure_product_naver_columns():
-    """
-    product 테이블에 네이버 최저가·구매제한 컬럼이 없으면 자동으로 추가.
-    - naver_lowest_price, naver_lowest_link, naver_lowest_mall, naver_lowest_updated_at
-    - max_purchase_quantity (INTEGER DEFAULT 0, 0=제한없음)
-    """
-    try:
-        insp = inspect(db.engine)
-        columns = [c["name"] for c in insp.get_columns("product")]
-        if "naver_lowest_price" not in columns:
-            db.session.execute(text("ALTER TABLE product ADD COLUMN naver_lowest_price INTEGER"))
-        if "naver_lowest_link" not in columns:
-            db.session.execute(text("ALTER TABLE product ADD COLUMN naver_lowest_link TEXT"))
-        if "naver_lowest_mall" not in columns:
-            db.session.execute(text("ALTER TABLE product ADD COLUMN naver_lowest_mall TEXT"))
-        if "naver_lowest_updated_at" not in columns:
-            db.session.execute(text("ALTER TABLE product ADD COLUMN naver_lowest_updated_at TEXT"))
-        if "max_purchase_quantity" not in columns:
-            db.session.execute(text("ALTER TABLE product ADD COLUMN max_purchase_quantity INTEGER DEFAULT 0"))
-            print("[DB MIGRATION] product.max_purchase_quantity 컬럼을 추가했습니다. (0=제한없음)", flush=True)
-        db.session.commit()
-        print("[DB MIGRATION] product 네이버 최저가/구매제한 컬럼 확인 완료.", flush=True)
-    except Exception as e:
-        print(f"[DB MIGRATION] 네이버 최저가 컬럼 자동 추가 실패: {e}", flush=True)
-
-
-def _ensure_user_withdrawn_at_column():
-    """user 테이블에 created_at, withdrawn_at 컬럼이 없으면 추가. MySQL/PostgreSQL에서 user는 예약어이므로 따옴표 처리."""
-    try:
-        insp = inspect(db.engine)
-        columns = [c["name"] for c in insp.get_columns("user")]
-        dialect_name = (db.engine.dialect.name or "").lower()
-        if "created_at" not in columns:
-            if dialect_name in ("mysql", "mariadb"):
-                db.session.execute(text("ALTER TABLE `user` ADD COLUMN `created_at` DATETIME"))
-            elif dialect_name == "postgresql":
-                db.session.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS created_at TIMESTAMP'))
-            else:
-                db.session.execute(text("ALTER TABLE user ADD COLUMN created_at DATETIME"))
-            db.session.commit()
-            print("[DB MIGRATION] user.created_at 컬럼을 추가했습니다.", flush=True)
-        if "withdrawn_at" not in columns:
-            if dialect_name in ("mysql", "mariadb"):
-                db.session.execute(text("ALTER TABLE `user` ADD COLUMN `withdrawn_at` DATETIME"))
-            elif dialect_name == "postgresql":
-                db.session.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS withdrawn_at TIMESTAMP'))
-            else:
-                db.session.execute(text("ALTER TABLE user ADD COLUMN withdrawn_at DATETIME"))
-            db.session.commit()
-            print("[DB MIGRATION] user.withdrawn_at 컬럼을 추가했습니다.", flush=True)
-    except Exception as e:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-        print(f"[DB MIGRATION] user 컬럼 자동 추가 실패: {e}", flush=True)
-
-
-def _ensure_user_withdrawn_at_column_standalone():
-    """user 테이블에 created_at, withdrawn_at 컬럼이 없으면 추가 (로그인 전 선행 호출용). 서버 DB 스키마 누락 대응."""
-    try:
-        insp = inspect(db.engine)
-        columns = [c["name"] for c in insp.get_columns("user")]
-        dialect_name = (db.engine.dialect.name or "").lower()
-        added = []
-        with db.engine.connect() as conn:
-            if "created_at" not in columns:
-                if dialect_name in ("mysql", "mariadb"):
-                    conn.execute(text("ALTER TABLE `user` ADD COLUMN `created_at` DATETIME"))
-                elif dialect_name == "postgresql":
-                    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS created_at TIMESTAMP'))
-                else:
-                    conn.execute(text("ALTER TABLE user ADD COLUMN created_at DATETIME"))
-                added.append("created_at")
-            if "withdrawn_at" not in columns:
-                if dialect_name in ("mysql", "mariadb"):
-                    conn.execute(text("ALTER TABLE `user` ADD COLUMN `withdrawn_at` DATETIME"))
-                elif dialect_name == "postgresql":
-                    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS withdrawn_at TIMESTAMP'))
-                else:
-                    conn.execute(text("ALTER TABLE user ADD COLUMN withdrawn_at DATETIME"))
-                added.append("withdrawn_at")
-            if added:
-                conn.commit()
-                print(f"[DB MIGRATION] user 테이블 컬럼 추가됨: {added} (standalone)", flush=True)
-        return True
-    except Exception as e:
-        print(f"[DB MIGRATION] user standalone 실패: {e}", flush=True)
-        return False
-
-
-def _ensure_delivery_request_secret_and_image():
-    """delivery_request 테이블에 is_secret, image_url 컬럼이 없으면 추가 (고객문의 비밀글·사진용)."""
-    try:
-        insp = inspect(db.engine)
-        columns = [c["name"] for c in insp.get_columns("delivery_request")]
-        if "is_secret" not in columns:
-            try:
-                db.session.execute(text("ALTER TABLE delivery_request ADD COLUMN is_secret INTEGER DEFAULT 0"))
-                db.session.commit()
-                print("[DB MIGRATION] delivery_request.is_secret 컬럼 추가됨.", flush=True)
-            except Exception as e1:
-                db.session.rollback()
-                print(f"[DB MIGRATION] is_secret 추가 실패: {e1}", flush=True)
-        if "image_url" not in columns:
-            try:
-                db.session.execute(text("ALTER TABLE delivery_request ADD COLUMN image_url VARCHAR(500)"))
-                db.session.commit()
-                print("[DB MIGRATION] delivery_request.image_url 컬럼 추가됨.", flush=True)
-            except Exception as e2:
-                db.session.rollback()
-                print(f"[DB MIGRATION] image_url 추가 실패: {e2}", flush=True)
-    except Exception as e:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-        print(f"[DB MIGRATION] delivery_request 컬럼 확인 실패: {e}", flush=True)
-
-
-with app.app_context():
-    _ensure_product_consumer_price_column()
-    _ensure_product_naver_columns()
-    _ensure_user_withdrawn_at_column()
-    _ensure_delivery_request_secret_and_image()
-
 # (모델 클래스는 models.py에 정의됨)
 
 
 def send_message(user_id, title, body, msg_type='custom', related_order_id=None, image_url=None):
-    """회원 쪽지 1건 저장(푸시 발송·관리자 발송 공통). 실패 시 None 반환. image_url 있으면 썸네일(배송알림 등)."""
+    """회원 쪽지 1건 저장(푸시 발송·관리자 발송 공통). 실패 시 None 반환. image_url 있으면 썸네일(배송알림 등).
+    웹푸시는 아웃박스에 같은 트랜잭션으로 기록 → 호출한 쪽 커밋 후 백그라운드 발송."""
     try:
         m = UserMessage(user_id=user_id, title=title, body=body or '', msg_type=msg_type or 'custom', related_order_id=related_order_id, image_url=image_url)
         db.session.add(m)
@@ -807,7 +649,15 @@ def send_message(user_id, title, body, msg_type='custom', related_order_id=None,
 
 
 def send_push_for_user(user_id, title, body, url='/mypage/messages'):
-    """해당 사용자에 알림 가능한 모든 구독자로 Web Push 발송. 실패한 구독은 삭제."""
+    """해당 사용자 Web Push 발송 예약 (아웃박스). VAPID 키 없으면 무시."""
+    if not os.getenv('VAPID_PRIVATE_KEY'):
+        return
+    enqueue_notification('push', {"user_id": user_id, "title": title, "body": body, "url": url})
+
+
+def _deliver_push(payload):
+    """아웃박스 push 핸들러: 사용자의 모든 구독자로 Web Push 발송. 만료 구독(404/410)은 삭제.
+    일부 구독만 실패하면 실패한 endpoint만 남겨 재시도."""
     vapid_private = os.getenv('VAPID_PRIVATE_KEY')
     if not vapid_private:
         return
@@ -815,22 +665,63 @@ def send_push_for_user(user_id, title, body, url='/mypage/messages'):
         from pywebpush import webpush, WebPushException  # pyright: ignore[reportMissingImports]
     except ImportError:
         return
-    subs = PushSubscription.query.filter_by(user_id=user_id).all()
+    q = PushSubscription.query.filter_by(user_id=payload.get("user_id"))
+    if payload.get("endpoints"):
+        q = q.filter(PushSubscription.endpoint.in_(payload["endpoints"]))
+    subs = q.all()
     vapid_claims = {"sub": os.getenv("VAPID_SUB_MAILTO", "mailto:admin@basket-uncle.local")}
-    payload = json.dumps({"title": title or "알림", "body": body or "", "url": url or "/mypage/messages"}, ensure_ascii=False)
+    data = json.dumps({"title": payload.get("title") or "알림", "body": payload.get("body") or "", "url": payload.get("url") or "/mypage/messages"}, ensure_ascii=False)
+    failed, last_error = [], None
     for sub in subs:
         try:
-            webpush(
-                subscription_info={"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
-                data=payload,
-                vapid_private_key=vapid_private,
-                vapid_claims=vapid_claims,
-            )
+            with integration_http.track("webpush"):
+                webpush(
+                    subscription_info={"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
+                    data=data,
+                    vapid_private_key=vapid_private,
+                    vapid_claims=vapid_claims,
+                    timeout=integration_http.INTEGRATIONS["webpush"].timeout,
+                    requests_session=integration_http.session_for(sub.endpoint),
+                )
         except WebPushException as e:
-            if e.response and e.response.status_code in (404, 410):
+            if e.response is not None and e.response.status_code in (404, 410):
                 db.session.delete(sub)
-        except Exception:
-            pass
+            else:
+                failed.append(sub.endpoint)
+                last_error = str(e)[:200]
+        except Exception as e:
+            failed.append(sub.endpoint)
+            last_error = str(e)[:200]
+    db.session.commit()
+    if failed:
+        raise RetryLater(f"push {len(failed)}/{len(subs)} 실패: {last_error}", payload=dict(payload, endpoints=failed))
+
+
+def queue_alimtalk_order_event(msg_type, phone, customer_name, order_id, **extra_variables):
+    """주문/배송 알림톡 발송 예약 (아웃박스). 호출한 쪽 커밋 후 백그라운드에서 솔라피 호출."""
+    enqueue_notification('alimtalk', {"kind": "order_event", "msg_type": msg_type, "phone": phone,
+                                      "customer_name": customer_name, "order_id": order_id, "extra": extra_variables})
+
+
+def _deliver_alimtalk(payload):
+    """아웃박스 alimtalk 핸들러. 템플릿/설정 미등록(에러 없음)은 완료 처리, API 오류는 재시도."""
+    if payload.get("kind") == "welcome":
+        ok, err = send_alimtalk_welcome(payload.get("phone"), payload.get("customer_name"))
+    else:
+        ok, err = send_alimtalk_order_event(payload.get("msg_type"), payload.get("phone"), payload.get("customer_name"),
+                                            payload.get("order_id"), **(payload.get("extra") or {}))
+    if not ok and err:
+        raise RuntimeError(err)
+
+
+def _deliver_email(payload):
+    """아웃박스 email 핸들러 (SMTP)."""
+    send_mail(payload.get("to"), payload.get("subject") or "", payload.get("body") or "")
+
+
+notification_dispatcher.register_handler('push', _deliver_push)
+notification_dispatcher.register_handler('alimtalk', _deliver_alimtalk)
+notification_dispatcher.register_handler('email', _deliver_email)
 
 
 # 푸시 발송용 기본 문구 (DB 없을 때 폴백)
@@ -892,52 +783,44 @@ def _polygon_point_as_xy(polygon, point_lat, point_lng):
 
 
 def _geocode_address(address_str):
-    """주소 문자열을 (lat, lng)로 변환. Nominatim 시도 후 실패 시 Photon(무료) 폴백. 결과는 주소별 캐시."""
+    """주소 문자열을 (lat, lng)로 변환. Nominatim 시도 후 실패 시 Photon(무료) 폴백. 결과는 geocode_cache(메모리 LRU + DB) 경유."""
     if not address_str or not address_str.strip():
         return None
-    addr = address_str.strip()
-    # 간단 인메모리 캐시 (최대 500개, 동일 주소 재요청 시 즉시 반환)
-    if not hasattr(_geocode_address, '_cache'):
-        _geocode_address._cache = {}
-        _geocode_address._cache_keys = []
-    _cache, _keys = _geocode_address._cache, _geocode_address._cache_keys
-    if addr in _cache:
-        return _cache[addr]
-    _max = 500
-    if len(_keys) >= _max:
-        for k in _keys[:_max // 4]:
-            _cache.pop(k, None)
-        _geocode_address._cache_keys = _keys[_max // 4:]
-        _keys = _geocode_address._cache_keys
+    addr = normalize_address(address_str)
+    cached = geocode_cache.get(GEOCODE_KIND_GEO, addr)
+    if cached is not GEOCODE_MISS:
+        return cached
+    transient = False  # 타임아웃·HTTP 오류 → 실패 결과를 DB에 남기지 않음
 
     # 한국 주소는 국가명 포함 시 성공률 상승
     q_nominatim = addr if ("대한민국" in addr or "한국" in addr or "South Korea" in addr) else (addr + " 대한민국")
 
     # 1) Nominatim (OpenStreetMap)
     try:
-        r = requests.get(
+        r = integration_http.get(
+            "nominatim",
             "https://nominatim.openstreetmap.org/search",
             params={"q": q_nominatim, "format": "json", "limit": 1},
             headers={"User-Agent": "BasketUncle/1.0 (https://github.com/basket-uncle; address-check)"},
-            timeout=10,
         )
         if r.status_code == 200:
             data = r.json()
             if data and len(data) > 0 and data[0].get("lat") and data[0].get("lon"):
                 result = (float(data[0]["lat"]), float(data[0]["lon"]))
-                _cache[addr] = result
-                _geocode_address._cache_keys.append(addr)
+                geocode_cache.put(GEOCODE_KIND_GEO, addr, result)
                 return result
+        else:
+            transient = True
     except Exception:
-        pass
+        transient = True
 
     # 2) Photon (Komoot, 무료·API키 불필요, OSM 기반)
     try:
-        r = requests.get(
+        r = integration_http.get(
+            "photon",
             "https://photon.komoot.io/api/",
             params={"q": addr, "limit": 1, "lang": "ko"},
             headers={"User-Agent": "BasketUncle/1.0"},
-            timeout=8,
         )
         if r.status_code == 200:
             data = r.json()
@@ -946,47 +829,39 @@ def _geocode_address(address_str):
                 coords = features[0].get("geometry", {}).get("coordinates")
                 if coords and len(coords) >= 2:
                     result = (float(coords[1]), float(coords[0]))
-                    _cache[addr] = result
-                    _geocode_address._cache_keys.append(addr)
+                    geocode_cache.put(GEOCODE_KIND_GEO, addr, result)
                     return result
+        else:
+            transient = True
     except Exception:
-        pass
-    _cache[addr] = None
-    _geocode_address._cache_keys.append(addr)
+        transient = True
+    geocode_cache.put(GEOCODE_KIND_GEO, addr, None, persist=not transient)
     return None
 
 
 def _reverse_geocode_to_zip(lat, lng):
-    """위경도 역지오코딩으로 우편번호 조회. 캐시 사용(최대 500개). KAKAO_REST_API_KEY 있으면 카카오 로컬 API(한국 5자리 정확), 없으면 Nominatim 폴백."""
+    """위경도 역지오코딩으로 우편번호 조회. geocode_cache(좌표 소수 4자리 키) 경유. KAKAO_REST_API_KEY 있으면 카카오 로컬 API(한국 5자리 정확), 없으면 Nominatim 폴백."""
     if lat is None or lng is None:
         return ''
     try:
-        key = (round(float(lat), 4), round(float(lng), 4))
+        key = latlng_key(lat, lng)
     except (TypeError, ValueError):
         return ''
-    if not hasattr(_reverse_geocode_to_zip, '_cache'):
-        _reverse_geocode_to_zip._cache = {}
-        _reverse_geocode_to_zip._keys = []
-    _cache, _keys = _reverse_geocode_to_zip._cache, _reverse_geocode_to_zip._keys
-    if key in _cache:
-        return _cache[key]
-    _max = 500
-    if len(_keys) >= _max:
-        for k in _keys[:_max // 4]:
-            _cache.pop(k, None)
-        _reverse_geocode_to_zip._keys = _keys[_max // 4:]
-        _keys = _reverse_geocode_to_zip._keys
+    cached = geocode_cache.get(GEOCODE_KIND_RZIP, key)
+    if cached is not GEOCODE_MISS:
+        return cached
     postcode = ''
+    transient = False
 
     # 1) 카카오 로컬 API (한국 5자리 우편번호 정확)
     try:
         kakao_key = KAKAO_REST_API_KEY
         if kakao_key:
-            r = requests.get(
+            r = integration_http.get(
+                "kakao_local",
                 "https://dapi.kakao.com/v2/local/geo/coord2address.json",
                 params={"x": lng, "y": lat, "input_coord": "WGS84"},
                 headers={"Authorization": f"KakaoAK {kakao_key}"},
-                timeout=8,
             )
             if r.status_code == 200:
                 data = r.json()
@@ -997,61 +872,57 @@ def _reverse_geocode_to_zip(lat, lng):
                     postcode = (ra.get("zone_no") or "").strip()
                     if not postcode and doc.get("address"):
                         postcode = (doc["address"].get("zip_code") or "").strip()
+            else:
+                transient = True
     except Exception:
-        pass
+        transient = True
 
     # 2) Nominatim 폴백 (한국은 postcode 누락 많음)
     if not postcode:
         try:
-            r = requests.get(
+            r = integration_http.get(
+                "nominatim",
                 "https://nominatim.openstreetmap.org/reverse",
                 params={"lat": lat, "lon": lng, "format": "json", "addressdetails": 1},
                 headers={"User-Agent": "BasketUncle/1.0 (https://github.com/basket-uncle; delivery-export)"},
-                timeout=8,
             )
             if r.status_code == 200:
                 data = r.json()
                 addr = (data or {}).get("address") or {}
                 postcode = (addr.get("postcode") or addr.get("postal_code") or "").strip()
+            else:
+                transient = True
         except Exception:
-            pass
+            transient = True
 
-    _cache[key] = postcode
-    _reverse_geocode_to_zip._keys.append(key)
+    geocode_cache.put(GEOCODE_KIND_RZIP, key, postcode, persist=bool(postcode) or not transient)
     return postcode
 
 
 def _address_to_zip_kakao(address_str):
-    """주소 문자열로 카카오 주소 검색 API 호출 → 5자리 우편번호(zone_no) 반환. 캐시(최대 300개)."""
+    """주소 문자열로 카카오 주소 검색 API 호출 → 5자리 우편번호(zone_no) 반환. geocode_cache 경유."""
     if not address_str or not address_str.strip():
         return ''
     addr = address_str.strip()
     m = re.match(r'\(([^)]+)\)', addr)
     if m:
         addr = m.group(1).strip()
+    addr = normalize_address(addr)
     if not addr:
         return ''
-    if not hasattr(_address_to_zip_kakao, '_cache'):
-        _address_to_zip_kakao._cache = {}
-        _address_to_zip_kakao._keys = []
-    _cache, _keys = _address_to_zip_kakao._cache, _address_to_zip_kakao._keys
-    if addr in _cache:
-        return _cache[addr]
-    _max = 300
-    if len(_keys) >= _max:
-        for k in _keys[:_max // 3]:
-            _cache.pop(k, None)
-        _address_to_zip_kakao._keys = _keys[_max // 3:]
-        _keys = _address_to_zip_kakao._keys
+    cached = geocode_cache.get(GEOCODE_KIND_ZIP, addr)
+    if cached is not GEOCODE_MISS:
+        return cached
     postcode = ''
+    transient = False
     try:
         kakao_key = KAKAO_REST_API_KEY
         if kakao_key:
-            r = requests.get(
+            r = integration_http.get(
+                "kakao_local",
                 "https://dapi.kakao.com/v2/local/search/address.json",
                 params={"query": addr},
                 headers={"Authorization": f"KakaoAK {kakao_key}"},
-                timeout=8,
             )
             if r.status_code == 200:
                 data = r.json()
@@ -1062,10 +933,13 @@ def _address_to_zip_kakao(address_str):
                     postcode = (ra.get("zone_no") or "").strip()
                     if not postcode and doc.get("address"):
                         postcode = (doc["address"].get("zip_code") or "").strip()
+            else:
+                transient = True
+        else:
+            transient = True  # 키 미설정: 나중에 키가 생기면 다시 조회하도록 DB에 남기지 않음
     except Exception:
-        pass
-    _cache[addr] = postcode
-    _address_to_zip_kakao._keys.append(addr)
+        transient = True
+    geocode_cache.put(GEOCODE_KIND_ZIP, addr, postcode, persist=bool(postcode) or not transient)
     return postcode
 
 
@@ -1154,13 +1028,134 @@ def _get_zone():
     return DeliveryZone.query.order_by(DeliveryZone.updated_at.desc()).first()
 
 
+class _ZonePolygon:
+    """파싱된 폴리곤 + 경계상자. 좌표 순서([lat,lng]/[lng,lat])는 생성 시 1회 추정."""
+
+    def __init__(self, points):
+        self.points = [(float(pt[0]), float(pt[1])) for pt in points]
+        xs = [pt[0] for pt in self.points]
+        ys = [pt[1] for pt in self.points]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        a0, a1 = self.points[0]
+        self.lng_first = 124 <= a0 <= 132 and 33 <= a1 <= 43
+
+    @classmethod
+    def from_json(cls, raw):
+        if not raw:
+            return None
+        try:
+            points = json.loads(raw)
+            if not points or len(points) < 3:
+                return None
+            return cls(points)
+        except Exception:
+            return None
+
+    def _hit(self, x, y):
+        x0, y0, x1, y1 = self.bbox
+        return x0 <= x <= x1 and y0 <= y <= y1 and _point_in_polygon(x, y, self.points)
+
+    def contains(self, lat, lng):
+        px, py = (lng, lat) if self.lng_first else (lat, lng)
+        # 좌표 순서 추정이 틀린 폴리곤도 있으므로 반대 순서로 한 번 더 확인
+        return self._hit(px, py) or self._hit(py, px)
+
+
+class ZoneIndex:
+    """배송권역(DeliveryZone 최신 1건) 판별용 사전 계산본. DeliveryZone.updated_at이 바뀔 때만 재생성.
+    폴리곤 파싱·경계상자·좌표 순서·퀵지역 이름 매처를 미리 만들어 두고, 주소당 지오코딩 1회로 판별."""
+
+    def __init__(self, zone):
+        self.version = (zone.id, zone.updated_at) if zone else None
+        self.name = ((getattr(zone, 'name', None) or '').strip()) if zone else ''
+        self.main = _ZonePolygon.from_json(getattr(zone, 'polygon_json', None)) if zone else None
+        self.quick = _ZonePolygon.from_json(getattr(zone, 'quick_region_polygon_json', None)) if zone else None
+        self.quick_names = _get_quick_region_list(zone) if zone else []
+        self._quick_re = re.compile('|'.join(re.escape(n) for n in self.quick_names)) if self.quick_names else None
+        self.use_quick_only = bool(getattr(zone, 'use_quick_region_only', False)) if zone else False
+        self.quick_extra_fee = int(getattr(zone, 'quick_extra_fee', None) or 10000) if zone else 10000
+        self.quick_extra_message = ((getattr(zone, 'quick_extra_message', None) or '').strip()) if zone else ''
+
+    def matches_quick_name(self, addr):
+        return bool(self._quick_re and self._quick_re.search(addr))
+
+    def _coords(self, addr):
+        return _geocode_address(addr) if (self.main or self.quick) else None
+
+    def in_main_polygon(self, addr, coords=None):
+        if not addr or not self.main:
+            return False
+        coords = coords or _geocode_address(addr)
+        return bool(coords) and self.main.contains(coords[0], coords[1])
+
+    def in_quick_polygon(self, addr, coords=None):
+        if not addr or not self.quick:
+            return False
+        coords = coords or _geocode_address(addr)
+        return bool(coords) and self.quick.contains(coords[0], coords[1])
+
+    def zone_type(self, addr):
+        """normal / quick / unavailable. addr는 _normalize_address_for_zone 적용된 값."""
+        if not addr or self.version is None:
+            return 'unavailable'
+        coords = self._coords(addr)
+        in_quick = bool(coords) and self.quick is not None and self.quick.contains(coords[0], coords[1])
+        if self.use_quick_only:
+            return 'quick' if (in_quick or self.matches_quick_name(addr)) else 'unavailable'
+        if coords and self.main is not None and self.main.contains(coords[0], coords[1]):
+            return 'normal'
+        if in_quick:
+            return 'quick'
+        if self.quick_names:
+            return 'normal' if self.matches_quick_name(addr) else 'unavailable'
+        # 배송권역 이름(예: 연수구)이 주소에 있으면 배송가능 (지오코딩/폴리곤 오차 보정)
+        if self.name and self.name in addr:
+            return 'normal'
+        return 'unavailable'
+
+
+ZONE_INDEX_CHECK_SECONDS = int(os.getenv("ZONE_INDEX_CHECK_SECONDS", "30"))
+_zone_index_state = {'index': None, 'checked_at': 0.0}
+_zone_index_lock = threading.Lock()
+
+
+def get_zone_index(force=False):
+    """프로세스별 ZoneIndex. ZONE_INDEX_CHECK_SECONDS마다 (id, updated_at)만 조회해 바뀌었을 때만 재생성
+    (다른 워커에서 저장한 변경도 이 주기 안에 반영)."""
+    state = _zone_index_state
+    now = time.monotonic()
+    index = state['index']
+    if not force and index is not None and now - state['checked_at'] < ZONE_INDEX_CHECK_SECONDS:
+        return index
+    with _zone_index_lock:
+        index = state['index']
+        if not force and index is not None and time.monotonic() - state['checked_at'] < ZONE_INDEX_CHECK_SECONDS:
+            return index
+        try:
+            head = db.session.query(DeliveryZone.id, DeliveryZone.updated_at).order_by(DeliveryZone.updated_at.desc()).first()
+            version = (head[0], head[1]) if head else None
+            if force or index is None or index.version != version:
+                index = ZoneIndex(_get_zone() if head else None)
+            state['index'] = index
+            state['checked_at'] = time.monotonic()
+        except Exception:
+            db.session.rollback()
+            if index is None:
+                index = ZoneIndex(None)
+        return index
+
+
+def rebuild_zone_index():
+    """관리자 배송구역 저장 후 호출 — 이 프로세스는 즉시 새 기준으로 판별."""
+    return get_zone_index(force=True)
+
+
 def get_main_display_config():
     """메인 화면 노출 설정. (메인 카테고리 개수, 카테고리당 상품 개수, 최신상품 개수, 마감임박 개수). 없으면 기본값 반환. 60초 캐시로 DB/메타데이터 부하 감소."""
     import time
     cache = getattr(get_main_display_config, '_cache', None)
     if cache is not None and (time.time() - cache[1]) < 60:
         return cache[0]
-    _ensure_main_display_config_columns()
     row = MainDisplayConfig.query.get(1)
     if row:
         result = (
@@ -1185,88 +1180,36 @@ def _normalize_address_for_zone(address_str):
 
 def is_address_in_main_polygon(address_str):
     """주소가 기본 권역안에 있으면 True (배송권역 기본 추가요금 없음). 폴리곤 [lat,lng]/[lng,lat] 자동 보정."""
-    zone = _get_zone()
-    addr = (address_str or "").strip()
-    if not addr or not zone or not zone.polygon_json:
-        return False
     try:
-        polygon = json.loads(zone.polygon_json)
-        if not polygon or len(polygon) < 3:
-            return False
-        coords = _geocode_address(addr)
-        if not coords:
-            return False
-        lat, lng = coords[0], coords[1]
-        px, py = _polygon_point_as_xy(polygon, lat, lng)
-        if _point_in_polygon(px, py, polygon):
-            return True
-        if _point_in_polygon(py, px, polygon):
-            return True
-        return False
+        return get_zone_index().in_main_polygon((address_str or "").strip())
     except Exception:
         return False
 
 
 def is_address_in_quick_polygon(address_str):
     """주소가 퀵 권역안에 있으면 True (추가요금 있는 퀵 배송). 폴리곤 좌표 순서 자동 보정."""
-    zone = _get_zone()
-    addr = (address_str or "").strip()
-    if not addr or not zone or not getattr(zone, 'quick_region_polygon_json', None):
-        return False
     try:
-        quick_poly = json.loads(zone.quick_region_polygon_json)
-        if not quick_poly or len(quick_poly) < 3:
-            return False
-        coords = _geocode_address(addr)
-        if not coords:
-            return False
-        lat, lng = coords[0], coords[1]
-        px, py = _polygon_point_as_xy(quick_poly, lat, lng)
-        if _point_in_polygon(px, py, quick_poly):
-            return True
-        if _point_in_polygon(py, px, quick_poly):
-            return True
-        return False
+        return get_zone_index().in_quick_polygon((address_str or "").strip())
     except Exception:
         return False
 
 
 def get_delivery_zone_type(address_str):
-    """주소 기준 권역 판별. is_address_in_delivery_zone과 동일한 기준(권역 이름·폴리곤·퀵 이름) 적용 후 normal/quick/unavailable 구분."""
+    """주소 기준 권역 판별 (normal/quick/unavailable). is_address_in_delivery_zone과 같은 ZoneIndex 기준, 지오코딩 1회."""
     addr = _normalize_address_for_zone(address_str)
     if not addr:
         return 'unavailable'
-    # 마이페이지·결제와 동기화: 배송가능 여부는 is_address_in_delivery_zone 단일 기준
-    if not is_address_in_delivery_zone(addr):
+    try:
+        return get_zone_index().zone_type(addr)
+    except Exception:
         return 'unavailable'
-    zone = _get_zone()
-    use_quick_only = bool(getattr(zone, 'use_quick_region_only', False)) if zone else False
-    if use_quick_only:
-        return 'quick'
-    if is_address_in_main_polygon(addr):
-        return 'normal'
-    if is_address_in_quick_polygon(addr):
-        return 'quick'
-    quick = _get_quick_region_list(zone) if zone else []
-    if quick and any(name in addr for name in quick):
-        return 'normal'
-    # 권역 이름만 맞는 경우(폴리곤/지오코딩 오차 보정) → 기본권역으로 처리
-    if zone and getattr(zone, 'name', None) and (zone.name or '').strip() and (zone.name or '').strip() in addr:
-        return 'normal'
-    # is_address_in_delivery_zone True인데 위에서 안 걸린 경우(폴리곤 swap 등) → 기본권역
-    return 'normal'
 
 
 def get_quick_extra_config():
     """퀵권역 추가요금 정보 반환. (fee, message)."""
-    zone = _get_zone()
-    fee = 10000
+    index = get_zone_index()
     msg = "해당 주소는 배송권역이 아니거나, 배송권 추가 요금으로 배송합니다. 추가요금과 주문방법 안내드립니다."
-    if zone:
-        fee = int(getattr(zone, 'quick_extra_fee', None) or 10000)
-        if getattr(zone, 'quick_extra_message', None):
-            msg = (zone.quick_extra_message or "").strip() or msg
-    return fee, msg
+    return index.quick_extra_fee, (index.quick_extra_message or msg)
 
 
 def _get_category_delivery_settings(cat_name):
@@ -1330,43 +1273,7 @@ def get_category_delivery_description(cat_name):
 
 def is_address_in_delivery_zone(address_str):
     """주소가 배송 가능한지 (기본 권역이든 퀵 권역이든 포함). use_quick_region_only 시 퀵권역만 배송가능. 마이페이지·결제 동일 정규화 적용."""
-    zone = _get_zone()
-    addr = _normalize_address_for_zone(address_str)
-    if not addr:
-        return False
-    use_quick_only = bool(getattr(zone, 'use_quick_region_only', False)) if zone else False
-    if use_quick_only:
-        if is_address_in_quick_polygon(addr):
-            return True
-        quick = _get_quick_region_list(zone)
-        return bool(quick and any(name in addr for name in quick))
-    if is_address_in_main_polygon(addr):
-        return True
-    if is_address_in_quick_polygon(addr):
-        return True
-    quick = _get_quick_region_list(zone) if zone else []
-    if quick:
-        return any(name in addr for name in quick)
-    # 배송권역 이름(예: 연수구)이 주소에 있으면 배송가능으로 처리 (지오코딩/폴리곤 오차 보정)
-    if zone and getattr(zone, 'name', None) and (zone.name or '').strip():
-        if (zone.name or '').strip() in addr:
-            return True
-    if zone and zone.polygon_json:
-        try:
-            polygon = json.loads(zone.polygon_json)
-            if polygon and len(polygon) >= 3:
-                coords = _geocode_address(addr)
-                if coords:
-                    lat, lng = coords[0], coords[1]
-                    px, py = _polygon_point_as_xy(polygon, lat, lng)
-                    if _point_in_polygon(px, py, polygon):
-                        return True
-                    # 폴리곤이 [lng,lat]인데 [lat,lng]로 추정된 경우 등 좌표 순서 반대 시 한 번 더 시도
-                    if _point_in_polygon(py, px, polygon):
-                        return True
-        except Exception:
-            pass
-    return False
+    return get_delivery_zone_type(address_str) != 'unavailable'
 
 
 def _get_user_total_paid(user_id):
@@ -1626,24 +1533,6 @@ def load_user(user_id):
     except (TypeError, ValueError):
         return None
     except Exception as e:
-        # DB 컬럼 누락(created_at, withdrawn_at 등)으로 쿼리 실패 시 마이그레이션 시도 후 재시도
-        err_str = str(e).lower()
-        if "withdrawn_at" in err_str or "created_at" in err_str or "no such column" in err_str or "unknown column" in err_str or "does not exist" in err_str or "undefinedcolumn" in err_str or "aborted" in err_str:
-            try:
-                db.session.rollback()  # PostgreSQL: 실패한 트랜잭션 정리
-                _ensure_user_withdrawn_at_column_standalone()  # 세션과 무관한 별도 연결로 컬럼 추가
-                db.session.rollback()  # 마이그레이션 후 트랜잭션 초기화
-                u = User.query.get(int(user_id))
-                if u and getattr(u, "withdrawn_at", None):
-                    return None
-                return u
-            except Exception as retry_e:
-                print(f"[load_user] retry failed user_id={user_id}: {retry_e}", flush=True)
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                return None
         print(f"[load_user] user_id={user_id} error: {e}", flush=True)
         try:
             db.session.rollback()
@@ -2476,6 +2365,33 @@ FOOTER_HTML = """
         </div>
     </div>
     <script>
+    // 새 메시지 수신: SSE(/api/messages/stream) 우선, 미지원·연결 거절(503 등) 시 60초 폴링
+    // onUserMessage(onPush(data), onPoll()) — 스트림 이벤트는 onPush, 폴링 주기마다 onPoll
+    window.onUserMessage = (function(){
+        var pushHandlers = [], pollHandlers = [], source = null, polling = null;
+        function startPolling() {
+            if (polling) return;
+            polling = setInterval(function() { pollHandlers.forEach(function(fn) { fn(); }); }, 60000);
+        }
+        function connect() {
+            if (!window.EventSource) { startPolling(); return; }
+            source = new EventSource('/api/messages/stream');
+            source.addEventListener('user_message', function(e) {
+                var data;
+                try { data = JSON.parse(e.data); } catch (err) { return; }
+                pushHandlers.forEach(function(fn) { fn(data); });
+            });
+            source.onerror = function() {
+                // 일시 끊김·서버 종료는 브라우저가 Last-Event-ID로 자동 재연결, 거절되어 닫히면 폴링으로 전환
+                if (source && source.readyState === EventSource.CLOSED) { source = null; startPolling(); }
+            };
+        }
+        return function(onPush, onPoll) {
+            pushHandlers.push(onPush);
+            pollHandlers.push(onPoll);
+            if (!source && !polling) connect();
+        };
+    })();
     (function(){
         if (!{{ 'true' if current_user.is_authenticated else 'false' }}) return;
         var bar = document.getElementById('message-notice-bar');
@@ -2503,10 +2419,11 @@ FOOTER_HTML = """
         }).catch(function(){});
         var closeBtn = document.getElementById('message-notice-close');
         if (closeBtn) closeBtn.addEventListener('click', dismiss);
-        setInterval(function() {
+        function refreshCount() {
             if (!shouldShow()) return;
             fetch('/api/messages/unread_count', { credentials: 'same-origin' }).then(function(r) { if (r.status !== 200) return; return r.json(); }).then(function(data) { if (data && data.count > 0) showBar(data.count); }).catch(function(){});
-        }, 60000);
+        }
+        window.onUserMessage(refreshCount, refreshCount);
     })();
     (function(){
         if (!{{ 'true' if current_user.is_authenticated else 'false' }}) return;
@@ -2543,12 +2460,12 @@ FOOTER_HTML = """
         }).then(function(data) { showMessagePopup(data); }).catch(function(){});
         var closeBtn = document.getElementById('message-popup-close');
         if (closeBtn) closeBtn.addEventListener('click', hideMessagePopup);
-        setInterval(function() {
+        window.onUserMessage(showMessagePopup, function() {
             fetch('/api/messages/latest_unread', { credentials: 'same-origin' }).then(function(r) {
                 if (r.status !== 200) return null;
                 return r.json();
             }).then(function(data) { showMessagePopup(data); }).catch(function(){});
-        }, 60000);
+        });
     })();
     </script>
 
@@ -3119,7 +3036,7 @@ def admin_settlement_toss_payment():
     toss_data = None
     if order.payment_key:
         url = f"https://api.tosspayments.com/v1/payments/{order.payment_key}"
-        res = requests.get(url, headers={"Authorization": f"Basic {auth_key}"})
+        res = integration_http.get("toss", url, headers={"Authorization": f"Basic {auth_key}"})
         if res.status_code == 200:
             toss_data = res.json()
         else:
@@ -3298,49 +3215,93 @@ def admin_solapi_test_send():
     return jsonify({"success": False, "message": err or "발송 실패"})
 
 
+def _badge_poll_response(etag, build):
+    """메시지 폴링 공통: If-None-Match가 배지 ETag와 같으면 304 (DB 조회 없음), 아니면 build() 결과 + ETag.
+    no-cache → 브라우저가 매 폴링마다 ETag로 재검증하고 304면 캐시된 본문을 그대로 fetch에 돌려줌."""
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        resp = build()
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
 @app.route('/api/messages/unread_count')
 @login_required
 def api_messages_unread_count():
     """로그인 사용자의 미읽음 메시지 개수 (알림 바 표시용)."""
-    n = UserMessage.query.filter_by(user_id=current_user.id, read_at=None).count()
-    return jsonify({"count": n})
+    n = badge_cache.get(current_user.id)['unread_count']
+    return _badge_poll_response(badge_etag(current_user.id, 'unread', n), lambda: jsonify({"count": n}))
 
 
 @app.route('/api/messages/latest_delivery_complete')
 @login_required
 def api_messages_latest_delivery_complete():
     """미읽음 배송완료 메시지 1건 반환 (앱 내 배송완료 팝업용). 없으면 has: false."""
-    m = UserMessage.query.filter_by(
-        user_id=current_user.id,
-        read_at=None,
-        msg_type='delivery_complete'
-    ).order_by(UserMessage.id.desc()).first()
-    if not m:
-        return jsonify({"has": False})
-    return jsonify({
-        "has": True,
-        "id": m.id,
-        "title": m.title or "배송이 완료되었습니다",
-        "body": (m.body or "")[:200],
-        "order_id": m.related_order_id,
-    })
+    mid = badge_cache.get(current_user.id)['latest_delivery_complete_id']
+
+    def _build():
+        m = db.session.get(UserMessage, mid) if mid else None
+        if not m or m.user_id != current_user.id or m.read_at is not None:
+            return jsonify({"has": False})
+        return jsonify({
+            "has": True,
+            "id": m.id,
+            "title": m.title or "배송이 완료되었습니다",
+            "body": (m.body or "")[:200],
+            "order_id": m.related_order_id,
+        })
+
+    return _badge_poll_response(badge_etag(current_user.id, 'delivery', mid), _build)
 
 
 @app.route('/api/messages/latest_unread')
 @login_required
 def api_messages_latest_unread():
     """미읽음 메시지 중 최신 1건 반환 (메시지 전송 시 항상 팝업 알림용). 없으면 has: false."""
-    m = UserMessage.query.filter_by(user_id=current_user.id, read_at=None).order_by(UserMessage.id.desc()).first()
-    if not m:
-        return jsonify({"has": False})
-    return jsonify({
-        "has": True,
-        "id": m.id,
-        "title": m.title or "알림",
-        "body": (m.body or "")[:200],
-        "msg_type": m.msg_type or "custom",
-        "order_id": m.related_order_id,
-    })
+    mid = badge_cache.get(current_user.id)['latest_unread_id']
+
+    def _build():
+        m = db.session.get(UserMessage, mid) if mid else None
+        if not m or m.user_id != current_user.id or m.read_at is not None:
+            return jsonify({"has": False})
+        return jsonify({
+            "has": True,
+            "id": m.id,
+            "title": m.title or "알림",
+            "body": (m.body or "")[:200],
+            "msg_type": m.msg_type or "custom",
+            "order_id": m.related_order_id,
+        })
+
+    return _badge_poll_response(badge_etag(current_user.id, 'latest', mid), _build)
+
+
+@app.route('/api/messages/stream')
+@login_required
+def api_messages_stream():
+    """새 메시지 SSE 스트림 (message_push.py). 연결 한도 초과·스레드 워커 아님 → 503, 브라우저는 폴링으로 전환."""
+    if not streams_supported(request.environ):
+        return jsonify({"error": "stream_unavailable"}), 503
+    user_id = current_user.id
+    q = message_broker.subscribe(user_id)
+    if q is None:
+        return jsonify({"error": "stream_full"}), 503
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        last_id = 0
+    try:
+        backlog = missed_messages(user_id, last_id) if last_id else []
+    except Exception:
+        message_broker.unsubscribe(user_id, q)
+        raise
+    # 본문 생성기는 DB를 쓰지 않음 → 요청 컨텍스트 종료 시 세션 반납, 스트림 동안 DB 연결 점유 없음
+    resp = app.response_class(stream_events(user_id, q, backlog), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # 프록시(nginx 등) 버퍼링 끔
+    return resp
 
 
 @app.route('/api/popup/current')
@@ -3762,46 +3723,98 @@ def inject_globals():
         # 비회원(미인증)이면 장바구니/메시지 수 없음, 카테고리는 등급 1 기준으로 표시 (좌측 메뉴·검색바용)
         if not getattr(current_user, 'is_authenticated', False):
             try:
-                nav_categories = categories_for_member_grade(1).all()
+                nav_categories = _nav_categories.get(1)
             except Exception:
                 nav_categories = []
             return dict(cart_count=0, unread_message_count=0, now=now_kst(), managers=[], nav_categories=nav_categories)
-        cart_count = 0
-        unread_message_count = 0
         grade = getattr(current_user, 'member_grade', 1) or 1
-        total_qty = db.session.query(db.func.sum(Cart.quantity)).filter(Cart.user_id == current_user.id).scalar()
-        cart_count = total_qty if total_qty else 0
-        unread_message_count = UserMessage.query.filter_by(user_id=current_user.id, read_at=None).count()
-        categories = categories_for_member_grade(grade).all()
+        # 장바구니 수량·미읽음 수: 회원별 배지 캐시 (Cart·UserMessage 커밋 시 해당 회원만 폐기)
+        badge = badge_cache.get(current_user.id)
+        categories = _nav_categories.get(grade)
         managers = [c.manager_email for c in categories if c.manager_email]
-        return dict(cart_count=cart_count, unread_message_count=unread_message_count, now=now_kst(), managers=managers, nav_categories=categories)
+        return dict(cart_count=badge['cart_count'], unread_message_count=badge['unread_count'], now=now_kst(), managers=managers, nav_categories=categories)
     except Exception:
         return dict(cart_count=0, unread_message_count=0, now=now_kst(), managers=[], nav_categories=[])
 
 
+def _build_nav_categories(grade):
+    return categories_for_member_grade(grade).all()
+
+
+# 좌측 메뉴·검색바 카테고리 목록: 회원 등급별 스냅샷 (카테고리 커밋 시 무효화)
+_nav_categories = SnapshotCache(app, _build_nav_categories, max_entries=5, name="nav-categories")
+invalidate_on_commit(_nav_categories, (Category,))
+
+
 @app.route('/health')
 def health_check():
     """Render 등 호스팅 헬스체크·포트 감지용. DB/로직 없이 200만 반환."""
     return "ok", 200, {"Content-Type": "text/plain"}
 
 
-@app.route('/api/search')
-def api_search():
-    """검색 무한 스크롤용 API (50개 단위, offset/limit)"""
-    q = request.args.get('q', '').strip()
-    if not q:
-        return jsonify([])
-    offset = int(request.args.get('offset', 0))
-    limit = min(int(request.args.get('limit', 50)), 100)
-    now = now_kst()
-    displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
-    query = Product.query.filter(Product.is_active == True, Product.name.contains(q)).filter(displayable).order_by(Product.id.desc())
-    products = query.offset(offset).limit(limit).all()
-    return jsonify([{
-        "id": p.id,
-        "name": p.name,
-        "price": p.price,
-        "naver_lowest_price": getattr(p, 'naver_lowest_price', None),
+def _build_product_search_index(key):
+    return ProductSearchIndex(
+        db.session.query(Product.id, Product.name, Product.is_active, Product.display_start_at).all()
+    )
+
+
+# 상품 검색 인덱스: 띄어쓰기 무시·단어 순서 무관·오타 허용 + 관련도 순 (product_search.py)
+# 상품명·판매여부·노출시작이 바뀐 커밋에만 무효화 (재고·조회수·최저가 갱신은 무시)
+_product_search_index = SnapshotCache(app, _build_product_search_index, ttl=SEARCH_INDEX_TTL, max_entries=1, name="product-search")
+invalidate_on_commit(
+    _product_search_index,
+    (Product,),
+    ignore_attrs=[a.key for a in Product.__mapper__.column_attrs if a.key not in SEARCH_INDEX_ATTRS],
+)
+
+
+def _search_ranked(q, now):
+    """검색어 → 노출 가능한 상품 [(관련도 등급, id), ...] (등급 순, 같은 등급은 최신순)."""
+    return _product_search_index.get('products').search(q, now)
+
+
+def _search_page(ranked, cursor, limit):
+    """검색 결과 keyset 페이지. cursor: [등급, 마지막 id] 또는 None. 반환: (id 목록, 다음 커서 키)."""
+    start = 0
+    if cursor:
+        start = bisect_right([(tier, -pid) for tier, pid in ranked], (cursor[0], -cursor[1]))
+    page = ranked[start:start + limit]
+    next_key = page[-1] if page and start + limit < len(ranked) else ()
+    return [pid for _tier, pid in page], next_key
+
+
+def _products_in_order(ids, now):
+    """id 목록 순서 그대로 상품 조회 (PK IN 1쿼리). 인덱스 생성 이후 판매중지·노출 보류된 상품은 제외."""
+    if not ids:
+        return []
+    displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
+    rows = Product.query.filter(Product.id.in_(ids), Product.is_active == True).filter(displayable).all()
+    by_id = {p.id: p for p in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+@app.route('/api/search')
+def api_search():
+    """검색 무한 스크롤용 API (50개 단위, 관련도 순). cursor(응답 X-Next-Cursor 헤더 값)로 다음 페이지, 예전 offset도 지원."""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify([])
+    limit = min(int(request.args.get('limit', 50)), 100)
+    cursor = decode_cursor(request.args.get('cursor'), 2)
+    if request.args.get('cursor') and cursor is None:
+        return jsonify({"success": False, "message": "잘못된 페이지 정보입니다."}), 400
+    now = now_kst()
+    ranked = _search_ranked(q, now)
+    if cursor is None and request.args.get('offset'):
+        offset = max(int(request.args.get('offset', 0)), 0)
+        ranked = ranked[offset:]
+    ids, next_key = _search_page(ranked, cursor, limit)
+    products = _products_in_order(ids, now)
+    return with_next_cursor(jsonify([{
+        "id": p.id,
+        "name": p.name,
+        "price": p.price,
+        "naver_lowest_price": getattr(p, 'naver_lowest_price', None),
         "naver_lowest_link": getattr(p, 'naver_lowest_link', None),
         "image_url": p.image_url,
         "image_url_thumb": cloudinary_thumbnail_url(p.image_url) or p.image_url,
@@ -3812,7 +3825,7 @@ def api_search():
         "badge": p.badge or "",
         "deadline": p.deadline.strftime('%Y-%m-%dT%H:%M:%S') if p.deadline else "",
         "is_sold_out": (p.deadline and p.deadline < now_kst()) or p.stock <= 0,
-    } for p in products])
+    } for p in products]), *next_key)
 
 
 @app.route('/search')
@@ -3824,14 +3837,26 @@ def search_view():
 
     now = now_kst()
     displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
-    base_query = Product.query.filter(Product.is_active == True, Product.name.contains(query)).filter(displayable).order_by(Product.id.desc())
-    total_count = base_query.count()
-    search_products = base_query.limit(50).all()
-    search_has_more = total_count > 50
+    ranked = _search_ranked(query, now)
+    total_count = len(ranked)
+    ids, next_key = _search_page(ranked, None, 50)
+    search_products = _products_in_order(ids, now)
+    search_has_more = bool(next_key)
+    search_next_cursor = encode_cursor(*next_key) if next_key else ''
 
     grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
     recommend_cats = categories_for_member_grade(grade).limit(3).all()
-    cat_previews = {cat: Product.query.filter_by(category=cat.name, is_active=True).filter(displayable).limit(4).all() for cat in recommend_cats}
+    cat_previews = {cat: [] for cat in recommend_cats}
+    if recommend_cats:
+        # 카테고리별 4개씩 한 쿼리 (row_number 윈도 함수)
+        rn = func.row_number().over(partition_by=Product.category, order_by=Product.id).label('rn')
+        sub = db.session.query(Product.id.label('pid'), rn).filter(
+            Product.category.in_([c.name for c in recommend_cats]), Product.is_active == True
+        ).filter(displayable).subquery()
+        previews = Product.query.join(sub, Product.id == sub.c.pid).filter(sub.c.rn <= 4).order_by(Product.id).all()
+        cats_by_name = {c.name: c for c in recommend_cats}
+        for p in previews:
+            cat_previews[cats_by_name[p.category]].append(p)
 
     content = """
     <div class="max-w-7xl mx-auto px-4 md:px-6 py-12 md:py-20 text-left">
@@ -3915,7 +3940,7 @@ def search_view():
     {% if search_has_more %}
     <script>
     (function(){
-        var searchOffset = 50;
+        var searchCursor = {{ search_next_cursor|tojson }};
         var searchLoading = false;
         var searchHasMore = true;
         var searchQ = {{ query|tojson }};
@@ -3924,8 +3949,8 @@ def search_view():
             if (searchLoading || !searchHasMore) return;
             searchLoading = true;
             document.getElementById('search-spinner').classList.remove('hidden');
-            fetch('/api/search?q=' + encodeURIComponent(searchQ) + '&offset=' + searchOffset + '&limit=50')
-                .then(function(r){ return r.json(); })
+            fetch('/api/search?q=' + encodeURIComponent(searchQ) + '&cursor=' + encodeURIComponent(searchCursor) + '&limit=50')
+                .then(function(r){ searchCursor = r.headers.get('X-Next-Cursor') || ''; return r.json(); })
                 .then(function(data){
                     if (!data || data.length === 0){ searchHasMore = false; document.getElementById('search-end-message').classList.remove('hidden'); }
                     else {
@@ -3981,8 +4006,7 @@ def search_view():
                                 })()
                                 + '</div></div>');
                         });
-                        searchOffset += data.length;
-                        if (data.length < 50) { searchHasMore = false; document.getElementById('search-end-message').classList.remove('hidden'); }
+                        if (!searchCursor) { searchHasMore = false; document.getElementById('search-end-message').classList.remove('hidden'); }
                     }
                 })
                 .catch(function(e){ searchHasMore = false; })
@@ -4004,21 +4028,12 @@ def search_view():
     </script>
     {% endif %}
     """
-    return render_template_string(HEADER_HTML + content + FOOTER_HTML, query=query, search_products=search_products, total_count=total_count, search_has_more=search_has_more, cat_previews=cat_previews, recommend_cats=recommend_cats, now=now)
+    return render_template_string(HEADER_HTML + content + FOOTER_HTML, query=query, search_products=search_products, total_count=total_count, search_has_more=search_has_more, search_next_cursor=search_next_cursor, cat_previews=cat_previews, recommend_cats=recommend_cats, now=now)
 
-@app.route('/')
-def index():
-    """메인 페이지 (디자인 유지). 카테고리·상품 개수는 관리자 > 메인화면 설정에서 조정. 판매 마감(재고0·마감경과) 상품은 노출하지 않음."""
-    try:
-        _record_page_view('main')
-    except Exception:
-        pass
-    try:
-        run_product_stock_reset()
-    except Exception:
-        pass
+def _build_main_page_snapshot(key):
+    """메인 페이지 데이터 모델(회원 등급·날짜별). 요청마다 달라지는 최신상품 무작위 추출은 index()에서 수행."""
+    grade, _day = key
     now = now_kst()
-    grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
     try:
         main_cat_count, products_per_cat, latest_count, closing_count = get_main_display_config()
     except Exception:
@@ -4029,85 +4044,110 @@ def index():
         all_categories = []
     grouped_products = {}
     # 상품 노출 유지(판매종료·마감 상품도 표시). 정렬: 판매중 먼저, 마감된 상품 제일 뒤
-    try:
-        is_sellable = and_(
-            or_(Product.stock.is_(None), Product.stock > 0),
-            or_(Product.deadline.is_(None), Product.deadline > now)
-        )
-        displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
+    is_sellable = and_(
+        or_(Product.stock.is_(None), Product.stock > 0),
+        or_(Product.deadline.is_(None), Product.deadline > now)
+    )
+    displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
 
-        latest_all = Product.query.filter_by(is_active=True).filter(displayable).order_by(is_sellable.desc(), Product.id.desc()).limit(latest_count * 2).all()
-        random_latest = random.sample(latest_all, min(len(latest_all), latest_count)) if latest_all else []
+    latest_all = Product.query.filter_by(is_active=True).filter(displayable).order_by(is_sellable.desc(), Product.id.desc()).limit(latest_count * 2).all()
 
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = now.replace(hour=23, minute=59, second=59)
-        # 오늘 마감인 상품 전부(이미 마감된 것 포함). 판매중 먼저, 마감된 건 제일 뒤
-        closing_today = Product.query.filter(
-            Product.is_active == True,
-            Product.deadline >= today_start,
-            Product.deadline <= today_end
-        ).filter(displayable).order_by((Product.deadline > now).desc(), Product.deadline.asc()).limit(closing_count).all()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = now.replace(hour=23, minute=59, second=59)
+    # 오늘 마감인 상품 전부(이미 마감된 것 포함). 판매중 먼저, 마감된 건 제일 뒤
+    closing_today = Product.query.filter(
+        Product.is_active == True,
+        Product.deadline >= today_start,
+        Product.deadline <= today_end
+    ).filter(displayable).order_by((Product.deadline > now).desc(), Product.deadline.asc()).limit(closing_count).all()
 
-        for cat in all_categories:
-            prods = Product.query.filter_by(category=cat.name, is_active=True).filter(displayable).order_by(is_sellable.desc(), Product.deadline.asc().nullslast(), Product.id.desc()).limit(products_per_cat).all()
-            if prods:
-                grouped_products[cat] = prods
+    for cat in all_categories:
+        prods = Product.query.filter_by(category=cat.name, is_active=True).filter(displayable).order_by(is_sellable.desc(), Product.deadline.asc().nullslast(), Product.id.desc()).limit(products_per_cat).all()
+        if prods:
+            grouped_products[cat] = prods
 
-        # 메인에서는 상품이 있는 카테고리만 표시
-        all_categories = [c for c in all_categories if c in grouped_products]
-        latest_reviews = Review.query.order_by(Review.created_at.desc()).limit(4).all()
-        all_pids = set()
-        for p in random_latest: all_pids.add(p.id)
-        for p in closing_today: all_pids.add(p.id)
-        for prods in grouped_products.values():
-            for p in prods: all_pids.add(p.id)
-        review_counts = {}
-        if all_pids:
-            review_counts = dict(db.session.query(Review.product_id, func.count(Review.id)).filter(Review.product_id.in_(all_pids)).group_by(Review.product_id).all())
-        now = now_kst()
+    # 메인에서는 상품이 있는 카테고리만 표시
+    all_categories = [c for c in all_categories if c in grouped_products]
+    latest_reviews = Review.query.order_by(Review.created_at.desc()).limit(4).all()
+    all_pids = set()
+    for p in latest_all: all_pids.add(p.id)
+    for p in closing_today: all_pids.add(p.id)
+    for prods in grouped_products.values():
+        for p in prods: all_pids.add(p.id)
+    review_counts = {}
+    if all_pids:
+        review_counts = dict(db.session.query(Review.product_id, func.count(Review.id)).filter(Review.product_id.in_(all_pids)).group_by(Review.product_id).all())
 
-        # 게시판별 추천 많은 순 상위 4개 (메인 하단 노출)
-        def _top_restaurant_ids(limit=4):
-            subq = db.session.query(RestaurantVote.restaurant_request_id, func.count(RestaurantVote.id).label('up')).filter(RestaurantVote.vote_type == 'up').group_by(RestaurantVote.restaurant_request_id).subquery()
-            rows = db.session.query(RestaurantRequest.id).outerjoin(subq, RestaurantRequest.id == subq.c.restaurant_request_id).filter(RestaurantRequest.is_hidden == False, RestaurantRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), RestaurantRequest.id.desc()).limit(limit).all()
-            return [r[0] for r in rows]
-        def _top_delivery_ids(limit=4):
-            subq = db.session.query(DeliveryRequestVote.delivery_request_id, func.count(DeliveryRequestVote.id).label('up')).filter(DeliveryRequestVote.vote_type == 'up').group_by(DeliveryRequestVote.delivery_request_id).subquery()
-            rows = db.session.query(DeliveryRequest.id).outerjoin(subq, DeliveryRequest.id == subq.c.delivery_request_id).filter(DeliveryRequest.is_hidden == False, DeliveryRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), DeliveryRequest.id.desc()).limit(limit).all()
-            return [r[0] for r in rows]
-        r_ids = _top_restaurant_ids(4)
-        main_restaurant_posts = []
-        if r_ids:
-            main_restaurant_posts = RestaurantRequest.query.filter(RestaurantRequest.id.in_(r_ids)).all()
-            main_restaurant_posts.sort(key=lambda p: r_ids.index(p.id))
-        d_ids = _top_delivery_ids(4)
-        main_delivery_posts = []
-        if d_ids:
-            main_delivery_posts = DeliveryRequest.query.filter(DeliveryRequest.id.in_(d_ids)).all()
-            main_delivery_posts.sort(key=lambda p: d_ids.index(p.id))
-        main_partnership_posts = PartnershipInquiry.query.filter_by(is_hidden=False, is_notice=False).order_by(PartnershipInquiry.id.desc()).limit(4).all()
-        main_free_posts = FreeBoard.query.filter_by(is_hidden=False, is_notice=False).order_by(FreeBoard.id.desc()).limit(4).all()
-        # 게시판 추천/비추천 수 일괄 조회 (N+1 제거)
-        main_restaurant_votes = {}
-        if r_ids:
-            up_r = dict(db.session.query(RestaurantVote.restaurant_request_id, func.count(RestaurantVote.id)).filter(RestaurantVote.restaurant_request_id.in_(r_ids), RestaurantVote.vote_type == 'up').group_by(RestaurantVote.restaurant_request_id).all())
-            down_r = dict(db.session.query(RestaurantVote.restaurant_request_id, func.count(RestaurantVote.id)).filter(RestaurantVote.restaurant_request_id.in_(r_ids), RestaurantVote.vote_type == 'down').group_by(RestaurantVote.restaurant_request_id).all())
-            leg_r = dict(db.session.query(RestaurantRecommend.restaurant_request_id, func.count(RestaurantRecommend.id)).filter(RestaurantRecommend.restaurant_request_id.in_(r_ids)).group_by(RestaurantRecommend.restaurant_request_id).all())
-            for rid in r_ids:
-                u, d = up_r.get(rid, 0), down_r.get(rid, 0)
-                if u == 0 and d == 0:
-                    u = leg_r.get(rid, 0)
-                main_restaurant_votes[rid] = (u, d)
-        main_delivery_votes = {}
-        if d_ids:
-            up_d = dict(db.session.query(DeliveryRequestVote.delivery_request_id, func.count(DeliveryRequestVote.id)).filter(DeliveryRequestVote.delivery_request_id.in_(d_ids), DeliveryRequestVote.vote_type == 'up').group_by(DeliveryRequestVote.delivery_request_id).all())
-            down_d = dict(db.session.query(DeliveryRequestVote.delivery_request_id, func.count(DeliveryRequestVote.id)).filter(DeliveryRequestVote.delivery_request_id.in_(d_ids), DeliveryRequestVote.vote_type == 'down').group_by(DeliveryRequestVote.delivery_request_id).all())
-            main_delivery_votes = {did: (up_d.get(did, 0), down_d.get(did, 0)) for did in d_ids}
+    # 게시판별 추천 많은 순 상위 4개 (메인 하단 노출)
+    # 추천순 상위 4개 (up_count 인덱스 정렬)
+    main_restaurant_posts = RestaurantRequest.query.filter_by(is_hidden=False, is_notice=False).order_by(
+        RestaurantRequest.up_count.desc(), RestaurantRequest.id.desc()).limit(4).all()
+    main_delivery_posts = DeliveryRequest.query.filter_by(is_hidden=False, is_notice=False).order_by(
+        DeliveryRequest.up_count.desc(), DeliveryRequest.id.desc()).limit(4).all()
+    main_partnership_posts = PartnershipInquiry.query.filter_by(is_hidden=False, is_notice=False).order_by(PartnershipInquiry.id.desc()).limit(4).all()
+    main_free_posts = FreeBoard.query.filter_by(is_hidden=False, is_notice=False).order_by(FreeBoard.id.desc()).limit(4).all()
+    # 게시판 추천/비추천 수 (글 행에 저장된 값)
+    main_restaurant_votes = {p.id: _post_vote_counts(p) for p in main_restaurant_posts}
+    main_delivery_votes = {p.id: _post_vote_counts(p) for p in main_delivery_posts}
+
+    return dict(
+        latest_all=latest_all,
+        latest_count=latest_count,
+        closing_today=closing_today,
+        grouped_products=grouped_products,
+        all_categories=all_categories,
+        latest_reviews=latest_reviews,
+        review_counts=review_counts,
+        main_restaurant_posts=main_restaurant_posts,
+        main_delivery_posts=main_delivery_posts,
+        main_partnership_posts=main_partnership_posts,
+        main_free_posts=main_free_posts,
+        main_restaurant_votes=main_restaurant_votes,
+        main_delivery_votes=main_delivery_votes,
+    )
+
+
+# 메인 페이지 스냅샷: TTL 백그라운드 재생성 + 상품·카테고리·리뷰·게시판 커밋 시 무효화 (조회수만 바뀐 경우 제외)
+_main_page_snapshots = SnapshotCache(app, _build_main_page_snapshot, name="main-page")
+invalidate_on_commit(
+    _main_page_snapshots,
+    (Product, Category, Review, MainDisplayConfig,
+     RestaurantRequest, RestaurantVote, RestaurantRecommend,
+     DeliveryRequest, DeliveryRequestVote, PartnershipInquiry, FreeBoard),
+    ignore_attrs=('view_count',),
+)
 
+
+@app.route('/')
+def index():
+    """메인 페이지 (디자인 유지). 카테고리·상품 개수는 관리자 > 메인화면 설정에서 조정. 판매 마감(재고0·마감경과) 상품은 노출하지 않음."""
+    try:
+        _record_page_view('main')
+    except Exception:
+        pass
+    now = now_kst()
+    grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
+    grade = max(1, min(5, grade))
+    try:
+        snap = _main_page_snapshots.get((grade, now.date()))
+        latest_all = snap['latest_all']
+        random_latest = random.sample(latest_all, min(len(latest_all), snap['latest_count'])) if latest_all else []
+        grouped_products = snap['grouped_products']
+        all_categories = snap['all_categories']
+        closing_today = snap['closing_today']
+        latest_reviews = snap['latest_reviews']
+        review_counts = snap['review_counts']
+        main_restaurant_posts = snap['main_restaurant_posts']
+        main_delivery_posts = snap['main_delivery_posts']
+        main_partnership_posts = snap['main_partnership_posts']
+        main_free_posts = snap['main_free_posts']
+        main_restaurant_votes = snap['main_restaurant_votes']
+        main_delivery_votes = snap['main_delivery_votes']
         has_more_categories = False
         total_categories_count = len(all_categories)
     except Exception:
         traceback.print_exc()
+        all_categories = []
         grouped_products = {}
         random_latest = []
         closing_today = []
@@ -4799,10 +4839,6 @@ def index_horizontal():
         _record_page_view('main')
     except Exception:
         pass
-    try:
-        run_product_stock_reset()
-    except Exception:
-        pass
     now = now_kst()
     grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
     try:
@@ -5853,27 +5889,22 @@ def _restaurant_recommend_count(rid):
     return RestaurantRecommend.query.filter_by(restaurant_request_id=rid).count()
 
 
-def _restaurant_vote_counts(rid):
-    """전국맛집요청 게시글별 추천(up)/비추천(down) 수. RestaurantVote 사용, 없으면 레거시 추천 수 반환."""
-    up = RestaurantVote.query.filter_by(restaurant_request_id=rid, vote_type='up').count()
-    down = RestaurantVote.query.filter_by(restaurant_request_id=rid, vote_type='down').count()
-    # 레거시: 아직 Vote가 없는 글은 기존 Recommend를 up으로 간주해 합산
-    if up == 0 and down == 0:
-        leg = RestaurantRecommend.query.filter_by(restaurant_request_id=rid).count()
-        if leg > 0:
-            up = leg
-    return up, down
+def _post_vote_counts(post):
+    """전국맛집요청·고객문의 글의 추천(up)/비추천(down) 수 (투표 시 갱신되는 up_count/down_count 컬럼).
+    레거시 restaurant_recommend는 마이그레이션 10에서 restaurant_vote(up)로 이전됨."""
+    return (post.up_count or 0, post.down_count or 0)
 
 
-def _migrate_restaurant_recommend_to_vote():
-    """RestaurantRecommend 데이터를 RestaurantVote(up)로 한 번 이전."""
-    for rec in RestaurantRecommend.query.all():
-        if not RestaurantVote.query.filter_by(user_id=rec.user_id, restaurant_request_id=rec.restaurant_request_id).first():
-            db.session.add(RestaurantVote(user_id=rec.user_id, restaurant_request_id=rec.restaurant_request_id, vote_type='up'))
-    try:
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+def _refresh_post_vote_counts(post_model, vote_model, fk_col, post_id):
+    """투표 테이블 기준으로 글의 up_count/down_count 재계산 (투표와 같은 트랜잭션에서 UPDATE 1회)."""
+    def _count(vote_type):
+        return db.session.query(func.count(vote_model.id)).filter(
+            fk_col == post_id, vote_model.vote_type == vote_type
+        ).scalar_subquery()
+    db.session.flush()
+    post_model.query.filter(post_model.id == post_id).update(
+        {post_model.up_count: _count('up'), post_model.down_count: _count('down')}, synchronize_session=False
+    )
 
 
 def _user_restaurant_vote(rid):
@@ -5884,13 +5915,6 @@ def _user_restaurant_vote(rid):
     return v.vote_type if v else None
 
 
-def _delivery_request_vote_counts(did):
-    """배송요청 글별 추천(up)/비추천(down) 수."""
-    up = DeliveryRequestVote.query.filter_by(delivery_request_id=did, vote_type='up').count()
-    down = DeliveryRequestVote.query.filter_by(delivery_request_id=did, vote_type='down').count()
-    return up, down
-
-
 def _user_delivery_request_vote(did):
     """현재 사용자의 해당 배송요청 글 투표. 'up', 'down', None."""
     if not current_user.is_authenticated:
@@ -5899,39 +5923,49 @@ def _user_delivery_request_vote(did):
     return v.vote_type if v else None
 
 
-def _restaurant_request_ordered_ids():
-    """전국맛집요청 추천순(많은 순) 정렬 ID 목록 (이전글/다음글용). 공지 제외."""
-    subq = db.session.query(RestaurantVote.restaurant_request_id, func.count(RestaurantVote.id).label('up')).filter(RestaurantVote.vote_type == 'up').group_by(RestaurantVote.restaurant_request_id).subquery()
-    rows = db.session.query(RestaurantRequest.id).outerjoin(subq, RestaurantRequest.id == subq.c.restaurant_request_id).filter(RestaurantRequest.is_hidden == False, RestaurantRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), RestaurantRequest.id.desc()).all()
-    return [r[0] for r in rows]
+BOARD_PAGE_SIZE = 10
+
+
+def _board_page(query, model, order_by, page, per_page=BOARD_PAGE_SIZE):
+    """공지(최신순) → 일반글(order_by) 순서 목록의 한 페이지를 SQL LIMIT/OFFSET으로 조회 (전체 글을 읽어 자르지 않음).
+    query: 숨김 제외·비밀글 등 공통 조건. 반환: (글 목록, 전체 수, 현재 페이지, 전체 페이지 수)."""
+    counts = dict(query.with_entities(model.is_notice, func.count(model.id)).group_by(model.is_notice).all())
+    n_notice, n_normal = counts.get(True, 0), counts.get(False, 0)
+    total = n_notice + n_normal
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page = max(1, min(page, total_pages))
+    start = (page - 1) * per_page
+    posts = []
+    if start < n_notice:
+        posts = query.filter(model.is_notice == True).order_by(model.id.desc()).offset(start).limit(per_page).all()
+    if len(posts) < per_page and n_normal:
+        posts += query.filter(model.is_notice == False).order_by(*order_by).offset(
+            max(0, start - n_notice)).limit(per_page - len(posts)).all()
+    return posts, total, page, total_pages
+
+
+def _board_neighbors(query, model, sort_cols, post):
+    """목록 정렬(sort_cols 모두 내림차순)에서 post 바로 앞(이전글)·뒤(다음글) id. 각각 인덱스 범위 조회 1건."""
+    values = [getattr(post, c.key) if getattr(post, c.key) is not None else 0 for c in sort_cols]
 
+    def _beyond(cmp):
+        # (c0, c1, ...) 사전식 비교: c0 cmp v0 OR (c0 = v0 AND (c1 cmp v1 OR ...))
+        cond = None
+        for col, val in reversed(list(zip(sort_cols, values))):
+            cond = cmp(col, val) if cond is None else or_(cmp(col, val), and_(col == val, cond))
+        return cond
 
-def _delivery_request_ordered_ids():
-    """배송요청 추천순(많은 순) 정렬 ID 목록 (이전글/다음글용). 공지 제외."""
-    subq = db.session.query(DeliveryRequestVote.delivery_request_id, func.count(DeliveryRequestVote.id).label('up')).filter(DeliveryRequestVote.vote_type == 'up').group_by(DeliveryRequestVote.delivery_request_id).subquery()
-    rows = db.session.query(DeliveryRequest.id).outerjoin(subq, DeliveryRequest.id == subq.c.delivery_request_id).filter(DeliveryRequest.is_hidden == False, DeliveryRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), DeliveryRequest.id.desc()).all()
-    return [r[0] for r in rows]
+    prev_row = query.filter(_beyond(lambda c, v: c > v)).with_entities(model.id).order_by(*[c.asc() for c in sort_cols]).first()
+    next_row = query.filter(_beyond(lambda c, v: c < v)).with_entities(model.id).order_by(*[c.desc() for c in sort_cols]).first()
+    return (prev_row[0] if prev_row else None), (next_row[0] if next_row else None)
 
 
 def _record_page_view(page_type):
-    """일별 페이지뷰 기록. page_type: 'main', 'category', 'product', 'cart'. 실패 시 무시."""
+    """일별 페이지뷰 기록. page_type: 'main', 'category', 'product', 'cart'. 메모리 버퍼에 누적 후 주기적으로 일괄 반영 (view_counter.py)."""
     try:
-        today = now_kst().date()
-        row = DailyStat.query.filter_by(stat_date=today).first()
-        if not row:
-            row = DailyStat(stat_date=today)
-            db.session.add(row)
-        if page_type == 'main':
-            row.main_views = (row.main_views or 0) + 1
-        elif page_type == 'category':
-            row.category_views = (row.category_views or 0) + 1
-        elif page_type == 'product':
-            row.product_views = (row.product_views or 0) + 1
-        elif page_type == 'cart':
-            row.cart_views = (row.cart_views or 0) + 1
-        db.session.commit()
+        view_counters.incr_page(page_type, now_kst().date())
     except Exception:
-        db.session.rollback()
+        pass
 
 
 def _user_recommended_restaurant(rid):
@@ -5948,18 +5982,11 @@ def _user_recommended_restaurant(rid):
 @app.route('/board/restaurant-request')
 def board_restaurant_request():
     """전국맛집요청 목록. 공지 상단 노출 후 일반글 추천순. 10개씩 페이지네이션."""
-    notice_posts = RestaurantRequest.query.filter_by(is_hidden=False, is_notice=True).order_by(RestaurantRequest.id.desc()).all()
-    subq = db.session.query(RestaurantVote.restaurant_request_id, func.count(RestaurantVote.id).label('up')).filter(RestaurantVote.vote_type == 'up').group_by(RestaurantVote.restaurant_request_id).subquery()
-    normal_ids = [r[0] for r in db.session.query(RestaurantRequest.id).outerjoin(subq, RestaurantRequest.id == subq.c.restaurant_request_id).filter(RestaurantRequest.is_hidden == False, RestaurantRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), RestaurantRequest.id.desc()).all()]
-    normal_posts = RestaurantRequest.query.filter(RestaurantRequest.id.in_(normal_ids)).all() if normal_ids else []
-    normal_posts.sort(key=lambda p: normal_ids.index(p.id))
-    all_posts = list(notice_posts) + list(normal_posts)
-    per_page = 10
-    total = len(all_posts)
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = max(1, min(int(request.args.get('page', 1)), total_pages))
-    posts = all_posts[(page - 1) * per_page:page * per_page]
-    vote_counts = {p.id: _restaurant_vote_counts(p.id) for p in posts}
+    posts, total, page, total_pages = _board_page(
+        RestaurantRequest.query.filter(RestaurantRequest.is_hidden == False), RestaurantRequest,
+        (RestaurantRequest.up_count.desc(), RestaurantRequest.id.desc()), int(request.args.get('page', 1)),
+    )
+    vote_counts = {p.id: _post_vote_counts(p) for p in posts}
     return render_template_string(
         HEADER_HTML + """
         <div class="max-w-3xl mx-auto py-8 md:py-12 px-4 font-black text-left">
@@ -6055,15 +6082,16 @@ def board_restaurant_request_write():
 @app.route('/board/restaurant-request/<int:rid>')
 def board_restaurant_request_detail(rid):
     """전국맛집요청 상세. 추천/비추천 게시글당 1인 1표."""
-    _migrate_restaurant_recommend_to_vote()
     p = RestaurantRequest.query.filter_by(id=rid, is_hidden=False).first_or_404()
-    up_count, down_count = _restaurant_vote_counts(p.id)
+    up_count, down_count = _post_vote_counts(p)
     user_vote = _user_restaurant_vote(p.id)
     show_100_notice = up_count >= 100
-    ids = _restaurant_request_ordered_ids()
-    idx = ids.index(rid) if rid in ids else -1
-    prev_id = ids[idx - 1] if idx > 0 else None
-    next_id = ids[idx + 1] if idx >= 0 and idx + 1 < len(ids) else None
+    prev_id = next_id = None
+    if not p.is_notice:  # 이전/다음글은 추천순 일반글 사이에서만
+        prev_id, next_id = _board_neighbors(
+            RestaurantRequest.query.filter(RestaurantRequest.is_hidden == False, RestaurantRequest.is_notice == False),
+            RestaurantRequest, (RestaurantRequest.up_count, RestaurantRequest.id), p,
+        )
     board_comments = BoardComment.query.filter_by(board_type='restaurant', post_id=p.id).order_by(BoardComment.id.asc()).all()
     can_edit = bool(
         current_user.is_authenticated
@@ -6214,6 +6242,7 @@ def board_restaurant_request_recommend(rid):
         v.vote_type = 'up'
     else:
         db.session.add(RestaurantVote(restaurant_request_id=rid, user_id=current_user.id, vote_type='up'))
+    _refresh_post_vote_counts(RestaurantRequest, RestaurantVote, RestaurantVote.restaurant_request_id, rid)
     db.session.commit()
     flash("추천되었습니다.")
     return redirect(url_for('board_restaurant_request_detail', rid=rid))
@@ -6233,6 +6262,7 @@ def board_restaurant_request_vote(rid):
         v.vote_type = vote_type
     else:
         db.session.add(RestaurantVote(restaurant_request_id=rid, user_id=current_user.id, vote_type=vote_type))
+    _refresh_post_vote_counts(RestaurantRequest, RestaurantVote, RestaurantVote.restaurant_request_id, rid)
     db.session.commit()
     flash("추천되었습니다." if vote_type == 'up' else "비추천되었습니다.")
     return redirect(url_for('board_restaurant_request_detail', rid=rid))
@@ -6242,18 +6272,11 @@ def board_restaurant_request_vote(rid):
 @app.route('/board/delivery-request')
 def board_delivery_request():
     """고객문의 목록. 공지 상단 노출 후 일반글 추천순. 비밀글은 작성자·관리자만 내용 노출."""
-    notice_posts = DeliveryRequest.query.filter_by(is_hidden=False, is_notice=True).order_by(DeliveryRequest.id.desc()).all()
-    subq = db.session.query(DeliveryRequestVote.delivery_request_id, func.count(DeliveryRequestVote.id).label('up')).filter(DeliveryRequestVote.vote_type == 'up').group_by(DeliveryRequestVote.delivery_request_id).subquery()
-    normal_ids = [r[0] for r in db.session.query(DeliveryRequest.id).outerjoin(subq, DeliveryRequest.id == subq.c.delivery_request_id).filter(DeliveryRequest.is_hidden == False, DeliveryRequest.is_notice == False).order_by(func.coalesce(subq.c.up, 0).desc(), DeliveryRequest.id.desc()).all()]
-    normal_posts = DeliveryRequest.query.filter(DeliveryRequest.id.in_(normal_ids)).all() if normal_ids else []
-    normal_posts.sort(key=lambda p: normal_ids.index(p.id))
-    all_posts = list(notice_posts) + list(normal_posts)
-    per_page = 10
-    total = len(all_posts)
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = max(1, min(int(request.args.get('page', 1)), total_pages))
-    posts = all_posts[(page - 1) * per_page:page * per_page]
-    vote_counts = {p.id: _delivery_request_vote_counts(p.id) for p in posts}
+    posts, total, page, total_pages = _board_page(
+        DeliveryRequest.query.filter(DeliveryRequest.is_hidden == False), DeliveryRequest,
+        (DeliveryRequest.up_count.desc(), DeliveryRequest.id.desc()), int(request.args.get('page', 1)),
+    )
+    vote_counts = {p.id: _post_vote_counts(p) for p in posts}
     return render_template_string(
         HEADER_HTML + """
         <div class="max-w-3xl mx-auto py-8 md:py-12 px-4 font-black text-left">
@@ -6355,13 +6378,15 @@ def board_delivery_request_detail(did):
     if not can_view:
         flash("비밀글은 작성자만 볼 수 있습니다.")
         return redirect(url_for('board_delivery_request'))
-    up_count, down_count = _delivery_request_vote_counts(p.id)
+    up_count, down_count = _post_vote_counts(p)
     user_vote = _user_delivery_request_vote(p.id)
     show_notice = up_count >= 20
-    ids = _delivery_request_ordered_ids()
-    idx = ids.index(did) if did in ids else -1
-    prev_id = ids[idx - 1] if idx > 0 else None
-    next_id = ids[idx + 1] if idx >= 0 and idx + 1 < len(ids) else None
+    prev_id = next_id = None
+    if not p.is_notice:  # 이전/다음글은 추천순 일반글 사이에서만
+        prev_id, next_id = _board_neighbors(
+            DeliveryRequest.query.filter(DeliveryRequest.is_hidden == False, DeliveryRequest.is_notice == False),
+            DeliveryRequest, (DeliveryRequest.up_count, DeliveryRequest.id), p,
+        )
     board_comments = BoardComment.query.filter_by(board_type='delivery', post_id=p.id).order_by(BoardComment.id.asc()).all()
     can_edit = bool(
         current_user.is_authenticated
@@ -6517,6 +6542,7 @@ def board_delivery_request_vote(did):
         v.vote_type = vote_type
     else:
         db.session.add(DeliveryRequestVote(delivery_request_id=did, user_id=current_user.id, vote_type=vote_type))
+    _refresh_post_vote_counts(DeliveryRequest, DeliveryRequestVote, DeliveryRequestVote.delivery_request_id, did)
     db.session.commit()
     flash("추천되었습니다." if vote_type == 'up' else "비추천되었습니다.")
     return redirect(url_for('board_delivery_request_detail', did=did))
@@ -6542,18 +6568,16 @@ def board_partnership():
         db.session.commit()
         flash("등록되었습니다.")
         return redirect(url_for('board_partnership'))
-    notice_posts = PartnershipInquiry.query.filter_by(is_hidden=False, is_notice=True).order_by(PartnershipInquiry.id.desc()).all()
-    normal_posts = PartnershipInquiry.query.filter_by(is_hidden=False, is_notice=False).order_by(PartnershipInquiry.id.desc()).all()
-    all_posts = list(notice_posts) + list(normal_posts)
-    if current_user.is_authenticated and current_user.is_admin:
-        visible_posts = all_posts
-    else:
-        visible_posts = [p for p in all_posts if not p.is_secret or (current_user.is_authenticated and p.user_id == current_user.id)]
-    per_page = 10
-    total = len(visible_posts)
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = max(1, min(int(request.args.get('page', 1)), total_pages))
-    posts = visible_posts[(page - 1) * per_page:page * per_page]
+    visible_q = PartnershipInquiry.query.filter(PartnershipInquiry.is_hidden == False)
+    if not (current_user.is_authenticated and current_user.is_admin):
+        # 비밀글은 본인 글만
+        visible = or_(PartnershipInquiry.is_secret == False, PartnershipInquiry.is_secret.is_(None))
+        if current_user.is_authenticated:
+            visible = or_(visible, PartnershipInquiry.user_id == current_user.id)
+        visible_q = visible_q.filter(visible)
+    posts, total, page, total_pages = _board_page(
+        visible_q, PartnershipInquiry, (PartnershipInquiry.id.desc(),), int(request.args.get('page', 1)),
+    )
     return render_template_string(
         HEADER_HTML + """
         <div class="max-w-3xl mx-auto py-8 md:py-12 px-4 font-black text-left">
@@ -6699,10 +6723,9 @@ def board_partnership_detail(pid):
     if not can_view:
         flash("비밀글은 작성자만 볼 수 있습니다.")
         return redirect(url_for('board_partnership'))
-    ids = [x.id for x in PartnershipInquiry.query.filter_by(is_hidden=False).order_by(PartnershipInquiry.id.desc()).all()]
-    idx = ids.index(pid) if pid in ids else -1
-    prev_id = ids[idx - 1] if idx > 0 else None
-    next_id = ids[idx + 1] if idx >= 0 and idx + 1 < len(ids) else None
+    prev_id, next_id = _board_neighbors(
+        PartnershipInquiry.query.filter(PartnershipInquiry.is_hidden == False), PartnershipInquiry, (PartnershipInquiry.id,), p,
+    )
     board_comments = BoardComment.query.filter_by(board_type='partnership', post_id=p.id).order_by(BoardComment.id.asc()).all()
     can_edit = bool(
         current_user.is_authenticated
@@ -6823,14 +6846,9 @@ def board_partnership_delete(pid):
 @app.route('/board/free', methods=['GET'])
 def board_free():
     """자유게시판 목록 (아이디어·제안 등 자유 입력). 글쓰기는 별도 페이지에서 작성."""
-    notice_posts = FreeBoard.query.filter_by(is_hidden=False, is_notice=True).order_by(FreeBoard.id.desc()).all()
-    normal_posts = FreeBoard.query.filter_by(is_hidden=False, is_notice=False).order_by(FreeBoard.id.desc()).all()
-    all_posts = list(notice_posts) + list(normal_posts)
-    per_page = 10
-    total = len(all_posts)
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = max(1, min(int(request.args.get('page', 1)), total_pages))
-    posts = all_posts[(page - 1) * per_page:page * per_page]
+    posts, total, page, total_pages = _board_page(
+        FreeBoard.query.filter(FreeBoard.is_hidden == False), FreeBoard, (FreeBoard.id.desc(),), int(request.args.get('page', 1)),
+    )
     post_ids = [p.id for p in posts]
     first_image_by_post = {}
     if post_ids:
@@ -6973,10 +6991,9 @@ def board_free_write():
 def board_free_detail(fid):
     """자유게시판 상세"""
     p = FreeBoard.query.filter_by(id=fid, is_hidden=False).first_or_404()
-    ids = [x.id for x in FreeBoard.query.filter_by(is_hidden=False).order_by(FreeBoard.id.desc()).all()]
-    idx = ids.index(fid) if fid in ids else -1
-    prev_id = ids[idx - 1] if idx > 0 else None
-    next_id = ids[idx + 1] if idx >= 0 and idx + 1 < len(ids) else None
+    prev_id, next_id = _board_neighbors(
+        FreeBoard.query.filter(FreeBoard.is_hidden == False), FreeBoard, (FreeBoard.id,), p,
+    )
     board_comments = BoardComment.query.filter_by(board_type='free', post_id=p.id).order_by(BoardComment.id.asc()).all()
     can_edit = bool(
         current_user.is_authenticated
@@ -7252,7 +7269,6 @@ def board_event_delete(eid):
 @app.route('/board/event', methods=['GET', 'POST'])
 def board_event():
     """이벤트 게시판 — 게시판 글, 공유 URL, 포인트 지급 요청, 신청 내역"""
-    _ensure_event_board_post_notice_column()
     if request.method == 'POST':
         shared_url = (request.form.get('shared_url') or '').strip()
         applicant_email = (request.form.get('applicant_email') or '').strip().lower()
@@ -7594,27 +7610,53 @@ def board_comment_add():
     return redirect(url_for('board_free_detail', fid=post_id))
 
 
+CATALOG_PAGE_SIZE = 50
+
+
+def _catalog_page(query, cursor=None, per_page=CATALOG_PAGE_SIZE, offset=0):
+    """판매중 먼저 → 최신순 (is_sellable desc, id desc) 페이지. (category, is_sellable, id) 인덱스 순서 그대로 조회.
+    cursor: [판매중 0/1, 마지막 id] (keyset) 또는 None(첫 페이지·예전 page 파라미터는 offset).
+    반환: (상품 목록, 다음 커서 키 — 마지막 페이지면 빈 튜플)."""
+    if cursor:
+        sellable, last_id = bool(cursor[0]), cursor[1]
+        after = and_(Product.is_sellable == sellable, Product.id < last_id)
+        if sellable:
+            after = or_(after, Product.is_sellable == False)
+        query = query.filter(after)
+    query = query.order_by(Product.is_sellable.desc(), Product.id.desc())
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, ()
+    rows = rows[:per_page]
+    return rows, (int(bool(rows[-1].is_sellable)), rows[-1].id)
+
+
 # [추가] 무한 스크롤을 위한 상품 데이터 제공 API
 @app.route('/api/category_products/<string:cat_name>')
 def api_category_products(cat_name):
-    """무한 스크롤용 데이터 제공 API (50개 단위). 마감된 상품도 노출, 제일 뒤에 정렬."""
+    """무한 스크롤용 데이터 제공 API (50개 단위). 마감된 상품도 노출, 제일 뒤에 정렬.
+    cursor(응답 X-Next-Cursor 헤더 값)로 다음 페이지. 오늘마감(마감시각 순)과 예전 page 파라미터는 offset."""
     page = int(request.args.get('page', 1))
-    per_page = 50
+    per_page = CATALOG_PAGE_SIZE
     offset = (page - 1) * per_page
+    cursor = decode_cursor(request.args.get('cursor'), 2)
+    if request.args.get('cursor') and cursor is None:
+        return jsonify({"success": False, "message": "잘못된 페이지 정보입니다."}), 400
     now = now_kst()
-    order_logic = (Product.stock <= 0) | (Product.deadline < now)
     displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
     query = Product.query.filter_by(is_active=True).filter(displayable)
-    if cat_name == '최신상품':
-        query = query.order_by(order_logic, Product.id.desc())
-    elif cat_name == '오늘마감':
+    next_key = ()
+    if cat_name == '오늘마감':
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = now.replace(hour=23, minute=59, second=59)
         query = query.filter(Product.deadline >= today_start, Product.deadline <= today_end).order_by((Product.deadline > now).desc(), Product.deadline.asc())
+        products = query.offset(offset).limit(per_page).all()
     else:
-        query = query.filter_by(category=cat_name).order_by(order_logic, Product.id.desc())
-
-    products = query.offset(offset).limit(per_page).all()
+        if cat_name != '최신상품':
+            query = query.filter_by(category=cat_name)
+        products, next_key = _catalog_page(query, cursor, per_page, offset=0 if cursor else offset)
     
     res_data = []
     for p in products:
@@ -7633,7 +7675,7 @@ def api_category_products(cat_name):
             "naver_lowest_price": getattr(p, 'naver_lowest_price', None),
             "naver_lowest_link": getattr(p, 'naver_lowest_link', None),
         })
-    return jsonify(res_data)
+    return with_next_cursor(jsonify(res_data), *next_key)
 
 
 @app.route('/category/<string:cat_name>')
@@ -7641,14 +7683,14 @@ def category_view(cat_name):
     """카테고리별 상품 목록 뷰 (무한 스크롤, 50개 단위, 스크롤 시 1초 대기 후 추가 로딩)"""
     _record_page_view('category')
     now = now_kst()
-    order_logic = (Product.stock <= 0) | (Product.deadline < now)
     displayable = or_(Product.display_start_at.is_(None), Product.display_start_at <= now)
     cat = None
     limit_num = 50
+    next_key = ()
 
     if cat_name == '최신상품':
-        # 판매중 먼저, 마감된 상품 제일 뒤
-        products = Product.query.filter_by(is_active=True).filter(displayable).order_by(order_logic, Product.id.desc()).limit(limit_num).all()
+        # 판매중 먼저, 마감된 상품 제일 뒤 (다음 페이지는 /api/category_products keyset 커서)
+        products, next_key = _catalog_page(Product.query.filter_by(is_active=True).filter(displayable))
         display_name = "✨ 최신 상품"
     elif cat_name == '오늘마감':
         today_end = now.replace(hour=23, minute=59, second=59)
@@ -7665,8 +7707,11 @@ def category_view(cat_name):
         user_grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
         if getattr(cat, 'min_member_grade', None) is not None and user_grade < cat.min_member_grade:
             abort(404)
-        products = Product.query.filter_by(category=cat_name, is_active=True).filter(displayable).order_by(order_logic, Product.id.desc()).limit(limit_num).all()
+        products, next_key = _catalog_page(Product.query.filter_by(category=cat_name, is_active=True).filter(displayable))
         display_name = f"{cat_name} 상품 리스트"
+    # 커서 방식 목록(오늘마감 제외): 첫 페이지의 다음 커서. 빈 문자열이면 마지막 페이지
+    cursor_mode = cat_name != '오늘마감'
+    next_cursor = encode_cursor(*next_key) if next_key else ''
 
     # 하단 추천 섹션 데이터 (등급별 카테고리)
     grade = (getattr(current_user, 'member_grade', 1) or 1) if current_user.is_authenticated else 1
@@ -7813,18 +7858,27 @@ def category_view(cat_name):
     <script>
     let page = 1;
     let loading = false;
+    const cursorMode = {{ 'true' if cursor_mode else 'false' }};
+    let nextCursor = {{ next_cursor|tojson }};
     let hasMore = true;
     const catName = "{{ cat_name }}";
 
     async function loadMore() {
         if (loading || !hasMore) return;
+        if (cursorMode && !nextCursor) {
+            hasMore = false;
+            document.getElementById('end-message').classList.remove('hidden');
+            return;
+        }
         loading = true;
         document.getElementById('spinner').classList.remove('hidden');
 
         page++;
         try {
-            const res = await fetch(`/api/category_products/${encodeURIComponent(catName)}?page=${page}&per_page=50`);
+            const qs = cursorMode ? `cursor=${encodeURIComponent(nextCursor)}` : `page=${page}&per_page=50`;
+            const res = await fetch(`/api/category_products/${encodeURIComponent(catName)}?${qs}`);
             const data = await res.json();
+            if (cursorMode) nextCursor = res.headers.get('X-Next-Cursor') || '';
 
             if (!data || data.length === 0) {
                 hasMore = false;
@@ -7890,7 +7944,7 @@ def category_view(cat_name):
                 grid.insertAdjacentHTML('beforeend', html);
             });
 
-            if (data.length < 50) {
+            if (cursorMode ? !nextCursor : data.length < 50) {
                 hasMore = false;
                 document.getElementById('end-message').classList.remove('hidden');
             }
@@ -7937,24 +7991,50 @@ def _get_review_vote_info(review_ids, user_id):
     return out
 
 
+_REVIEW_CURSOR_EPOCH = datetime(1970, 1, 1)
+
+
+def _review_page(query, cursor=None, per_page=5, offset=0):
+    """구매후기 최신순 (created_at desc, id desc) 페이지. (product_id|category_id, created_at, id) 인덱스 순서 그대로.
+    cursor: [작성시각(마이크로초), 마지막 id] 또는 None. 반환: (후기 목록, 다음 커서 키)."""
+    if cursor:
+        created = _REVIEW_CURSOR_EPOCH + timedelta(microseconds=cursor[0])
+        query = query.filter(or_(
+            Review.created_at < created,
+            and_(Review.created_at == created, Review.id < cursor[1]),
+        ))
+    query = query.order_by(Review.created_at.desc(), Review.id.desc())
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page or rows[per_page - 1].created_at is None:
+        return rows[:per_page], ()
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, ((last.created_at - _REVIEW_CURSOR_EPOCH) // timedelta(microseconds=1), last.id)
+
+
 @app.route('/api/product_reviews')
 def api_product_reviews():
-    """상품 상세 구매후기 더보기용 API (페이지당 5개)"""
+    """상품 상세 구매후기 더보기용 API (페이지당 5개). cursor(응답 X-Next-Cursor 헤더 값)로 다음 페이지, 예전 page도 지원."""
     category_id = request.args.get('category_id', type=int)
     product_id = request.args.get('product_id', type=int)
     page = max(1, int(request.args.get('page', 1)))
     per_page = 5
     offset = (page - 1) * per_page
+    cursor = decode_cursor(request.args.get('cursor'), 2)
+    if request.args.get('cursor') and cursor is None:
+        return jsonify({"success": False, "message": "잘못된 페이지 정보입니다."}), 400
     if category_id is not None:
-        q = Review.query.filter_by(category_id=category_id).order_by(Review.created_at.desc())
+        q = Review.query.filter_by(category_id=category_id)
     elif product_id is not None:
-        q = Review.query.filter_by(product_id=product_id).order_by(Review.created_at.desc())
+        q = Review.query.filter_by(product_id=product_id)
     else:
         return jsonify([])
-    reviews = q.offset(offset).limit(per_page).all()
+    reviews, next_key = _review_page(q, cursor, per_page, offset=0 if cursor else offset)
     review_ids = [r.id for r in reviews]
     vote_info = _get_review_vote_info(review_ids, current_user.id if current_user.is_authenticated else None)
-    return jsonify([{
+    return with_next_cursor(jsonify([{
         "id": r.id,
         "image_url": r.image_url or "",
         "user_name": (r.user_name or "")[:1] + "**",
@@ -7963,7 +8043,7 @@ def api_product_reviews():
         "recommend_count": vote_info.get(r.id, {}).get("recommend_count", 0),
         "not_recommend_count": vote_info.get(r.id, {}).get("not_recommend_count", 0),
         "my_vote": vote_info.get(r.id, {}).get("my_vote"),
-    } for r in reviews])
+    } for r in reviews]), *next_key)
 
 
 @app.route('/api/review_vote', methods=['POST'])
@@ -8004,9 +8084,9 @@ def api_review_vote():
 def product_detail(pid):
     """상품 상세 정보 페이지 (최근등록상품 복구 및 추천 카테고리 추가 완료본)"""
     p = Product.query.get_or_404(pid)
+    # 조회수 증가 (버퍼에 누적, 주기적으로 DB 반영)
+    view_counters.incr_product(p.id)
     try:
-        # 조회수 증가
-        p.view_count = (getattr(p, 'view_count', 0) or 0) + 1
         # 예전 대량등록/수정에서 로컬 절대경로(C:\...)로 저장된 이미지가 있으면 Cloudinary/업로드 폴더로 자동 교정
         fixed = False
         try:
@@ -8040,21 +8120,6 @@ def product_detail(pid):
             pass
         if fixed:
             db.session.commit()
-        else:
-            db.session.commit()
-    except Exception:
-        db.session.rollback()
-
-    # 네이버 최저가 정보가 비어 있으면 최초 상세 진입 시 한 번 더 조회·저장
-    try:
-        if getattr(p, "naver_lowest_price", None) is None:
-            _nav = get_lowest_price(p.name)
-            if _nav.get("price") is not None:
-                p.naver_lowest_price = _nav.get("price")
-                p.naver_lowest_link = _nav.get("link")
-                p.naver_lowest_mall = _nav.get("mall_name")
-                p.naver_lowest_updated_at = now_kst()
-                db.session.commit()
     except Exception:
         db.session.rollback()
 
@@ -8207,21 +8272,20 @@ def product_detail(pid):
     
     # 4. 리뷰: 해당 상품의 판매자(카테고리)별로 묶어서 노출, 5개만 초기 로딩·더보기 5개씩
     if cat_info:
-        review_base = Review.query.filter_by(category_id=cat_info.id).order_by(Review.created_at.desc())
+        review_base = Review.query.filter_by(category_id=cat_info.id)
     else:
-        review_base = Review.query.filter_by(product_id=pid).order_by(Review.created_at.desc())
+        review_base = Review.query.filter_by(product_id=pid)
     reviews_total_count = review_base.count()
-    product_reviews = review_base.limit(5).all()
-    reviews_has_more = reviews_total_count > 5
+    product_reviews, review_next_key = _review_page(review_base)
+    reviews_has_more = bool(review_next_key)
+    reviews_next_cursor = encode_cursor(*review_next_key) if review_next_key else ''
     review_vote_info = _get_review_vote_info(
         [r.id for r in product_reviews],
         current_user.id if current_user.is_authenticated else None,
     )
 
-    # 인터넷 최저가: API로 최저가순 최대 3건 조회. 없으면 DB 저장값 1건으로 대체
-    naver_lowest_list = get_lowest_price_list(p.name, 3)
-    if not naver_lowest_list and getattr(p, "naver_lowest_price", None) and getattr(p, "naver_lowest_link", None):
-        naver_lowest_list = [{"price": p.naver_lowest_price, "link": p.naver_lowest_link, "mall_name": getattr(p, "naver_lowest_mall", None), "title": None}]
+    # 인터넷 최저가: 백그라운드 갱신(naver_price_refresh.py)이 저장한 최저가순 최대 3건 (상세에서 API 호출 없음)
+    naver_lowest_list = stored_price_list(p)
 
     # 동일 카테고리 상품 (현재 상품 제외, 판매중·재고 있음 우선, 최대 8개)
     same_category_products = Product.query.filter(
@@ -8597,6 +8661,7 @@ def product_detail(pid):
                 var reviewsTotal = {{ reviews_total_count }};
                 var reviewsLoaded = 5;
                 var reviewPage = 2;
+                var reviewCursor = {{ reviews_next_cursor|tojson }};
                 var categoryId = {{ cat_info.id if cat_info else 'null' }};
                 var productId = {{ p.id }};
                 var btn = document.getElementById('reviews-load-more-btn');
@@ -8607,9 +8672,9 @@ def product_detail(pid):
                 btn.addEventListener('click', function(){
                     if (btn.disabled) return;
                     btn.disabled = true;
-                    var url = '/api/product_reviews?page=' + reviewPage + '&per_page=5';
+                    var url = '/api/product_reviews?cursor=' + encodeURIComponent(reviewCursor) + '&per_page=5';
                     if (categoryId != null) url += '&category_id=' + categoryId; else url += '&product_id=' + productId;
-                    fetch(url).then(function(r){ return r.json(); }).then(function(data){
+                    fetch(url).then(function(r){ reviewCursor = r.headers.get('X-Next-Cursor') || ''; return r.json(); }).then(function(data){
                         data.forEach(function(r){
                             var imgPart = r.image_url ? '<div class="w-20 h-20 sm:w-24 sm:h-24 flex-shrink-0 rounded-xl overflow-hidden border border-gray-100 bg-gray-50"><img src="' + r.image_url.replace(/"/g,'&quot;') + '" class="w-full h-full object-cover" loading="lazy" alt=""></div>' : '<div class="w-20 h-20 sm:w-24 sm:h-24 rounded-xl bg-gray-100 flex items-center justify-center text-gray-400 text-[10px] font-bold flex-shrink-0 border border-gray-100">사진 없음</div>';
                             var rec = r.recommend_count || 0, notRec = r.not_recommend_count || 0, myVote = r.my_vote;
@@ -8625,7 +8690,7 @@ def product_detail(pid):
                         reviewsLoaded += data.length;
                         reviewPage++;
                         updateBtnText();
-                        if (reviewsLoaded >= reviewsTotal || data.length < 5){ wrap.classList.add('hidden'); endMsg.classList.remove('hidden'); }
+                        if (!reviewCursor){ wrap.classList.add('hidden'); endMsg.classList.remove('hidden'); }
                         else { btn.disabled = false; }
                     }).catch(function(){ btn.disabled = false; });
                 });
@@ -8841,6 +8906,7 @@ def product_detail(pid):
                                   product_reviews=product_reviews,
                                   reviews_total_count=reviews_total_count,
                                   reviews_has_more=reviews_has_more,
+                                  reviews_next_cursor=reviews_next_cursor,
                                   review_vote_info=review_vote_info,
                                   user_logged_in=current_user.is_authenticated,
                                   recommend_cats_detail=recommend_cats_detail,
@@ -8868,6 +8934,67 @@ def admin_debug_product(pid):
         "image_url": p.image_url,
         "detail_image_url_raw": p.detail_image_url,
     })
+
+
+@app.route('/admin/debug/template_cache')
+@login_required
+def admin_debug_template_cache():
+    """템플릿 컴파일 캐시 적중/미적중 현황."""
+    if not current_user.is_admin:
+        return redirect('/')
+    return jsonify(template_cache_stats())
+
+
+def _geocode_warmup_addresses():
+    """워밍업 대상: 회원 주소 + 주문 배송지 (중복 제거는 start_geocode_warmup에서)."""
+    for (addr,) in db.session.query(User.address).filter(User.address.isnot(None), User.address != '').distinct():
+        yield addr
+    for (addr,) in db.session.query(Order.delivery_address).filter(Order.delivery_address.isnot(None), Order.delivery_address != '').distinct():
+        # 주문 배송지는 "(도로명) 상세" 형식이 섞여 있음 → 괄호 안 기본주소도 함께
+        m = re.match(r'\(([^)]+)\)', addr.strip())
+        yield m.group(1) if m else addr
+
+
+@app.route('/admin/geocode/warmup', methods=['GET', 'POST'])
+@login_required
+def admin_geocode_warmup():
+    """GET: 지오코딩 캐시·워밍업 현황. POST: 회원 주소·주문 배송지 전체 미리 지오코딩 시작 (백그라운드)."""
+    if not current_user.is_admin:
+        return jsonify({'error': '권한이 없습니다.'}), 403
+    started = None
+    if request.method == 'POST':
+        started = start_geocode_warmup(app, _geocode_warmup_addresses, _geocode_address)
+    return jsonify({'started': started, 'warmup': geocode_warmup_status(), 'cache': geocode_cache.stats()})
+
+
+@app.route('/admin/debug/notification_outbox', methods=['GET', 'POST'])
+@login_required
+def admin_debug_notification_outbox():
+    """알림 아웃박스 현황 (상태별 건수·최근 발송 포기 건). POST 시 발송 포기 건 재시도."""
+    if not current_user.is_admin:
+        return redirect('/')
+    requeued = notification_dispatcher.requeue_dead() if request.method == 'POST' else None
+    return jsonify(dict(notification_dispatcher.stats(), requeued=requeued))
+
+
+@app.route('/admin/debug/integrations')
+@login_required
+def admin_debug_integrations():
+    """외부 연동별 호출 수·오류·재시도·서킷 상태·지연 시간 히스토그램 (이 워커 기준)."""
+    if not current_user.is_admin:
+        return redirect('/')
+    return jsonify(integration_http.stats())
+
+
+@app.route('/admin/debug/message_push')
+@login_required
+def admin_debug_message_push():
+    """새 메시지 SSE 현황 (이 워커의 열린 스트림 수·전달/누락 건수)."""
+    if not current_user.is_admin:
+        return redirect('/')
+    return jsonify(message_broker.stats())
+
+
 @app.route('/category/seller/<int:cid>')
 def seller_info_page(cid):
     """판매 사업자 정보 상세 페이지"""
@@ -8927,27 +9054,6 @@ def category_view_path(cat_path):
 
 def _find_or_create_social_user(provider, provider_id, email, name):
     """소셜 로그인: provider+provider_id 또는 email로 회원 찾기, 없으면 생성. 반환: User"""
-    try:
-        return _find_or_create_social_user_impl(provider, provider_id, email, name)
-    except Exception as e:
-        err_str = str(e).lower()
-        if "withdrawn_at" in err_str or "created_at" in err_str or "no such column" in err_str or "unknown column" in err_str or "does not exist" in err_str or "undefinedcolumn" in err_str or "aborted" in err_str:
-            try:
-                db.session.rollback()  # PostgreSQL: 실패한 트랜잭션 정리
-                _ensure_user_withdrawn_at_column_standalone()  # 세션과 무관한 별도 연결로 컬럼 추가
-                db.session.rollback()
-                return _find_or_create_social_user_impl(provider, provider_id, email, name)
-            except Exception:
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                raise
-        raise
-
-
-def _find_or_create_social_user_impl(provider, provider_id, email, name):
-    """소셜 로그인 구현 (User 조회/생성)."""
     user = User.query.filter_by(auth_provider=provider, auth_provider_id=str(provider_id)).first()
     if user:
         if (email and not user.email):
@@ -9026,18 +9132,22 @@ def auth_naver_callback():
     if not client_id or not client_secret:
         flash("네이버 로그인이 설정되지 않았습니다."); return redirect('/login')
     redirect_uri = _oauth_redirect_base() + '/auth/naver/callback'
-    token_res = requests.post(
-        'https://nid.naver.com/oauth2.0/token',
-        data={
-            'grant_type': 'authorization_code',
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'code': code,
-            'state': state,
-            'redirect_uri': redirect_uri
-        },
-        headers={'Accept': 'application/json'}
-    )
+    try:
+        token_res = integration_http.post(
+            'naver_oauth',
+            'https://nid.naver.com/oauth2.0/token',
+            data={
+                'grant_type': 'authorization_code',
+                'client_id': client_id,
+                'client_secret': client_secret,
+                'code': code,
+                'state': state,
+                'redirect_uri': redirect_uri
+            },
+            headers={'Accept': 'application/json'}
+        )
+    except requests.RequestException:
+        flash("네이버 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if token_res.status_code != 200:
         flash("네이버 로그인(토큰)에 실패했습니다."); return redirect('/login')
     try:
@@ -9047,10 +9157,14 @@ def auth_naver_callback():
         flash("네이버 로그인 응답 오류."); return redirect('/login')
     if not access_token:
         flash("네이버 로그인에 실패했습니다."); return redirect('/login')
-    profile_res = requests.get(
-        'https://openapi.naver.com/v1/nid/me',
-        headers={'Authorization': 'Bearer ' + access_token}
-    )
+    try:
+        profile_res = integration_http.get(
+            'naver_oauth',
+            'https://openapi.naver.com/v1/nid/me',
+            headers={'Authorization': 'Bearer ' + access_token}
+        )
+    except requests.RequestException:
+        flash("네이버 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if profile_res.status_code != 200:
         flash("프로필 조회에 실패했습니다."); return redirect('/login')
     try:
@@ -9063,7 +9177,6 @@ def auth_naver_callback():
         flash("프로필 형식 오류."); return redirect('/login')
     if not pid:
         flash("네이버 프로필을 가져올 수 없습니다."); return redirect('/login')
-    _ensure_user_withdrawn_at_column_standalone()  # User 조회 전에 컬럼 확보
     try:
         user = _find_or_create_social_user('naver', pid, email, name)
         if getattr(user, "withdrawn_at", None):
@@ -9120,17 +9233,21 @@ def auth_google_callback():
     if not client_id or not client_secret:
         flash("구글 로그인이 설정되지 않았습니다."); return redirect('/login')
     redirect_uri = _oauth_redirect_base() + '/auth/google/callback'
-    token_res = requests.post(
-        'https://oauth2.googleapis.com/token',
-        data={
-            'code': code,
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'redirect_uri': redirect_uri,
-            'grant_type': 'authorization_code'
-        },
-        headers={'Content-Type': 'application/x-www-form-urlencoded'}
-    )
+    try:
+        token_res = integration_http.post(
+            'google_oauth',
+            'https://oauth2.googleapis.com/token',
+            data={
+                'code': code,
+                'client_id': client_id,
+                'client_secret': client_secret,
+                'redirect_uri': redirect_uri,
+                'grant_type': 'authorization_code'
+            },
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+    except requests.RequestException:
+        flash("구글 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if token_res.status_code != 200:
         flash("구글 로그인(토큰)에 실패했습니다."); return redirect('/login')
     try:
@@ -9140,10 +9257,14 @@ def auth_google_callback():
         flash("구글 로그인 응답 오류."); return redirect('/login')
     if not access_token:
         flash("구글 로그인에 실패했습니다."); return redirect('/login')
-    profile_res = requests.get(
-        'https://www.googleapis.com/oauth2/v2/userinfo',
-        headers={'Authorization': 'Bearer ' + access_token}
-    )
+    try:
+        profile_res = integration_http.get(
+            'google_oauth',
+            'https://www.googleapis.com/oauth2/v2/userinfo',
+            headers={'Authorization': 'Bearer ' + access_token}
+        )
+    except requests.RequestException:
+        flash("구글 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if profile_res.status_code != 200:
         flash("프로필 조회에 실패했습니다."); return redirect('/login')
     try:
@@ -9155,7 +9276,6 @@ def auth_google_callback():
         flash("프로필 형식 오류."); return redirect('/login')
     if not pid:
         flash("구글 프로필을 가져올 수 없습니다."); return redirect('/login')
-    _ensure_user_withdrawn_at_column_standalone()  # User 조회 전에 컬럼 확보
     try:
         user = _find_or_create_social_user('google', str(pid), email, name)
         if getattr(user, "withdrawn_at", None):
@@ -9219,11 +9339,15 @@ def auth_kakao_callback():
     }
     if client_secret:
         token_payload['client_secret'] = client_secret
-    token_res = requests.post(
-        'https://kauth.kakao.com/oauth/token',
-        data=token_payload,
-        headers={'Content-Type': 'application/x-www-form-urlencoded'}
-    )
+    try:
+        token_res = integration_http.post(
+            'kakao_oauth',
+            'https://kauth.kakao.com/oauth/token',
+            data=token_payload,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+    except requests.RequestException:
+        flash("카카오 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if token_res.status_code != 200:
         flash("카카오 로그인(토큰)에 실패했습니다."); return redirect('/login')
     try:
@@ -9233,10 +9357,14 @@ def auth_kakao_callback():
         flash("카카오 로그인 응답 오류."); return redirect('/login')
     if not access_token:
         flash("카카오 로그인에 실패했습니다."); return redirect('/login')
-    profile_res = requests.get(
-        'https://kapi.kakao.com/v2/user/me',
-        headers={'Authorization': 'Bearer ' + access_token}
-    )
+    try:
+        profile_res = integration_http.get(
+            'kakao_oauth',
+            'https://kapi.kakao.com/v2/user/me',
+            headers={'Authorization': 'Bearer ' + access_token}
+        )
+    except requests.RequestException:
+        flash("카카오 로그인 서버 응답이 없습니다. 잠시 후 다시 시도해 주세요."); return redirect('/login')
     if profile_res.status_code != 200:
         flash("카카오 프로필 조회에 실패했습니다."); return redirect('/login')
     try:
@@ -9250,7 +9378,6 @@ def auth_kakao_callback():
         flash("카카오 프로필 형식 오류."); return redirect('/login')
     if not pid:
         flash("카카오 프로필을 가져올 수 없습니다."); return redirect('/login')
-    _ensure_user_withdrawn_at_column_standalone()  # User 조회 전에 컬럼 확보
     try:
         user = _find_or_create_social_user('kakao', str(pid), email, name)
         if getattr(user, "withdrawn_at", None):
@@ -9351,27 +9478,14 @@ def auth_status():
 def login():
     """로그인 라우트"""
     if request.method == 'POST':
-        _ensure_user_withdrawn_at_column_standalone()  # 로그인 쿼리 전에 컬럼 확보 (PostgreSQL 등)
         user = None
         try:
             user = User.query.filter_by(email=request.form.get('email')).first()
         except Exception as e:
-            err_str = str(e).lower()
-            if "withdrawn_at" in err_str or "created_at" in err_str or "no such column" in err_str or "unknown column" in err_str or "does not exist" in err_str or "undefinedcolumn" in err_str or "aborted" in err_str:
-                try:
-                    db.session.rollback()  # PostgreSQL: 실패한 트랜잭션 정리
-                    _ensure_user_withdrawn_at_column_standalone()  # 세션과 무관한 별도 연결로 컬럼 추가
-                    db.session.rollback()
-                    user = User.query.filter_by(email=request.form.get('email')).first()
-                except Exception as retry_e:
-                    print(f"[login] migration/retry failed: {retry_e}", flush=True)
-                    try:
-                        db.session.rollback()
-                    except Exception:
-                        pass
-            if user is None:
-                flash("일시적인 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.")
-                return redirect(url_for('login'))
+            print(f"[login] user query failed: {e}", flush=True)
+            db.session.rollback()
+            flash("일시적인 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+            return redirect(url_for('login'))
         if user and user.password and check_password_hash(user.password, request.form.get('password')):
             if getattr(user, "withdrawn_at", None):
                 flash("탈퇴된 계정입니다.")
@@ -9460,10 +9574,8 @@ def register():
         db.session.commit()
         title, body = get_template_content('welcome')
         send_message(new_user.id, title, body, 'welcome')
-        try:
-            send_alimtalk_welcome(new_user.phone, new_user.name)
-        except Exception:
-            pass
+        if new_user.phone:
+            enqueue_notification('alimtalk', {"kind": "welcome", "phone": new_user.phone, "customer_name": new_user.name})
         apply_welcome_event_points(new_user)
         db.session.commit()
         flash("가입이 완료되었습니다. 로그인해 주세요.")
@@ -10160,8 +10272,9 @@ def mypage():
 
     # 품목별 금액 상세 + 품목별 취소용 OrderItem 목록 (취소 품목도 표기)
     enhanced_orders = []
+    items_by_order = load_order_items(o.id for o in orders)
     for o in orders:
-        o.order_items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
+        o.order_items = items_by_order.get(o.id, [])
         details_with_price = []
         if o.order_items:
             for oi in o.order_items:
@@ -10853,6 +10966,39 @@ def _toss_cancel_headers(idempotency_key):
     }
 
 
+def _toss_refund_unfinalized_payment(payment_key, order_id, reason):
+    """승인은 됐지만 주문 생성에 실패한 결제(재고 부족 등) 전액 취소. 성공 여부 반환."""
+    try:
+        res = integration_http.post(
+            "toss",
+            f"https://api.tosspayments.com/v1/payments/{payment_key}/cancel",
+            json={"cancelReason": reason},
+            headers=_toss_cancel_headers(f"unfinalized-{order_id}"),
+        )
+        if res.status_code in (200, 201):
+            return True
+        print(f"[Toss refund error] orderId={order_id} status={res.status_code} body={res.text}")
+    except Exception as e:
+        print(f"[Toss refund error] orderId={order_id} {e!r}")
+    return False
+
+
+def _toss_payment_by_order_id(order_id, timeout=None, retries=None):
+    """주문번호로 토스 결제 조회 (GET /v1/payments/orders/{orderId}). 결제 dict, 결제 없음(404)이면 None.
+    그 밖의 응답·연결 오류는 예외 → 호출 쪽에서 나중에 다시 조회. timeout·retries 생략 시 toss 연동 기본값."""
+    auth_key = base64.b64encode(f"{TOSS_SECRET_KEY}:".encode()).decode()
+    res = integration_http.get(
+        "toss",
+        f"https://api.tosspayments.com/v1/payments/orders/{quote(order_id, safe='')}",
+        headers={"Authorization": f"Basic {auth_key}"},
+        timeout=timeout, retries=retries,
+    )
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+    return res.json()
+
+
 @app.route('/order/cancel_item/<int:order_id>/<int:item_id>', methods=['POST'])
 @login_required
 def order_cancel_item(order_id, item_id):
@@ -10882,7 +11028,7 @@ def order_cancel_item(order_id, item_id):
         body = {"cancelAmount": cancel_amount, "cancelReason": "품목 부분 취소"}
         if tax_free_cancel:
             body["taxFreeAmount"] = tax_free_cancel
-        res = requests.post(url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-item-{oi.id}"), timeout=30)
+        res = integration_http.post("toss", url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-item-{oi.id}"))
         if res.status_code not in (200, 201):
             try:
                 err = res.json()
@@ -10919,7 +11065,7 @@ def _do_full_order_cancel(order):
         tax_free = getattr(order, 'tax_free_amount', None) or 0
         if tax_free and int(tax_free) > 0:
             body["taxFreeAmount"] = int(tax_free)
-        res = requests.post(url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-full"), timeout=30)
+        res = integration_http.post("toss", url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-full"))
         if res.status_code not in (200, 201):
             try:
                 err = res.json()
@@ -11107,15 +11253,15 @@ def cart():
     can_use_points = max_use > 0 and items
     meets_min_order = (total >= min_order_to_use) if (min_order_to_use and min_order_to_use > 0) else True
     
-    # 상단 헤더 및 빈 장바구니 처리
-    content = f"""
+    # 장바구니 화면은 고정 Jinja 소스(컴파일 캐시 대상), 값은 컨텍스트로만 전달
+    content = """
     <div class="max-w-4xl mx-auto py-10 md:py-16 px-4 md:px-6 text-left">
         <div class="flex items-baseline justify-between mb-8 md:mb-10">
             <h1 class="text-2xl md:text-3xl font-semibold text-gray-900 tracking-tight">장바구니</h1>
         </div>
         
         <div class="bg-white rounded-2xl md:rounded-3xl shadow-sm border border-gray-100 overflow-hidden">
-            {" " if items else f'''
+            {% if not items %}
             <div class="py-24 md:py-32 text-center">
                 <p class="text-6xl md:text-7xl mb-6 opacity-10">🧺</p>
                 <p class="text-base md:text-lg mb-6 text-gray-400 font-medium">장바구니가 비어 있습니다.</p>
@@ -11123,78 +11269,69 @@ def cart():
                     상품 보러가기
                 </a>
             </div>
-            '''}
-    """
-
-    # 장바구니 상품 리스트
-    if items:
-        content += '<div class="p-6 md:p-12 space-y-8">'
-        for i in items:
-            max_q = product_limits.get(i.product_id, 0)
-            at_limit = max_q > 0 and i.quantity >= max_q
-            limit_label = f' <span class="text-[10px] text-amber-600 font-medium">(최대 {max_q}개)</span>' if max_q > 0 else ''
-            plus_disabled = ' disabled class="cursor-not-allowed opacity-50"' if at_limit else ''
-            plus_title = f' title="이 상품은 최대 {max_q}개까지 구매 가능합니다"' if at_limit else ''
-            content += f"""
+            {% else %}
+            <div class="p-6 md:p-12 space-y-8">
+            {% for i in items %}
+            {% set max_q = product_limits.get(i.product_id, 0) %}
+            {% set at_limit = max_q > 0 and i.quantity >= max_q %}
             <div class="flex flex-col md:flex-row justify-between items-start md:items-center border-b border-gray-100 pb-6 md:pb-7 gap-4">
                 <div class="flex-1 text-left">
-                    <p class="text-[11px] text-gray-400 mb-1 tracking-wide">[{ i.product_category }]</p>
-                    <p class="font-semibold text-base md:text-lg text-gray-900 leading-snug mb-1.5">{ i.product_name }</p>
-                    <p class="text-gray-500 text-sm md:text-base font-medium">{ "{:,}".format(i.price) }원{ limit_label }</p>
+                    <p class="text-[11px] text-gray-400 mb-1 tracking-wide">[{{ i.product_category }}]</p>
+                    <p class="font-semibold text-base md:text-lg text-gray-900 leading-snug mb-1.5">{{ i.product_name }}</p>
+                    <p class="text-gray-500 text-sm md:text-base font-medium">{{ "{:,}".format(i.price) }}원{% if max_q > 0 %} <span class="text-[10px] text-amber-600 font-medium">(최대 {{ max_q }}개)</span>{% endif %}</p>
                 </div>
                 
                 <div class="flex items-center justify-between w-full md:w-auto gap-4">
                     <div class="flex items-center gap-4 bg-gray-50 px-4 py-2.5 rounded-xl border border-gray-100">
-                        <button onclick="minusFromCart({i.product_id})" class="text-gray-400 hover:text-gray-700 transition text-lg">
+                        <button onclick="minusFromCart({{ i.product_id }})" class="text-gray-400 hover:text-gray-700 transition text-lg">
                             <i class="fas fa-minus"></i>
                         </button>
-                        <span class="font-semibold text-base w-6 text-center text-gray-900">{ i.quantity }</span>
-                        <button onclick="addToCart({i.product_id})"{ plus_disabled }{ plus_title } class="text-gray-400 hover:text-gray-700 transition text-lg">
+                        <span class="font-semibold text-base w-6 text-center text-gray-900">{{ i.quantity }}</span>
+                        <button onclick="addToCart({{ i.product_id }})"{% if at_limit %} disabled class="cursor-not-allowed opacity-50" title="이 상품은 최대 {{ max_q }}개까지 구매 가능합니다"{% endif %} class="text-gray-400 hover:text-gray-700 transition text-lg">
                             <i class="fas fa-plus"></i>
                         </button>
                     </div>
                     
-                    <form action="/cart/delete/{i.product_id}" method="POST" class="md:ml-4">
+                    <form action="/cart/delete/{{ i.product_id }}" method="POST" class="md:ml-4">
                         <button class="text-gray-300 hover:text-red-500 transition text-xl p-2" aria-label="삭제">
                             <i class="fas fa-trash-alt"></i>
                         </button>
                     </form>
                 </div>
             </div>
-            """
-        
-        # 결제 요약 영역
-        min_order_msg = ""
-        if min_order_to_use and min_order_to_use > 0:
-            if meets_min_order:
-                min_order_msg = f'<p class="text-[10px] md:text-xs text-teal-600 font-bold mt-2"><i class="fas fa-check-circle mr-1"></i> 최소 주문 금액({min_order_to_use:,}원)을 충족했습니다. 주문 가능합니다.</p>'
-            else:
-                min_order_msg = f'<p class="text-[10px] md:text-xs text-amber-600 font-bold mt-2"><i class="fas fa-exclamation-circle mr-1"></i> 최소 주문 금액은 {min_order_to_use:,}원입니다. 현재 주문 금액 {total:,}원으로는 주문할 수 없습니다. 상품을 더 담아 주세요.</p>'
-        point_info = ""
-        if can_use_points:
-            point_info = f'''<div class="pt-4 mt-4 border-t border-gray-200">
-                <p class="text-[11px] text-gray-500 font-medium mb-1">보유 포인트 {user_points:,}원 · 이번 주문에서 최대 {max_use:,}원 사용 가능</p>
-                <p class="text-[10px] text-gray-400 mt-0.5">다음 단계(주문 확인)에서 사용할 포인트 금액을 입력할 수 있습니다.</p>
-            </div>'''
-        else:
-            point_info = f'''<div class="pt-4 mt-4 border-t border-gray-200">
-                <p class="text-[11px] text-gray-500 font-medium mb-1">보유 포인트 {user_points:,}원</p>
-                <p class="text-[10px] text-gray-400 mt-0.5">포인트는 주문 금액이 {min_order_to_use:,}원 이상일 때 사용 가능하며, 주문 확인 단계에서 입력합니다.</p>
-            </div>''' if (min_order_to_use and min_order_to_use > 0) else f'<div class="pt-4 mt-4 border-t border-gray-200"><p class="text-[11px] text-gray-500">보유 포인트 {user_points:,}원</p></div>'
-        content += f"""
-            <div class="bg-gray-50 p-6 md:p-8 rounded-2xl md:rounded-3xl space-y-4 mt-10 border border-gray-100">
+            {% endfor %}
+            
+            <div class="bg-gray-50 p-6 md:p-8 rounded-2xl md:rounded-3xl space-y-4 mt-10 border border-gray-100">
                 <div class="flex justify-between text-sm md:text-base text-gray-600 font-medium">
                     <span>주문 상품 합계</span>
-                    <span>{ "{:,}".format(subtotal) }원</span>
+                    <span>{{ "{:,}".format(subtotal) }}원</span>
                 </div>
                 <div class="flex justify-between items-center pt-5 border-t border-gray-200 mt-5">
                     <span class="text-sm md:text-base text-gray-500 font-medium">최종 결제 금액</span>
                     <span class="text-2xl md:text-3xl text-gray-900 font-semibold tracking-tight">
-                        { "{:,}".format(total) }원
+                        {{ "{:,}".format(total) }}원
                     </span>
                 </div>
-                {min_order_msg}
-                {point_info}
+                {% if min_order_to_use and min_order_to_use > 0 %}
+                {% if meets_min_order %}
+                <p class="text-[10px] md:text-xs text-teal-600 font-bold mt-2"><i class="fas fa-check-circle mr-1"></i> 최소 주문 금액({{ "{:,}".format(min_order_to_use) }}원)을 충족했습니다. 주문 가능합니다.</p>
+                {% else %}
+                <p class="text-[10px] md:text-xs text-amber-600 font-bold mt-2"><i class="fas fa-exclamation-circle mr-1"></i> 최소 주문 금액은 {{ "{:,}".format(min_order_to_use) }}원입니다. 현재 주문 금액 {{ "{:,}".format(total) }}원으로는 주문할 수 없습니다. 상품을 더 담아 주세요.</p>
+                {% endif %}
+                {% endif %}
+                {% if can_use_points %}
+                <div class="pt-4 mt-4 border-t border-gray-200">
+                    <p class="text-[11px] text-gray-500 font-medium mb-1">보유 포인트 {{ "{:,}".format(user_points) }}원 · 이번 주문에서 최대 {{ "{:,}".format(max_use) }}원 사용 가능</p>
+                    <p class="text-[10px] text-gray-400 mt-0.5">다음 단계(주문 확인)에서 사용할 포인트 금액을 입력할 수 있습니다.</p>
+                </div>
+                {% elif min_order_to_use and min_order_to_use > 0 %}
+                <div class="pt-4 mt-4 border-t border-gray-200">
+                    <p class="text-[11px] text-gray-500 font-medium mb-1">보유 포인트 {{ "{:,}".format(user_points) }}원</p>
+                    <p class="text-[10px] text-gray-400 mt-0.5">포인트는 주문 금액이 {{ "{:,}".format(min_order_to_use) }}원 이상일 때 사용 가능하며, 주문 확인 단계에서 입력합니다.</p>
+                </div>
+                {% else %}
+                <div class="pt-4 mt-4 border-t border-gray-200"><p class="text-[11px] text-gray-500">보유 포인트 {{ "{:,}".format(user_points) }}원</p></div>
+                {% endif %}
                 <p class="text-[11px] md:text-xs text-gray-500 mt-1 font-medium">다음 단계에서 배송지를 다시 확인하고 수정할 수 있습니다.</p>
             </div>
             
@@ -11209,10 +11346,8 @@ def cart():
                 </form>
             </div>
             <p class="text-[10px] text-gray-400 mt-3 text-center">오류가 나거나 다시 담으려면 위 <strong>장바구니 비우기</strong> 후 상품을 다시 담아 주세요.</p>
-        </div>
-        """
-        if not meets_min_order:
-            content += """
+            </div>
+            {% if not meets_min_order %}
             <script>
             (function(){
                 var btn = document.getElementById('cart-order-btn');
@@ -11222,10 +11357,14 @@ def cart():
                 }
             })();
             </script>
-            """
-
-    content += "</div>"
-    return render_template_string(HEADER_HTML + content + FOOTER_HTML, items=items, subtotal=subtotal, delivery_fee=delivery_fee, total=total, delivery_fee_breakdown=delivery_fee_breakdown if items else {})
+            {% endif %}
+            {% endif %}
+        </div>
+    </div>
+    """
+    return render_template_string(HEADER_HTML + content + FOOTER_HTML, items=items, subtotal=subtotal, delivery_fee=delivery_fee, total=total, delivery_fee_breakdown=delivery_fee_breakdown if items else {},
+                                  product_limits=product_limits, min_order_to_use=min_order_to_use, meets_min_order=meets_min_order,
+                                  can_use_points=can_use_points, user_points=user_points, max_use=max_use)
 @app.route('/order/confirm')
 @login_required
 def order_confirm():
@@ -11561,49 +11700,66 @@ def _finalize_order_from_cart(user, items, order_id, payment_key=None, order_sta
     db.session.add(order)
     db.session.flush()
 
+    # 카트 상품·카테고리는 IN 쿼리 1회씩으로 로드 (장바구니 크기와 무관한 쿼리 수)
+    cat_names = {i.product_category for i in items if i.product_category}
+    categories_by_name = {c.name: c for c in Category.query.filter(Category.name.in_(cat_names)).all()} if cat_names else {}
+
+    order_items = []
     for i in items:
-        p = Product.query.get(i.product_id)
+        p = products_by_id.get(i.product_id)
         supplier_val = (getattr(p, 'supplier', None) or '').strip() if p else ''
-        db.session.add(OrderItem(
+        order_items.append(dict(
             order_id=order.id, product_id=i.product_id, product_name=i.product_name,
             product_category=i.product_category, price=i.price, quantity=i.quantity,
             tax_type=i.tax_type or '과세', item_status=item_status, supplier=supplier_val or None,
         ))
-    db.session.flush()
+    # 품목 INSERT 1회로 생성 id까지 받음 (ORM flush는 생성 id를 받느라 SQLite에서 행마다 INSERT)
+    # PostgreSQL: INSERT ... RETURNING id 일괄 실행, 입력 순서대로 id 반환 (재조회 없음)
+    # SQLite는 입력 순서를 보장하는 RETURNING이 행마다 INSERT로 풀리므로 아래 대체 경로
+    dialect = db.engine.dialect
+    if dialect.name != 'sqlite' and dialect.insert_executemany_returning_sort_by_parameter_order:
+        item_ids = db.session.scalars(
+            db.insert(OrderItem).returning(OrderItem.id, sort_by_parameter_order=True), order_items
+        ).all()
+    else:
+        # SQLite 대체: executemany 후 id 재조회 (새 주문의 품목은 이 트랜잭션에서만 추가 → id 오름차순 = 입력 순서)
+        db.session.execute(db.insert(OrderItem), order_items)
+        item_ids = db.session.execute(
+            db.select(OrderItem.id).where(OrderItem.order_id == order.id).order_by(OrderItem.id.asc())
+        ).scalars().all()
+    for oi, oi_id in zip(order_items, item_ids):
+        oi['id'] = oi_id
 
-    order_items = OrderItem.query.filter_by(order_id=order.id).order_by(OrderItem.id.asc()).all()
     delivery_fee_per_settlement = 990
+    settlement_rows = []
     for oi in order_items:
-        cat = Category.query.filter_by(name=oi.product_category).first()
+        cat = categories_by_name.get(oi['product_category'])
         cat_type = getattr(cat, 'category_type', None) or '입점형'
         if cat_type == '공급자형':
-            p = Product.query.get(oi.product_id)
-            base_price = (getattr(p, 'supply_price', None) or p.price) if p else oi.price
-            sales_amount = base_price * oi.quantity
+            p = products_by_id.get(oi['product_id'])
+            base_price = (getattr(p, 'supply_price', None) or p.price) if p else oi['price']
+            sales_amount = base_price * oi['quantity']
             fee = 0
             delivery_fee_per = 0
             total = sales_amount
         else:
-            sales_amount = oi.price * oi.quantity
+            sales_amount = oi['price'] * oi['quantity']
             fee = round(sales_amount * 0.055)
             delivery_fee_per = delivery_fee_per_settlement
             total = sales_amount - fee - delivery_fee_per
-        settlement_no = "N" + str(oi.id).zfill(10)
+        settlement_no = "N" + str(oi['id']).zfill(10)
         tax_exempt_val = (getattr(cat, 'tax_type', None) or '과세') == '면세'
-        db.session.add(Settlement(
-            settlement_no=settlement_no, order_id=order.id, order_item_id=oi.id,
-            sale_dt=order.created_at, category=oi.product_category,
+        settlement_rows.append(dict(
+            settlement_no=settlement_no, order_id=order.id, order_item_id=oi['id'],
+            sale_dt=order.created_at, category=oi['product_category'],
             tax_exempt=tax_exempt_val,
-            product_name=oi.product_name, sales_amount=sales_amount, fee=fee,
+            product_name=oi['product_name'], sales_amount=sales_amount, fee=fee,
             delivery_fee=delivery_fee_per, settlement_total=total,
             category_type=cat_type,
             settlement_status='입금대기', settled_at=None,
         ))
-
-    for i in items:
-        p = Product.query.get(i.product_id)
-        if p:
-            p.stock -= i.quantity
+    if settlement_rows:
+        db.session.execute(db.insert(Settlement), settlement_rows)
 
     apply_order_points(user, original_total, points_used, order.id)
     if session.get('save_address_to_profile') and delivery_addr:
@@ -11612,9 +11768,38 @@ def _finalize_order_from_cart(user, items, order_id, payment_key=None, order_sta
         user.address_detail = delivery_addr_detail
         user.entrance_pw = delivery_entrance_pw
 
-    _clear_checkout_session()
     Cart.query.filter_by(user_id=user.id).delete()
+
+    # 재고 차감: 커밋 직전 마지막 문장으로 조건부 UPDATE 1회 (stock >= 주문수량인 행만) → 동시 결제 시 초과 판매 방지
+    # (지오코딩 등 외부 호출·주문 행 생성을 모두 마친 뒤 실행 → 상품 행 잠금은 커밋까지 잠깐만 유지)
+    # 갱신된 행 수가 상품 수와 다르면 재고 부족 상품이 있는 것 → 주문·포인트·장바구니 삭제까지 전체 롤백
+    qty_by_pid = {}
+    for i in items:
+        if i.product_id in products_by_id:
+            qty_by_pid[i.product_id] = qty_by_pid.get(i.product_id, 0) + (i.quantity or 0)
+    if qty_by_pid:
+        qty_expr = case(qty_by_pid, value=Product.id)
+        updated = Product.query.filter(
+            Product.id.in_(list(qty_by_pid)),
+            or_(Product.stock.is_(None), Product.stock >= qty_expr),
+        ).update({
+            Product.stock: Product.stock - qty_expr,
+            Product.is_sellable: sellable_clause(now_kst(), Product.stock - qty_expr),
+        }, synchronize_session=False)
+        if updated != len(qty_by_pid):
+            names = [(products_by_id[pid].name, pid, qty) for pid, qty in qty_by_pid.items()]
+            db.session.rollback()
+            short = next((name for name, pid, qty in names
+                          if (db.session.get(Product, pid).stock or 0) < qty
+                          and db.session.get(Product, pid).stock is not None), None)
+            if short:
+                flash(f"「{short}」의 재고가 부족하여 주문할 수 없습니다. 장바구니 수량을 확인해 주세요.")
+            else:
+                flash("재고가 부족한 상품이 있어 주문할 수 없습니다. 장바구니 수량을 확인해 주세요.")
+            return None
+
     db.session.commit()
+    _clear_checkout_session()
     return order
 
 
@@ -11894,10 +12079,7 @@ def order_bank_transfer():
         else:
             title, body = get_template_content('order_created', order_id=order.order_id)
             send_message(current_user.id, title, body, 'order_created', order.id)
-            try:
-                send_alimtalk_order_event('order_created', order.customer_phone or current_user.phone, order.customer_name or current_user.name, order.order_id)
-            except Exception:
-                pass
+            queue_alimtalk_order_event('order_created', order.customer_phone or current_user.phone, order.customer_name or current_user.name, order.order_id)
             try:
                 db.session.commit()
             except Exception:
@@ -11956,6 +12138,50 @@ def order_bank_transfer():
     return render_template_string(HEADER_HTML + content + FOOTER_HTML)
 
 
+# 결제 성공 화면 본문 (주문번호·품목 수·금액은 render 변수 → 주문마다 같은 템플릿 소스)
+PAYMENT_SUCCESS_HTML = """
+    <div class="max-w-md mx-auto py-20 md:py-32 px-6 text-center font-black">
+        <div class="w-24 h-24 bg-teal-500 rounded-full flex items-center justify-center text-white text-4xl mx-auto mb-10 shadow-2xl animate-bounce">
+            <i class="fas fa-check"></i>
+        </div>
+        
+        <h2 class="text-3xl md:text-4xl font-black mb-4 text-gray-800 tracking-tighter italic uppercase">
+            주문 성공!
+        </h2>
+        <p class="text-gray-700 font-bold text-sm md:text-base mb-4 leading-relaxed">
+            품목 {{ item_count }}개, 합계 {{ "{:,}".format(total_amount) }}원이 주문되었습니다.
+        </p>
+        <p class="text-gray-400 font-bold text-xs md:text-sm mb-12 leading-relaxed">
+            앱 설치 후 알림 설정 시 배송 진행 과정을 안내받으실 수 있습니다.
+        </p>
+
+        <div class="bg-white p-8 rounded-[2.5rem] border border-gray-100 shadow-xl mb-12 text-left space-y-5">
+            <div class="pb-4 border-b border-gray-50">
+                <p class="text-[10px] text-gray-400 uppercase tracking-widest mb-1 font-black">Order ID</p>
+                <p class="text-sm font-black text-gray-700">{{ oid }}</p>
+            </div>
+            <div>
+                <p class="text-[10px] text-gray-400 uppercase tracking-widest mb-1 font-black">결제 금액</p>
+                <p class="text-2xl font-black text-teal-600 italic">{{ "{:,}".format(total_amount) }}원</p>
+            </div>
+        </div>
+
+        <div class="flex flex-col gap-4">
+            <a href="/mypage" class="bg-gray-800 text-white py-6 rounded-3xl font-black text-lg shadow-xl hover:bg-black transition active:scale-95">
+                주문 내역 확인하기
+            </a>
+            <a href="/" class="bg-white text-gray-400 py-4 rounded-3xl font-black text-sm hover:text-teal-600 transition">
+                메인으로 돌아가기
+            </a>
+        </div>
+        
+        <p class="mt-12 text-[10px] text-gray-300 font-medium">
+            문의 사항이 있으시면 1666-8320으로 연락주세요.
+        </p>
+    </div>
+    """
+
+
 # [수정] 결제 성공 화면 내 '바로가기 추가' 버튼 포함
 @app.route('/payment/success')
 @login_required
@@ -11973,9 +12199,28 @@ def payment_success():
         return redirect('/cart')
     # 결제 확인 API: JSON 본문 전송 (특수문자 있어도 JSON이므로 URL 인코딩 불필요). 응답은 HTTP 상태 코드 + JSON.
     url, auth_key = "https://api.tosspayments.com/v1/payments/confirm", base64.b64encode(f"{TOSS_SECRET_KEY}:".encode()).decode()
-    res = requests.post(url, json={"paymentKey": pk, "amount": amount_int, "orderId": oid}, headers={"Authorization": f"Basic {auth_key}", "Content-Type": "application/json"})
+    # 연결 풀(keep-alive)로 TLS 재협상 없이 호출. 멱등키 → 응답 유실 시 재시도해도 승인은 1번만
+    try:
+        res = integration_http.post("toss", url, json={"paymentKey": pk, "amount": amount_int, "orderId": oid}, headers={"Authorization": f"Basic {auth_key}", "Content-Type": "application/json", "Idempotency-Key": f"confirm-{oid}"})
+    except requests.RequestException as e:
+        # 재시도 후에도 응답 없음 → 토스에서는 승인됐을 수 있음. 먼저 기록(백그라운드 보정 대상)하고 주문번호로 조회
+        print(f"[Toss confirm error] orderId={oid} {e!r}", flush=True)
+        record_unconfirmed_payment(oid, pk, current_user.id, amount_int, repr(e))
+        try:
+            # 요청 안에서는 짧게 1번만 (이미 confirm 재시도로 지연됨) — 실패하면 백그라운드 보정에 맡김
+            payment = _toss_payment_by_order_id(oid, timeout=(3, 5), retries=0)
+        except Exception as lookup_error:
+            print(f"[Toss payment lookup error] orderId={oid} {lookup_error!r}", flush=True)
+            payment = None
+        if not (payment and payment.get('status') == 'DONE' and payment.get('paymentKey') == pk
+                and payment.get('totalAmount') == amount_int):
+            # 미승인·조회 실패: 승인된 것으로 확인되면 백그라운드에서 자동 취소
+            return redirect(url_for('payment_fail', message="결제 확인 응답이 지연되고 있습니다. 결제가 승인된 경우 자동 취소되며, 잠시 후 주문 내역을 확인해 주세요."))
+        reconciling = True
+    else:
+        reconciling = False
 
-    if res.status_code != 200:
+    if not reconciling and res.status_code != 200:
         err_msg = "결제 확인에 실패했습니다."
         err_code = ""
         trace_id = ""
@@ -11999,9 +12244,11 @@ def payment_success():
         msg_safe = (err_msg or "")[:200].strip()
         return redirect(url_for('payment_fail', message=msg_safe))
 
-    # res.status_code == 200 → 주문 생성
+    # 승인 확인됨(응답 200 또는 조회 결과 DONE) → 주문 생성
     items = Cart.query.filter_by(user_id=current_user.id).all()
     if not items:
+        if reconciling and _toss_refund_unfinalized_payment(pk, oid, "장바구니 없음으로 주문 불가"):
+            resolve_unconfirmed_payment(oid, 'refunded')
         return redirect('/cart')
 
     try:
@@ -12011,68 +12258,38 @@ def payment_success():
         )
     except Exception as e:
         db.session.rollback()
-        flash("주문 저장 중 오류가 발생했습니다. 결제는 완료되었을 수 있으니 고객센터로 문의해 주세요.")
         print(f"payment_success DB Error: {e}")
+        if _toss_refund_unfinalized_payment(pk, oid, "주문 저장 실패"):
+            if reconciling:
+                resolve_unconfirmed_payment(oid, 'refunded')
+            flash("주문 저장 중 오류가 발생하여 결제가 자동 취소되었습니다. 다시 시도해 주세요.")
+        else:
+            flash("주문 저장 중 오류가 발생했습니다. 결제는 완료되었을 수 있으니 고객센터로 문의해 주세요.")
         return redirect('/cart')
     if not order:
+        # 재고 부족·구매 제한 등으로 주문이 거절됨 → 승인된 결제 전액 취소
+        if _toss_refund_unfinalized_payment(pk, oid, "재고 부족 등으로 주문 불가"):
+            if reconciling:
+                resolve_unconfirmed_payment(oid, 'refunded')
+            flash("결제가 자동 취소되었습니다. 환불은 카드사 정책에 따라 3~7일 소요될 수 있습니다.")
+        else:
+            flash("결제 취소 처리에 실패했습니다. 고객센터(1666-8320)로 문의해 주세요.")
         return redirect('/cart')
+    if reconciling:
+        resolve_unconfirmed_payment(oid, 'finalized')
 
     title, body = get_template_content('order_created', order_id=oid)
     send_message(current_user.id, title, body, 'order_created', order.id)
-    try:
-        send_alimtalk_order_event('order_created', order.customer_phone or current_user.phone, order.customer_name or current_user.name, order.order_id)
-    except Exception:
-        pass
+    queue_alimtalk_order_event('order_created', order.customer_phone or current_user.phone, order.customer_name or current_user.name, order.order_id)
     try:
         db.session.commit()
     except Exception:
         db.session.rollback()
 
-    # ✅ 세련된 성공 화면 구성 (품목 수·합계 금액 안내 + 앱/알림 안내)
+    # ✅ 세련된 성공 화면 (품목 수·합계 금액 안내 + 앱/알림 안내) — 고정 템플릿 + 변수 → 컴파일 캐시 재사용
     item_count = sum(i.quantity for i in items)
-    total_amount = int(amt)
-    success_content = f"""
-        <div class="max-w-md mx-auto py-20 md:py-32 px-6 text-center font-black">
-            <div class="w-24 h-24 bg-teal-500 rounded-full flex items-center justify-center text-white text-4xl mx-auto mb-10 shadow-2xl animate-bounce">
-                <i class="fas fa-check"></i>
-            </div>
-            
-            <h2 class="text-3xl md:text-4xl font-black mb-4 text-gray-800 tracking-tighter italic uppercase">
-                주문 성공!
-            </h2>
-            <p class="text-gray-700 font-bold text-sm md:text-base mb-4 leading-relaxed">
-                품목 {item_count}개, 합계 {total_amount:,}원이 주문되었습니다.
-            </p>
-            <p class="text-gray-400 font-bold text-xs md:text-sm mb-12 leading-relaxed">
-                앱 설치 후 알림 설정 시 배송 진행 과정을 안내받으실 수 있습니다.
-            </p>
-
-            <div class="bg-white p-8 rounded-[2.5rem] border border-gray-100 shadow-xl mb-12 text-left space-y-5">
-                <div class="pb-4 border-b border-gray-50">
-                    <p class="text-[10px] text-gray-400 uppercase tracking-widest mb-1 font-black">Order ID</p>
-                    <p class="text-sm font-black text-gray-700">{ oid }</p>
-                </div>
-                <div>
-                    <p class="text-[10px] text-gray-400 uppercase tracking-widest mb-1 font-black">결제 금액</p>
-                    <p class="text-2xl font-black text-teal-600 italic">{ "{:,}".format(total_amount) }원</p>
-                </div>
-            </div>
-
-            <div class="flex flex-col gap-4">
-                <a href="/mypage" class="bg-gray-800 text-white py-6 rounded-3xl font-black text-lg shadow-xl hover:bg-black transition active:scale-95">
-                    주문 내역 확인하기
-                </a>
-                <a href="/" class="bg-white text-gray-400 py-4 rounded-3xl font-black text-sm hover:text-teal-600 transition">
-                    메인으로 돌아가기
-                </a>
-            </div>
-            
-            <p class="mt-12 text-[10px] text-gray-300 font-medium">
-                문의 사항이 있으시면 1666-8320으로 연락주세요.
-            </p>
-        </div>
-        """
-    return render_template_string(HEADER_HTML + success_content + FOOTER_HTML)
+    return render_template_string(HEADER_HTML + PAYMENT_SUCCESS_HTML + FOOTER_HTML,
+                                  oid=oid, item_count=item_count, total_amount=int(amt))
 
     return redirect('/')
 
@@ -12149,10 +12366,7 @@ def admin_confirm_bank_deposit(order_id):
         db.session.commit()
         title, body = get_template_content('order_created', order_id=order.order_id)
         send_message(order.user_id, title, body, 'order_created', order.id)
-        try:
-            send_alimtalk_order_event('order_created', order.customer_phone, order.customer_name, order.order_id)
-        except Exception:
-            pass
+        queue_alimtalk_order_event('order_created', order.customer_phone, order.customer_name, order.order_id)
         db.session.commit()
         flash(f"주문 {order.order_id} 무통장 입금이 확인되어 결제완료 처리되었습니다.")
     except Exception as e:
@@ -12178,10 +12392,13 @@ def admin_bulk_request_delivery():
     orders = Order.query.filter(Order.order_id.in_(order_ids), Order.status == '결제완료').all()
     
     count = 0
+    items_by_order = load_order_items(o.id for o in orders)
     for o in orders:
         o.status = '배송요청'
         # 해당 주문의 모든 품목에도 배송요청 상태 적용
-        for oi in OrderItem.query.filter_by(order_id=o.id, cancelled=False).all():
+        for oi in items_by_order.get(o.id, []):
+            if oi.cancelled:
+                continue
             oi.item_status = '배송요청'
         # 배송요청 시에는 고객 메시지 발송하지 않음 (기사 픽업 시 배송중 메시지만 발송)
         count += 1
@@ -12191,138 +12408,158 @@ def admin_bulk_request_delivery():
 
 
 def _save_delivery_proof_image(file):
-    """배송완료 증빙 사진 저장. 반환: URL 또는 None. Cloudinary 설정 시 Cloudinary 사용."""
+    """배송완료 증빙 사진 저장(관리자 업로드). 서버에서 축소·재압축 후 blob_store(Cloudinary/로컬)에 해시 키로 저장. 반환: URL 또는 None."""
     if not file or not getattr(file, 'filename', None) or file.filename == '' or not _is_allowed_image_filename(file.filename):
         return None
     try:
-        if cloudinary_url:
-            upload_res = cloudinary.uploader.upload(
-                file,
-                folder="basket-uncle/delivery_proof"
-            )
-            return upload_res.get("secure_url") or upload_res.get("url")
-        folder = os.path.join(app.config['UPLOAD_FOLDER'], 'delivery_proof')
-        os.makedirs(folder, exist_ok=True)
-        ext = os.path.splitext(secure_filename(file.filename))[1].lower() or '.jpg'
-        if ext not in ALLOWED_IMAGE_EXTENSIONS:
-            ext = '.jpg'
-        new_name = f"proof_{now_kst().strftime('%Y%m%d_%H%M%S_%f')}{ext}"
-        path = os.path.join(folder, new_name)
-        file.save(path)
-        return f"/static/uploads/delivery_proof/{new_name}"
+        stored = store_photo(file.read())
+        return stored['url'] if stored else None
     except Exception:
         return None
 
 
 def _save_delivery_proof_base64(data_url_or_base64):
-    """기사 앱에서 보낸 base64 또는 data URL을 파일로 저장. 반환: URL 또는 None. Cloudinary 설정 시 Cloudinary 사용."""
-    if not data_url_or_base64 or not isinstance(data_url_or_base64, str):
-        return None
-    s = data_url_or_base64.strip()
-    if s.startswith('data:image'):
-        # data:image/jpeg;base64,xxxx
-        idx = s.find(',')
-        if idx == -1:
-            return None
-        s = s[idx + 1:]
-    try:
-        raw = base64.b64decode(s, validate=True)
-    except Exception:
-        return None
-    if len(raw) > 10 * 1024 * 1024:
-        return None
-    try:
-        if cloudinary_url:
-            upload_res = cloudinary.uploader.upload(
-                BytesIO(raw),
-                folder="basket-uncle/delivery_proof"
-            )
-            return upload_res.get("secure_url") or upload_res.get("url")
-        folder = os.path.join(app.config['UPLOAD_FOLDER'], 'delivery_proof')
-        os.makedirs(folder, exist_ok=True)
-        new_name = f"logi_{now_kst().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
-        path = os.path.join(folder, new_name)
-        with open(path, 'wb') as f:
-            f.write(raw)
-        return f"/static/uploads/delivery_proof/{new_name}"
-    except Exception:
-        return None
+    """기사 앱에서 보낸 base64 또는 data URL → blob_store 저장. 반환: URL 또는 None."""
+    stored = store_photo_data_url(data_url_or_base64)
+    return stored['url'] if stored else None
+
+
+def _load_delivery_event_items(events):
+    """이벤트 목록의 (주문번호, 카테고리) → (Order, [OrderItem]) 를 IN 쿼리 2회로 로드."""
+    keys = []
+    for e in events:
+        key = ((e.get('order_id') or '').strip(), (e.get('category') or '').strip())
+        if key[0] and key not in keys:
+            keys.append(key)
+    orders = Order.query.filter(Order.order_id.in_({k[0] for k in keys})).all() if keys else []
+    orders_by_no = {o.order_id: o for o in orders}
+    items_by_key = {}
+    if orders:
+        for oi in OrderItem.query.filter(OrderItem.order_id.in_([o.id for o in orders]), OrderItem.cancelled == False).all():
+            items_by_key.setdefault((oi.order_id, oi.product_category or ''), []).append(oi)
+    out = {}
+    for key in keys:
+        order = orders_by_no.get(key[0])
+        out[key] = (order, items_by_key.get((order.id, key[1]), []) if order else [])
+    return out
+
+
+def apply_delivery_in_progress(events):
+    """기사 픽업(상차) 일괄 반영. events: [{order_id, category}].
+    해당 품목 배송중 + 로그 + 고객 쪽지(아웃박스)를 한 트랜잭션으로 커밋. 반환: {(order_id, category): 'ok'|'no_order'|'no_items'}."""
+    loaded = _load_delivery_event_items(events)
+    results = {}
+    notified = set()
+    template = None
+    now = now_kst()
+    for key, (order, items) in loaded.items():
+        if not order:
+            results[key] = 'no_order'
+            continue
+        if not items:
+            results[key] = 'no_items'
+            continue
+        for oi in items:
+            old_status = getattr(oi, 'item_status', None) or '결제완료'
+            oi.item_status = '배송중'
+            oi.status_message = None
+            db.session.add(OrderItemLog(order_id=order.id, order_item_id=oi.id, log_type='item_status', old_value=old_status, new_value='배송중', created_at=now))
+        results[key] = 'ok'
+        # 한 주문의 여러 카테고리가 같이 상차돼도 고객 쪽지는 1건
+        if order.user_id and order.id not in notified:
+            notified.add(order.id)
+            if template is None:
+                template = get_template_content('delivery_in_progress', order_id='{order_id}')
+            send_message(order.user_id, template[0], template[1].replace('{order_id}', str(order.order_id)), 'delivery_in_progress', order.id)
+    db.session.commit()
+    return results
+
+
+def apply_delivery_complete(events, base_url=None):
+    """기사 배송완료 일괄 반영. events: [{order_id, category, photo_url}] (외부 API는 photo(base64)도 허용).
+    품목 배송완료·포인트 적립·로그 + 고객 쪽지/알림톡(아웃박스)을 한 트랜잭션으로 커밋. 반환 형식은 apply_delivery_in_progress와 동일."""
+    loaded = _load_delivery_event_items(events)
+    photos = {}
+    for e in events:
+        key = ((e.get('order_id') or '').strip(), (e.get('category') or '').strip())
+        if (e.get('photo_url') or e.get('photo')) and key not in photos:
+            photos[key] = e
+    if base_url is None:
+        base_url = request.url_root if has_request_context() else ''
+    base_url = (base_url or '').rstrip('/')
+    results = {}
+    template = None
+    now = now_kst()
+    for key, (order, items) in loaded.items():
+        if not order:
+            results[key] = 'no_order'
+            continue
+        if not items:
+            results[key] = 'no_items'
+            continue
+        proof_url = None
+        if key in photos:
+            proof_url = photos[key].get('photo_url') or _save_delivery_proof_base64(photos[key].get('photo'))
+        for oi in items:
+            old_status = getattr(oi, 'item_status', None) or '결제완료'
+            oi.item_status = '배송완료'
+            oi.status_message = None
+            if proof_url:
+                oi.delivery_proof_image_url = proof_url
+            if not oi.cancelled:
+                apply_points_on_delivery_complete(oi)
+            db.session.add(OrderItemLog(order_id=order.id, order_item_id=oi.id, log_type='item_status', old_value=old_status, new_value='배송완료', created_at=now))
+        results[key] = 'ok'
+        full_url = (proof_url if proof_url.startswith("http") else base_url + proof_url) if proof_url else None
+        # ① 자체 배송완료 메시지: 앱 내 쪽지 + 푸시 (카카오 알림톡과 별도로 항상 발송)
+        if order.user_id:
+            if template is None:
+                template = get_template_content('delivery_complete', order_id='{order_id}')
+            send_message(order.user_id, template[0], template[1].replace('{order_id}', str(order.order_id)), 'delivery_complete', order.id, image_url=full_url)
+        # ② 카카오 알림톡
+        extra_vars = {"#{사진링크}": full_url} if full_url else {}
+        queue_alimtalk_order_event('delivery_complete', order.customer_phone, order.customer_name, order.order_id, **extra_vars)
+    db.session.commit()
+    return results
+
+
+# 배송 시스템(logi)에서 발행하는 이벤트 → 같은 프로세스에서 일괄 처리 (HTTP 자기 호출 없음)
+subscribe_domain_event(DELIVERY_PICKED_UP, apply_delivery_in_progress)
+subscribe_domain_event(DELIVERY_COMPLETED, apply_delivery_complete)
+
+_DELIVERY_EVENT_ERRORS = {
+    'no_order': ("주문을 찾을 수 없습니다.", 404),
+    'no_items': ("해당 카테고리 품목이 없습니다.", 404),
+}
 
 
 @app.route('/api/logi/delivery-in-progress', methods=['POST'])
 def api_logi_delivery_in_progress():
-    """로지(기사) 픽업(상차) 콜백. order_id(문자열), category 수신 → 해당 품목 배송중 반영 및 고객 메시지 발송."""
+    """로지(기사) 픽업(상차) 콜백 (외부 연동용). order_id(문자열), category 수신 → 해당 품목 배송중 반영 및 고객 메시지 발송."""
     data = request.get_json() or {}
     order_id_str = (data.get('order_id') or '').strip()
-    category = (data.get('category') or '').strip()
     if not order_id_str:
         return jsonify({"success": False, "message": "order_id가 필요합니다."}), 400
-    order = Order.query.filter_by(order_id=order_id_str).first()
-    if not order:
-        return jsonify({"success": False, "message": "주문을 찾을 수 없습니다."}), 404
-    items = OrderItem.query.filter_by(order_id=order.id, cancelled=False).filter(OrderItem.product_category == category).all()
-    if not items:
-        return jsonify({"success": False, "message": "해당 카테고리 품목이 없습니다."}), 404
-    for oi in items:
-        old_status = getattr(oi, 'item_status', None) or '결제완료'
-        oi.item_status = '배송중'
-        oi.status_message = None
-        db.session.add(OrderItemLog(order_id=order.id, order_item_id=oi.id, log_type='item_status', old_value=old_status, new_value='배송중', created_at=now_kst()))
-    db.session.commit()
-    title, body = get_template_content('delivery_in_progress', order_id=order.order_id)
-    if order.user_id:
-        send_message(order.user_id, title, body, 'delivery_in_progress', order.id)
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+    result = apply_delivery_in_progress([data])
+    status = next(iter(result.values()), 'no_order')
+    if status in _DELIVERY_EVENT_ERRORS:
+        msg, code = _DELIVERY_EVENT_ERRORS[status]
+        return jsonify({"success": False, "message": msg}), code
     return jsonify({"success": True, "message": "배송중 반영 및 고객 알림 발송 완료."})
 
 
 @app.route('/api/logi/delivery-complete', methods=['POST'])
 def api_logi_delivery_complete():
-    """로지(기사) 배송완료 콜백. order_id(문자열), category, photo(base64) 수신 → 품목 배송완료 처리 및 고객 메시지에 사진 포함."""
+    """로지(기사) 배송완료 콜백 (외부 연동용). order_id(문자열), category, photo(base64) 수신 → 품목 배송완료 처리 및 고객 메시지에 사진 포함."""
     data = request.get_json() or {}
     order_id_str = (data.get('order_id') or '').strip()
-    category = (data.get('category') or '').strip()
-    photo = data.get('photo')
     if not order_id_str:
         return jsonify({"success": False, "message": "order_id가 필요합니다."}), 400
-    order = Order.query.filter_by(order_id=order_id_str).first()
-    if not order:
-        return jsonify({"success": False, "message": "주문을 찾을 수 없습니다."}), 404
-    items = OrderItem.query.filter_by(order_id=order.id, cancelled=False).filter(OrderItem.product_category == category).all()
-    if not items:
-        return jsonify({"success": False, "message": "해당 카테고리 품목이 없습니다."}), 404
-    proof_url = _save_delivery_proof_base64(photo) if photo else None
-    for oi in items:
-        old_status = getattr(oi, 'item_status', None) or '결제완료'
-        oi.item_status = '배송완료'
-        oi.status_message = None
-        if proof_url:
-            oi.delivery_proof_image_url = proof_url
-        if not oi.cancelled:
-            apply_points_on_delivery_complete(oi)
-        db.session.add(OrderItemLog(order_id=order.id, order_item_id=oi.id, log_type='item_status', old_value=old_status, new_value='배송완료', created_at=now_kst()))
-    db.session.commit()
-    # ① 자체 배송완료 메시지: 앱 내 쪽지 + 푸시 (카카오 알림톡과 별도로 항상 발송)
-    message_image_url = (proof_url if (proof_url and proof_url.startswith("http")) else (request.url_root.rstrip("/") + proof_url) if proof_url else None)
-    title, body = get_template_content('delivery_complete', order_id=order.order_id)
-    if order.user_id:
-        try:
-            send_message(order.user_id, title, body, 'delivery_complete', order.id, image_url=message_image_url)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-    # ② 카카오 알림톡 (기존대로 유지)
-    try:
-        extra_vars = {}
-        if proof_url:
-            full_url = proof_url if proof_url.startswith("http") else request.url_root.rstrip("/") + proof_url
-            extra_vars["#{사진링크}"] = full_url
-        send_alimtalk_order_event('delivery_complete', order.customer_phone, order.customer_name, order.order_id, **extra_vars)
-    except Exception:
-        pass
+    result = apply_delivery_complete([data])
+    status = next(iter(result.values()), 'no_order')
+    if status in _DELIVERY_EVENT_ERRORS:
+        msg, code = _DELIVERY_EVENT_ERRORS[status]
+        return jsonify({"success": False, "message": msg}), code
     return jsonify({"success": True, "message": "배송완료 처리 및 고객 알림 발송 완료."})
 
 
@@ -12368,7 +12605,7 @@ def admin_order_item_status():
             body = {"cancelAmount": cancel_amount, "cancelReason": "품절로 인한 부분 취소"}
             if tax_free_cancel:
                 body["taxFreeAmount"] = tax_free_cancel
-            res = requests.post(url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-item-{oi.id}-out"), timeout=30)
+            res = integration_http.post("toss", url, json=body, headers=_toss_cancel_headers(f"cancel-{order.id}-item-{oi.id}-out"))
             if res.status_code not in (200, 201):
                 try:
                     err = res.json()
@@ -12403,14 +12640,10 @@ def admin_order_item_status():
             title, body = get_template_content('delivery_complete', order_id=order.order_id)
             proof_url = getattr(oi, 'delivery_proof_image_url', None) or None
             send_message(order.user_id, title, body, 'delivery_complete', order.id, image_url=proof_url)
-            try:
-                extra_vars = {}
-                if proof_url:
-                    full_url = request.url_root.rstrip('/') + proof_url
-                    extra_vars["#{사진링크}"] = full_url
-                send_alimtalk_order_event('delivery_complete', order.customer_phone, order.customer_name, order.order_id, **extra_vars)
-            except Exception:
-                pass
+            extra_vars = {}
+            if proof_url:
+                extra_vars["#{사진링크}"] = request.url_root.rstrip('/') + proof_url
+            queue_alimtalk_order_event('delivery_complete', order.customer_phone, order.customer_name, order.order_id, **extra_vars)
         elif item_status == '배송지연':
             title, body = get_template_content('delivery_delayed', order_id=order.order_id)
             send_message(order.user_id, title, body, 'delivery_delayed', order.id)
@@ -12563,118 +12796,11 @@ def admin_order_items(order_id):
     return render_template_string(_order_item_status_tpl, order=order, order_items=order_items)
 
 
-def _ensure_main_display_config_columns():
-    """main_display_config 테이블에 최신상품·마감임박 컬럼이 없으면 추가 (기존 DB 호환)."""
-    try:
-        from sqlalchemy import inspect
-        insp = inspect(db.engine)
-        if 'main_display_config' not in insp.get_table_names():
-            return
-        cols = [c['name'] for c in insp.get_columns('main_display_config')]
-        for col, sql in [
-            ('main_latest_count', 'ALTER TABLE main_display_config ADD COLUMN main_latest_count INTEGER DEFAULT 30'),
-            ('main_closing_count', 'ALTER TABLE main_display_config ADD COLUMN main_closing_count INTEGER DEFAULT 50'),
-        ]:
-            if col not in cols:
-                db.session.execute(text(sql))
-                db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-
-
-def _ensure_event_board_post_notice_column():
-    """event_board_post 테이블에 is_notice 컬럼이 없으면 추가 (기존 DB 호환)."""
-    try:
-        from sqlalchemy import inspect
-        insp = inspect(db.engine)
-        if 'event_board_post' not in insp.get_table_names():
-            return
-        cols = [c['name'] for c in insp.get_columns('event_board_post')]
-        if 'is_notice' not in cols:
-            db.session.execute(text("ALTER TABLE event_board_post ADD COLUMN is_notice INTEGER DEFAULT 0"))
-            db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-
-
-def _ensure_delivery_zone_columns():
-    """delivery_zone 테이블에 퀵지역·그 외 배송불가용 컬럼이 없으면 추가 (기존 DB 호환)."""
-    try:
-        from sqlalchemy import inspect
-        insp = inspect(db.engine)
-        cols = [c['name'] for c in insp.get_columns('delivery_zone')]
-        if 'quick_region_names' not in cols:
-            db.session.execute(text("ALTER TABLE delivery_zone ADD COLUMN quick_region_names TEXT"))
-            db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-    try:
-        from sqlalchemy import inspect
-        insp = inspect(db.engine)
-        cols = [c['name'] for c in insp.get_columns('delivery_zone')]
-        if 'use_quick_region_only' not in cols:
-            db.session.execute(text("ALTER TABLE delivery_zone ADD COLUMN use_quick_region_only BOOLEAN DEFAULT 0"))
-            db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-    try:
-        from sqlalchemy import inspect
-        insp = inspect(db.engine)
-        cols = [c['name'] for c in insp.get_columns('delivery_zone')]
-        if 'quick_region_polygon_json' not in cols:
-            db.session.execute(text("ALTER TABLE delivery_zone ADD COLUMN quick_region_polygon_json TEXT"))
-            db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-    for col, sql in [
-        ('quick_extra_fee', 'ALTER TABLE delivery_zone ADD COLUMN quick_extra_fee INTEGER DEFAULT 10000'),
-        ('quick_extra_message', 'ALTER TABLE delivery_zone ADD COLUMN quick_extra_message TEXT'),
-    ]:
-        try:
-            insp = inspect(db.engine)
-            cols = [c['name'] for c in insp.get_columns('delivery_zone')]
-            if col not in cols:
-                db.session.execute(text(sql))
-                db.session.commit()
-        except Exception:
-            try:
-                db.session.rollback()
-            except Exception:
-                pass
-    try:
-        insp = inspect(db.engine)
-        cols = [c['name'] for c in insp.get_columns('order')]
-        if 'quick_extra_fee' not in cols:
-            db.session.execute(text("ALTER TABLE \"order\" ADD COLUMN quick_extra_fee INTEGER DEFAULT 0"))
-            db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-
-
 @login_required
 def admin_delivery_zone_api():
     """배송구역: GET=폴리곤·퀵지역 반환, POST=폴리곤 또는 퀵지역 저장 (마스터 관리자 전용). 퀵지역만 사용 시 그 외 지역 배송불가."""
     if not current_user.is_admin:
         return jsonify({'error': '권한 없음'}), 403
-    _ensure_delivery_zone_columns()
     if request.method == 'GET':
         z = DeliveryZone.query.order_by(DeliveryZone.updated_at.desc()).first()
         polygon = []
@@ -12760,6 +12886,7 @@ def admin_delivery_zone_api():
     if updated:
         z.updated_at = now_kst()
     db.session.commit()
+    rebuild_zone_index()
     return jsonify({'ok': True})
 
 
@@ -12769,7 +12896,6 @@ def admin_main_display_config():
     """관리자: 메인 화면 노출 설정 저장 (카테고리 개수, 카테고리당 상품, 최신상품, 마감임박 개수)."""
     if not current_user.is_admin:
         return jsonify({"success": False, "message": "권한이 없습니다."}), 403
-    _ensure_main_display_config_columns()
     data = request.get_json() or {}
     try:
         main_category_count = int(data.get('main_category_count', 8) or 8)
@@ -12791,6 +12917,7 @@ def admin_main_display_config():
         row.main_products_per_category = main_products_per_category
         row.main_latest_count = main_latest_count
         row.main_closing_count = main_closing_count
+    get_main_display_config._cache = None  # 커밋 후 메인 스냅샷 재생성 시 새 설정 바로 반영
     db.session.commit()
     return jsonify({"success": True, "message": "저장되었습니다."})
 
@@ -13228,9 +13355,10 @@ def admin_revenue_report_download():
         revenue_report_end = now_kst()
     if revenue_report_start and revenue_report_end and revenue_report_start > revenue_report_end:
         revenue_report_start, revenue_report_end = revenue_report_end, revenue_report_start
-    orders_in_range = Order.query.filter(
+    order_report = load_order_report(Order.query.filter(
         Order.created_at >= revenue_report_start, Order.created_at <= revenue_report_end
-    ).order_by(Order.created_at.desc()).all()
+    ).order_by(Order.created_at.desc()))
+    orders_in_range = order_report.orders
     order_ids = [o.id for o in orders_in_range]
     settlement_by_order = {}
     if order_ids:
@@ -13250,12 +13378,12 @@ def admin_revenue_report_download():
         # 공급가: 주문 품목 기준
         supply_total = 0
         tax_type = '과세'
-        for oi in OrderItem.query.filter_by(order_id=o.id, cancelled=False).all():
-            p = Product.query.get(oi.product_id)
+        for oi in order_report.items(o, include_cancelled=False):
+            p = order_report.product(oi.product_id)
             if p:
                 if getattr(p, 'supply_price', None) is not None:
                     supply_total += int((p.supply_price or 0) * oi.quantity)
-                cat = Category.query.filter_by(name=p.category).first()
+                cat = order_report.category(p.category)
                 if getattr(cat, 'tax_type', '과세') == '면세':
                     tax_type = '면세'
         # 합계(원금-공급가): 포인트 사용과 무관하게 원금 대비 마진
@@ -13283,8 +13411,8 @@ def admin_revenue_report_download():
 
 @login_required
 def admin_price_compare_post():
-    """관리자 비교검색: 품명 목록을 받아 네이버 쇼핑 API로 최저가 조회 후 저장하고 비교검색 탭으로 리다이렉트.
-    대량 결과는 세션(쿠키) 용량 한계를 피하기 위해 서버 파일에 저장하고, 세션에는 파일 키만 둠."""
+    """관리자 비교검색: 품명 목록을 받아 네이버 쇼핑 최저가 조사 작업을 백그라운드로 시작하고 비교검색 탭으로 리다이렉트.
+    탭은 진행률을 받다가 완료되면 결과 파일(price_compare_cache)을 읽음. 세션에는 작업 id·파일 키만 둠."""
     categories = Category.query.order_by(Category.order.asc(), Category.id.asc()).all()
     managers = [c.manager_email for c in categories if c.manager_email]
     if not (current_user.is_admin or current_user.email in managers):
@@ -13295,34 +13423,78 @@ def admin_price_compare_post():
         flash("품명을 한 줄에 하나씩 입력해 주세요.")
         return redirect("/admin?tab=price_compare")
     session["price_compare_raw_text"] = raw_text
-    results, truncated, total_lines = get_naver_shop_compare(raw_text)
+    names = split_price_compare_names(raw_text)
+    _remove_price_compare_file(session.pop("price_compare_file", None))
+    session.pop("price_compare_results", None)
     session["price_compare_truncated"] = False
-    session["price_compare_total_lines"] = total_lines
-    # 대량 결과는 세션 쿠키 한계(약 4KB)로 저장 실패 → 파일에 저장하고 세션에는 키만
-    if results:
-        cache_dir = os.path.join(app.instance_path, "price_compare_cache")
-        try:
-            os.makedirs(cache_dir, exist_ok=True)
-        except OSError:
-            cache_dir = os.path.join(tempfile.gettempdir(), "basket_uncle_price_compare")
-            os.makedirs(cache_dir, exist_ok=True)
-        file_key = "pc_{}_{}.json".format(getattr(current_user, "id", 0), int(time.time() * 1000))
-        path = os.path.join(cache_dir, file_key)
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump({"results": results, "total_lines": total_lines}, f, ensure_ascii=False)
-            session["price_compare_file"] = file_key
-            session.pop("price_compare_results", None)
-        except Exception:
-            if len(results) <= 20:
-                session["price_compare_results"] = results
-            session.pop("price_compare_file", None)
-    else:
-        session.pop("price_compare_file", None)
-        session.pop("price_compare_results", None)
+    session["price_compare_total_lines"] = len(names)
+    try:
+        meta = price_compare_jobs.start(names, _naver_shop_compare_search(), owner_id=getattr(current_user, "id", 0))
+        session["price_compare_job"] = meta["id"]
+    except OSError as e:
+        print(f"[PRICE COMPARE] 작업 시작 실패: {e}", flush=True)
+        session.pop("price_compare_job", None)
+        flash("최저가 조사를 시작하지 못했습니다. 잠시 후 다시 시도해 주세요.")
     return redirect("/admin?tab=price_compare")
 
 
+def _price_compare_job_state():
+    """세션의 가격비교 작업 확인. 완료면 결과 파일 키를 세션에 옮기고 None, 실행 중이면 작업 상태 dict."""
+    job_id = session.get("price_compare_job")
+    if not job_id:
+        return None
+    meta = price_compare_jobs.get(job_id)
+    if meta is None or meta.get("owner_id") != getattr(current_user, "id", 0):
+        session.pop("price_compare_job", None)
+        return None
+    if meta["status"] == "running":
+        return meta
+    session.pop("price_compare_job", None)
+    if meta["status"] == "done":
+        session["price_compare_file"] = meta["file_key"]
+        session["price_compare_total_lines"] = meta["total"]
+    else:
+        flash("최저가 조사 중 오류가 발생했습니다: {}".format(meta.get("error") or "-"))
+    return None
+
+
+@login_required
+def admin_price_compare_progress():
+    """가격비교 작업 진행률 SSE 스트림 (price_compare_job.py). 작업이 없으면 204 → 브라우저 재연결 중단.
+    스레드 워커가 아니면 503 (스트림이 작업 내내 워커를 붙잡음) → 화면은 5초마다 새로고침으로 진행률 확인."""
+    categories = Category.query.order_by(Category.order.asc(), Category.id.asc()).all()
+    managers = [c.manager_email for c in categories if c.manager_email]
+    if not (current_user.is_admin or current_user.email in managers):
+        abort(403)
+    job_id = session.get("price_compare_job")
+    meta = price_compare_jobs.get(job_id) if job_id else None
+    if meta is None or meta.get("owner_id") != current_user.id:
+        return "", 204
+    if not streams_supported(request.environ):
+        return jsonify({"error": "stream_unavailable"}), 503
+    resp = app.response_class(price_compare_jobs.progress_events(meta["id"]), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+def _remove_price_compare_file(file_key):
+    """최저가 조사 결과 파일 삭제 (instance 또는 임시 디렉터리)."""
+    if not file_key:
+        return
+    for cache_dir in [
+        os.path.join(app.instance_path, "price_compare_cache"),
+        os.path.join(tempfile.gettempdir(), "basket_uncle_price_compare"),
+    ]:
+        path = os.path.join(cache_dir, file_key)
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            break
+
+
 def _load_price_compare_results():
     """세션 또는 파일에서 최저가 조사 결과 로드. 대량 결과는 파일에 저장되어 있어 세션 용량 초과를 피함."""
     file_key = session.get("price_compare_file")
@@ -13425,19 +13597,8 @@ def admin_price_compare_clear():
     session.pop("price_compare_results", None)
     session.pop("price_compare_truncated", None)
     session.pop("price_compare_total_lines", None)
-    file_key = session.pop("price_compare_file", None)
-    if file_key:
-        for cache_dir in [
-            os.path.join(app.instance_path, "price_compare_cache"),
-            os.path.join(tempfile.gettempdir(), "basket_uncle_price_compare"),
-        ]:
-            path = os.path.join(cache_dir, file_key)
-            if os.path.isfile(path):
-                try:
-                    os.remove(path)
-                except OSError:
-                    pass
-                break
+    session.pop("price_compare_job", None)
+    _remove_price_compare_file(session.pop("price_compare_file", None))
     flash("최저가 검색 결과를 초기화했습니다.")
     return redirect("/admin?tab=price_compare")
 
@@ -13520,8 +13681,10 @@ def admin_dashboard():
     supplier_product_end_date_str = ''
     manual_order_products = []
     manual_order_users = []
+    price_compare_job = None
     if request.args.get("tab") == "price_compare":
-        price_compare_results = _load_price_compare_results()
+        price_compare_job = _price_compare_job_state()
+        price_compare_results = _load_price_compare_results() if price_compare_job is None else []
         price_compare_truncated = session.get("price_compare_truncated", False)
         price_compare_total_lines = session.get("price_compare_total_lines", 0)
     else:
@@ -13596,7 +13759,8 @@ def admin_dashboard():
             q_orders = q_orders.filter(Order.order_id.ilike('%' + order_id_search + '%'))
         if payment_key_search:
             q_orders = q_orders.filter(Order.payment_key.ilike('%' + payment_key_search + '%'))
-        all_orders = q_orders.order_by(Order.created_at.desc()).all()
+        order_report = load_order_report(q_orders.order_by(Order.created_at.desc()))
+        all_orders = order_report.orders
 
         for o in all_orders:
             order_date = o.created_at.strftime('%Y-%m-%d')
@@ -13609,7 +13773,7 @@ def admin_dashboard():
             manager_qty_total = 0    # 오더별 정산: 내 카테고리 수량 합계
 
             # OrderItem이 있으면 DB 기준으로 금액·수량 집계 (취소 품목 제외)
-            items = OrderItem.query.filter_by(order_id=o.id, cancelled=False).order_by(OrderItem.id.asc()).all()
+            items = order_report.items(o, include_cancelled=False)
             if items:
                 for oi in items:
                     if is_master or oi.product_category in my_categories:
@@ -13641,7 +13805,7 @@ def admin_dashboard():
                                     qt = int(it_match.group(2))
                                     manager_items_list.append(f"{pn}({qt})")
                                     manager_qty_total += qt
-                                    p_obj = Product.query.filter_by(name=pn).first()
+                                    p_obj = order_report.product_by_name(pn)
                                     if p_obj:
                                         item_price = p_obj.price * qt
                                         summary[cat_n]["subtotal"] += item_price
@@ -13670,13 +13834,13 @@ def admin_dashboard():
         for o in filtered_orders:
             order_date_str = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else ''
             status_str = o.status or '결제완료'
-            items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
+            items = order_report.items(o)
             if items:
                 for oi in items:
                     if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
                         is_cancelled = getattr(oi, 'cancelled', False) or (getattr(oi, 'item_status', None) in ('부분취소', '품절취소'))
                         qty = 0 if is_cancelled else oi.quantity
-                        p = Product.query.get(oi.product_id) if oi.product_id else None
+                        p = order_report.product(oi.product_id)
                         supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                         line_supply_amount = supply_price * qty
                         sales_table_rows.append({
@@ -13700,7 +13864,7 @@ def admin_dashboard():
                                 if it_match:
                                     pn, qt = it_match.groups()
                                     qt = int(qt)
-                                    p = Product.query.filter_by(name=pn.strip()).first()
+                                    p = order_report.product_by_name(pn)
                                     supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                                     sales_table_rows.append({'order_date': order_date_str, 'order_id': getattr(o, 'order_id', None) or '', 'product_name': pn.strip(), 'category': cat_n, 'quantity': qt, 'status': status_str, 'line_supply_amount': supply_price * qt})
         # 조회 결과 총합계 수량 + 품목·판매상품명별 판매수량 총합계 (집계 테이블용)
@@ -13721,21 +13885,22 @@ def admin_dashboard():
         if sel_settlement_status == '정산대기': sel_settlement_status = '입금대기'
         if sel_settlement_status == '정산완료': sel_settlement_status = '입금완료'
         # 기존 OrderItem에 대한 Settlement 백필 (결제 시 생성 누락분 보충)
+        backfilled = 0
         for o in filtered_orders:
-            items = OrderItem.query.filter_by(order_id=o.id, cancelled=False).order_by(OrderItem.id.asc()).all()
+            items = order_report.items(o, include_cancelled=False)
             if not items:
                 continue
             for oi in items:
                 if not (is_master or oi.product_category in my_categories):
                     continue
-                if Settlement.query.filter_by(order_item_id=oi.id).first():
+                if order_report.has_settlement(oi.id):
                     continue
                 delivery_fee_per_settlement = 990  # 정산번호당 배송관리비 990원
-                cat = Category.query.filter_by(name=oi.product_category).first()
+                cat = order_report.category(oi.product_category)
                 cat_type = getattr(cat, 'category_type', None) or '입점형'
                 if cat_type == '공급자형':
                     # 공급자형: 공급가 기준 정산 (수수료·배송관리비 0)
-                    p = Product.query.get(oi.product_id)
+                    p = order_report.product(oi.product_id)
                     supply_price = getattr(p, 'supply_price', None) or p.price
                     sales_amount = supply_price * oi.quantity
                     fee = 0
@@ -13762,10 +13927,14 @@ def admin_dashboard():
                     category_type=cat_type,
                     settlement_status=st, settled_at=getattr(oi, 'settled_at', None)
                 ))
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+                order_report.mark_settled(oi.id)
+                backfilled += 1
+        # 백필이 없으면 커밋 생략 (커밋하면 세션 객체가 만료되어 템플릿에서 주문을 한 건씩 다시 읽음)
+        if backfilled:
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
         # 정산 전용 테이블에서 조회 (판매일시, 카테고리, 면세여부, 품목, 판매금액, 수수료, 배송관리비, 정산합계, 입금상태(입금일))
         q = Settlement.query.filter(Settlement.sale_dt >= start_dt, Settlement.sale_dt <= end_dt)
         if not is_master:
@@ -14026,7 +14195,6 @@ def admin_dashboard():
         main_display_main_category_count, main_display_products_per_category, main_display_latest_count, main_display_closing_count = get_main_display_config()
     kakao_map_app_key = KAKAO_MAP_APP_KEY
     if tab == 'delivery_zone' and is_master:
-        _ensure_delivery_zone_columns()
         z = DeliveryZone.query.order_by(DeliveryZone.updated_at.desc()).first()
         if z:
             if z.polygon_json:
@@ -14234,9 +14402,10 @@ def admin_dashboard():
             'net_profit': payment_received - refund_sum - settlement_paid,
         }
         # 상세: 주문별 (결제넘버 기준)
-        orders_in_range = Order.query.filter(
+        order_report = load_order_report(Order.query.filter(
             Order.created_at >= revenue_report_start, Order.created_at <= revenue_report_end
-        ).order_by(Order.created_at.desc()).all()
+        ).order_by(Order.created_at.desc()))
+        orders_in_range = order_report.orders
         order_ids = [o.id for o in orders_in_range]
         settlement_by_order = {}
         if order_ids:
@@ -14252,13 +14421,13 @@ def admin_dashboard():
             item_supply = 0
             has_taxable = False
             has_exempt = False
-            for oi in OrderItem.query.filter_by(order_id=o.id, cancelled=False).all():
-                p = Product.query.get(oi.product_id)
+            for oi in order_report.items(o, include_cancelled=False):
+                p = order_report.product(oi.product_id)
                 if not p:
                     continue
                 if getattr(p, 'supply_price', None) is not None:
                     item_supply += int((p.supply_price or 0) * oi.quantity)
-                cat = Category.query.filter_by(name=p.category).first()
+                cat = order_report.category(p.category)
                 tax_type_val = getattr(cat, 'tax_type', '과세')
                 if tax_type_val == '면세':
                     has_exempt = True
@@ -14341,8 +14510,7 @@ def admin_dashboard():
         admin_restaurant_requests = q.all()
         restaurant_recommend_counts = {}
         for p in admin_restaurant_requests:
-            u, d = _restaurant_vote_counts(p.id)
-            restaurant_recommend_counts[p.id] = (u, d)
+            restaurant_recommend_counts[p.id] = _post_vote_counts(p)
     admin_delivery_requests = []
     delivery_request_vote_counts = {}
     if (tab == 'delivery_request' or tab == 'board_manage') and is_master:
@@ -14356,8 +14524,7 @@ def admin_dashboard():
             q = q.limit(board_manage_d_limit)
         admin_delivery_requests = q.all()
         for p in admin_delivery_requests:
-            u, d = _delivery_request_vote_counts(p.id)
-            delivery_request_vote_counts[p.id] = (u, d)
+            delivery_request_vote_counts[p.id] = _post_vote_counts(p)
     if (tab == 'partnership' or tab == 'board_manage') and is_master:
         if tab == 'board_manage':
             _allowed = (5, 20, 50, 100)
@@ -14658,20 +14825,29 @@ def admin_dashboard():
     stats_cart_items_total = 0
     stats_product_views_total = 0
     stats_daily_table = []
+    stats_pending_product_views = {}
     if tab == 'stats':
+        stats_pending_product_views = view_counters.pending_product_views()
         now = now_kst()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         week_start = today_start - timedelta(days=7)
         from sqlalchemy import func
         if is_master:
-            # DailyStat: 오늘 / 최근 7일 / 전체
+            # DailyStat: 오늘 / 최근 7일 / 전체 (아직 DB에 반영 안 된 버퍼 증분 합산)
             all_daily = DailyStat.query.order_by(DailyStat.stat_date.desc()).limit(365).all()
+            daily_views = {}
             for row in all_daily:
-                d = row.stat_date
-                main = (row.main_views or 0)
-                cat = (row.category_views or 0)
-                prod = (row.product_views or 0)
-                cart = (row.cart_views or 0)
+                daily_views[row.stat_date] = {'main_views': row.main_views or 0, 'category_views': row.category_views or 0, 'product_views': row.product_views or 0, 'cart_views': row.cart_views or 0}
+            for d, deltas in view_counters.pending_page_views().items():
+                merged = daily_views.setdefault(d, {'main_views': 0, 'category_views': 0, 'product_views': 0, 'cart_views': 0})
+                for col, n in deltas.items():
+                    merged[col] += n
+            for d in sorted(daily_views, reverse=True)[:365]:
+                row = daily_views[d]
+                main = row['main_views']
+                cat = row['category_views']
+                prod = row['product_views']
+                cart = row['cart_views']
                 if d == today_start.date():
                     stats_page_views_today['main'] += main
                     stats_page_views_today['category'] += cat
@@ -14703,7 +14879,7 @@ def admin_dashboard():
             sold_q = db.session.query(OrderItem.product_id, OrderItem.product_name, func.sum(OrderItem.quantity).label('qty')).filter(OrderItem.cancelled == False).group_by(OrderItem.product_id, OrderItem.product_name).order_by(func.sum(OrderItem.quantity).desc()).limit(15).all()
             stats_top_products_by_sold = [{'product_id': r.product_id, 'product_name': r.product_name, 'qty': r.qty} for r in sold_q]
             stats_top_products_by_views = Product.query.order_by(Product.view_count.desc().nullslast()).limit(10).all()
-            stats_product_views_total = db.session.query(db.func.coalesce(db.func.sum(Product.view_count), 0)).scalar() or 0
+            stats_product_views_total = (db.session.query(db.func.coalesce(db.func.sum(Product.view_count), 0)).scalar() or 0) + sum(stats_pending_product_views.values())
             stats_members_total = User.query.filter(User.is_admin == False).count()
             stats_members_today = 0
             stats_members_week = 0
@@ -14725,6 +14901,9 @@ def admin_dashboard():
             stats_low_stock_count = Product.query.filter(Product.category.in_(my_cats), Product.is_active == True, Product.stock < 5).count() if my_cats else 0
             stats_reviews_total = Review.query.filter(Review.category_id.in_(my_cat_ids)).count() if my_cat_ids else 0
             stats_product_views_total = db.session.query(db.func.coalesce(db.func.sum(Product.view_count), 0)).filter(Product.category.in_(my_cats)).scalar() or 0 if my_cats else 0
+            if my_cats and stats_pending_product_views:
+                my_pending_pids = [r[0] for r in db.session.query(Product.id).filter(Product.id.in_(list(stats_pending_product_views)), Product.category.in_(my_cats)).all()]
+                stats_product_views_total += sum(stats_pending_product_views[pid] for pid in my_pending_pids)
             sold_q = db.session.query(OrderItem.product_id, OrderItem.product_name, func.sum(OrderItem.quantity).label('qty')).filter(OrderItem.cancelled == False, OrderItem.product_category.in_(my_cats)).group_by(OrderItem.product_id, OrderItem.product_name).order_by(func.sum(OrderItem.quantity).desc()).limit(15).all() if my_cats else []
             stats_top_products_by_sold = [{'product_id': r.product_id, 'product_name': r.product_name, 'qty': r.qty} for r in sold_q]
             stats_top_products_by_views = Product.query.filter(Product.category.in_(my_cats)).order_by(Product.view_count.desc().nullslast()).limit(10).all() if my_cats else []
@@ -14989,11 +15168,39 @@ def admin_dashboard():
                         </div>
                     </div>
                 </form>
+                {% if price_compare_job %}
+                <div id="pc-job-progress" class="mb-6 p-5 bg-teal-50 rounded-2xl border border-teal-200">
+                    <p class="text-sm font-black text-teal-800">최저가 조사 중… <span id="pc-job-count">{{ price_compare_job.done }}</span> / {{ price_compare_job.total }}건</p>
+                    <div class="mt-3 h-2 w-full bg-white rounded-full overflow-hidden border border-teal-100">
+                        <div id="pc-job-bar" class="h-full bg-teal-500 transition-all" style="width: {{ (price_compare_job.done * 100 // price_compare_job.total) if price_compare_job.total else 0 }}%"></div>
+                    </div>
+                    <p class="mt-2 text-[11px] text-gray-500">조사가 끝나면 이 화면에 결과가 표시됩니다. 다른 탭으로 이동해도 조사는 계속됩니다.</p>
+                </div>
                 <script>
                 (function(){
-                    var ta = document.getElementById('price_compare_raw_text');
-                    if (ta) {
-                        document.querySelectorAll('.price-compare-add-name').forEach(function(btn){
+                    var total = {{ price_compare_job.total|int }};
+                    var count = document.getElementById('pc-job-count');
+                    var bar = document.getElementById('pc-job-bar');
+                    function finish(){ window.location.replace('/admin?tab=price_compare'); }
+                    if (!window.EventSource) { setTimeout(finish, 5000); return; }
+                    var es = new EventSource('/admin/price_compare/progress');
+                    es.addEventListener('progress', function(e){
+                        var d = {};
+                        try { d = JSON.parse(e.data); } catch (err) { return; }
+                        if (count) count.textContent = d.done;
+                        if (bar && total) bar.style.width = Math.floor(d.done * 100 / total) + '%';
+                        if (d.status !== 'running') { es.close(); finish(); }
+                    });
+                    // 204(작업 없음)·503(스트림 미지원)으로 닫히면 잠시 후 새로고침 (바로 새로고침하면 재요청 반복)
+                    es.onerror = function(){ if (es.readyState === EventSource.CLOSED) setTimeout(finish, 5000); };
+                })();
+                </script>
+                {% endif %}
+                <script>
+                (function(){
+                    var ta = document.getElementById('price_compare_raw_text');
+                    if (ta) {
+                        document.querySelectorAll('.price-compare-add-name').forEach(function(btn){
                             btn.addEventListener('click', function(){
                                 var name = (this.getAttribute('data-name') || '').trim();
                                 if (!name) return;
@@ -15500,7 +15707,7 @@ def admin_dashboard():
                                 <thead class="bg-gray-50"><tr><th class="p-3 text-left">상품명</th><th class="p-3 text-right">조회수</th></tr></thead>
                                 <tbody>
                                     {% for p in stats_top_products_by_views %}
-                                    <tr class="border-b border-gray-50"><td class="p-3 font-bold text-gray-800 truncate max-w-[200px]">{{ p.name }}</td><td class="p-3 text-right font-black text-blue-600">{{ getattr(p, 'view_count', 0) or 0 }}</td></tr>
+                                    <tr class="border-b border-gray-50"><td class="p-3 font-bold text-gray-800 truncate max-w-[200px]">{{ p.name }}</td><td class="p-3 text-right font-black text-blue-600">{{ (getattr(p, 'view_count', 0) or 0) + stats_pending_product_views.get(p.id, 0) }}</td></tr>
                                     {% else %}
                                       <tr><td colspan="2" class="p-4 text-center text-gray-400">데이터 없음</td></tr>
                                       {% endfor %}
@@ -15732,6 +15939,31 @@ def admin_dashboard():
                     <textarea id="quick_extra_message_input" rows="3" class="w-full border border-amber-200 rounded-xl px-4 py-3 text-sm font-bold text-gray-800 placeholder-gray-400" placeholder="해당 주소는 배송지역이 아닙니다. 배송료 추가 시 퀵으로 배송됩니다. 추가하시고 주문하시겠습니까?">{{ delivery_zone_quick_extra_message }}</textarea>
                 </label>
             </div>
+            <div class="mb-10 p-6 bg-gray-50 border border-gray-200 rounded-2xl">
+                <h3 class="text-base font-black text-gray-800 italic mb-2">주소 좌표 캐시 미리 채우기</h3>
+                <p class="text-[11px] text-gray-600 font-bold mb-3">회원 주소·주문 배송지 전체를 미리 지오코딩해 두면 결제·배송지 확인 시 외부 지도 API를 기다리지 않습니다. (신규 주소만 1초 간격으로 조회)</p>
+                <div class="flex gap-3 items-center flex-wrap">
+                    <button type="button" id="geocode_warmup_btn" class="px-5 py-2.5 bg-gray-800 text-white rounded-xl font-black text-xs shadow hover:bg-gray-900">워밍업 시작</button>
+                    <span id="geocode_warmup_status" class="text-[11px] text-gray-600 font-bold"></span>
+                </div>
+            </div>
+            <script>
+            (function(){
+                var btn = document.getElementById('geocode_warmup_btn');
+                var el = document.getElementById('geocode_warmup_status');
+                function show(d) {
+                    var w = d.warmup || {}, c = d.cache || {};
+                    el.textContent = (w.running ? '진행 중 ' : (w.finished_at ? '완료 ' : '')) + (w.total ? (w.done + '/' + w.total + ' (신규 조회 ' + w.fetched + ') · ') : '') + '캐시 적중률 ' + Math.round((c.hit_rate || 0) * 100) + '%';
+                    if (w.running) setTimeout(poll, 3000);
+                }
+                function poll() { fetch('/admin/geocode/warmup').then(function(r){ return r.json(); }).then(show).catch(function(){}); }
+                btn.addEventListener('click', function() {
+                    fetch('/admin/geocode/warmup', { method: 'POST', headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                    .then(function(r){ return r.json(); }).then(function(d){ if (d.error) alert(d.error); else { if (d.started === false) alert('이미 진행 중입니다.'); show(d); } }).catch(function(){ alert('요청 실패'); });
+                });
+                poll();
+            })();
+            </script>
             <div class="mb-12">
                 <h3 class="text-lg font-black text-gray-800 italic mb-2">지도에서 배송구역 설정 (좌표 클릭)</h3>
                 <p class="text-[11px] text-gray-500 font-bold mb-2">편집할 구역을 선택한 뒤 지도를 클릭해 꼭짓점을 추가하세요. <span class="text-orange-600 font-black">주황색 = 일반 배송구역</span> (퀵지역 비었을 때만 사용), <span class="text-teal-600 font-black">틸색 = 퀵지역</span> (우선 적용).</p>
@@ -18374,6 +18606,7 @@ def admin_dashboard():
                             <a href="/admin/orders/delivery_summary_image?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}&order_ids={{ filtered_orders | map(attribute='order_id') | join(',') }}{% for oc in sel_order_cats %}&order_cat={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&order_cat=전체{% endif %}" class="bg-gray-700 text-white px-5 py-2.5 rounded-xl font-black text-xs shadow hover:bg-gray-800 inline-flex items-center justify-center">이미지</a>
                             <a href="/admin/orders/delivery_summary_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}&order_ids={{ filtered_orders | map(attribute='order_id') | join(',') }}{% for oc in sel_order_cats %}&order_cat={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&order_cat=전체{% endif %}" class="bg-teal-600 text-white px-5 py-2.5 rounded-xl font-black text-xs shadow hover:bg-teal-700">엑셀</a>
                     <a href="/admin/orders/excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}&order_ids={{ filtered_orders | map(attribute='order_id') | join(',') }}" class="bg-teal-100 text-teal-700 px-5 py-2.5 rounded-2xl font-black text-xs">Excel</a>
+                    <a href="/admin/orders/excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}&format=csv" data-bg-export class="bg-gray-100 text-gray-600 px-5 py-2.5 rounded-2xl font-black text-xs" title="기간 전체를 서버에서 만든 뒤 완료되면 내려받기">기간 전체 CSV(백그라운드)</a>
                 </div>
             </div>
             <div class="flex flex-wrap items-center gap-4 mb-6 bg-gray-50 p-6 rounded-[2.5rem] border border-gray-100">
@@ -18766,7 +18999,7 @@ def admin_dashboard():
                     <div><label class="text-[10px] text-gray-400 font-black ml-2">입금상태</label><select name="settlement_status" class="w-full border-none bg-gray-50 p-4 rounded-2xl font-black text-xs bg-white"><option value="전체" {% if sel_settlement_status == '전체' %}selected{% endif %}>전체</option><option value="입금대기" {% if sel_settlement_status == '입금대기' %}selected{% endif %}>입금대기</option><option value="입금완료" {% if sel_settlement_status == '입금완료' %}selected{% endif %}>입금완료</option><option value="취소" {% if sel_settlement_status == '취소' %}selected{% endif %}>취소</option><option value="보류" {% if sel_settlement_status == '보류' %}selected{% endif %}>보류</option></select></div>
                     <button type="submit" class="bg-teal-600 text-white py-4 rounded-2xl font-black shadow-lg lg:col-span-2">조회하기</button>
                 </form>
-                <p class="mt-3 text-[11px] text-gray-600 font-bold">엑셀: <a href="/admin/orders/settlement_detail_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}{% for oc in sel_order_cats %}&order_cat={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&order_cat=전체{% endif %}&settlement_status={{ sel_settlement_status | urlencode }}{% if order_id_search %}&order_id={{ order_id_search | urlencode }}{% endif %}{% if payment_key_search %}&payment_key={{ payment_key_search | urlencode }}{% endif %}" class="text-teal-600 hover:underline">정산 상세 (n넘버)</a> · <a href="/admin/settlement/category_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}{% for oc in sel_order_cats %}&category={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&category=전체{% endif %}" class="text-teal-600 hover:underline">카테고리별 판매 품목 (품목·규격·수량)</a></p>
+                <p class="mt-3 text-[11px] text-gray-600 font-bold">엑셀: <a href="/admin/orders/settlement_detail_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}{% for oc in sel_order_cats %}&order_cat={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&order_cat=전체{% endif %}&settlement_status={{ sel_settlement_status | urlencode }}{% if order_id_search %}&order_id={{ order_id_search | urlencode }}{% endif %}{% if payment_key_search %}&payment_key={{ payment_key_search | urlencode }}{% endif %}" class="text-teal-600 hover:underline">정산 상세 (n넘버)</a> · <a href="/admin/settlement/category_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}{% for oc in sel_order_cats %}&category={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&category=전체{% endif %}" class="text-teal-600 hover:underline">카테고리별 판매 품목 (품목·규격·수량)</a> · <a href="/admin/orders/settlement_detail_excel?start_date={{ start_date_str.replace(' ', '%20') }}&end_date={{ end_date_str.replace(' ', '%20') }}{% for oc in sel_order_cats %}&order_cat={{ oc | urlencode }}{% endfor %}{% if not sel_order_cats %}&order_cat=전체{% endif %}&settlement_status={{ sel_settlement_status | urlencode }}&format=csv" data-bg-export class="text-gray-500 hover:underline">정산 상세 CSV(백그라운드)</a></p>
 
                 {% if settlement_summary %}
                 <div class="mt-6 grid grid-cols-2 md:grid-cols-3 lg:grid-cols-6 gap-4">
@@ -19469,6 +19702,37 @@ def admin_dashboard():
         });
     })();
     </script>
+    <script>
+    // 대용량 내보내기: data-bg-export 링크 → 백그라운드 작업 시작, 2초마다 상태 확인 후 완료되면 내려받기
+    document.addEventListener('click', function(e) {
+        var a = e.target.closest('a[data-bg-export]');
+        if (!a) return;
+        e.preventDefault();
+        if (a.dataset.running === '1') return;
+        a.dataset.running = '1';
+        var label = a.textContent;
+        a.textContent = '준비 중...';
+        var done = function(msg) { a.dataset.running = ''; a.textContent = label; if (msg) alert(msg); };
+        fetch(a.href + (a.href.indexOf('?') === -1 ? '?' : '&') + 'background=1', {credentials: 'same-origin'})
+            .then(function(r) { return r.json(); })
+            .then(function(job) {
+                var poll = function() {
+                    fetch(job.status_url, {credentials: 'same-origin'}).then(function(r) { return r.json(); }).then(function(st) {
+                        if (st.status === 'done') {
+                            done(st.rows ? null : '다운로드할 데이터가 없습니다.');
+                            if (st.rows) window.location.href = st.download_url;
+                        } else if (st.status === 'error' || st.error) {
+                            done('내보내기 실패: ' + (st.error || ''));
+                        } else {
+                            setTimeout(poll, 2000);
+                        }
+                    }).catch(function() { done('상태 확인 실패'); });
+                };
+                poll();
+            })
+            .catch(function() { done('내보내기를 시작하지 못했습니다.'); });
+    });
+    </script>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
     """
     ctx = dict(locals())
@@ -20326,6 +20590,7 @@ def admin_product_bulk_upload():
                     db.session.rollback()
                     raise
         db.session.commit()
+        reschedule_product_stock_reset()
         flash(f"{count}개 상품이 등록되었습니다.")
         if created_cat_names:
             flash(f"미등록 카테고리 {len(created_cat_names)}개가 자동 추가되었습니다: {', '.join(sorted(created_cat_names))}")
@@ -22174,9 +22439,10 @@ def seller_confirm():
 확인 시각: {conf.confirmed_at}
 수신 이메일: {conf.recipient_email or '-'}
 """
-                            send_mail(admin_email, subject, body)
+                            enqueue_notification('email', {"to": admin_email, "subject": subject, "body": body})
+                            db.session.commit()
                 except Exception:
-                    pass
+                    db.session.rollback()
             return render_template_string(
                 HEADER_HTML + """
                 <div class="max-w-md mx-auto px-4 py-20 text-center">
@@ -22240,9 +22506,10 @@ def order_confirm_dispatch(token):
 제목: {dispatch.subject}
 확인 시각: {dispatch.confirmed_at}
 """
-                        send_mail(admin_email, subject, body)
+                        enqueue_notification('email', {"to": admin_email, "subject": subject, "body": body})
+                        db.session.commit()
             except Exception:
-                pass
+                db.session.rollback()
         return render_template_string(
             HEADER_HTML + """
             <div class="max-w-md mx-auto px-4 py-20 text-center">
@@ -22996,6 +23263,14 @@ def admin_orders_manual_create():
     return redirect('/admin?tab=orders')
 
 
+def _delete_delivery_task_items(task_filter):
+    """삭제할 배송 작업(task_filter 조건)의 품목 행 삭제. delivery_task_item은 FK가 없어 작업보다 먼저 지움
+    (남겨 두면 SQLite에서 재사용된 작업 id에 붙어 관제 화면 품목 합계가 틀어짐)."""
+    DeliveryTaskItem.query.filter(
+        DeliveryTaskItem.task_id.in_(db.select(DeliveryTask.id).where(task_filter))
+    ).delete(synchronize_session=False)
+
+
 @login_required
 def admin_orders_delete_all():
     """주문정보 전체 삭제 (Order, OrderItem 및 연관 테이블). 관리자 전용. POST + confirm=1."""
@@ -23017,6 +23292,7 @@ def admin_orders_delete_all():
         Settlement.query.filter(Settlement.order_id.in_(order_ids)).delete(synchronize_session=False)
         MarketingCost.query.filter(MarketingCost.order_id.in_(order_ids)).delete(synchronize_session=False)
         Review.query.filter(Review.order_id.in_(order_ids)).delete(synchronize_session=False)
+        _delete_delivery_task_items(DeliveryTask.order_id.in_(order_id_strs))
         DeliveryTask.query.filter(DeliveryTask.order_id.in_(order_id_strs)).delete(synchronize_session=False)
         DeliveryLog.query.filter(DeliveryLog.order_id.in_(order_id_strs)).delete(synchronize_session=False)
         OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
@@ -23068,6 +23344,7 @@ def admin_orders_delete_selected():
         MarketingCost.query.filter(MarketingCost.order_id.in_(order_ids)).delete(synchronize_session=False)
         Review.query.filter(Review.order_id.in_(order_ids)).delete(synchronize_session=False)
         if order_id_strs:
+            _delete_delivery_task_items(DeliveryTask.order_id.in_(order_id_strs))
             DeliveryTask.query.filter(DeliveryTask.order_id.in_(order_id_strs)).delete(synchronize_session=False)
             DeliveryLog.query.filter(DeliveryLog.order_id.in_(order_id_strs)).delete(synchronize_session=False)
         OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
@@ -23107,6 +23384,7 @@ def admin_db_reset_all():
             Settlement.query.filter(Settlement.order_id.in_(order_ids)).delete(synchronize_session=False)
             MarketingCost.query.filter(MarketingCost.order_id.in_(order_ids)).delete(synchronize_session=False)
             Review.query.filter(Review.order_id.in_(order_ids)).delete(synchronize_session=False)
+        DeliveryTaskItem.query.delete()
         DeliveryTask.query.delete()
         DeliveryLog.query.delete()
         OrderItem.query.delete()
@@ -23447,7 +23725,7 @@ def admin_product_add():
             max_purchase_quantity=max_purchase_quantity,
             supplier=(request.form.get('supplier') or '').strip() or None,
         )
-        db.session.add(new_p); db.session.commit(); return redirect('/admin')
+        db.session.add(new_p); db.session.commit(); reschedule_product_stock_reset(); return redirect('/admin')
     return render_template_string(HEADER_HTML + """<div class="max-w-xl mx-auto py-20 px-6 font-black text-left"><h2 class="text-3xl font-black mb-12 border-l-8 border-teal-600 pl-6 uppercase italic text-left">Add Product</h2><p class="text-[11px] text-gray-500 font-bold mb-6 bg-gray-50 p-4 rounded-xl border border-gray-100">각 항목이 <strong>목록·상세 페이지 어디에</strong> 나가는지: 상품명→목록 카드·상세 제목 / Short Intro→상품명 옆 / Detailed Intro→상세 사진 위 / Delivery→목록 배지·상세 배송문구 / 가격·규격→목록·상세 / 재고→잔여 N개 / 마감일→카운트다운·오늘마감 / Main Image→목록·대표사진 / Detail Images→상세 본문 여러 장.</p><form method="POST" enctype="multipart/form-data" class="bg-white p-10 rounded-[3rem] shadow-2xl space-y-7 text-left"><select name="category" class="w-full p-5 bg-gray-50 rounded-2xl font-black outline-none focus:ring-4 focus:ring-teal-50 text-left">{% for c in selectable_categories %}<option value="{{c.name}}">{{c.name}}</option>{% endfor %}</select>
    <div class="space-y-1"><label class="text-[10px] text-indigo-600 font-black ml-4 uppercase tracking-widest">공급사 (발주·취합용)</label><input name="supplier" placeholder="예: OO농장, XX식품" class="w-full p-5 bg-indigo-50 border border-indigo-100 rounded-2xl font-black text-left text-sm" value="{{ p.supplier if p else '' }}"></div>
    <input name="name" placeholder="상품 명칭 (예: 꿀부사 사과)" class="w-full p-5 bg-gray-50 rounded-2xl font-black text-left text-sm" value="{{ p.name if p else '' }}" required>
@@ -23631,6 +23909,7 @@ def admin_product_edit(pid):
             )
             
         db.session.commit()
+        reschedule_product_stock_reset()
         flash("상품 정보가 성공적으로 수정되었습니다.")
         return redirect('/admin')
 
@@ -24064,42 +24343,133 @@ def admin_delete_products_by_category():
     return redirect('/admin?tab=products&category=' + quote(cat_name))
 
 
+def _admin_export(kind, filename_base, build, empty_message, redirect_to, sheet_name='Sheet1'):
+    """관리자 리포트 내보내기 공통.
+    ?format=csv|xlsx (기본 xlsx), ?background=1 이면 백그라운드 작업으로 시작하고 작업 상태 JSON(202) 반환.
+    build() → (헤더, 행 반복자). 백그라운드에서는 다른 스레드에서 실행되므로 쿼리는 build 안에서 만들 것."""
+    fmt = (request.args.get('format') or 'xlsx').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'xlsx'
+    if request.args.get('background') == '1':
+        meta = export_jobs.start(kind, fmt, filename_base, build, owner_id=current_user.id, sheet_name=sheet_name)
+        return jsonify(_export_job_json(meta)), 202
+    header, rows = build()
+    resp = export_response(fmt, filename_base, header, rows, sheet_name=sheet_name)
+    if resp is None:
+        flash(empty_message)
+        return redirect(redirect_to)
+    return resp
+
+
+def _export_job_json(meta):
+    return {
+        'job_id': meta['id'], 'kind': meta['kind'], 'status': meta['status'], 'rows': meta['rows'],
+        'filename': meta['filename'], 'error': meta.get('error'),
+        'status_url': f"/admin/exports/{meta['id']}",
+        'download_url': f"/admin/exports/{meta['id']}/download" if meta['status'] == 'done' else None,
+    }
+
+
+@app.route('/admin/exports/<job_id>')
+@login_required
+def admin_export_job_status(job_id):
+    """백그라운드 내보내기 작업 상태 (running / done / error)."""
+    meta = export_jobs.get(job_id)
+    if not meta or (meta.get('owner_id') != current_user.id and not current_user.is_admin):
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(_export_job_json(meta))
+
+
+@app.route('/admin/exports/<job_id>/download')
+@login_required
+def admin_export_job_download(job_id):
+    """완료된 백그라운드 내보내기 결과 파일 다운로드."""
+    meta = export_jobs.get(job_id)
+    if not meta or (meta.get('owner_id') != current_user.id and not current_user.is_admin):
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    if meta['status'] != 'done':
+        return jsonify(_export_job_json(meta)), 409
+    path = export_jobs.file_path(meta)
+    if not os.path.isfile(path):
+        return jsonify({'error': '보관 기간이 지나 파일이 삭제되었습니다.'}), 410
+    mimetype = CSV_MIMETYPE if meta['format'] == 'csv' else XLSX_MIMETYPE
+    resp = send_file(path, mimetype=mimetype, as_attachment=True, download_name=meta['filename'])
+    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(meta['filename'])}"
+    return resp
+
+
 @login_required
 def admin_sellers_excel():
     """판매자 정보(Seller Business Profile) 엑셀 다운로드"""
     if not current_user.is_admin:
         flash("권한이 없습니다.")
         return redirect('/admin')
-    categories = Category.query.order_by(Category.order.asc(), Category.id.asc()).all()
-    rows = []
-    for i, c in enumerate(categories, 1):
-        rows.append({
-            '순서': i,
-            '카테고리': c.name or '',
-            '상호': c.biz_name or '',
-            '대표자': c.biz_representative or '',
-            '사업자등록번호': c.biz_reg_number or '',
-            '통신판매업번호': getattr(c, 'biz_online_sales_number', None) or '',
-            '소재지': c.biz_address or '',
-            '고객센터': c.biz_contact or '',
-            '문의링크': c.seller_inquiry_link or '',
-            '은행명': c.bank_name or '',
-            '예금주': c.account_holder or '',
-            '정산계좌': c.settlement_account or '',
-            '매니저이메일': c.manager_email or '',
-        })
-    if not rows:
-        flash("다운로드할 판매자 정보가 없습니다.")
-        return redirect('/admin?tab=sellers')
-    df = pd.DataFrame(rows)
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as w:
-        df.to_excel(w, index=False)
-    out.seek(0)
-    filename = f"판매자정보_{now_kst().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = send_file(out, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', download_name=filename, as_attachment=True)
-    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
-    return resp
+
+    def build():
+        header = ['순서', '카테고리', '상호', '대표자', '사업자등록번호', '통신판매업번호', '소재지', '고객센터',
+                  '문의링크', '은행명', '예금주', '정산계좌', '매니저이메일']
+        categories = Category.query.order_by(Category.order.asc(), Category.id.asc())
+        rows = ([
+            i, c.name or '', c.biz_name or '', c.biz_representative or '', c.biz_reg_number or '',
+            getattr(c, 'biz_online_sales_number', None) or '', c.biz_address or '', c.biz_contact or '',
+            c.seller_inquiry_link or '', c.bank_name or '', c.account_holder or '', c.settlement_account or '',
+            c.manager_email or '',
+        ] for i, c in enumerate(categories, 1))
+        return header, rows
+
+    return _admin_export('sellers', f"판매자정보_{now_kst().strftime('%Y%m%d_%H%M%S')}", build,
+                         "다운로드할 판매자 정보가 없습니다.", '/admin?tab=sellers')
+
+
+def _orders_sales_export(is_master, my_categories, sel_order_cats, allowed_ids, sd, ed):
+    """조회 결과 상세(주문일시, 오더아이디, 판매상품명, 카테고리, 판매수량, 결제상태) 행 생성기."""
+    header = ['주문일시', '오더아이디', '판매상품명', '카테고리', '판매수량', '결제상태']
+    query = Order.query.filter(Order.status != '결제취소')
+    if allowed_ids:
+        query = query.filter(Order.order_id.in_(allowed_ids))
+    elif sd and ed:
+        query = query.filter(Order.created_at >= sd, Order.created_at <= ed)
+
+    def rows():
+        for report in iter_order_reports(query.order_by(Order.created_at.desc(), Order.id.desc())):
+            for o in report.orders:
+                if is_master:
+                    order_show = True
+                else:
+                    order_show = False
+                    parts = (o.product_details or '').split(' | ')
+                    for part in parts:
+                        match = re.search(r'\[(.*?)\] (.*)', part)
+                        if match and match.group(1).strip() in my_categories:
+                            order_show = True
+                            break
+                if not order_show:
+                    continue
+                parts = (o.product_details or '').split(' | ')
+                order_date_str = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else ''
+                order_no = getattr(o, 'order_id', None) or ''
+                status_str = o.status or '결제완료'
+                items = report.items(o)
+                if items:
+                    for oi in items:
+                        if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
+                            is_cancelled = getattr(oi, 'cancelled', False) or (getattr(oi, 'item_status', None) in ('부분취소', '품절취소'))
+                            yield [order_date_str, order_no, oi.product_name, oi.product_category,
+                                   0 if is_cancelled else oi.quantity,
+                                   '취소' if is_cancelled else (getattr(oi, 'item_status', None) or status_str)]
+                else:
+                    for part in parts:
+                        match = re.search(r'\[(.*?)\] (.*)', part)
+                        if match:
+                            cat_n, items_str = match.groups()
+                            if (is_master or cat_n in my_categories) and (not sel_order_cats or cat_n in sel_order_cats):
+                                for item in items_str.split(', '):
+                                    it_match = re.search(r'(.*?)\((\d+)\)', item)
+                                    if it_match:
+                                        pn, qt = it_match.groups()
+                                        yield [order_date_str, order_no, pn.strip(), cat_n, int(qt), status_str]
+
+    return header, rows()
 
 
 @login_required
@@ -24114,78 +24484,21 @@ def admin_orders_sales_excel():
     now = now_kst()
     start_date_str = request.args.get('start_date', now.strftime('%Y-%m-%d 00:00')).replace('T', ' ')
     end_date_str = request.args.get('end_date', now.strftime('%Y-%m-%d 23:59')).replace('T', ' ')
-    query = Order.query.filter(Order.status != '결제취소')
     order_ids_param = request.args.get('order_ids', '').strip()
-    if order_ids_param:
-        allowed_ids = [x.strip() for x in order_ids_param.split(',') if x.strip()]
-        if allowed_ids:
-            query = query.filter(Order.order_id.in_(allowed_ids))
-    else:
+    allowed_ids = [x.strip() for x in order_ids_param.split(',') if x.strip()] if order_ids_param else []
+    sd = ed = None
+    if not order_ids_param:
         try:
             sd = datetime.strptime(start_date_str, '%Y-%m-%d %H:%M')
             ed = datetime.strptime(end_date_str, '%Y-%m-%d %H:%M')
-            query = query.filter(Order.created_at >= sd, Order.created_at <= ed)
         except Exception:
             pass
     sel_order_cats = request.args.getlist('order_cat')
     if not sel_order_cats or '전체' in sel_order_cats:
         sel_order_cats = []
-    orders = query.order_by(Order.created_at.desc()).all()
-    sales_table_rows = []
-    for o in orders:
-        if is_master:
-            order_show = True
-        else:
-            order_show = False
-            parts = (o.product_details or '').split(' | ')
-            for part in parts:
-                match = re.search(r'\[(.*?)\] (.*)', part)
-                if match and match.group(1).strip() in my_categories:
-                    order_show = True
-                    break
-        if not order_show:
-            continue
-        parts = (o.product_details or '').split(' | ')
-        order_date_str = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else ''
-        status_str = o.status or '결제완료'
-        items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
-        if items:
-            for oi in items:
-                if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
-                    is_cancelled = getattr(oi, 'cancelled', False) or (getattr(oi, 'item_status', None) in ('부분취소', '품절취소'))
-                    sales_table_rows.append({
-                        'order_date': order_date_str,
-                        'order_id': getattr(o, 'order_id', None) or '',
-                        'product_name': oi.product_name,
-                        'category': oi.product_category,
-                        'quantity': 0 if is_cancelled else oi.quantity,
-                        'status': '취소' if is_cancelled else (getattr(oi, 'item_status', None) or status_str)
-                    })
-        else:
-            for part in parts:
-                match = re.search(r'\[(.*?)\] (.*)', part)
-                if match:
-                    cat_n, items_str = match.groups()
-                    if (is_master or cat_n in my_categories) and (not sel_order_cats or cat_n in sel_order_cats):
-                        for item in items_str.split(', '):
-                            it_match = re.search(r'(.*?)\((\d+)\)', item)
-                            if it_match:
-                                pn, qt = it_match.groups()
-                                sales_table_rows.append({'order_date': order_date_str, 'order_id': getattr(o, 'order_id', None) or '', 'product_name': pn.strip(), 'category': cat_n, 'quantity': int(qt), 'status': status_str})
-    if not sales_table_rows:
-        flash("다운로드할 데이터가 없습니다.")
-        return redirect('/admin?tab=orders')
-    df = pd.DataFrame(sales_table_rows, columns=['order_date', 'order_id', 'product_name', 'category', 'quantity', 'status'])
-    df.columns = ['주문일시', '오더아이디', '판매상품명', '카테고리', '판매수량', '결제상태']
-    df = _dataframe_utf8_safe(df)
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as w:
-        df.to_excel(w, index=False)
-    out.seek(0)
-    filename = f"조회결과상세_{now_kst().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = send_file(out, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', download_name=filename, as_attachment=True)
-    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
-    return resp
+    build = partial(_orders_sales_export, is_master, my_categories, sel_order_cats, allowed_ids, sd, ed)
+    return _admin_export('orders_sales', f"조회결과상세_{now_kst().strftime('%Y%m%d_%H%M%S')}", build,
+                         "다운로드할 데이터가 없습니다.", '/admin?tab=orders')
 
 
 def _pil_font_for_table(size=12):
@@ -24383,7 +24696,8 @@ def admin_orders_sales_detail_image():
     sel_order_cats = request.args.getlist('order_cat')
     if not sel_order_cats or '전체' in sel_order_cats:
         sel_order_cats = []
-    orders = query.order_by(Order.created_at.desc()).all()
+    order_report = load_order_report(query.order_by(Order.created_at.desc()))
+    orders = order_report.orders
     sales_table_rows = []
     for o in orders:
         if is_master:
@@ -24401,7 +24715,7 @@ def admin_orders_sales_detail_image():
         parts = (o.product_details or '').split(' | ')
         order_date_str = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else ''
         status_str = o.status or '결제완료'
-        items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
+        items = order_report.items(o)
         if items:
             for oi in items:
                 if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
@@ -24496,7 +24810,8 @@ def admin_orders_sales_summary_excel():
     sel_order_cats = request.args.getlist('order_cat')
     if not sel_order_cats or '전체' in sel_order_cats:
         sel_order_cats = []
-    orders = query.order_by(Order.created_at.desc()).all()
+    order_report = load_order_report(query.order_by(Order.created_at.desc()))
+    orders = order_report.orders
     sales_table_rows = []
     for o in orders:
         if is_master:
@@ -24514,13 +24829,13 @@ def admin_orders_sales_summary_excel():
         parts = (o.product_details or '').split(' | ')
         order_date_str = o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else ''
         status_str = o.status or '결제완료'
-        items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
+        items = order_report.items(o)
         if items:
             for oi in items:
                 if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
                     is_cancelled = getattr(oi, 'cancelled', False) or (getattr(oi, 'item_status', None) in ('부분취소', '품절취소'))
                     qty = 0 if is_cancelled else oi.quantity
-                    p = Product.query.get(oi.product_id) if oi.product_id else None
+                    p = order_report.product(oi.product_id)
                     supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                     sales_table_rows.append({
                         'order_date': order_date_str,
@@ -24541,7 +24856,7 @@ def admin_orders_sales_summary_excel():
                             if it_match:
                                 pn, qt = it_match.groups()
                                 qt = int(qt)
-                                p = Product.query.filter_by(name=pn.strip()).first()
+                                p = order_report.product_by_name(pn)
                                 supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                                 sales_table_rows.append({'order_date': order_date_str, 'product_name': pn.strip(), 'category': cat_n, 'quantity': qt, 'status': status_str, 'line_supply_amount': supply_price * qt})
     from collections import defaultdict
@@ -24640,12 +24955,13 @@ def _delivery_summary_rows(is_master, my_categories, sel_order_cats, start_dt, e
         allowed_ids = [x.strip() for x in order_ids_param.split(',') if x.strip()]
         if allowed_ids:
             q_orders = q_orders.filter(Order.order_id.in_(allowed_ids))
-    all_orders = q_orders.order_by(Order.created_at.desc()).all()
+    order_report = load_order_report(q_orders.order_by(Order.created_at.desc()))
+    all_orders = order_report.orders
     delivery_rows = []
     for o in all_orders:
         order_show = False
         manager_items_list = []
-        items = OrderItem.query.filter_by(order_id=o.id, cancelled=False).order_by(OrderItem.id.asc()).all()
+        items = order_report.items(o, include_cancelled=False)
         if items:
             for oi in items:
                 if is_master or oi.product_category in my_categories:
@@ -24760,7 +25076,8 @@ def admin_orders_sales_summary_image():
     sel_order_cats = request.args.getlist('order_cat')
     if not sel_order_cats or '전체' in sel_order_cats:
         sel_order_cats = []
-    orders = query.order_by(Order.created_at.desc()).all()
+    order_report = load_order_report(query.order_by(Order.created_at.desc()))
+    orders = order_report.orders
     sales_table_rows = []
     for o in orders:
         if is_master:
@@ -24777,13 +25094,13 @@ def admin_orders_sales_summary_image():
             continue
         parts = (o.product_details or '').split(' | ')
         status_str = o.status or '결제완료'
-        items = OrderItem.query.filter_by(order_id=o.id).order_by(OrderItem.id.asc()).all()
+        items = order_report.items(o)
         if items:
             for oi in items:
                 if (is_master or oi.product_category in my_categories) and (not sel_order_cats or oi.product_category in sel_order_cats):
                     is_cancelled = getattr(oi, 'cancelled', False) or (getattr(oi, 'item_status', None) in ('부분취소', '품절취소'))
                     qty = 0 if is_cancelled else oi.quantity
-                    p = Product.query.get(oi.product_id) if oi.product_id else None
+                    p = order_report.product(oi.product_id)
                     supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                     sales_table_rows.append({
                         'category': oi.product_category,
@@ -24802,7 +25119,7 @@ def admin_orders_sales_summary_image():
                             if it_match:
                                 pn, qt = it_match.groups()
                                 qt = int(qt)
-                                p = Product.query.filter_by(name=pn.strip()).first()
+                                p = order_report.product_by_name(pn)
                                 supply_price = int(p.supply_price) if p and getattr(p, 'supply_price', None) is not None else (int(p.price) if p and getattr(p, 'price', None) is not None else 0)
                                 sales_table_rows.append({'category': cat_n, 'product_name': pn.strip(), 'quantity': qt, 'line_supply_amount': supply_price * qt})
     from collections import defaultdict
@@ -24847,6 +25164,45 @@ def admin_orders_sales_summary_image():
     return resp
 
 
+def _settlement_detail_export(is_master, my_categories, sel_order_cats, sel_settlement_status,
+                              order_id_search, payment_key_search, start_dt, end_dt):
+    """정산 상세(Settlement n넘버 기준) 행 생성기. 정산 행을 1000건씩 읽음."""
+    header = ['정산번호(n)', '판매일시', '카테고리', '면세여부', '품목', '판매금액', '수수료', '배송관리비', '정산합계', '입금상태', '입금일']
+    q = Settlement.query.filter(Settlement.sale_dt >= start_dt, Settlement.sale_dt <= end_dt)
+    if not is_master:
+        q = q.filter(Settlement.category.in_(my_categories))
+    if sel_order_cats:
+        q = q.filter(Settlement.category.in_(sel_order_cats))
+    if sel_settlement_status and sel_settlement_status != '전체':
+        q = q.filter(Settlement.settlement_status == sel_settlement_status)
+    if order_id_search or payment_key_search:
+        order_q = db.session.query(Order.id)
+        if order_id_search:
+            order_q = order_q.filter(Order.order_id.ilike('%' + order_id_search + '%'))
+        if payment_key_search:
+            order_q = order_q.filter(Order.payment_key.ilike('%' + payment_key_search + '%'))
+        item_q = db.session.query(OrderItem.id).filter(OrderItem.order_id.in_(order_q.scalar_subquery()))
+        q = q.filter(Settlement.order_item_id.in_(item_q.scalar_subquery()))
+
+    def rows():
+        for s in q.order_by(Settlement.sale_dt.desc(), Settlement.id.asc()).yield_per(1000):
+            yield [
+                s.settlement_no,
+                s.sale_dt.strftime('%Y-%m-%d %H:%M') if s.sale_dt else '',
+                s.category,
+                '면세' if s.tax_exempt else '과세',
+                s.product_name,
+                s.sales_amount,
+                s.fee,
+                s.delivery_fee,
+                s.settlement_total,
+                s.settlement_status,
+                s.settled_at.strftime('%Y-%m-%d %H:%M') if s.settled_at else '',
+            ]
+
+    return header, rows()
+
+
 @login_required
 def admin_orders_settlement_detail_excel():
     """정산 상세 엑셀 다운로드 (Settlement 테이블 n넘버 기준, 날짜·카테고리·입금상태 필터)"""
@@ -24873,57 +25229,38 @@ def admin_orders_settlement_detail_excel():
     except Exception:
         start_dt = now.replace(hour=0, minute=0, second=0)
         end_dt = now.replace(hour=23, minute=59, second=59)
-    q = Settlement.query.filter(Settlement.sale_dt >= start_dt, Settlement.sale_dt <= end_dt)
+    build = partial(_settlement_detail_export, is_master, my_categories, sel_order_cats, sel_settlement_status,
+                    order_id_search, payment_key_search, start_dt, end_dt)
+    return _admin_export('settlement_detail', f"정산상세_{now_kst().strftime('%Y%m%d_%H%M%S')}", build,
+                         "다운로드할 정산 상세 데이터가 없습니다.", '/admin?tab=settlement')
+
+
+def _settlement_category_export(is_master, my_categories, sel_cats, start_dt, end_dt):
+    """카테고리별 판매 품목(판매일시, 카테고리, 품목명, 규격, 수량, 단가, 합계) 행 생성기."""
+    header = ["판매일시", "카테고리", "품목명", "규격", "수량", "단가", "합계"]
+    q = db.session.query(OrderItem, Order.created_at, Product.spec).join(
+        Order, OrderItem.order_id == Order.id
+    ).outerjoin(Product, OrderItem.product_id == Product.id)
+    q = q.filter(Order.status != '결제취소', OrderItem.cancelled == False)
+    q = q.filter(Order.created_at >= start_dt, Order.created_at <= end_dt)
     if not is_master:
-        q = q.filter(Settlement.category.in_(my_categories))
-    if sel_order_cats:
-        q = q.filter(Settlement.category.in_(sel_order_cats))
-    if sel_settlement_status and sel_settlement_status != '전체':
-        q = q.filter(Settlement.settlement_status == sel_settlement_status)
-    if order_id_search or payment_key_search:
-        order_q = Order.query
-        if order_id_search:
-            order_q = order_q.filter(Order.order_id.ilike('%' + order_id_search + '%'))
-        if payment_key_search:
-            order_q = order_q.filter(Order.payment_key.ilike('%' + payment_key_search + '%'))
-        order_ids = [o.id for o in order_q.all()]
-        if order_ids:
-            order_item_ids = [oi.id for oi in OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).all()]
-            if order_item_ids:
-                q = q.filter(Settlement.order_item_id.in_(order_item_ids))
-            else:
-                q = q.filter(Settlement.order_item_id == -1)
-        else:
-            q = q.filter(Settlement.order_item_id == -1)
-    rows = []
-    for s in q.order_by(Settlement.sale_dt.desc()).all():
-        rows.append({
-            'settlement_no': s.settlement_no,
-            'sale_dt': s.sale_dt.strftime('%Y-%m-%d %H:%M') if s.sale_dt else '',
-            'category': s.category,
-            'category_type': getattr(s, 'category_type', None) or '입점형',
-            'tax_exempt': '면세' if s.tax_exempt else '과세',
-            'product_name': s.product_name,
-            'sales_amount': s.sales_amount,
-            'fee': s.fee,
-            'delivery_fee': s.delivery_fee,
-            'settlement_total': s.settlement_total,
-            'settlement_status': s.settlement_status,
-            'settled_at': s.settled_at.strftime('%Y-%m-%d %H:%M') if s.settled_at else '',
-        })
-    if not rows:
-        flash("다운로드할 정산 상세 데이터가 없습니다.")
-        return redirect('/admin?tab=settlement')
-    df = pd.DataFrame(rows, columns=['settlement_no', 'sale_dt', 'category', 'tax_exempt', 'product_name', 'sales_amount', 'fee', 'delivery_fee', 'settlement_total', 'settlement_status', 'settled_at'])
-    df.columns = ['정산번호(n)', '판매일시', '카테고리', '면세여부', '품목', '판매금액', '수수료', '배송관리비', '정산합계', '입금상태', '입금일']
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as w:
-        df.to_excel(w, index=False)
-    out.seek(0)
-    filename = f"정산상세_{now_kst().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = send_file(out, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', download_name=filename, as_attachment=True)
-    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
-    return resp
+        q = q.filter(OrderItem.product_category.in_(my_categories))
+    if sel_cats:
+        q = q.filter(OrderItem.product_category.in_(sel_cats))
+
+    def rows():
+        for oi, created_at, spec in q.order_by(Order.created_at.desc(), OrderItem.id.asc()).yield_per(1000):
+            yield [
+                created_at.strftime('%Y-%m-%d %H:%M') if created_at else '',
+                oi.product_category,
+                oi.product_name,
+                spec or "-",
+                oi.quantity,
+                oi.price,
+                oi.price * oi.quantity,
+            ]
+
+    return header, rows()
 
 
 @login_required
@@ -24947,40 +25284,90 @@ def admin_settlement_category_excel():
     except Exception:
         start_dt = now.replace(hour=0, minute=0, second=0)
         end_dt = now.replace(hour=23, minute=59, second=59)
-    q = db.session.query(OrderItem, Order, Product).join(
-        Order, OrderItem.order_id == Order.id
-    ).outerjoin(Product, OrderItem.product_id == Product.id)
-    q = q.filter(Order.status != '결제취소', OrderItem.cancelled == False)
-    q = q.filter(Order.created_at >= start_dt, Order.created_at <= end_dt)
-    if not is_master:
-        q = q.filter(OrderItem.product_category.in_(my_categories))
-    if sel_cats:
-        q = q.filter(OrderItem.product_category.in_(sel_cats))
-    rows = []
-    for oi, o, p in q.order_by(Order.created_at.desc(), OrderItem.id.asc()).all():
-        spec = (p.spec if p else None) or "-"
-        rows.append({
-            "sale_dt": o.created_at.strftime('%Y-%m-%d %H:%M') if o and o.created_at else '',
-            "category": oi.product_category,
-            "product_name": oi.product_name,
-            "spec": spec,
-            "quantity": oi.quantity,
-            "price": oi.price,
-            "total": oi.price * oi.quantity,
-        })
-    if not rows:
-        flash("다운로드할 데이터가 없습니다.")
-        return redirect('/admin?tab=settlement')
-    df = pd.DataFrame(rows, columns=["sale_dt", "category", "product_name", "spec", "quantity", "price", "total"])
-    df.columns = ["판매일시", "카테고리", "품목명", "규격", "수량", "단가", "합계"]
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as w:
-        df.to_excel(w, index=False)
-    out.seek(0)
-    filename = f"카테고리별판매품목_{now_kst().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    resp = send_file(out, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', download_name=filename, as_attachment=True)
-    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
-    return resp
+    build = partial(_settlement_category_export, is_master, my_categories, sel_cats, start_dt, end_dt)
+    return _admin_export('settlement_category', f"카테고리별판매품목_{now_kst().strftime('%Y%m%d_%H%M%S')}", build,
+                         "다운로드할 데이터가 없습니다.", '/admin?tab=settlement')
+
+
+def _orders_excel_product_cells(product_details, is_master, my_categories):
+    """product_details 텍스트 → (권한 있는 카테고리 포함 여부, [(열 이름, 상품명, 수량), ...])."""
+    show = False
+    cells = []
+    parts = product_details.split(' | ') if product_details else []
+    for part in parts:
+        match = re.search(r'\[(.*?)\] (.*)', part)
+        if match:
+            cat_n, items_str = match.groups()
+            if is_master or cat_n in my_categories:
+                show = True
+                for item in items_str.split(', '):
+                    item_match = re.search(r'(.*?)\((\d+)\)', item)
+                    if item_match:
+                        p_name = item_match.group(1).strip()
+                        cells.append((f"[{cat_n}] {p_name}", p_name, int(item_match.group(2))))
+    return show, cells
+
+
+def _orders_excel_export(is_master, my_categories, allowed_ids, sd, ed):
+    """주문 리스트(주문 1행 + 상품별 수량 열) 행 생성기.
+    상품 열 목록을 헤더에 먼저 써야 하므로 product_details만 읽는 1차 패스로 열을 모은 뒤, 2차 패스에서 행을 씀."""
+    query = Order.query.filter(Order.status != '결제취소')
+    if allowed_ids:
+        query = query.filter(Order.order_id.in_(allowed_ids))
+    elif sd and ed:
+        query = query.filter(Order.created_at >= sd, Order.created_at <= ed)
+
+    # 헤더 순서 고정 (정보성 열들을 앞으로 배치) + 실제 생성된 상품 열들만 가나다순 정렬
+    base_cols = ["일시", "주문번호", "고객명", "전화번호", "주소", "메모", "결제금액", "상태", "입금여부", "정산일시"]
+    product_cols = set()
+    any_shown = False
+    for (details,) in query.with_entities(Order.product_details).yield_per(2000):
+        show, cells = _orders_excel_product_cells(details, is_master, my_categories)
+        if show:
+            any_shown = True
+            product_cols.update(c[0] for c in cells)
+    header = base_cols + sorted(product_cols)
+    col_index = {c: i for i, c in enumerate(header)}
+
+    def rows():
+        total_payment = 0
+        for report in iter_order_reports(query.order_by(Order.created_at.desc(), Order.id.desc())):
+            for o in report.orders:
+                show, cells = _orders_excel_product_cells(o.product_details, is_master, my_categories)
+                if not show:
+                    continue
+                row = [''] * len(header)
+                row[:len(base_cols)] = [
+                    o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else "-",
+                    o.order_id[-8:] if o.order_id else "-",
+                    o.customer_name or "-",
+                    o.customer_phone or "-",
+                    o.delivery_address or "-",
+                    o.request_memo or "-",
+                    0,
+                    o.status or "-",
+                    "입금완료" if getattr(o, 'is_settled', False) else "대기",
+                    o.settled_at.strftime('%Y-%m-%d %H:%M') if (getattr(o, 'is_settled', False) and o.settled_at) else "-",
+                ]
+                # 권한 있는 품목만 정산대상금액에 합산
+                row_manager_subtotal = 0
+                for col_name, p_name, p_qty in cells:
+                    row[col_index[col_name]] = p_qty
+                    p_obj = report.product_by_name(p_name)
+                    if p_obj:
+                        row_manager_subtotal += p_obj.price * p_qty
+                # 마스터는 주문 전체 결제금액, 매니저는 해당 오더의 권한 품목 합계만
+                payment = o.total_price if is_master else row_manager_subtotal
+                row[col_index["결제금액"]] = payment
+                total_payment += int(payment or 0)
+                yield row
+        # 총합계 행 (권한 있는 품목 합계만)
+        total_row = [''] * len(header)
+        total_row[col_index["주문번호"]] = "총합계"
+        total_row[col_index["결제금액"]] = total_payment
+        yield total_row
+
+    return header, (rows() if any_shown else iter(()))
 
 
 @login_required
@@ -24988,123 +25375,32 @@ def admin_orders_excel():
     """주문 내역 엑셀 다운로드 (정산여부/일시 포함 + 품목 분리 최종 완성본)"""
     categories = Category.query.all()
     my_categories = [c.name for c in categories if c.manager_email == current_user.email]
-    
+
     if not (current_user.is_admin or my_categories):
         flash("엑셀 다운로드 권한이 없습니다.")
         return redirect('/admin')
 
-
-
     is_master = current_user.is_admin
     now = now_kst()
-    
+
     # [기존 로직 유지] 날짜 변수 정의
     start_date_str = request.args.get('start_date', now.strftime('%Y-%m-%d 00:00')).replace('T', ' ')
     end_date_str = request.args.get('end_date', now.strftime('%Y-%m-%d 23:59')).replace('T', ' ')
-    
-    query = Order.query.filter(Order.status != '결제취소')
-    
+
     # 현재 권한 있는 오더만 사용: order_ids가 있으면 해당 주문만 대상(날짜는 참고용), 없으면 날짜로만 필터
     order_ids_param = request.args.get('order_ids', '').strip()
-    if order_ids_param:
-        allowed_ids = [x.strip() for x in order_ids_param.split(',') if x.strip()]
-        if allowed_ids:
-            query = query.filter(Order.order_id.in_(allowed_ids))
-    else:
+    allowed_ids = [x.strip() for x in order_ids_param.split(',') if x.strip()] if order_ids_param else []
+    sd = ed = None
+    if not order_ids_param:
         try:
             sd = datetime.strptime(start_date_str, '%Y-%m-%d %H:%M')
             ed = datetime.strptime(end_date_str, '%Y-%m-%d %H:%M')
-            query = query.filter(Order.created_at >= sd, Order.created_at <= ed)
-        except:
+        except Exception:
             pass
+    build = partial(_orders_excel_export, is_master, my_categories, allowed_ids, sd, ed)
+    return _admin_export('orders', f"주문정산_{now_kst().strftime('%Y%m%d_%H%M%S')}", build,
+                         "다운로드할 데이터가 없습니다.", '/admin?tab=orders', sheet_name='주문리스트')
 
-    orders = query.order_by(Order.created_at.desc()).all()
-    
-    data = []
-    all_product_columns = set()
-
-    for o in orders:
-        # 권한 있는 품목만 합산 (오더별 정산대상금액)
-        row_manager_subtotal = 0
-
-        row = {
-            "일시": o.created_at.strftime('%Y-%m-%d %H:%M') if o.created_at else "-",
-            "주문번호": o.order_id[-8:] if o.order_id else "-",
-            "고객명": o.customer_name or "-",
-            "전화번호": o.customer_phone or "-",
-            "주소": o.delivery_address or "-",
-            "메모": o.request_memo or "-",
-            "결제금액": 0,  # 아래에서 권한별로 채움
-            "상태": o.status or "-",
-            "입금여부": "입금완료" if getattr(o, 'is_settled', False) else "대기",
-            "정산일시": o.settled_at.strftime('%Y-%m-%d %H:%M') if (getattr(o, 'is_settled', False) and o.settled_at) else "-"
-        }
-        
-        parts = o.product_details.split(' | ') if o.product_details else []
-        row_show_flag = False
-        
-        for part in parts:
-            match = re.search(r'\[(.*?)\] (.*)', part)
-            if match:
-                cat_n, items_str = match.groups()
-                if is_master or cat_n in my_categories:
-                    row_show_flag = True
-                    items = items_str.split(', ')
-                    for item in items:
-                        item_match = re.search(r'(.*?)\((\d+)\)', item)
-                        if item_match:
-                            p_name = item_match.group(1).strip()
-                            p_qty = int(item_match.group(2))
-                            col_name = f"[{cat_n}] {p_name}"
-                            row[col_name] = p_qty
-                            all_product_columns.add(col_name)
-                            # 권한 있는 품목만 정산대상금액에 합산
-                            p_obj = Product.query.filter_by(name=p_name).first()
-                            if p_obj:
-                                row_manager_subtotal += p_obj.price * p_qty
-
-        if row_show_flag:
-            # 마스터는 주문 전체 결제금액, 매니저는 해당 오더의 권한 품목 합계만
-            row["결제금액"] = o.total_price if is_master else row_manager_subtotal
-            data.append(row)
-
-    if not data:
-        flash("다운로드할 데이터가 없습니다.")
-        return redirect('/admin?tab=orders')
-
-    # 데이터프레임 생성 및 열 순서 확정
-    df = pd.DataFrame(data)
-    
-    # 헤더 순서 고정 (정보성 열들을 앞으로 배치)
-    base_cols = ["일시", "주문번호", "고객명", "전화번호", "주소", "메모", "결제금액", "상태", "정산여부", "정산일시"]
-    
-    # 실제 생성된 상품 열들만 추출하여 가나다순 정렬
-    existing_base_cols = [c for c in base_cols if c in df.columns]
-    product_cols = sorted([c for c in df.columns if c not in base_cols])
-    
-    df = df[existing_base_cols + product_cols]
-    df = df.fillna('') # 수량 없는 칸 빈칸 처리
-
-    # 총합계 행 추가 (권한 있는 품목 합계만)
-    total_row = {c: "" for c in df.columns}
-    total_row["주문번호"] = "총합계"
-    if "결제금액" in df.columns:
-        total_row["결제금액"] = pd.to_numeric(df["결제금액"], errors="coerce").fillna(0).astype(int).sum()
-    df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
-
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='openpyxl') as w:
-        df.to_excel(w, index=False, sheet_name='주문리스트')
-    out.seek(0)
-    filename = f"주문정산_{now_kst().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response = send_file(
-        out,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
-    response.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
-    return response
 
 # --------------------------------------------------------------------------------
 # 9. 데이터베이스 초기화 및 서버 실행
@@ -25115,64 +25411,8 @@ def init_db():
     with app.app_context():
         # 모든 테이블(Settlement 포함) 생성
         db.create_all()
-        # 누락된 컬럼 수동 추가 (ALTER TABLE 로직). 배포 후에도 새 컬럼이 없으면 자동 추가되어 DB 오류 방지.
-        cols = [
-            ("product", "description", "VARCHAR(200)"),
-            ("product", "detail_image_url", "TEXT"),
-            ("user", "request_memo", "VARCHAR(500)"),
-            ("order", "delivery_fee", "INTEGER DEFAULT 0"),
-            ("product", "badge", "VARCHAR(50)"),
-            ("category", "seller_name", "VARCHAR(100)"),
-            ("category", "seller_inquiry_link", "VARCHAR(500)"),
-            ("category", "order", "INTEGER DEFAULT 0"),
-            ("category", "description", "VARCHAR(200)"),
-            ("category", "biz_name", "VARCHAR(100)"),
-            ("category", "biz_representative", "VARCHAR(50)"),
-            ("category", "biz_reg_number", "VARCHAR(50)"),
-            ("category", "biz_online_sales_number", "VARCHAR(50)"),
-            ("category", "biz_address", "VARCHAR(200)"),
-            ("category", "biz_contact", "VARCHAR(50)"),
-            ("category", "bank_name", "VARCHAR(50)"),
-            ("category", "account_holder", "VARCHAR(100)"),
-            ("category", "settlement_account", "VARCHAR(50)"),
-            ("order", "status", "VARCHAR(20) DEFAULT '결제완료'"),
-            ("review", "user_name", "VARCHAR(50)"),
-            ("review", "product_name", "VARCHAR(100)"),
-            ("review", "order_id", "INTEGER"),
-            ("review", "category_id", "INTEGER"),
-            ("order_item", "item_status", "VARCHAR(30) DEFAULT '결제완료'"),
-            ("order_item", "status_message", "TEXT"),
-            ("order_item", "delivery_proof_image_url", "VARCHAR(500)"),
-            ("user_message", "image_url", "VARCHAR(500)"),
-            ("restaurant_request", "admin_notes", "TEXT"),
-            ("partnership_inquiry", "is_secret", "BOOLEAN DEFAULT 1"),
-            ("partnership_inquiry", "admin_notes", "TEXT"),
-            ("partnership_inquiry", "is_hidden", "BOOLEAN DEFAULT 0"),
-            ("product", "view_count", "INTEGER DEFAULT 0"),
-            ("product", "supply_price", "INTEGER"),
-            ("category", "category_type", "VARCHAR(20) DEFAULT '입점형'"),
-            ("settlement", "category_type", "VARCHAR(20) DEFAULT '입점형'"),
-            ("settlement", "supply_amount", "INTEGER"),
-            ("order_item", "supply_price", "INTEGER"),
-            ("user", "utm_source", "VARCHAR(100)"),
-            ("user", "utm_medium", "VARCHAR(100)"),
-            ("user", "utm_campaign", "VARCHAR(100)"),
-            ("order", "utm_source", "VARCHAR(100)"),
-            ("order", "utm_medium", "VARCHAR(100)"),
-            ("order", "utm_campaign", "VARCHAR(100)"),
-        ]
-        for t, c, ct in cols:
-            try:
-                existing = []
-                if db.engine.dialect.name == "sqlite":
-                    rp = db.session.execute(text(f'PRAGMA table_info("{t}")')).fetchall()
-                    existing = [row[1] for row in rp] if rp else []
-                if c in existing:
-                    continue
-                db.session.execute(text(f"ALTER TABLE \"{t}\" ADD COLUMN \"{c}\" {ct}"))
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+        # 누락된 컬럼·인덱스는 버전 마이그레이션으로 보정 (이미 적용된 버전은 건너뜀)
+        run_schema_migrations(db)
 
         # 기존 리뷰에 판매자(category_id) 보정: product_id -> 상품의 카테고리 -> category.id
         try:
@@ -25202,6 +25442,33 @@ def init_db():
             db.session.add(Category(name="프리미엄 공동구매", tax_type="과세", order=1, description="유통 단계를 파격적으로 줄인 송도 전용 공구 상품입니다."))
         db.session.commit()
 
+_background_scheduler = None
+
+
+def start_background_scheduler():
+    """프로세스당 1개의 APScheduler 기동 (재고 초기화 등 요청 경로 밖 작업). BACKGROUND_JOBS=0이면 미기동."""
+    global _background_scheduler
+    if _background_scheduler is not None:
+        return _background_scheduler
+    if os.getenv("BACKGROUND_JOBS", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler  # type: ignore[reportMissingImports]
+        _background_scheduler = BackgroundScheduler(timezone="Asia/Seoul")
+        schedule_product_stock_reset(app, _background_scheduler)
+        schedule_sellable_refresh(app, _background_scheduler)
+        if NAVER_CLIENT_ID and NAVER_CLIENT_SECRET:
+            schedule_naver_price_refresh(app, _background_scheduler, _naver_price_list)
+        if TOSS_SECRET_KEY:
+            schedule_payment_reconcile(app, _background_scheduler, _toss_payment_by_order_id, _toss_refund_unfinalized_payment)
+        _background_scheduler.start()
+        notification_dispatcher.start()  # 재시작 전 남은 알림 발송
+    except Exception:
+        traceback.print_exc()
+        _background_scheduler = None
+    return _background_scheduler
+
+
 # 관리자 라우트는 admin_routes.py에서 한 번에 등록 (app.py 경량화)
 from admin_routes import register_admin_routes
 register_admin_routes(app)
@@ -25222,187 +25489,27 @@ if __name__ == "__main__":
     # 로컬 실행 시 매일 한국시간 새벽 4시 자동 백업
     if GITHUB_BACKUP_TOKEN and GITHUB_BACKUP_REPO:
         try:
-            from apscheduler.schedulers.background import BackgroundScheduler  # type: ignore[reportMissingImports]
             from apscheduler.triggers.cron import CronTrigger  # type: ignore[reportMissingImports]
-            _scheduler = BackgroundScheduler(timezone="Asia/Seoul")
+            _scheduler = start_background_scheduler()
             def _scheduled_backup():
                 with app.app_context():
                     run_backup()
-            _scheduler.add_job(_scheduled_backup, CronTrigger(hour=4, minute=0), id="daily_backup")
-            _scheduler.start()
+            if _scheduler is not None:
+                _scheduler.add_job(_scheduled_backup, CronTrigger(hour=4, minute=0), id="daily_backup")
         except Exception:
             pass
 # 프로덕션(gunicorn 등) 앱 로드 시 테이블 생성 + 마이그레이션
 with app.app_context():
     # 모든 모델(이벤트 게시판·공유 링크 등) 테이블 자동 생성 — 서버 업로드 시 flask db migrate/upgrade 수동 실행 불필요
     from models import EventBoardPost, ShareLink, EventPointRequest, EventWinnerPost, EventWinnerAttachment  # noqa: F401 - 테이블 생성용 로드
-    db.create_all()
+    # 테이블 생성 + 버전별 컬럼·인덱스 마이그레이션 (schema_migrations.py, 요청 경로에서는 DDL 없음)
+    run_schema_migrations(db)
     try:
         if db.session.get(SignupWelcomeConfig, 1) is None:
             db.session.add(SignupWelcomeConfig(id=1, points_amount=0))
             db.session.commit()
     except Exception:
         db.session.rollback()
-    from sqlalchemy import text
-    try:
-        rp = db.session.execute(text("PRAGMA table_info(settlement)")).fetchall()
-        cols = [row[1] for row in rp] if rp else []
-        if cols and 'settlement_no' not in cols:
-            # 기존 settlement는 구 스키마 → category_settlement로 이름 변경 후 새 settlement 생성
-            try:
-                db.session.execute(text("ALTER TABLE settlement RENAME TO category_settlement"))
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-                try:
-                    db.session.execute(text("DROP TABLE IF EXISTS category_settlement"))
-                    db.session.execute(text("ALTER TABLE settlement RENAME TO category_settlement"))
-                    db.session.commit()
-                except Exception:
-                    db.session.rollback()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text("SELECT 1 FROM settlement LIMIT 1"))
-    except Exception:
-        db.create_all()
-    try:
-        db.session.execute(text('ALTER TABLE "order" ADD COLUMN is_settled INTEGER DEFAULT 0'))
-        db.session.execute(text('ALTER TABLE "order" ADD COLUMN settled_at DATETIME'))
-        db.session.commit()
-    except: pass
-    try:
-        db.session.execute(text('ALTER TABLE "order" ADD COLUMN payment_method VARCHAR(30)'))
-        db.session.commit()
-    except: pass
-    try:
-        db.session.execute(text('ALTER TABLE "order" ADD COLUMN settlement_status VARCHAR(20) DEFAULT \'입금대기\''))
-        db.session.commit()
-    except: pass
-    try:
-        db.session.execute(text('UPDATE "order" SET settlement_status = \'입금대기\' WHERE settlement_status = \'정산대기\''))
-        db.session.execute(text('UPDATE "order" SET settlement_status = \'입금완료\' WHERE settlement_status = \'정산완료\''))
-        db.session.commit()
-    except: pass
-    try:
-        db.session.execute(text('ALTER TABLE order_item ADD COLUMN settlement_status VARCHAR(20) DEFAULT \'입금대기\''))
-        db.session.commit()
-    except: pass
-    try:
-        db.session.execute(text('ALTER TABLE order_item ADD COLUMN settled_at DATETIME'))
-        db.session.commit()
-    except: pass
-    # 회원 등급 컬럼 추가 (기존 DB 호환)
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN member_grade INTEGER DEFAULT 1'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN member_grade_overridden INTEGER DEFAULT 0'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE category ADD COLUMN min_member_grade INTEGER'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    # 카테고리별 배송료 관리 컬럼 (기본값 호환)
-    for col_def in [
-        ('delivery_base_fee', 'INTEGER DEFAULT 1900'),
-        ('delivery_free_over', 'INTEGER'),
-        ('delivery_extra_threshold', 'INTEGER'),
-        ('delivery_extra_fee', 'INTEGER DEFAULT 1900'),
-        ('delivery_fee_per_item', 'INTEGER DEFAULT 0'),
-    ]:
-        try:
-            db.session.execute(text(f'ALTER TABLE category ADD COLUMN {col_def[0]} {col_def[1]}'))
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE category ADD COLUMN biz_online_sales_number VARCHAR(50)'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN points INTEGER DEFAULT 0'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    # 포인트 3종 컬럼 (적립/이벤트/캐시충전, 기존 DB 호환)
-    for col in ('points_accumulated', 'points_event', 'points_cash'):
-        try:
-            db.session.execute(text(f'ALTER TABLE user ADD COLUMN {col} INTEGER DEFAULT 0'))
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-    # point_log 유형 컬럼 (기존 DB 호환)
-    try:
-        db.session.execute(text('ALTER TABLE point_log ADD COLUMN point_type VARCHAR(20) DEFAULT \'accumulated\''))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    # 소셜 로그인 컬럼 (기존 DB 호환)
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN auth_provider VARCHAR(20)'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN auth_provider_id VARCHAR(100)'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN created_at DATETIME'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE "order" ADD COLUMN points_used INTEGER DEFAULT 0'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE point_log ADD COLUMN order_item_id INTEGER'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE point_log ADD COLUMN adjusted_by INTEGER'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    # product 재고 초기화 컬럼 (기존 DB 호환)
-    try:
-        db.session.execute(text('ALTER TABLE product ADD COLUMN reset_time VARCHAR(5)'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE product ADD COLUMN reset_to_quantity INTEGER'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE product ADD COLUMN last_reset_at DATETIME'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    try:
-        db.session.execute(text('ALTER TABLE product ADD COLUMN display_start_at DATETIME'))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-    # 게시판 공지 컬럼 (전체보기 시 상단 노출용)
-    for tbl, col in [('restaurant_request', 'is_notice'), ('delivery_request', 'is_notice'), ('partnership_inquiry', 'is_notice'), ('free_board', 'is_notice'), ('event_board_post', 'is_notice')]:
-        try:
-            db.session.execute(text(f'ALTER TABLE {tbl} ADD COLUMN {col} INTEGER DEFAULT 0'))
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
     # Render 등 gunicorn 기동 시: DB 삭제 후 재시작이면 관리자·카테고리가 없을 수 있음 → 빈 DB일 때 초기화 자동 실행
     try:
         if not User.query.filter_by(email="admin@uncle.com").first() and not Category.query.first():
@@ -25413,6 +25520,9 @@ with app.app_context():
         except Exception:
             pass
 
+# 재고 초기화 등 스케줄 작업 (gunicorn 워커별 기동, 실제 실행은 잠금으로 1곳만)
+start_background_scheduler()
+
 # init_db()와 app.run()은 아래 if __name__ == "__main__" 블록에서만 실행 (import 시 서버 미기동)
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+# --------------------------------------------------------------------------------
+# 콘텐츠 주소 기반 이미지 저장소 (배송완료 증빙 사진)
+# - 서버에서 한 번만 디코딩 → 긴 변 축소·JPEG 재압축 + 썸네일 생성 → sha256을 키로 저장
+# - 같은 사진을 다시 올려도 같은 키 → 이미 있으면 업로드 생략 (재시도·중복 전송 안전)
+# - CLOUDINARY_URL 설정 시 Cloudinary(public_id = 해시), 아니면 static/uploads 로컬 디스크
+# - DB(delivery_task)에는 URL·해시·썸네일 URL만 저장하고 base64 원본은 남기지 않음
+# --------------------------------------------------------------------------------
+import os
+import base64
+import hashlib
+import traceback
+from io import BytesIO
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+PHOTO_MAX_BYTES = 10 * 1024 * 1024                                   # 디코딩된 원본 상한
+PHOTO_MAX_EDGE = int(os.getenv("DELIVERY_PHOTO_MAX_EDGE", "1600"))   # 긴 변(px)
+PHOTO_QUALITY = int(os.getenv("DELIVERY_PHOTO_QUALITY", "80"))
+THUMB_MAX_EDGE = int(os.getenv("DELIVERY_PHOTO_THUMB_EDGE", "320"))
+THUMB_QUALITY = 70
+
+DELIVERY_PROOF_FOLDER = "delivery_proof"
+
+
+def decode_data_url(data_url_or_base64):
+    """data:image/...;base64,xxx 또는 순수 base64 → bytes. 형식 오류·용량 초과면 None."""
+    if not data_url_or_base64 or not isinstance(data_url_or_base64, str):
+        return None
+    s = data_url_or_base64.strip()
+    if s.startswith('data:'):
+        idx = s.find(',')
+        if idx == -1:
+            return None
+        s = s[idx + 1:]
+    if len(s) > PHOTO_MAX_BYTES * 4 // 3 + 4:
+        return None
+    try:
+        raw = base64.b64decode(s, validate=True)
+    except Exception:
+        return None
+    return raw if raw and len(raw) <= PHOTO_MAX_BYTES else None
+
+
+def _encode_jpeg(img, max_edge, quality):
+    img = img.copy()
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def normalize_photo(raw):
+    """원본 bytes → (본문 JPEG, 썸네일 JPEG). EXIF 회전 반영, 메타데이터 제거. 이미지가 아니면 ValueError."""
+    try:
+        img = Image.open(BytesIO(raw))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    except Exception as e:
+        raise ValueError(f"이미지 디코딩 실패: {e}")
+    return _encode_jpeg(img, PHOTO_MAX_EDGE, PHOTO_QUALITY), _encode_jpeg(img, THUMB_MAX_EDGE, THUMB_QUALITY)
+
+
+class LocalBlobStore:
+    """static/uploads/<folder>/<해시 앞 2자리>/<해시>.jpg 에 저장 (임시 파일 → rename 으로 원자적 기록)."""
+
+    def __init__(self, root_dir, url_prefix="/static/uploads"):
+        self.root_dir = root_dir
+        self.url_prefix = url_prefix.rstrip('/')
+
+    def put(self, folder, name, data):
+        rel = f"{folder}/{name[:2]}/{name}.jpg"
+        path = os.path.join(self.root_dir, *rel.split('/'))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return f"{self.url_prefix}/{rel}"
+
+
+class CloudinaryBlobStore:
+    """public_id = basket-uncle/<folder>/<해시>, overwrite=False → 같은 내용은 한 번만 저장."""
+
+    def __init__(self, base_folder="basket-uncle"):
+        self.base_folder = base_folder
+
+    def put(self, folder, name, data):
+        import cloudinary.uploader
+        res = cloudinary.uploader.upload(
+            BytesIO(data),
+            public_id=f"{self.base_folder}/{folder}/{name}",
+            overwrite=False,
+            resource_type="image",
+        )
+        url = res.get("secure_url") or res.get("url")
+        if not url:
+            raise RuntimeError(f"Cloudinary 응답에 URL 없음: {res}")
+        return url
+
+
+def get_blob_store():
+    if os.getenv("CLOUDINARY_URL", "").strip():
+        return CloudinaryBlobStore()
+    return _local_store()
+
+
+def _local_store():
+    return LocalBlobStore(current_app.config.get('UPLOAD_FOLDER') or os.path.join(current_app.root_path, "static", "uploads"))
+
+
+def store_photo(raw, folder=DELIVERY_PROOF_FOLDER):
+    """원본 bytes → {'url', 'hash', 'thumb_url'}. 이미지가 아니거나 저장 실패 시 None.
+    Cloudinary 업로드가 실패하면 로컬 디스크로 폴백."""
+    if not raw or len(raw) > PHOTO_MAX_BYTES:
+        return None
+    try:
+        body, thumb = normalize_photo(raw)
+    except ValueError as e:
+        print(f"[blob_store] {e}", flush=True)
+        return None
+    digest = hashlib.sha256(body).hexdigest()
+    stores = [get_blob_store()]
+    if not isinstance(stores[0], LocalBlobStore):
+        stores.append(_local_store())
+    for store in stores:
+        try:
+            return {
+                'url': store.put(folder, digest, body),
+                'hash': digest,
+                'thumb_url': store.put(folder, f"{digest}_t", thumb),
+            }
+        except Exception:
+            traceback.print_exc()
+    return None
+
+
+def store_photo_data_url(data_url_or_base64, folder=DELIVERY_PROOF_FOLDER):
+    """기사 앱 data URL(base64) → store_photo 결과 또는 None."""
+    raw = decode_data_url(data_url_or_base64)
+    return store_photo(raw, folder) if raw else None
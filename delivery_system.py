@@ -1,6 +1,5 @@
 import os
 import sqlite3
-import requests
 import json
 import time
 import hmac
@@ -8,9 +7,13 @@ import hashlib
 import re
 import uuid
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template_string, request, redirect, jsonify, flash, url_for, session
+from flask import Blueprint, request, redirect, jsonify, flash, url_for, session
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text, UniqueConstraint
+from sqlalchemy import text, func, case, UniqueConstraint, Index
+from sqlalchemy.orm import column_property, deferred
+from template_cache import render_template_string
+from domain_events import publish as publish_event, DELIVERY_PICKED_UP, DELIVERY_COMPLETED
+from blob_store import store_photo_data_url
 
 # [핵심] Blueprint 정의 (이름: logi, 주소 접두어: /logi)
 # 이 설정으로 인해 이제 모든 주소는 basam.co.kr/logi/... 가 됩니다.
@@ -74,21 +77,40 @@ class DeliveryTask(db_delivery.Model):
     customer_name = db_delivery.Column(db_delivery.String(50))
     phone = db_delivery.Column(db_delivery.String(20))
     address = db_delivery.Column(db_delivery.String(500))
-    category = db_delivery.Column(db_delivery.String(100)) 
+    category = db_delivery.Column(db_delivery.String(100), index=True)
     memo = db_delivery.Column(db_delivery.String(500))
     product_details = db_delivery.Column(db_delivery.Text)
     driver_id = db_delivery.Column(db_delivery.Integer, nullable=True)
     driver_name = db_delivery.Column(db_delivery.String(50), default="미배정")
     status = db_delivery.Column(db_delivery.String(20), default="대기")
-    photo_data = db_delivery.Column(db_delivery.Text, nullable=True) 
+    # 예전 base64 사진 원본 (scripts/migrate_delivery_photos.py 로 이전 후 NULL). 목록 조회 시 로드하지 않음
+    photo_data = deferred(db_delivery.Column(db_delivery.Text, nullable=True))
+    # 배송완료 사진: 저장소(blob_store) URL·내용 해시(sha256)·썸네일 URL
+    photo_url = db_delivery.Column(db_delivery.String(500), nullable=True)
+    photo_hash = db_delivery.Column(db_delivery.String(64), nullable=True)
+    photo_thumb_url = db_delivery.Column(db_delivery.String(500), nullable=True)
     pickup_at = db_delivery.Column(db_delivery.DateTime, nullable=True)
-    completed_at = db_delivery.Column(db_delivery.DateTime, nullable=True)
+    completed_at = db_delivery.Column(db_delivery.DateTime, nullable=True, index=True)
     # 기사 정산 상태
     driver_pay_status = db_delivery.Column(db_delivery.String(20), default="미지급")  # 미지급 / 지급완료
     driver_pay_date = db_delivery.Column(db_delivery.DateTime, nullable=True)
     # 오더별 배송료(기사 지급액). NULL이면 전역 단가(DriverConfig.unit_fee) 사용
     driver_fee = db_delivery.Column(db_delivery.Integer, nullable=True)
-    __table_args__ = (UniqueConstraint('order_id', 'category', name='_order_cat_v12_uc_bp'),)
+    __table_args__ = (
+        UniqueConstraint('order_id', 'category', name='_order_cat_v12_uc_bp'),
+        Index('ix_delivery_task_status_driver', 'status', 'driver_id'),
+        Index('ix_delivery_task_status_completed', 'status', 'completed_at', 'driver_id'),
+    )
+
+# 이전 전 base64 사진 유무 (photo_data IS NOT NULL) — 목록의 '사진보기' 표시용, 원본은 로드하지 않음
+DeliveryTask.has_legacy_photo = column_property(DeliveryTask.__table__.c.photo_data.isnot(None))
+
+class DeliveryTaskItem(db_delivery.Model):
+    """작업별 품목·수량. 입고(logi_sync) 시 product_details를 한 번만 파싱해 저장 → 관제 화면 품목 합계는 SQL SUM."""
+    id = db_delivery.Column(db_delivery.Integer, primary_key=True)
+    task_id = db_delivery.Column(db_delivery.Integer, nullable=False, index=True)
+    item_name = db_delivery.Column(db_delivery.String(200))
+    qty = db_delivery.Column(db_delivery.Integer, default=0)
 
 class DeliveryLog(db_delivery.Model):
     id = db_delivery.Column(db_delivery.Integer, primary_key=True)
@@ -98,6 +120,12 @@ class DeliveryLog(db_delivery.Model):
     message = db_delivery.Column(db_delivery.String(500))
     created_at = db_delivery.Column(db_delivery.DateTime, default=get_kst)
 
+class LogiSyncState(db_delivery.Model):
+    """신규 주문 가져오기(logi_sync) 하이워터마크 (전역 1레코드). 마지막으로 처리한 주문의 status_changed_at."""
+    id = db_delivery.Column(db_delivery.Integer, primary_key=True)
+    last_status_changed_at = db_delivery.Column(db_delivery.DateTime, nullable=True)
+    synced_at = db_delivery.Column(db_delivery.DateTime, nullable=True)
+
 # --------------------------------------------------------------------------------
 # 4. 유틸리티 함수 (함수명 겹침 방지 접두어 사용)
 # --------------------------------------------------------------------------------
@@ -131,15 +159,10 @@ def logi_set_driver_unit_fee(amount: int):
     db_delivery.session.commit()
 
 
-def logi_calc_driver_payouts(start_dt=None, end_dt=None, driver_id=None, pay_status=None, item_keyword=None):
-    """기사별 배송완료 건수 및 예상 지급액 계산 (DB 기록 변경 없음, 조회용 로직).
-
-    - pay_status: None/''=전체, '미지급', '지급완료'
-    - item_keyword: 상품명/카테고리 텍스트 부분검색 (product_details 기준)
-    """
-    _logi_ensure_driver_pay_columns()
-    _logi_ensure_driver_fee_column()
-    q = DeliveryTask.query.filter(DeliveryTask.status == '완료')
+def _logi_payout_filter(q, start_dt=None, end_dt=None, driver_id=None, pay_status=None, item_keyword=None):
+    """기사 지급 화면·API 공통 조건 (배송완료 + 기간/기사/지급상태/품목 키워드).
+    키워드 부분검색은 PostgreSQL에서 pg_trgm GIN 인덱스(마이그레이션 v7)가 받쳐 줌, SQLite는 LIKE 스캔."""
+    q = q.filter(DeliveryTask.status == '완료')
     if start_dt:
         q = q.filter(DeliveryTask.completed_at >= start_dt)
     if end_dt:
@@ -148,44 +171,44 @@ def logi_calc_driver_payouts(start_dt=None, end_dt=None, driver_id=None, pay_sta
         q = q.filter(DeliveryTask.driver_id == driver_id)
     if pay_status in ('미지급', '지급완료'):
         q = q.filter(DeliveryTask.driver_pay_status == pay_status)
-    if item_keyword:
-        kw = f"%{item_keyword.strip()}%"
-        q = q.filter(DeliveryTask.product_details.ilike(kw))
+    kw = (item_keyword or '').strip()
+    if kw:
+        kw = kw.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        q = q.filter(DeliveryTask.product_details.ilike(f"%{kw}%", escape='\\'))
+    return q
 
-    unit_fee = logi_get_driver_unit_fee()
-    stats = {}
-    for t in q.all():
-        if not t.driver_id:
-            continue
-        key = (t.driver_id, t.driver_name)
-        if key not in stats:
-            stats[key] = {
-                "driver_id": t.driver_id,
-                "driver_name": t.driver_name or "",
-                "completed_count": 0,
-            }
-        stats[key]["completed_count"] += 1
-
-    # 지급액 계산: 오더별 driver_fee가 있으면 해당 금액, 없으면 건당 unit_fee
-    for t in q.all():
-        if not t.driver_id:
-            continue
-        key = (t.driver_id, t.driver_name)
-        fee = getattr(t, 'driver_fee', None)
-        if fee is not None and fee >= 0:
-            amount = fee
-        else:
-            amount = unit_fee
-        stats[key]["payout_amount"] = stats[key].get("payout_amount", 0) + amount
 
-    # 총합계
-    total_completed = sum(v["completed_count"] for v in stats.values())
-    total_payout = sum(v["payout_amount"] for v in stats.values())
+def logi_calc_driver_payouts(start_dt=None, end_dt=None, driver_id=None, pay_status=None, item_keyword=None):
+    """기사별 배송완료 건수 및 예상 지급액 계산 (DB 기록 변경 없음, 조회용 로직).
+
+    - pay_status: None/''=전체, '미지급', '지급완료'
+    - item_keyword: 상품명/카테고리 텍스트 부분검색 (product_details 기준)
+    - 지급액: 오더별 driver_fee(0 이상)가 있으면 해당 금액, 없으면 건당 unit_fee
+    DB에서 driver_id 기준 GROUP BY 한 번으로 건수·합계를 구함 (작업 행을 메모리로 읽지 않음).
+    """
+    unit_fee = logi_get_driver_unit_fee()
+    fee = case((DeliveryTask.driver_fee >= 0, DeliveryTask.driver_fee), else_=unit_fee)
+    q = db_delivery.session.query(
+        DeliveryTask.driver_id,
+        func.max(DeliveryTask.driver_name),
+        func.count(DeliveryTask.id),
+        func.coalesce(func.sum(fee), 0),
+    ).filter(DeliveryTask.driver_id.isnot(None))
+    q = _logi_payout_filter(q, start_dt, end_dt, driver_id, pay_status, item_keyword)
+    rows = q.group_by(DeliveryTask.driver_id).all()
+
+    drivers = [{
+        "driver_id": d_id,
+        "driver_name": d_name or "",
+        "completed_count": int(cnt or 0),
+        "payout_amount": int(amount or 0),
+    } for d_id, d_name, cnt, amount in rows]
+    drivers.sort(key=lambda d: (d["driver_name"], d["driver_id"]))
 
     return {
-        "drivers": list(stats.values()),
-        "total_completed": total_completed,
-        "total_payout": total_payout,
+        "drivers": drivers,
+        "total_completed": sum(d["completed_count"] for d in drivers),
+        "total_payout": sum(d["payout_amount"] for d in drivers),
         "unit_fee": unit_fee,
     }
 
@@ -193,16 +216,23 @@ def logi_extract_qty(text_data):
     match = re.search(r'\((\d+)\)', text_data)
     return int(match.group(1)) if match else 0
 
+def logi_parse_items(product_details):
+    """'[카테고리] 상품A(2), 상품B(1)' → [('상품A', 2), ('상품B', 1)]"""
+    items = re.findall(r'\]\s*(.*?)\((\d+)\)', product_details or '')
+    if not items: items = re.findall(r'(.*?)\((\d+)\)', product_details or '')
+    return [(name.strip(), int(qty)) for name, qty in items]
+
 def logi_get_item_summary(tasks):
     summary = {}
     for t in tasks:
-        items = re.findall(r'\]\s*(.*?)\((\d+)\)', t.product_details)
-        if not items: items = re.findall(r'(.*?)\((\d+)\)', t.product_details)
-        for name, qty in items:
-            name = name.strip()
-            summary[name] = summary.get(name, 0) + int(qty)
+        for name, qty in logi_parse_items(t.product_details):
+            summary[name] = summary.get(name, 0) + qty
     return summary
 
+def logi_task_item_rows(task_id, product_details):
+    """DeliveryTaskItem executemany INSERT용 dict 목록."""
+    return [dict(task_id=task_id, item_name=name[:200], qty=qty) for name, qty in logi_parse_items(product_details)]
+
 def logi_get_main_db_path():
     # app.py와 같은 레벨의 instance 폴더 내 DB 경로를 정확히 반환 (SQLite 전용)
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'direct_trade_mall.db')
@@ -218,40 +248,55 @@ def _logi_using_postgres():
         return False
 
 
-def _logi_ensure_driver_pay_columns():
-    """delivery_task 테이블에 driver_pay_status / driver_pay_date 컬럼이 없으면 자동 추가."""
-    try:
-        # SQLite든 Postgres든 이미 있으면 에러가 나므로, 실패해도 그냥 무시
-        try:
-            db_delivery.session.execute(text(
-                "ALTER TABLE delivery_task ADD COLUMN driver_pay_status VARCHAR(20) DEFAULT '미지급'"
-            ))
-            db_delivery.session.commit()
-        except Exception:
-            db_delivery.session.rollback()
-        try:
-            db_delivery.session.execute(text(
-                "ALTER TABLE delivery_task ADD COLUMN driver_pay_date TIMESTAMP NULL"
-            ))
-            db_delivery.session.commit()
-        except Exception:
-            db_delivery.session.rollback()
-    except Exception:
-        pass
+# 관제 화면 카테고리 드롭다운 (SELECT DISTINCT 결과를 잠시 보관, 신규 입고 시 비움)
+LOGI_CATEGORY_CACHE_SECONDS = int(os.getenv("LOGI_CATEGORY_CACHE_SECONDS", "300"))
+_logi_category_cache = {'at': 0.0, 'cats': None}
 
 
-def _logi_ensure_driver_fee_column():
-    """delivery_task 테이블에 driver_fee(오더별 배송료) 컬럼이 없으면 자동 추가."""
-    try:
-        try:
-            db_delivery.session.execute(text(
-                "ALTER TABLE delivery_task ADD COLUMN driver_fee INTEGER NULL"
-            ))
-            db_delivery.session.commit()
-        except Exception:
-            db_delivery.session.rollback()
-    except Exception:
-        pass
+def logi_saved_categories():
+    cached = _logi_category_cache['cats']
+    if cached is not None and time.monotonic() - _logi_category_cache['at'] < LOGI_CATEGORY_CACHE_SECONDS:
+        return cached
+    cats = [c for (c,) in db_delivery.session.query(DeliveryTask.category)
+            .filter(DeliveryTask.category.isnot(None), DeliveryTask.category != '')
+            .distinct().order_by(DeliveryTask.category).all()]
+    _logi_category_cache.update(at=time.monotonic(), cats=cats)
+    return cats
+
+
+def logi_invalidate_categories():
+    _logi_category_cache['cats'] = None
+
+
+def logi_migrate_photo_blobs(batch_size=20):
+    """예전 delivery_task.photo_data(base64) → blob_store 이전 (1회성, scripts/migrate_delivery_photos.py).
+    한 번에 한 행의 원본만 로드하고, 배치마다 커밋. 이전한 행은 photo_data = NULL. 반환: (이전 건수, 실패 건수)"""
+    moved = failed = 0
+    last_id = 0
+    while True:
+        ids = [r[0] for r in db_delivery.session.query(DeliveryTask.id)
+               .filter(DeliveryTask.id > last_id, DeliveryTask.photo_data.isnot(None))
+               .order_by(DeliveryTask.id).limit(batch_size).all()]
+        if not ids:
+            break
+        last_id = ids[-1]
+        for tid in ids:
+            data = (db_delivery.session.query(DeliveryTask.photo_data).filter(DeliveryTask.id == tid).scalar() or '').strip()
+            if data.startswith(('http://', 'https://', '/static/')):
+                values = {'photo_url': data[:500]}
+            else:
+                stored = store_photo_data_url(data)
+                if not stored:
+                    failed += 1
+                    print(f"[LOGI] task #{tid} 사진 이전 실패 (photo_data 유지)", flush=True)
+                    continue
+                values = {'photo_url': stored['url'], 'photo_hash': stored['hash'], 'photo_thumb_url': stored['thumb_url']}
+            values['photo_data'] = None
+            DeliveryTask.query.filter(DeliveryTask.id == tid).update(values, synchronize_session=False)
+            moved += 1
+        db_delivery.session.commit()
+        print(f"[LOGI] 배송 사진 이전: {moved}건 완료, {failed}건 실패 (~task #{last_id})", flush=True)
+    return moved, failed
 
 # --------------------------------------------------------------------------------
 # 5. 관리자 보안 라우트 (로그인/로그아웃)
@@ -305,29 +350,39 @@ def logi_admin_logout():
 # 6. 관리자 메인 대시보드 (복구된 모든 필터링 및 숫자 현황판)
 # --------------------------------------------------------------------------------
 
+LOGI_DASHBOARD_PAGE_SIZE = int(os.getenv("LOGI_DASHBOARD_PAGE_SIZE", "200"))
+
+
 @logi_bp.route('/')
 def logi_admin_dashboard():
     if not session.get('admin_logged_in'):
         return redirect(url_for('logi.logi_admin_login'))
 
-    # 새로 추가된 기사 정산 컬럼이 없을 수 있으므로, 대시보드 진입 시 한 번 보정
-    _logi_ensure_driver_pay_columns()
-    _logi_ensure_driver_fee_column()
-    
     st_filter = request.args.get('status', 'all')
     cat_filter = request.args.get('category', '전체')
     q = request.args.get('q', '')
-
-    query = DeliveryTask.query
-    if st_filter == '미배정': query = query.filter(DeliveryTask.status == '대기', DeliveryTask.driver_id == None)
-    elif st_filter == '배정완료': query = query.filter(DeliveryTask.status == '배정완료')
-    elif st_filter != 'all': query = query.filter_by(status=st_filter)
-    
-    if cat_filter != '전체': query = query.filter_by(category=cat_filter)
-    if q: query = query.filter((DeliveryTask.address.contains(q)) | (DeliveryTask.customer_name.contains(q)))
-    
-    tasks = query.all()
-    tasks.sort(key=lambda x: (x.address or "", logi_extract_qty(x.product_details)), reverse=True)
+    after_id = request.args.get('after', type=int)
+
+    def _apply_filters(query):
+        if st_filter == '미배정': query = query.filter(DeliveryTask.status == '대기', DeliveryTask.driver_id == None)
+        elif st_filter == '배정완료': query = query.filter(DeliveryTask.status == '배정완료')
+        elif st_filter != 'all': query = query.filter(DeliveryTask.status == st_filter)
+        if cat_filter != '전체': query = query.filter(DeliveryTask.category == cat_filter)
+        if q: query = query.filter((DeliveryTask.address.contains(q)) | (DeliveryTask.customer_name.contains(q)))
+        return query
+
+    # 작업 목록: (주소, id) 내림차순 키셋 페이지네이션 — after=이전 페이지 마지막 작업 id
+    addr_key = func.coalesce(DeliveryTask.address, '')
+    query = _apply_filters(DeliveryTask.query)
+    if after_id:
+        after_addr = db_delivery.session.query(addr_key).filter(DeliveryTask.id == after_id).scalar()
+        if after_addr is not None:
+            query = query.filter((addr_key < after_addr) | ((addr_key == after_addr) & (DeliveryTask.id < after_id)))
+    tasks = query.order_by(addr_key.desc(), DeliveryTask.id.desc()).limit(LOGI_DASHBOARD_PAGE_SIZE + 1).all()
+    next_after = None
+    if len(tasks) > LOGI_DASHBOARD_PAGE_SIZE:
+        tasks = tasks[:LOGI_DASHBOARD_PAGE_SIZE]
+        next_after = tasks[-1].id
 
     # 현황판 수치 계산
     pending_sync_count = 0
@@ -344,14 +399,32 @@ def logi_admin_dashboard():
     except Exception:
         pass
 
-    unassigned_count = DeliveryTask.query.filter(DeliveryTask.status == '대기', DeliveryTask.driver_id == None).count()
-    assigned_count = DeliveryTask.query.filter_by(status='배정완료').count()
-    picking_count = DeliveryTask.query.filter_by(status='픽업').count()
-    complete_today = DeliveryTask.query.filter_by(status='완료').filter(DeliveryTask.completed_at >= get_kst().replace(hour=0,minute=0,second=0)).count()
+    # 상태·기사배정 여부별 건수를 GROUP BY 1회로
+    today_start = get_kst().replace(hour=0, minute=0, second=0, microsecond=0)
+    unassigned_count = assigned_count = picking_count = complete_today = 0
+    no_driver = DeliveryTask.driver_id.is_(None)
+    for status, is_unassigned, cnt, done_today in (
+        db_delivery.session.query(DeliveryTask.status, no_driver, func.count(DeliveryTask.id),
+                                  func.sum(case((DeliveryTask.completed_at >= today_start, 1), else_=0)))
+        .group_by(DeliveryTask.status, no_driver).all()
+    ):
+        if status == '대기' and is_unassigned: unassigned_count += cnt
+        elif status == '배정완료': assigned_count += cnt
+        elif status == '픽업': picking_count += cnt
+        elif status == '완료': complete_today += int(done_today or 0)
+
+    # 카테고리별 품목 합계: 필터 조건 전체(페이지 무관)를 DeliveryTaskItem SUM으로
+    item_sum_grouped = {}
+    for cat, name, qty in (
+        _apply_filters(db_delivery.session.query(DeliveryTask.category, DeliveryTaskItem.item_name, func.sum(DeliveryTaskItem.qty))
+                       .join(DeliveryTask, DeliveryTask.id == DeliveryTaskItem.task_id))
+        .group_by(DeliveryTask.category, DeliveryTaskItem.item_name)
+        .order_by(DeliveryTask.category, DeliveryTaskItem.item_name).all()
+    ):
+        item_sum_grouped.setdefault(cat or "기타", {})[name] = int(qty or 0)
 
-    item_sum = logi_get_item_summary(tasks)
     drivers = Driver.query.all()
-    saved_cats = sorted(list(set([t.category for t in DeliveryTask.query.all() if t.category])))
+    saved_cats = logi_saved_categories()
 
     html = """
     <!DOCTYPE html>
@@ -533,7 +606,7 @@ def logi_admin_dashboard():
                                     <button type="button" onclick="viewTaskLog('{{t.id}}')" class="text-[9px] text-blue-500 font-black flex items-center gap-0.5 min-h-[32px] touch-manipulation">
                                         <i class="fas fa-history"></i> Log보기
                                     </button>
-                                    {% if t.photo_data %}
+                                    {% if t.photo_url or t.has_legacy_photo %}
                                     <button type="button" onclick="viewPhoto('{{t.id}}')" class="text-[9px] text-green-600 font-black flex items-center gap-0.5 min-h-[32px] touch-manipulation">
                                         <i class="fas fa-camera"></i> 사진보기
                                     </button>
@@ -559,6 +632,12 @@ def logi_admin_dashboard():
                     </tbody>
                 </table>
             </div>
+            {% if after_id or next_after %}
+            <div class="flex justify-center gap-3 -mt-8 mb-12 text-[11px] font-black">
+                {% if after_id %}<a href="{{ url_for('logi.logi_admin_dashboard', status=current_status, category=current_cat, q=current_q or None) }}" class="px-4 py-2 rounded-xl bg-white border border-slate-200 text-slate-500 min-h-[44px] flex items-center touch-manipulation">처음으로</a>{% endif %}
+                {% if next_after %}<a href="{{ url_for('logi.logi_admin_dashboard', status=current_status, category=current_cat, q=current_q or None, after=next_after) }}" class="px-4 py-2 rounded-xl bg-slate-800 text-white min-h-[44px] flex items-center touch-manipulation">다음 {{ page_size }}건 <i class="fas fa-chevron-right ml-1"></i></a>{% endif %}
+            </div>
+            {% endif %}
         </main>
 
         <script>
@@ -725,17 +804,6 @@ def logi_admin_dashboard():
     </html>
     """
 
-    # [핵심] 카테고리별 요약을 위해 데이터 가공 추가
-    item_sum_grouped = {}
-    for t in tasks:
-        cat = t.category or "기타"
-        if cat not in item_sum_grouped: item_sum_grouped[cat] = {}
-        items = re.findall(r'\]\s*(.*?)\((\d+)\)', t.product_details)
-        if not items: items = re.findall(r'(.*?)\((\d+)\)', t.product_details)
-        for name, qty in items:
-            name = name.strip()
-            item_sum_grouped[cat][name] = item_sum_grouped[cat].get(name, 0) + int(qty)
-
    # 함수 내에서 정의된 모든 변수(tasks, item_sum_grouped 등)가 자동으로 전달됩니다.
     return render_template_string(html, 
                             tasks=tasks,
@@ -748,7 +816,11 @@ def logi_admin_dashboard():
                             saved_cats=saved_cats,
                             item_sum_grouped=item_sum_grouped,
                             current_status=st_filter, 
-                            current_cat=cat_filter)
+                            current_cat=cat_filter,
+                            current_q=q,
+                            after_id=after_id,
+                            next_after=next_after,
+                            page_size=LOGI_DASHBOARD_PAGE_SIZE)
 
 # --------------------------------------------------------------------------------
 # 7. 기사용 업무 페이지 (보안 강화 및 PC 자동인증 로직 100% 복구)
@@ -1224,7 +1296,9 @@ def logi_driver_work():
 @logi_bp.route('/api/photo/<int:tid>')
 def logi_get_photo(tid):
     task = DeliveryTask.query.get(tid)
-    if task and task.photo_data:
+    if task and task.photo_url:
+        return jsonify({"success": True, "photo": task.photo_url, "thumb": task.photo_thumb_url})
+    if task and task.photo_data:  # 이전 전(migrate_delivery_photos 미실행) 데이터
         return jsonify({"success": True, "photo": task.photo_data})
     return jsonify({"success": False, "error": "사진이 없습니다."})
 @logi_bp.route('/api/logs/<int:tid>')
@@ -1322,56 +1396,85 @@ def logi_driver_fee_update():
                             pay_status=request.args.get('pay_status',''),
                             q=request.args.get('q','')))
 
+# 하이워터마크 이전 일정 시간도 다시 조회 (동기화 도중 커밋된 주문 누락 방지, 중복은 (주문, 카테고리) 키로 걸러짐)
+LOGI_SYNC_OVERLAP_SECONDS = int(os.getenv("LOGI_SYNC_OVERLAP_SECONDS", "300"))
+
+
 @logi_bp.route('/sync')
 def logi_sync():
+    """배송요청 주문 → DeliveryTask 입고, 결제취소 주문 → 작업 취소 반영.
+    지난 동기화 이후 상태가 바뀐 주문만 조회하고, 기존 (주문, 카테고리) 키는 한 번에 조회, 신규 작업·로그는 한 트랜잭션으로 저장."""
     try:
-        if _logi_using_postgres():
-            rows = db_delivery.session.execute(text(
-                "SELECT order_id, customer_name, customer_phone, delivery_address, request_memo, product_details FROM \"order\" WHERE status = '배송요청'"
-            )).fetchall()
-            count = 0
-            canceled = db_delivery.session.execute(text("SELECT order_id FROM \"order\" WHERE status = '결제취소'")).fetchall()
-            canceled_ids = [r[0] for r in canceled]
-            if canceled_ids:
-                DeliveryTask.query.filter(DeliveryTask.order_id.in_(canceled_ids)).update({DeliveryTask.status: "결제취소"}, synchronize_session=False)
-            for row in rows:
-                order_id, customer_name, customer_phone, delivery_address, request_memo, product_details_val = row[0], row[1], row[2], row[3], row[4], row[5]
-                for block in (product_details_val or "").split(" | "):
-                    match = re.search(r"\[(.*?)\]", block)
-                    if match:
-                        cat = match.group(1).strip()
-                        exists = DeliveryTask.query.filter_by(order_id=order_id, category=cat).first()
-                        if not exists:
-                            nt = DeliveryTask(order_id=order_id, customer_name=customer_name or "", phone=customer_phone or "", address=delivery_address or "", memo=request_memo or "", category=cat, product_details=block.strip(), status="대기")
-                            db_delivery.session.add(nt)
-                            db_delivery.session.commit()
-                            logi_add_log(nt.id, nt.order_id, "입고", "배송시스템에 신규 주문 입고됨")
-                            count += 1
-            db_delivery.session.commit()
-            return jsonify({"success": True, "synced_count": count})
-        path = logi_get_main_db_path()
-        conn = sqlite3.connect(path); conn.row_factory = sqlite3.Row; cursor = conn.cursor()
+        state = LogiSyncState.query.get(1)
+        if not state:
+            state = LogiSyncState(id=1)
+            db_delivery.session.add(state)
+        sql = ('SELECT order_id, status, customer_name, customer_phone, delivery_address, request_memo, product_details, status_changed_at '
+               'FROM "order" WHERE status IN (\'배송요청\', \'결제취소\')')
+        params = {}
+        if state.last_status_changed_at:
+            sql += " AND status_changed_at >= :since"
+            params['since'] = state.last_status_changed_at - timedelta(seconds=LOGI_SYNC_OVERLAP_SECONDS)
+        rows = db_delivery.session.execute(text(sql), params).fetchall()
+
         # [복구] 결제취소 상태 동기화
-        cursor.execute("SELECT order_id FROM \"order\" WHERE status = '결제취소'")
-        canceled_ids = [r['order_id'] for r in cursor.fetchall()]
-        if canceled_ids: DeliveryTask.query.filter(DeliveryTask.order_id.in_(canceled_ids)).update({DeliveryTask.status: '결제취소'}, synchronize_session=False)
-        
-        # [복구] 배송요청 신규 입고
-        cursor.execute("SELECT * FROM \"order\" WHERE status = '배송요청'")
-        count = 0
-        for row in cursor.fetchall():
-            for block in row['product_details'].split(' | '):
+        canceled_ids = [r.order_id for r in rows if r.status == '결제취소']
+        if canceled_ids:
+            DeliveryTask.query.filter(DeliveryTask.order_id.in_(canceled_ids)).update({DeliveryTask.status: '결제취소'}, synchronize_session=False)
+
+        # [복구] 배송요청 신규 입고: 주문 상세의 [카테고리] 블록마다 작업 1건
+        candidates = []
+        for r in rows:
+            if r.status != '배송요청':
+                continue
+            for block in (r.product_details or '').split(' | '):
                 match = re.search(r'\[(.*?)\]', block)
                 if match:
-                    cat = match.group(1).strip()
-                    exists = DeliveryTask.query.filter_by(order_id=row['order_id'], category=cat).first()
-                    if not exists:
-                        nt = DeliveryTask(order_id=row['order_id'], customer_name=row['customer_name'], phone=row['customer_phone'], address=row['delivery_address'], memo=row['request_memo'], category=cat, product_details=block.strip(), status='대기')
-                        db_delivery.session.add(nt); db_delivery.session.commit()
-                        logi_add_log(nt.id, nt.order_id, '입고', '배송시스템에 신규 주문 입고됨')
-                        count += 1
-        db_delivery.session.commit(); conn.close(); return jsonify({"success": True, "synced_count": count})
-    except Exception as e: return jsonify({"success": False, "error": str(e)})
+                    candidates.append((r, match.group(1).strip(), block.strip()))
+        order_ids = list({r.order_id for r, _, _ in candidates})
+        existing = set()
+        for i in range(0, len(order_ids), 500):
+            existing.update(
+                (oid, cat) for oid, cat in db_delivery.session.query(DeliveryTask.order_id, DeliveryTask.category)
+                .filter(DeliveryTask.order_id.in_(order_ids[i:i + 500])).all()
+            )
+        new_tasks = []
+        for r, cat, block in candidates:
+            if (r.order_id, cat) in existing:
+                continue
+            existing.add((r.order_id, cat))
+            new_tasks.append(dict(order_id=r.order_id, customer_name=r.customer_name or "", phone=r.customer_phone or "", address=r.delivery_address or "", memo=r.request_memo or "", category=cat, product_details=block, status='대기'))
+        if new_tasks:
+            # executemany INSERT 1회 → 생성된 id는 (주문, 카테고리) 키로 다시 조회해 로그에 연결
+            db_delivery.session.execute(DeliveryTask.__table__.insert(), new_tasks)
+            new_keys = {(t['order_id'], t['category']): t['product_details'] for t in new_tasks}
+            new_order_ids = list({t['order_id'] for t in new_tasks})
+            now = get_kst()
+            logs, items = [], []
+            for i in range(0, len(new_order_ids), 500):
+                for tid, oid, cat in (db_delivery.session.query(DeliveryTask.id, DeliveryTask.order_id, DeliveryTask.category)
+                                      .filter(DeliveryTask.order_id.in_(new_order_ids[i:i + 500])).all()):
+                    if (oid, cat) in new_keys:
+                        logs.append(dict(task_id=tid, order_id=oid, status='입고', message='배송시스템에 신규 주문 입고됨', created_at=now))
+                        items.extend(logi_task_item_rows(tid, new_keys[(oid, cat)]))
+            if logs:
+                db_delivery.session.execute(DeliveryLog.__table__.insert(), logs)
+            if items:
+                db_delivery.session.execute(DeliveryTaskItem.__table__.insert(), items)
+
+        hwm = max((r.status_changed_at for r in rows if r.status_changed_at), default=None)
+        if isinstance(hwm, str):  # SQLite text() 조회는 문자열로 올 수 있음
+            hwm = datetime.fromisoformat(hwm)
+        if hwm and (state.last_status_changed_at is None or hwm > state.last_status_changed_at):
+            state.last_status_changed_at = hwm
+        state.synced_at = get_kst()
+        db_delivery.session.commit()
+        if new_tasks:
+            logi_invalidate_categories()
+        return jsonify({"success": True, "synced_count": len(new_tasks)})
+    except Exception as e:
+        db_delivery.session.rollback()
+        return jsonify({"success": False, "error": str(e)})
 
 @logi_bp.route('/bulk/execute', methods=['POST'])
 def logi_bulk_execute():
@@ -1401,9 +1504,13 @@ def logi_bulk_execute():
                 
             elif action == 'delete':
                 db_delivery.session.delete(t)
+        if action == 'delete' and tasks:
+            DeliveryTaskItem.query.filter(DeliveryTaskItem.task_id.in_([t.id for t in tasks])).delete(synchronize_session=False)
         
         # ⚠️ 루프가 다 끝난 후 '한 번에' 저장(Commit) 합니다.
         db_delivery.session.commit()
+        if action == 'delete':
+            logi_invalidate_categories()
         return jsonify({"success": True})
 
     except Exception as e:
@@ -1413,19 +1520,17 @@ def logi_bulk_execute():
 @logi_bp.route('/bulk/pickup', methods=['POST'])
 def logi_bulk_pickup():
     data = request.json
-    for tid in data.get('task_ids'):
-        t = DeliveryTask.query.get(tid)
-        if t and t.status in ['배정완료', '대기']: 
+    task_ids = [tid for tid in (data.get('task_ids') or []) if tid]
+    picked = []
+    for t in (DeliveryTask.query.filter(DeliveryTask.id.in_(task_ids)).all() if task_ids else []):
+        if t.status in ['배정완료', '대기']:
             t.status, t.pickup_at = '픽업', get_kst()
             logi_add_log(t.id, t.order_id, '픽업', '일괄 상차 완료 처리')
-            # 메인 앱에 배송중 반영 및 고객 메시지 발송
-            try:
-                url = (request.host_url or request.url_root or '').rstrip('/') + '/api/logi/delivery-in-progress'
-                if url.startswith('http'):
-                    requests.post(url, json={'order_id': t.order_id, 'category': t.category or ''}, timeout=10)
-            except Exception:
-                pass
-    db_delivery.session.commit(); return jsonify({"success": True})
+            picked.append({'order_id': t.order_id, 'category': t.category or ''})
+    db_delivery.session.commit()
+    # 메인 앱에 배송중 반영 및 고객 메시지 발송 (픽업 전체를 한 번에)
+    publish_event(DELIVERY_PICKED_UP, picked)
+    return jsonify({"success": True})
 
 @logi_bp.route('/update_status/<int:tid>/<string:new_status>')
 def logi_update_task_status(tid, new_status):
@@ -1438,31 +1543,25 @@ def logi_update_task_status(tid, new_status):
         db_delivery.session.commit()
         # 픽업 시 메인 앱 배송중 반영 및 고객 메시지 발송
         if new_status == '픽업':
-            try:
-                url = (request.host_url or request.url_root or '').rstrip('/') + '/api/logi/delivery-in-progress'
-                if url.startswith('http'):
-                    requests.post(url, json={'order_id': t.order_id, 'category': t.category or ''}, timeout=10)
-            except Exception:
-                pass
+            publish_event(DELIVERY_PICKED_UP, {'order_id': t.order_id, 'category': t.category or ''})
     return redirect(request.referrer or url_for('logi.logi_admin_dashboard'))
 
 @logi_bp.route('/complete_action/<int:tid>', methods=['POST'])
 def logi_complete_action(tid):
     t = DeliveryTask.query.get(tid); d = request.json or {}
     if t:
-        t.status, t.completed_at, t.photo_data = '완료', get_kst(), d.get('photo')
+        # 사진은 여기서 한 번만 디코딩·축소해 저장소에 올리고, 이후로는 URL만 전달
+        stored = store_photo_data_url(d.get('photo')) if d.get('photo') else None
+        if d.get('photo') and not stored:
+            print(f"[LOGI] 배송완료 사진 저장 실패 (task #{t.id})", flush=True)
+        t.status, t.completed_at = '완료', get_kst()
+        if stored:
+            t.photo_url, t.photo_hash, t.photo_thumb_url = stored['url'], stored['hash'], stored['thumb_url']
         logi_add_log(t.id, t.order_id, '완료', '기사 배송 완료 및 안내 전송')
         db_delivery.session.commit()
         # 메인 앱에 배송완료 반영 및 고객 메시지(사진 포함) 발송
-        customer_notify_ok = True
-        try:
-            url = (request.host_url or request.url_root or '').rstrip('/') + '/api/logi/delivery-complete'
-            if url.startswith('http'):
-                r = requests.post(url, json={'order_id': t.order_id, 'category': t.category or '', 'photo': t.photo_data}, timeout=15)
-                if r.status_code not in (200, 201):
-                    customer_notify_ok = False
-        except Exception:
-            customer_notify_ok = False
+        results = publish_event(DELIVERY_COMPLETED, {'order_id': t.order_id, 'category': t.category or '', 'photo_url': t.photo_url})
+        customer_notify_ok = bool(results) and all(r and all(v == 'ok' for v in r.values()) for r in results)
         return jsonify({"success": True, "customer": t.customer_name, "phone": t.phone, "customer_notify_ok": customer_notify_ok})
     return jsonify({"success": False})
 
@@ -1569,10 +1668,6 @@ def logi_driver_payout_page():
     if not session.get('admin_logged_in'):
         return redirect(url_for('logi.logi_admin_login'))
 
-    # 테이블 스키마 보정 (컬럼 없으면 자동 추가)
-    _logi_ensure_driver_pay_columns()
-    _logi_ensure_driver_fee_column()
-
     # 기본 조회 기간: 오늘
     today = get_kst().date()
     start_str = request.args.get('start', today.strftime('%Y-%m-%d'))
@@ -1602,18 +1697,7 @@ def logi_driver_payout_page():
     drivers = Driver.query.order_by(Driver.name.asc()).all()
 
     # 상세 목록: 조건에 맞는 개별 배차건 (선택 지급용)
-    task_q = DeliveryTask.query.filter(DeliveryTask.status == '완료')
-    if start_dt:
-        task_q = task_q.filter(DeliveryTask.completed_at >= start_dt)
-    if end_dt:
-        task_q = task_q.filter(DeliveryTask.completed_at <= end_dt)
-    if driver_id:
-        task_q = task_q.filter(DeliveryTask.driver_id == driver_id)
-    if pay_status in ('미지급', '지급완료'):
-        task_q = task_q.filter(DeliveryTask.driver_pay_status == pay_status)
-    if item_keyword:
-        kw = f"%{item_keyword}%"
-        task_q = task_q.filter(DeliveryTask.product_details.ilike(kw))
+    task_q = _logi_payout_filter(DeliveryTask.query, start_dt, end_dt, driver_id, pay_status, item_keyword)
     payout_tasks = task_q.order_by(DeliveryTask.completed_at.desc()).all()
 
     html = """
@@ -0,0 +1,37 @@
+# --------------------------------------------------------------------------------
+# 프로세스 내 도메인 이벤트 버스 (delivery_system ↔ app)
+# 배송 시스템(logi)이 같은 서버의 /api/logi/* 를 HTTP로 다시 호출하던 방식 대신,
+# 이벤트를 발행하면 app.py에 등록된 핸들러가 같은 프로세스에서 바로 처리.
+# 핸들러는 이벤트 목록(배치)을 한 번에 받음 → 일괄 상차 80건도 한 트랜잭션.
+# --------------------------------------------------------------------------------
+import traceback
+from collections import defaultdict
+
+# 이벤트 이름
+DELIVERY_PICKED_UP = "delivery.picked_up"    # payload: {order_id, category}
+DELIVERY_COMPLETED = "delivery.completed"    # payload: {order_id, category, photo_url}
+
+_handlers = defaultdict(list)
+
+
+def subscribe(event_name, handler):
+    """handler(payloads: list[dict]) → 결과(선택). 같은 이벤트에 여러 핸들러 등록 가능."""
+    _handlers[event_name].append(handler)
+
+
+def publish(event_name, payloads):
+    """payloads(dict 또는 dict 목록)를 등록된 핸들러에 한 번에 전달. 핸들러별 결과 목록 반환.
+    핸들러 예외는 발행한 쪽 처리를 막지 않도록 로그만 남기고 None."""
+    if isinstance(payloads, dict):
+        payloads = [payloads]
+    payloads = [p for p in payloads if p]
+    if not payloads:
+        return []
+    results = []
+    for handler in list(_handlers.get(event_name, ())):
+        try:
+            results.append(handler(payloads))
+        except Exception:
+            traceback.print_exc()
+            results.append(None)
+    return results
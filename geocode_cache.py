@@ -0,0 +1,287 @@
+# --------------------------------------------------------------------------------
+# 지오코딩 캐시 (주소→좌표, 주소→우편번호, 좌표→우편번호)
+# 1차: 프로세스 내 LRU (TTL, 실패 결과는 짧은 TTL로 네거티브 캐시)
+# 2차: geocode_cache 테이블 — 워커·재배포 간 공유. 쓰기는 백그라운드 스레드에서 모아서 UPSERT
+#      (결제 트랜잭션이 DB 락을 잡고 있어도 요청 스레드가 기다리지 않음)
+# --------------------------------------------------------------------------------
+import os
+import re
+import time
+import atexit
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from delivery_system import db_delivery
+from models import GeocodeCache, _now_kst
+
+db = db_delivery
+
+GEOCODE_CACHE_MAX = int(os.getenv("GEOCODE_CACHE_MAX", "5000"))
+GEOCODE_TTL_SECONDS = int(os.getenv("GEOCODE_TTL_SECONDS", str(90 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(6 * 3600)))
+
+# get() 결과 없음 표시 (None은 "지오코딩 실패"라는 캐시된 값이므로 구분)
+MISS = object()
+
+KIND_GEO = 'geo'    # 주소 → (lat, lng) / None
+KIND_ZIP = 'zip'    # 주소 → 우편번호(카카오) / ''
+KIND_RZIP = 'rzip'  # "lat,lng" → 우편번호 / ''
+
+
+def normalize_address(address_str):
+    """연속 공백 정리. 같은 아파트 주소가 띄어쓰기만 달라도 같은 키가 되도록."""
+    return re.sub(r'\s+', ' ', (address_str or '').strip())[:300]
+
+
+def latlng_key(lat, lng):
+    return f"{round(float(lat), 4):.4f},{round(float(lng), 4):.4f}"
+
+
+def _is_found(kind, value):
+    return bool(value) if kind != KIND_GEO else value is not None
+
+
+class GeocodeCacheStore:
+    """(kind, key) → 값. 메모리 LRU → DB 순으로 조회, put()은 메모리에 즉시 반영하고 DB에는 비동기로 기록."""
+
+    def __init__(self, max_entries=GEOCODE_CACHE_MAX, ttl=GEOCODE_TTL_SECONDS,
+                 negative_ttl=GEOCODE_NEGATIVE_TTL_SECONDS):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._app = None
+        self._lru = OrderedDict()  # (kind, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._pending = {}         # (kind, key) -> value (DB 기록 대기)
+        self._wake = threading.Event()
+        self._pid = None
+        self._local = threading.local()  # uncounted(): 이 스레드의 조회는 적중/미적중 집계 제외
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self._app = app
+        atexit.register(self.flush)
+
+    # ---- 메모리 LRU ----
+    def _remember(self, kind, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl if _is_found(kind, value) else self.negative_ttl
+        with self._lock:
+            self._lru[(kind, key)] = (time.monotonic() + ttl, value)
+            self._lru.move_to_end((kind, key))
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _from_memory(self, kind, key):
+        with self._lock:
+            entry = self._lru.get((kind, key))
+            if entry is None:
+                return MISS
+            if entry[0] < time.monotonic():
+                self._lru.pop((kind, key), None)
+                return MISS
+            self._lru.move_to_end((kind, key))
+            return entry[1]
+
+    # ---- DB ----
+    def _from_db(self, kind, key):
+        table = GeocodeCache.__table__
+        try:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.lat, table.c.lng, table.c.postcode, table.c.found, table.c.updated_at)
+                    .where(table.c.kind == kind, table.c.cache_key == key)
+                ).first()
+        except Exception:
+            return MISS
+        if row is None:
+            return MISS
+        age = (_now_kst() - row.updated_at).total_seconds() if row.updated_at else 0
+        ttl = self.ttl if row.found else self.negative_ttl
+        if age > ttl:
+            return MISS
+        if kind == KIND_GEO:
+            value = (row.lat, row.lng) if row.found and row.lat is not None and row.lng is not None else None
+        else:
+            value = (row.postcode or '') if row.found else ''
+        self._remember(kind, key, value, ttl=max(1, ttl - age))
+        return value
+
+    @contextmanager
+    def uncounted(self):
+        """블록 안에서 이 스레드가 하는 조회는 통계에 넣지 않음 (워밍업 — 실제 요청 적중률만 집계)."""
+        prev = getattr(self._local, 'uncounted', False)
+        self._local.uncounted = True
+        try:
+            yield
+        finally:
+            self._local.uncounted = prev
+
+    def get(self, kind, key):
+        counted = not getattr(self._local, 'uncounted', False)
+        value = self._from_memory(kind, key)
+        if value is not MISS:
+            if counted:
+                self.memory_hits += 1
+            return value
+        value = self._from_db(kind, key)
+        if value is not MISS:
+            if counted:
+                self.db_hits += 1
+            return value
+        if counted:
+            self.misses += 1
+        return MISS
+
+    def put(self, kind, key, value, persist=True):
+        """persist=False: 일시 오류(타임아웃 등)로 인한 실패 — 메모리에만 짧게 보관하고 DB에는 남기지 않음."""
+        self._remember(kind, key, value)
+        if not persist:
+            return
+        with self._lock:
+            self._pending[(kind, key)] = value
+        self._ensure_writer()
+        self._wake.set()
+
+    # ---- 비동기 DB 기록 ----
+    def _ensure_writer(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._run, name="geocode-cache-writer", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            time.sleep(1)  # 짧은 시간 모아서 한 트랜잭션으로
+            self.flush()
+
+    def flush(self):
+        if self._app is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    for (kind, key), value in pending.items():
+                        _upsert(conn, kind, key, value)
+        except Exception:
+            traceback.print_exc()
+            with self._lock:
+                for k, v in pending.items():
+                    self._pending.setdefault(k, v)
+
+    def stats(self):
+        with self._lock:
+            size, pending = len(self._lru), len(self._pending)
+        total = self.memory_hits + self.db_hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_entries,
+            "pending_writes": pending,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.db_hits) / total, 4) if total else 0.0,
+        }
+
+
+def _upsert(conn, kind, key, value):
+    table = GeocodeCache.__table__
+    found = _is_found(kind, value)
+    values = {
+        'kind': kind, 'cache_key': key, 'found': found, 'updated_at': _now_kst(),
+        'lat': value[0] if kind == KIND_GEO and found else None,
+        'lng': value[1] if kind == KIND_GEO and found else None,
+        'postcode': (value or None) if kind != KIND_GEO else None,
+    }
+    dialect = conn.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        ins = (pg_insert if dialect == 'postgresql' else sqlite_insert)(table).values(**values)
+        conn.execute(ins.on_conflict_do_update(
+            index_elements=[table.c.kind, table.c.cache_key],
+            set_={c: ins.excluded[c] for c in ('lat', 'lng', 'postcode', 'found', 'updated_at')},
+        ))
+        return
+    upd = table.update().where(table.c.kind == kind, table.c.cache_key == key).values(
+        {c: values[c] for c in ('lat', 'lng', 'postcode', 'found', 'updated_at')}
+    )
+    if conn.execute(upd).rowcount == 0:
+        conn.execute(table.insert().values(**values))
+
+
+geocode_cache = GeocodeCacheStore()
+
+
+# --------------------------------------------------------------------------------
+# 관리자 워밍업: 회원 주소·주문 배송지 전체를 미리 지오코딩 (백그라운드 1회 실행)
+# --------------------------------------------------------------------------------
+_warmup_state = {'running': False, 'total': 0, 'done': 0, 'fetched': 0, 'started_at': None, 'finished_at': None, 'error': None}
+_warmup_lock = threading.Lock()
+
+
+def warmup_status():
+    with _warmup_lock:
+        return dict(_warmup_state)
+
+
+def start_warmup(app, load_addresses, geocode_fn, delay_seconds=1.0):
+    """load_addresses() → 주소 목록, geocode_fn(addr) → 지오코딩(캐시 경유).
+    캐시에 없던 주소는 외부 API를 부르므로 delay_seconds 간격 유지 (Nominatim 1req/s 정책).
+    이미 실행 중이면 False."""
+    with _warmup_lock:
+        if _warmup_state['running']:
+            return False
+        _warmup_state.update(running=True, total=0, done=0, fetched=0,
+                             started_at=_now_kst().isoformat(timespec='seconds'), finished_at=None, error=None)
+
+    def _run():
+        try:
+            with app.app_context(), geocode_cache.uncounted():
+                addresses = []
+                seen = set()
+                for a in load_addresses():
+                    key = normalize_address(a)
+                    if key and key not in seen:
+                        seen.add(key)
+                        addresses.append(key)
+                with _warmup_lock:
+                    _warmup_state['total'] = len(addresses)
+                for addr in addresses:
+                    fetched = geocode_cache.get(KIND_GEO, addr) is MISS
+                    if fetched:
+                        geocode_fn(addr)
+                    with _warmup_lock:
+                        _warmup_state['done'] += 1
+                        if fetched:
+                            _warmup_state['fetched'] += 1
+                    if fetched:
+                        time.sleep(delay_seconds)
+            geocode_cache.flush()
+        except Exception as e:
+            traceback.print_exc()
+            with _warmup_lock:
+                _warmup_state['error'] = str(e)[:200]
+        finally:
+            with _warmup_lock:
+                _warmup_state['running'] = False
+                _warmup_state['finished_at'] = _now_kst().isoformat(timespec='seconds')
+
+    threading.Thread(target=_run, name="geocode-warmup", daemon=True).start()
+    return True
@@ -3,5 +3,10 @@ import os
 
 bind = "0.0.0.0:%s" % os.environ.get("PORT", "10000")
 workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# 스레드 워커(gthread): 새 메시지 SSE 스트림(/api/messages/stream)이 스레드 1개씩 점유
+# → SSE_MAX_STREAMS(기본 24)보다 넉넉하게 두어 일반 요청용 스레드 확보
+# DB 커넥션 풀도 이 값 기준 (app.py SQLALCHEMY_ENGINE_OPTIONS: pool_size = GUNICORN_THREADS, + DB_MAX_OVERFLOW)
+# 이 설정 파일 없이(-c 없이) 실행하면 sync 워커 1스레드 → SSE는 503으로 꺼지고 폴링으로 동작
+threads = int(os.environ.get("GUNICORN_THREADS", "32"))
 timeout = 300
 worker_tmp_dir = "/dev/shm"  # Render/일부 환경에서 메모리 기반 tmp 사용
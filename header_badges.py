@@ -0,0 +1,132 @@
+# --------------------------------------------------------------------------------
+# 헤더 배지 캐시 (회원별 장바구니 수량·미읽음 메시지 수·최신 미읽음 메시지 id)
+# 모든 페이지의 inject_globals와 메시지 폴링 API(/api/messages/*)가 매번 cart SUM·user_message COUNT를
+# 실행하던 것을 회원별 캐시로 대체.
+# - 이 프로세스에서 Cart·UserMessage 행이 쓰인 트랜잭션이 커밋되면 해당 회원 배지만 즉시 폐기
+#   (user_id를 알 수 없는 일괄 UPDATE/DELETE는 전체 폐기)
+# - 다른 워커의 변경·원시 SQL 변경은 짧은 TTL(BADGE_CACHE_TTL) 경과 후 반영
+# - badge_etag(): 폴링 응답 ETag → 변화 없으면 304 (DB 조회 없음)
+# --------------------------------------------------------------------------------
+import os
+import time
+import threading
+
+from sqlalchemy import case, event, func, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from delivery_system import db_delivery
+from models import Cart, UserMessage
+
+db = db_delivery
+
+BADGE_CACHE_TTL = int(os.getenv("BADGE_CACHE_TTL", "15"))           # 초
+BADGE_CACHE_MAX_USERS = int(os.getenv("BADGE_CACHE_MAX_USERS", "20000"))
+
+_BADGE_MODELS = (Cart, UserMessage)
+_DIRTY_KEY = "_badge_dirty_users"
+_DIRTY_ALL = "*"
+
+
+def load_badge(user_id):
+    """DB에서 배지 값 조회: 장바구니 1쿼리 + 미읽음 메시지 1쿼리 (ix_user_message_unread)."""
+    cart_qty = db.session.query(func.coalesce(func.sum(Cart.quantity), 0)).filter(Cart.user_id == user_id).scalar()
+    unread, latest_id, latest_delivery_id = db.session.query(
+        func.count(UserMessage.id),
+        func.max(UserMessage.id),
+        func.max(case((UserMessage.msg_type == 'delivery_complete', UserMessage.id))),
+    ).filter(UserMessage.user_id == user_id, UserMessage.read_at.is_(None)).one()
+    return {
+        'cart_count': int(cart_qty or 0),
+        'unread_count': int(unread or 0),
+        'latest_unread_id': latest_id,
+        'latest_delivery_complete_id': latest_delivery_id,
+    }
+
+
+class BadgeCache:
+    """user_id → (생성 시각, 배지 dict). invalidate(user_ids) 시 해당 회원만, clear() 시 전체 폐기."""
+
+    def __init__(self, loader=load_badge, ttl=BADGE_CACHE_TTL, max_users=BADGE_CACHE_MAX_USERS):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.loads = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            generation = self._generation
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        badge = self.loader(user_id)
+        with self._lock:
+            self.loads += 1
+            if generation == self._generation:  # 조회 도중 커밋된 변경이 있으면 저장하지 않음
+                if len(self._entries) >= self.max_users and user_id not in self._entries:
+                    self._entries.clear()
+                self._entries[user_id] = (time.monotonic(), badge)
+        return badge
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self._generation += 1
+            for uid in user_ids:
+                self._entries.pop(uid, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+badge_cache = BadgeCache()
+
+
+def badge_etag(user_id, *values):
+    """폴링 응답 ETag: 회원 + 응답을 결정하는 배지 값."""
+    return "b%s-%s" % (user_id, "-".join("" if v is None else str(v) for v in values))
+
+
+# ---- 커밋 시 무효화 ----
+def _mark(session, user_id):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    dirty.add(_DIRTY_ALL if user_id is None else user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_badge_users(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, _BADGE_MODELS):
+            continue
+        _mark(session, obj.user_id)
+        hist = sa_inspect(obj).attrs.user_id.history
+        for uid in hist.deleted or ():  # 다른 회원으로 옮겨진 행: 이전 회원도
+            _mark(session, uid)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_badge_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _BADGE_MODELS):
+        _mark(orm_execute_state.session, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_badges(session):
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if not dirty:
+        return
+    if _DIRTY_ALL in dirty:
+        badge_cache.clear()
+    else:
+        badge_cache.invalidate(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_badges(session):
+    session.info.pop(_DIRTY_KEY, None)
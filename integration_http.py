@@ -0,0 +1,230 @@
+# --------------------------------------------------------------------------------
+# 외부 연동 HTTP 클라이언트 (네이버 쇼핑·지오코딩·토스·OAuth·알림톡·GitHub 백업·웹푸시 공용)
+# 호출마다 requests.get/post로 새 TLS 연결을 열던 것을 호스트별 requests.Session(keep-alive 풀)으로 재사용.
+# - 연동별 (연결, 읽기) 타임아웃 명시 — 타임아웃 없는 호출 없음
+# - 재시도: 지수 백오프 + 지터. GET·Idempotency-Key 있는 요청만 응답 실패(5xx·429·읽기 타임아웃)까지 재시도,
+#   그 외 POST는 요청이 나가지 않은 연결 실패만 재시도 (결제 승인 등 중복 실행 방지)
+# - 서킷 브레이커: 연속 실패 시 쿨다운 동안 호출 없이 CircuitOpenError (장애 난 업체를 기다리지 않음)
+#   쿨다운 후 1건만 시험 호출(half-open) → 성공하면 복구
+# - 연동별 지연 시간 히스토그램·오류 수 → stats() (/admin/debug/integrations)
+# --------------------------------------------------------------------------------
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))          # 호스트별 유지 연결 수
+HTTP_BACKOFF_SECONDS = 0.2
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """브레이커가 열려 호출하지 않음. requests 예외를 잡던 기존 코드에서 그대로 처리됨."""
+
+
+class Integration:
+    """연동 1개 설정: timeout=(연결, 읽기) 초, retries=추가 시도 횟수, breaker_failures=None이면 브레이커 없음."""
+
+    def __init__(self, name, timeout, retries=1, breaker_failures=5, breaker_cooldown=30):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.retried = 0
+        self.short_circuited = 0
+        self.total_ms = 0.0
+
+    # ---- 서킷 브레이커 ----
+    def allow(self):
+        if self.breaker_failures is None:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.breaker_cooldown:
+                self.short_circuited += 1
+                return False
+            self._trial = True  # half-open: 시험 호출 1건
+            return True
+
+    def record(self, elapsed_ms, ok):
+        with self._lock:
+            self.calls += 1
+            self.total_ms += elapsed_ms
+            i = 0
+            while i < len(LATENCY_BUCKETS_MS) and elapsed_ms > LATENCY_BUCKETS_MS[i]:
+                i += 1
+            self.buckets[i] += 1
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                self._trial = False
+                return
+            self.errors += 1
+            self._failures += 1
+            if self.breaker_failures is not None and (self._trial or self._failures >= self.breaker_failures):
+                if self._opened_at is None or self._trial:
+                    print(f"[HTTP] {self.name} 서킷 열림 (연속 실패 {self._failures}회, {self.breaker_cooldown}초)", flush=True)
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+    def percentile(self, q):
+        """히스토그램 기준 근사 백분위(ms, 구간 상한)."""
+        target = self.calls * q
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def stats(self):
+        with self._lock:
+            labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "state": self.state(),
+                "timeout": list(self.timeout),
+                "calls": self.calls,
+                "errors": self.errors,
+                "retried": self.retried,
+                "short_circuited": self.short_circuited,
+                "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else None,
+                "p50_ms": self.percentile(0.5),
+                "p95_ms": self.percentile(0.95),
+                "histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+INTEGRATIONS = {i.name: i for i in (
+    Integration("naver_shop", timeout=(2, 4)),
+    Integration("naver_oauth", timeout=(3, 10)),
+    Integration("kakao_oauth", timeout=(3, 10)),
+    Integration("google_oauth", timeout=(3, 10)),
+    Integration("nominatim", timeout=(3, 8)),
+    Integration("photon", timeout=(3, 8)),
+    Integration("kakao_local", timeout=(3, 8)),
+    # 결제: 읽기 타임아웃은 넉넉히, 브레이커 없음 (결제 승인은 추정으로 막지 않음)
+    Integration("toss", timeout=(3, 30), retries=2, breaker_failures=None),
+    Integration("kakao_alimtalk", timeout=(3, 15)),
+    Integration("github", timeout=(5, 120), retries=0),
+    Integration("webpush", timeout=(3, 10), retries=0, breaker_failures=None),
+)}
+
+
+# ---- 호스트별 세션 ----
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(url):
+    """URL 호스트의 공유 세션 (keep-alive 연결 풀). 쿠키는 저장하지 않음 (회원 간 공유 방지)."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    s = _sessions.get(key)
+    if s is not None:
+        return s
+    with _sessions_lock:
+        s = _sessions.get(key)
+        if s is None:
+            s = requests.Session()
+            s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            s.mount(f"{parts.scheme}://", adapter)
+            _sessions[key] = s
+        return s
+
+
+def _not_sent(exc):
+    """요청이 서버에 전달되기 전 실패(연결 타임아웃·연결 거부·DNS)인지."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _sleep_backoff(attempt):
+    time.sleep(random.uniform(0, HTTP_BACKOFF_SECONDS * (2 ** attempt)))
+
+
+def request(integration, method, url, timeout=None, retries=None, **kwargs):
+    """연동 설정(타임아웃·재시도·브레이커)을 적용한 requests 호출. 반환: requests.Response.
+    브레이커가 열려 있으면 CircuitOpenError, 재시도 후에도 실패하면 마지막 예외를 그대로 올림."""
+    conf = INTEGRATIONS[integration]
+    method = method.upper()
+    retries = conf.retries if retries is None else retries
+    headers = kwargs.get("headers") or {}
+    safe = method in IDEMPOTENT_METHODS or any(k.lower() == "idempotency-key" for k in headers)
+    session = session_for(url)
+    attempt = 0
+    while True:
+        if not conf.allow():
+            raise CircuitOpenError(f"{integration}: 서킷 열림 (외부 서비스 장애 추정)")
+        t0 = time.perf_counter()
+        try:
+            resp = session.request(method, url, timeout=timeout or conf.timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            conf.record((time.perf_counter() - t0) * 1000, ok=False)
+            if attempt < retries and (safe or _not_sent(e)):
+                conf.retried += 1
+                _sleep_backoff(attempt)
+                attempt += 1
+                continue
+            raise
+        failed = resp.status_code >= 500
+        conf.record((time.perf_counter() - t0) * 1000, ok=not failed)
+        if resp.status_code in RETRY_STATUSES and safe and attempt < retries:
+            conf.retried += 1
+            resp.close()
+            _sleep_backoff(attempt)
+            attempt += 1
+            continue
+        return resp
+
+
+def get(integration, url, **kwargs):
+    return request(integration, "GET", url, **kwargs)
+
+
+def post(integration, url, **kwargs):
+    return request(integration, "POST", url, **kwargs)
+
+
+@contextmanager
+def track(integration):
+    """자체적으로 HTTP를 호출하는 라이브러리(pywebpush 등) 호출 시간·실패를 같은 통계에 기록."""
+    conf = INTEGRATIONS[integration]
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        yield conf
+        ok = True
+    finally:
+        conf.record((time.perf_counter() - t0) * 1000, ok=ok)
+
+
+def stats():
+    return {name: conf.stats() for name, conf in INTEGRATIONS.items()}
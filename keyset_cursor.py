@@ -0,0 +1,37 @@
+# --------------------------------------------------------------------------------
+# 무한 스크롤 keyset 커서 (불투명 토큰)
+# 마지막으로 내려준 행의 정렬 키(예: 판매중 여부, id)를 base64url 토큰으로 감싸 응답 헤더로 전달
+# → 다음 요청은 "그 키 뒤" 조건으로 인덱스 범위 조회. OFFSET처럼 앞 페이지를 다시 읽지 않고,
+#   스크롤 중 상품이 추가·마감되어도 중복·누락이 생기지 않음
+# --------------------------------------------------------------------------------
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values):
+    """정수 키 목록 → 토큰."""
+    raw = json.dumps([int(v) for v in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """토큰 → 정수 키 목록 (길이 size). 형식이 맞지 않으면 None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        return None
+    return values
+
+
+def with_next_cursor(resp, *values):
+    """응답에 다음 페이지 커서 헤더 추가 (values가 없으면 마지막 페이지 → 헤더 없음)."""
+    if values:
+        resp.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
+    return resp
@@ -0,0 +1,222 @@
+# --------------------------------------------------------------------------------
+# 회원 메시지 실시간 전달 (Server-Sent Events)
+# 배송완료 팝업·새 메시지 알림 바가 /api/messages/* 를 1분마다 폴링하던 것을
+# /api/messages/stream(SSE) 연결 하나로 대체. 연결이 안 되면 브라우저 쪽에서 폴링으로 전환.
+# - UserMessage가 추가된 트랜잭션이 커밋되면 해당 회원의 열린 스트림에 바로 전달
+# - MESSAGE_PUSH_BACKEND=local(기본): 같은 프로세스 안에서만 전달 (gunicorn 워커 1개일 때)
+#   MESSAGE_PUSH_BACKEND=postgres: 트랜잭션 안에서 pg_notify → 워커마다 LISTEN 스레드 1개가 받아 전달
+#   (NOTIFY는 커밋 시에만 배달되므로 롤백된 메시지는 나가지 않음)
+# - 스트림 하나가 gunicorn 스레드 하나를 점유 → 프로세스당 SSE_MAX_STREAMS개까지만 받고 초과 시 503(폴링 전환)
+#   일정 시간(SSE_STREAM_SECONDS) 후 서버가 끊으면 브라우저가 Last-Event-ID로 재연결 → 끊긴 사이 메시지 보충
+# - 스레드 워커(gunicorn -c gunicorn_config.py → gthread)가 전제. sync 워커(스레드 1개)에서는 스트림 하나가
+#   워커 전체를 막으므로 SSE_MODE=auto(기본)면 503 → 브라우저는 처음부터 폴링
+# --------------------------------------------------------------------------------
+import os
+import json
+import queue
+import select
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from delivery_system import db_delivery
+from models import UserMessage
+
+db = db_delivery
+
+MESSAGE_PUSH_BACKEND = os.getenv("MESSAGE_PUSH_BACKEND", "local").strip().lower()   # local | postgres
+SSE_MODE = os.getenv("SSE_MODE", "auto").strip().lower()              # auto(스레드 워커에서만) | on | off
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "24"))             # gunicorn threads보다 작게 (일반 요청용 여유)
+SSE_STREAM_SECONDS = int(os.getenv("SSE_STREAM_SECONDS", "300"))      # 스트림 최대 유지 시간 → 브라우저 재연결
+SSE_KEEPALIVE_SECONDS = 20                                             # 프록시 유휴 타임아웃 방지용 주석 행
+SSE_RETRY_MS = 5000
+SSE_QUEUE_SIZE = 50
+PG_CHANNEL = "user_message"
+
+_SESSION_KEY = "_message_push_pending"
+
+
+def message_event(m):
+    """UserMessage → 스트림 이벤트 데이터 (/api/messages/latest_unread 응답과 같은 형태)."""
+    return {
+        "has": True,
+        "id": m.id,
+        "user_id": m.user_id,
+        "title": m.title or "알림",
+        "body": (m.body or "")[:200],
+        "msg_type": m.msg_type or "custom",
+        "order_id": m.related_order_id,
+    }
+
+
+def format_sse(data, event_name="user_message"):
+    payload = dict(data)
+    payload.pop("user_id", None)
+    return f"id: {data['id']}\nevent: {event_name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def streams_supported(environ):
+    """이 요청을 처리하는 서버에서 SSE 스트림을 열어도 되는지. auto: WSGI 서버가 스레드 방식(wsgi.multithread)일 때만."""
+    if SSE_MODE in ("on", "1", "true"):
+        return True
+    if SSE_MODE in ("off", "0", "false"):
+        return False
+    return bool(environ.get("wsgi.multithread"))
+
+
+class MessageBroker:
+    """user_id → 열린 스트림 큐 목록. publish()는 큐에 넣기만 하고 바로 반환 (가득 찬 큐는 건너뜀)."""
+
+    def __init__(self, max_streams=SSE_MAX_STREAMS):
+        self.max_streams = max_streams
+        self._subs = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        """스트림 큐 등록. 프로세스 한도 초과면 None."""
+        if MESSAGE_PUSH_BACKEND == "postgres":
+            self._start_listener()
+        with self._lock:
+            if self._count >= self.max_streams:
+                return None
+            q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+            self._subs[user_id].add(q)
+            self._count += 1
+            return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._subs.get(user_id)
+            if subs and q in subs:
+                subs.discard(q)
+                self._count -= 1
+                if not subs:
+                    del self._subs[user_id]
+
+    def publish(self, data):
+        with self._lock:
+            targets = list(self._subs.get(data.get("user_id"), ()))
+        for q in targets:
+            try:
+                q.put_nowait(data)
+                self.published += 1
+            except queue.Full:
+                self.dropped += 1  # 밀린 스트림: 재연결 시 Last-Event-ID로 보충
+
+    def stats(self):
+        with self._lock:
+            return {"backend": MESSAGE_PUSH_BACKEND, "mode": SSE_MODE, "streams": self._count, "users": len(self._subs),
+                    "max_streams": self.max_streams, "published": self.published, "dropped": self.dropped}
+
+    # ---- postgres LISTEN (워커 프로세스별 1개, 첫 구독 시 시작) ----
+    def _start_listener(self):
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+        threading.Thread(target=self._listen_forever, name="message-push-listen", daemon=True).start()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            try:
+                self._listen()
+                backoff = 1
+            except Exception:
+                traceback.print_exc()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def _listen(self):
+        raw = db.engine.raw_connection()
+        raw.detach()  # 풀에서 분리한 전용 연결 (LISTEN 유지)
+        conn = raw.driver_connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {PG_CHANNEL}")
+            print(f"[MESSAGE PUSH] LISTEN {PG_CHANNEL} (pid {os.getpid()})", flush=True)
+            while True:
+                if select.select([conn], [], [], SSE_KEEPALIVE_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    try:
+                        self.publish(json.loads(note.payload))
+                    except ValueError:
+                        pass
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+broker = MessageBroker()
+
+
+def missed_messages(user_id, last_id, limit=20):
+    """재연결 시 Last-Event-ID 이후 도착한 미읽음 메시지 (오래된 순)."""
+    rows = UserMessage.query.filter(
+        UserMessage.user_id == user_id, UserMessage.read_at.is_(None), UserMessage.id > last_id
+    ).order_by(UserMessage.id.asc()).limit(limit).all()
+    return [message_event(m) for m in rows]
+
+
+def stream_events(user_id, q, backlog=()):
+    """SSE 응답 본문 생성기. DB·요청 컨텍스트를 쓰지 않음 (응답 전에 세션 반납)."""
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for data in backlog:
+            yield format_sse(data)
+        deadline = time.monotonic() + SSE_STREAM_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                data = q.get(timeout=min(SSE_KEEPALIVE_SECONDS, remaining))
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield format_sse(data)
+    finally:
+        broker.unsubscribe(user_id, q)
+
+
+# ---- 커밋 시 발행 ----
+@event.listens_for(Session, "after_flush")
+def _collect_new_messages(session, flush_context):
+    new = [message_event(obj) for obj in session.new if isinstance(obj, UserMessage)]
+    if not new:
+        return
+    if MESSAGE_PUSH_BACKEND == "postgres":
+        conn = session.connection()
+        for data in new:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": PG_CHANNEL, "payload": json.dumps(data, ensure_ascii=False)})
+    else:
+        session.info.setdefault(_SESSION_KEY, []).extend(new)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    for data in session.info.pop(_SESSION_KEY, ()):
+        broker.publish(data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -3,6 +3,7 @@
 # --------------------------------------------------------------------------------
 from datetime import datetime, timedelta
 from flask_login import UserMixin
+from sqlalchemy import event
 from delivery_system import db_delivery
 
 db = db_delivery
@@ -119,10 +120,22 @@ class Product(db.Model):
     naver_lowest_link = db.Column(db.String(500), nullable=True)
     naver_lowest_mall = db.Column(db.String(200), nullable=True)
     naver_lowest_updated_at = db.Column(db.DateTime, nullable=True)
+    # 백그라운드 갱신(naver_price_refresh.py): 상세용 최저가 목록(JSON, 최대 3건)·값 출처('api'|'manual')·마지막 조회 시각
+    naver_lowest_list = db.Column(db.Text, nullable=True)
+    naver_lowest_source = db.Column(db.String(10), nullable=True)
+    naver_lowest_checked_at = db.Column(db.DateTime, nullable=True)
     # 구매 제한: 0이면 제한 없음, N이면 1인당(1주문당) 최대 N개까지 구매 가능
     max_purchase_quantity = db.Column(db.Integer, default=0)
     # 공급사(상품별). 카테고리는 날짜별 운영 예정이므로 발주·취합은 공급사 기준
     supplier = db.Column(db.String(100), nullable=True)
+    # 판매중 여부 (재고 있음 + 마감 전). 목록 정렬·keyset 페이지용으로 저장 — product_sellable.py에서 유지
+    is_sellable = db.Column(db.Boolean, default=True)
+
+    __table_args__ = (
+        db.Index('ix_product_category_sellable', 'category', 'is_sellable', 'id'),
+        db.Index('ix_product_sellable', 'is_sellable', 'id'),
+        db.Index('ix_product_naver_checked', 'naver_lowest_checked_at'),
+    )
 
 
 class Cart(db.Model):
@@ -136,6 +149,7 @@ class Cart(db.Model):
     price = db.Column(db.Integer)
     quantity = db.Column(db.Integer, default=1)
     tax_type = db.Column(db.String(20), default='과세')
+    __table_args__ = (db.Index('ix_cart_user', 'user_id'),)
 
 
 class Order(db.Model):
@@ -160,19 +174,27 @@ class Order(db.Model):
     delivery_lat = db.Column(db.Float, nullable=True)
     delivery_lng = db.Column(db.Float, nullable=True)
     request_memo = db.Column(db.String(500))
-    created_at = db.Column(db.DateTime, default=_now_kst)
+    created_at = db.Column(db.DateTime, default=_now_kst, index=True)
     points_used = db.Column(db.Integer, default=0)
     quick_extra_fee = db.Column(db.Integer, default=0)
     utm_source = db.Column(db.String(100), nullable=True)
     utm_medium = db.Column(db.String(100), nullable=True)
     utm_campaign = db.Column(db.String(100), nullable=True)
+    status_changed_at = db.Column(db.DateTime, nullable=True, index=True)  # 배송 시스템 동기화 기준 (하이워터마크)
+
+
+@event.listens_for(Order.status, 'set')
+def _order_status_changed(target, value, oldvalue, initiator):
+    """주문 상태가 바뀔 때마다 status_changed_at 갱신 → logi_sync는 이 시각 이후 바뀐 주문만 조회."""
+    if value != oldvalue:
+        target.status_changed_at = _now_kst()
 
 
 class OrderItem(db.Model):
     """주문 품목"""
     __tablename__ = "order_item"
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, nullable=False)
     product_name = db.Column(db.String(200), nullable=False)
     product_category = db.Column(db.String(50), nullable=False)
@@ -211,6 +233,7 @@ class UserMessage(db.Model):
     related_order_id = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=_now_kst)
     read_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_user_message_unread', 'user_id', 'read_at', 'id'),)
 
 
 class MessageTemplate(db.Model):
@@ -246,6 +269,11 @@ class RestaurantRequest(db.Model):
     created_at = db.Column(db.DateTime, default=_now_kst)
     is_hidden = db.Column(db.Boolean, default=False)
     is_notice = db.Column(db.Boolean, default=False)
+    # 추천/비추천 수 (restaurant_vote 기준, 투표 시 갱신) → 추천순 목록·이전/다음글을 인덱스 정렬로 조회
+    up_count = db.Column(db.Integer, default=0)
+    down_count = db.Column(db.Integer, default=0)
+
+    __table_args__ = (db.Index('ix_restaurant_request_rank', 'is_hidden', 'is_notice', 'up_count', 'id'),)
 
 
 class RestaurantRecommend(db.Model):
@@ -264,7 +292,10 @@ class RestaurantVote(db.Model):
     restaurant_request_id = db.Column(db.Integer, db.ForeignKey('restaurant_request.id', ondelete='CASCADE'), nullable=False)
     vote_type = db.Column(db.String(10), nullable=False)
     created_at = db.Column(db.DateTime, default=_now_kst)
-    __table_args__ = (db.UniqueConstraint('user_id', 'restaurant_request_id', name='uq_restaurant_vote_user_post'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'restaurant_request_id', name='uq_restaurant_vote_user_post'),
+        db.Index('ix_restaurant_vote_post', 'restaurant_request_id', 'vote_type'),
+    )
 
 
 class PartnershipInquiry(db.Model):
@@ -280,6 +311,8 @@ class PartnershipInquiry(db.Model):
     is_hidden = db.Column(db.Boolean, default=False)
     is_notice = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (db.Index('ix_partnership_inquiry_list', 'is_hidden', 'is_notice', 'id'),)
+
 
 class FreeBoard(db.Model):
     __tablename__ = "free_board"
@@ -292,6 +325,8 @@ class FreeBoard(db.Model):
     is_hidden = db.Column(db.Boolean, default=False)
     is_notice = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (db.Index('ix_free_board_list', 'is_hidden', 'is_notice', 'id'),)
+
 
 class FreeBoardAttachment(db.Model):
     """자유게시판 첨부 (사진 여러 장, 동영상)"""
@@ -378,6 +413,11 @@ class DeliveryRequest(db.Model):
     is_hidden = db.Column(db.Boolean, default=False)
     is_notice = db.Column(db.Boolean, default=False)
     is_secret = db.Column(db.Boolean, default=False)
+    # 추천/비추천 수 (delivery_request_vote 기준, 투표 시 갱신)
+    up_count = db.Column(db.Integer, default=0)
+    down_count = db.Column(db.Integer, default=0)
+
+    __table_args__ = (db.Index('ix_delivery_request_rank', 'is_hidden', 'is_notice', 'up_count', 'id'),)
 
 
 class DeliveryRequestVote(db.Model):
@@ -387,7 +427,10 @@ class DeliveryRequestVote(db.Model):
     delivery_request_id = db.Column(db.Integer, db.ForeignKey('delivery_request.id', ondelete='CASCADE'), nullable=False)
     vote_type = db.Column(db.String(10), nullable=False)
     created_at = db.Column(db.DateTime, default=_now_kst)
-    __table_args__ = (db.UniqueConstraint('user_id', 'delivery_request_id', name='uq_delivery_request_vote_user_post'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'delivery_request_id', name='uq_delivery_request_vote_user_post'),
+        db.Index('ix_delivery_request_vote_post', 'delivery_request_id', 'vote_type'),
+    )
 
 
 class BoardComment(db.Model):
@@ -550,6 +593,11 @@ class Review(db.Model):
     image_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=_now_kst)
 
+    __table_args__ = (
+        db.Index('ix_review_product_created', 'product_id', 'created_at', 'id'),
+        db.Index('ix_review_category_created', 'category_id', 'created_at', 'id'),
+    )
+
 
 class ReviewVote(db.Model):
     """리뷰 추천/비추천 (회원별 1회, 1=추천 -1=비추천)"""
@@ -581,7 +629,7 @@ class Settlement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     settlement_no = db.Column(db.String(32), unique=True, nullable=False)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
-    order_item_id = db.Column(db.Integer, nullable=True)
+    order_item_id = db.Column(db.Integer, nullable=True, index=True)
     sale_dt = db.Column(db.DateTime, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     category_type = db.Column(db.String(20), default='입점형')
@@ -632,3 +680,57 @@ class EmailOrderDispatch(db.Model):
     confirmed_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=_now_kst)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+
+class GeocodeCache(db.Model):
+    """지오코딩 결과 영구 캐시 (워커·재배포 간 공유).
+    kind: geo(주소→좌표), zip(주소→우편번호, 카카오), rzip(좌표→우편번호). found=False는 실패 결과(네거티브 캐시)."""
+    __tablename__ = "geocode_cache"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    cache_key = db.Column(db.String(300), nullable=False)  # 정규화 주소 또는 "lat,lng"(소수 4자리)
+    lat = db.Column(db.Float, nullable=True)
+    lng = db.Column(db.Float, nullable=True)
+    postcode = db.Column(db.String(10), nullable=True)
+    found = db.Column(db.Boolean, default=True)
+    updated_at = db.Column(db.DateTime, default=_now_kst)
+
+    __table_args__ = (db.UniqueConstraint('kind', 'cache_key', name='uq_geocode_cache_kind_key'),)
+
+
+class NotificationOutbox(db.Model):
+    """알림 발송 대기열 (웹푸시·알림톡·이메일). 쪽지/주문 변경과 같은 트랜잭션에 기록하고 백그라운드 디스패처가 발송.
+    status: pending(대기·재시도 예정) → sent(완료) / dead(재시도 한도 초과)."""
+    __tablename__ = "notification_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), nullable=False)   # push / alimtalk / email
+    payload = db.Column(db.Text, nullable=False)         # JSON
+    status = db.Column(db.String(10), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=_now_kst, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=_now_kst)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_notification_outbox_status_next', 'status', 'next_attempt_at'),)
+
+
+class PaymentReconcile(db.Model):
+    """승인 확인(confirm) 응답을 받지 못한 토스 결제. '결제는 됐는데 주문이 없는' 상태를 남기지 않도록
+    백그라운드에서 주문번호로 결제를 조회해 정리 (payment_reconcile.py).
+    status: pending(확인 대기) → finalized(주문 생성됨) / refunded(주문 없이 승인 → 전액 취소)
+            / not_paid(승인 안 됨·만료) / failed(재시도 한도 초과 → 관리자 확인)."""
+    __tablename__ = "payment_reconcile"
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.String(100), nullable=False, unique=True)   # 토스 orderId (= Order.order_id)
+    payment_key = db.Column(db.String(200), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    amount = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(10), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_check_at = db.Column(db.DateTime, default=_now_kst, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=_now_kst)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_payment_reconcile_status_next', 'status', 'next_check_at'),)
@@ -0,0 +1,186 @@
+# --------------------------------------------------------------------------------
+# 네이버 쇼핑 최저가 백그라운드 갱신
+# 상품 상세 진입 시 네이버 API를 동기 호출(최대 2.5~4초)하던 것을 주기 작업으로 옮김 → 상세는 저장값만 읽음.
+# - 대상: 판매중 상품 중 한 번도 조회 안 됨(신규·대량등록 직후) 또는 NAVER_PRICE_MAX_AGE_HOURS 경과 (미조회 우선)
+# - 점유: naver_lowest_checked_at 조건부 UPDATE(리스) → 워커 여러 개여도 같은 상품 중복 조회 없음,
+#   실행 중 프로세스가 죽으면 리스 만료 후 다시 대상
+# - 조회: 스레드 풀 + 토큰 버킷(NAVER_API_QPS, 워커 프로세스 수로 나눔) → 네이버 검색 API 초당 한도 이내
+#   하루 호출 수 ≈ 판매중 상품 수 × (24 / NAVER_PRICE_MAX_AGE_HOURS)
+# - 저장: 배치마다 executemany UPDATE 2문장 + 커밋 1회
+#   관리자가 직접 입력한 최저가(naver_lowest_source='manual')는 덮어쓰지 않고 상세용 목록만 갱신
+# --------------------------------------------------------------------------------
+import os
+import json
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, event, or_, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from delivery_system import db_delivery
+from models import Product, _now_kst
+
+db = db_delivery
+
+NAVER_PRICE_REFRESH_SECONDS = int(os.getenv("NAVER_PRICE_REFRESH_SECONDS", "600"))
+NAVER_PRICE_MAX_AGE_HOURS = int(os.getenv("NAVER_PRICE_MAX_AGE_HOURS", "24"))
+NAVER_PRICE_BATCH = int(os.getenv("NAVER_PRICE_BATCH", "300"))          # 1회 실행 최대 조회 상품 수
+NAVER_PRICE_WORKERS = int(os.getenv("NAVER_PRICE_WORKERS", "4"))
+NAVER_API_QPS = float(os.getenv("NAVER_API_QPS", "8"))                  # 네이버 검색 API 한도(초당 10건) 아래
+NAVER_PRICE_LEASE_SECONDS = 900
+NAVER_PRICE_LIST_SIZE = 3
+NAVER_PRICE_JOB_ID = "naver_price_refresh"
+
+
+class RateLimiter:
+    """토큰 버킷: 초당 rate건, 최대 burst건 연속 허용. acquire()는 토큰이 생길 때까지 대기."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = max(0.1, float(rate))
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# gunicorn 워커마다 스케줄러가 돌므로 프로세스당 몫으로 나눔
+limiter = RateLimiter(NAVER_API_QPS / max(1, int(os.getenv("WEB_CONCURRENCY", "1"))))
+
+
+# ---- 수동 입력 표시 ----
+@event.listens_for(Session, "before_flush")
+def _mark_manual_naver_price(session, flush_context, instances):
+    """관리자 화면·엑셀 등 ORM으로 최저가·링크를 바꾸면 출처를 'manual'로 (백그라운드 갱신이 덮어쓰지 않도록)."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Product):
+            continue
+        attrs = sa_inspect(obj).attrs
+        if attrs.naver_lowest_source.history.has_changes():
+            continue
+        if obj in session.new:
+            changed = obj.naver_lowest_price is not None or obj.naver_lowest_link is not None
+        else:
+            changed = attrs.naver_lowest_price.history.has_changes() or attrs.naver_lowest_link.history.has_changes()
+        if changed:
+            obj.naver_lowest_source = 'manual'
+
+
+# ---- 갱신 ----
+def _claim(limit, now):
+    """갱신 대상 점유. checked_at을 '리스 만료 후 다시 오래된 값'이 되도록 당겨 둠."""
+    table = Product.__table__
+    stale_before = now - timedelta(hours=NAVER_PRICE_MAX_AGE_HOURS)
+    lease = stale_before + timedelta(seconds=NAVER_PRICE_LEASE_SECONDS)
+    checked = table.c.naver_lowest_checked_at
+    claimed = []
+    with db.engine.begin() as conn:
+        rows = conn.execute(
+            table.select()
+            .with_only_columns(table.c.id, table.c.name, checked)
+            .where(table.c.is_active == True, or_(checked.is_(None), checked < stale_before))
+            .order_by(checked.is_(None).desc(), checked.asc(), table.c.id.desc())
+            .limit(limit)
+        ).fetchall()
+        for row in rows:
+            same = checked.is_(None) if row.naver_lowest_checked_at is None else checked == row.naver_lowest_checked_at
+            res = conn.execute(table.update().where(table.c.id == row.id, same).values(naver_lowest_checked_at=lease))
+            if res.rowcount == 1:
+                claimed.append(row)
+    return claimed
+
+
+def _write(results, now):
+    """조회 결과 일괄 저장. 실패한 상품은 건드리지 않음 (리스 만료 후 재시도)."""
+    table = Product.__table__
+    ok = [(row, items) for row, items, error in results if error is None]
+    if not ok:
+        return 0
+    with db.engine.begin() as conn:
+        conn.execute(
+            table.update().where(table.c.id == bindparam('_id')).values(
+                naver_lowest_list=bindparam('_list'), naver_lowest_checked_at=bindparam('_now'),
+            ),
+            [{'_id': row.id, '_list': json.dumps(items, ensure_ascii=False), '_now': now} for row, items in ok],
+        )
+        found = [{'_id': row.id, '_price': items[0].get('price'), '_link': items[0].get('link'),
+                  '_mall': items[0].get('mall_name'), '_now': now}
+                 for row, items in ok if items and items[0].get('price') is not None]
+        if found:
+            conn.execute(
+                table.update().where(
+                    table.c.id == bindparam('_id'),
+                    or_(table.c.naver_lowest_source.is_(None), table.c.naver_lowest_source == 'api'),
+                ).values(
+                    naver_lowest_price=bindparam('_price'), naver_lowest_link=bindparam('_link'),
+                    naver_lowest_mall=bindparam('_mall'), naver_lowest_updated_at=bindparam('_now'),
+                    naver_lowest_source='api',
+                ),
+                found,
+            )
+    return len(ok)
+
+
+def refresh_naver_prices(fetcher, limit=NAVER_PRICE_BATCH, now=None):
+    """fetcher(상품명, 최대 건수) → 최저가순 [{price, link, mall_name, title}, ...] (API 오류는 예외).
+    반환: {'claimed', 'updated', 'failed'}."""
+    now = now or _now_kst()
+    rows = _claim(limit, now)
+    if not rows:
+        return {'claimed': 0, 'updated': 0, 'failed': 0}
+
+    def _fetch(row):
+        limiter.acquire()
+        try:
+            return row, fetcher(row.name, NAVER_PRICE_LIST_SIZE), None
+        except Exception as e:
+            return row, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, NAVER_PRICE_WORKERS), thread_name_prefix="naver-price") as pool:
+        results = list(pool.map(_fetch, rows))
+    updated = _write(results, now)
+    return {'claimed': len(rows), 'updated': updated, 'failed': len(rows) - updated}
+
+
+def stored_price_list(p):
+    """상세 페이지용 저장된 최저가 목록. 아직 조회 전이면 저장된 최저가 1건(수동 입력 포함)."""
+    try:
+        items = json.loads(p.naver_lowest_list) if p.naver_lowest_list else []
+    except (TypeError, ValueError):
+        items = []
+    if not items and p.naver_lowest_price and p.naver_lowest_link:
+        items = [{"price": p.naver_lowest_price, "link": p.naver_lowest_link, "mall_name": p.naver_lowest_mall, "title": None}]
+    return items
+
+
+def schedule_naver_price_refresh(app, scheduler, fetcher):
+    """APScheduler에 최저가 갱신 작업 등록 (NAVER_PRICE_REFRESH_SECONDS 간격, 기동 30초 후 첫 실행)."""
+    def _job():
+        with app.app_context():
+            try:
+                stats = refresh_naver_prices(fetcher)
+                if stats['claimed']:
+                    print(f"[NAVER PRICE] 최저가 갱신 {stats['updated']}/{stats['claimed']}건 (실패 {stats['failed']})", flush=True)
+            except Exception:
+                traceback.print_exc()
+
+    scheduler.add_job(
+        _job, 'interval', seconds=NAVER_PRICE_REFRESH_SECONDS, id=NAVER_PRICE_JOB_ID,
+        replace_existing=True, coalesce=True, max_instances=1,
+        # 스케줄러 시간대(Asia/Seoul) 기준 aware 시각 — naive now()는 UTC 서버에서 9시간 전으로 해석됨
+        next_run_time=datetime.now(scheduler.timezone) + timedelta(seconds=30),
+    )
@@ -0,0 +1,194 @@
+# --------------------------------------------------------------------------------
+# 알림 아웃박스 (웹푸시·카카오 알림톡·이메일 비동기 발송)
+# - enqueue(): 요청 세션에 NotificationOutbox 행만 추가 → 쪽지·주문 변경과 같은 트랜잭션으로 커밋
+# - 커밋 직후 디스패처 스레드를 깨워 스레드 풀에서 발송 (요청 스레드는 외부 API를 기다리지 않음)
+# - 실패 시 지수 백오프 재시도, 한도 초과 시 status='dead' (관리자 화면에서 재시도 가능)
+# - 행 점유는 next_attempt_at 조건부 UPDATE(리스)로 처리 → 워커 여러 개여도 중복 발송 없음,
+#   발송 중 프로세스가 죽으면 리스 만료 후 다른 워커가 재시도
+# --------------------------------------------------------------------------------
+import os
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from delivery_system import db_delivery
+from models import NotificationOutbox, _now_kst
+
+db = db_delivery
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_POLL_SECONDS = int(os.getenv("OUTBOX_POLL_SECONDS", "10"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))   # 30s, 60s, 120s ... (최대 1시간)
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_BATCH_SIZE = 50
+
+_SESSION_FLAG = "_notification_outbox_pending"
+
+
+class RetryLater(Exception):
+    """핸들러가 일부만 실패했을 때: payload를 남은 대상만으로 줄여 재시도 (이미 받은 대상에 중복 발송 방지)."""
+
+    def __init__(self, message, payload=None):
+        super().__init__(message)
+        self.payload = payload
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self._app = None
+        self._handlers = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def register_handler(self, channel, fn):
+        """fn(payload: dict) — 정상 반환이면 발송 완료, 예외면 재시도."""
+        self._handlers[channel] = fn
+
+    def start(self):
+        """워커 프로세스별 디스패처 스레드 1개 (fork 이후 첫 호출 시 시작)."""
+        pid = os.getpid()
+        if self._pid == pid or self._app is None:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._executor = ThreadPoolExecutor(max_workers=max(1, OUTBOX_WORKERS), thread_name_prefix="outbox-send")
+        threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True).start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(OUTBOX_POLL_SECONDS)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception:
+                traceback.print_exc()
+
+    # ---- 발송 ----
+    def drain(self):
+        """발송 가능한 행을 모두 처리. 한 배치씩 점유 → 스레드 풀에서 병렬 발송."""
+        with self._app.app_context():
+            while True:
+                batch = self._claim(OUTBOX_BATCH_SIZE)
+                if not batch:
+                    return
+                list(self._executor.map(self._deliver, batch))
+
+    def _claim(self, limit):
+        table = NotificationOutbox.__table__
+        now = _now_kst()
+        lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed = []
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                table.select()
+                .where(table.c.status == 'pending', table.c.next_attempt_at <= now)
+                .order_by(table.c.next_attempt_at, table.c.id)
+                .limit(limit)
+            ).fetchall()
+            for row in rows:
+                res = conn.execute(
+                    table.update()
+                    .where(table.c.id == row.id, table.c.status == 'pending', table.c.next_attempt_at == row.next_attempt_at)
+                    .values(next_attempt_at=lease_until)
+                )
+                if res.rowcount == 1:
+                    claimed.append(row)
+        return claimed
+
+    def _deliver(self, row):
+        """스레드 풀에서 실행. 행마다 별도 app context(=별도 세션)."""
+        handler = self._handlers.get(row.channel)
+        new_payload = None
+        error = None
+        with self._app.app_context():
+            try:
+                payload = json.loads(row.payload or '{}')
+                if handler is None:
+                    raise RuntimeError(f"등록되지 않은 채널: {row.channel}")
+                handler(payload)
+            except RetryLater as e:
+                error = str(e) or 'retry'
+                new_payload = e.payload
+            except Exception as e:
+                db.session.rollback()
+                error = f"{type(e).__name__}: {e}"
+            self._record(row, error, new_payload)
+
+    def _record(self, row, error, new_payload=None):
+        table = NotificationOutbox.__table__
+        now = _now_kst()
+        if error is None:
+            values = {'status': 'sent', 'sent_at': now, 'attempts': row.attempts + 1, 'last_error': None}
+        else:
+            attempts = row.attempts + 1
+            values = {'attempts': attempts, 'last_error': error[:500]}
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                values['status'] = 'dead'
+                print(f"[OUTBOX] #{row.id} {row.channel} 발송 포기 ({attempts}회): {error[:200]}", flush=True)
+            else:
+                delay = min(3600, OUTBOX_BACKOFF_SECONDS * (2 ** (attempts - 1)))
+                values['next_attempt_at'] = now + timedelta(seconds=delay)
+            if new_payload is not None:
+                values['payload'] = json.dumps(new_payload, ensure_ascii=False)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.update().where(table.c.id == row.id).values(**values))
+        except Exception:
+            traceback.print_exc()  # 기록 실패 시 리스 만료 후 재시도됨
+
+    # ---- 관리자 ----
+    def stats(self):
+        counts = dict(db.session.query(NotificationOutbox.status, func.count(NotificationOutbox.id))
+                      .group_by(NotificationOutbox.status).all())
+        dead = (NotificationOutbox.query.filter_by(status='dead')
+                .order_by(NotificationOutbox.id.desc()).limit(20).all())
+        return {
+            'counts': counts,
+            'dead': [{'id': r.id, 'channel': r.channel, 'attempts': r.attempts, 'last_error': r.last_error,
+                      'created_at': r.created_at.isoformat(timespec='seconds') if r.created_at else None} for r in dead],
+        }
+
+    def requeue_dead(self):
+        n = NotificationOutbox.query.filter_by(status='dead').update(
+            {'status': 'pending', 'attempts': 0, 'next_attempt_at': _now_kst()}, synchronize_session=False)
+        db.session.commit()
+        if n:
+            self.wake()
+        return n
+
+
+dispatcher = OutboxDispatcher()
+
+
+def enqueue(channel, payload):
+    """현재 세션에 발송 대기 행 추가 (커밋은 호출한 쪽에서). 커밋되면 디스패처가 바로 발송."""
+    db.session.add(NotificationOutbox(channel=channel, payload=json.dumps(payload, ensure_ascii=False), next_attempt_at=_now_kst()))
+    db.session.info[_SESSION_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        dispatcher.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_after_rollback(session):
+    session.info.pop(_SESSION_FLAG, None)
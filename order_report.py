@@ -0,0 +1,168 @@
+# --------------------------------------------------------------------------------
+# 관리자 주문 리포트 로더 (주문 현황·정산 탭, 매출/정산 엑셀·이미지 내보내기 공용)
+# 주문마다 OrderItem.query.filter_by(order_id=...)·Product.query.get(...)을 부르던 N+1 대신
+# 주문 1쿼리 + 품목 1쿼리(IN, 청크) → 메모리에서 주문별로 묶음.
+# 상품·카테고리·정산 존재 여부도 처음 필요할 때 한 번에 읽어 둠.
+# 품목 없는 예전 주문의 상품명 조회도 리포트 전체 상품명을 모아 IN 1쿼리(청크),
+# 스트리밍 내보내기에서는 청크 간에 상품명 → 상품 맵을 공유 (청크마다 다시 읽지 않음).
+# --------------------------------------------------------------------------------
+import re
+from collections import defaultdict
+from itertools import islice
+
+from delivery_system import db_delivery
+from models import Category, OrderItem, Product, Settlement
+
+db = db_delivery
+
+IN_CHUNK = 900  # SQLite 바인드 변수 한도(구버전 999) 아래로
+STREAM_CHUNK = 500  # 대용량 내보내기: 주문 몇 건씩 묶어 품목을 읽을지
+
+_DETAIL_PART = re.compile(r'\[(.*?)\] (.*)')
+_DETAIL_ITEM = re.compile(r'(.*?)\((\d+)\)')
+
+
+def _chunks(values, size=IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def load_order_items(order_ids):
+    """order.id 목록 → {order.id: [OrderItem, ...]} (품목 id 순). 취소 품목 포함."""
+    by_order = defaultdict(list)
+    ids = sorted({i for i in order_ids if i is not None})
+    for chunk in _chunks(ids):
+        for oi in OrderItem.query.filter(OrderItem.order_id.in_(chunk)).order_by(OrderItem.order_id, OrderItem.id).all():
+            by_order[oi.order_id].append(oi)
+    return by_order
+
+
+def detail_product_names(product_details):
+    """product_details 텍스트('[카테고리] 상품명(수량), ... | ...') → 상품명 목록 (화면·엑셀 파싱과 같은 규칙)."""
+    names = []
+    for part in (product_details or '').split(' | '):
+        match = _DETAIL_PART.search(part)
+        if not match:
+            continue
+        for item in match.group(2).split(', '):
+            item_match = _DETAIL_ITEM.search(item)
+            if item_match and item_match.group(1).strip():
+                names.append(item_match.group(1).strip())
+    return names
+
+
+def load_products_by_name(names, into=None):
+    """상품명 목록 → {상품명: Product 또는 None} (IN 1쿼리, 청크). 같은 이름이 여럿이면 id가 가장 작은 상품.
+    into를 주면 거기에 채움 (이미 있는 이름은 다시 읽지 않음)."""
+    found = {} if into is None else into
+    todo = sorted({n for n in names if n and n not in found})
+    loaded = {}
+    for chunk in _chunks(todo):
+        for p in Product.query.filter(Product.name.in_(chunk)).order_by(Product.id.asc()).all():
+            loaded.setdefault(p.name, p)
+    for n in todo:
+        found[n] = loaded.get(n)
+    return found
+
+
+class OrderReport:
+    """주문 목록과 그 품목·상품·카테고리를 배치로 읽어 둔 묶음.
+
+    report = load_order_report(Order.query.filter(...).order_by(...))
+    for o in report.orders:
+        for oi in report.items(o, include_cancelled=False): ...
+    """
+
+    def __init__(self, orders, products_by_name=None):
+        self.orders = list(orders)
+        self._items = load_order_items(o.id for o in self.orders)
+        self._products = None
+        self._products_by_name = products_by_name  # 스트리밍 내보내기: 청크 간 공유 맵
+        self._names_loaded = False
+        self._categories = None
+        self._settled_item_ids = None
+
+    def __iter__(self):
+        return iter(self.orders)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def items(self, order, include_cancelled=True):
+        items = self._items.get(order.id, [])
+        if include_cancelled:
+            return items
+        return [oi for oi in items if not oi.cancelled]
+
+    def all_items(self):
+        for o in self.orders:
+            yield from self._items.get(o.id, [])
+
+    # ---- 상품 (품목의 product_id 기준 일괄 조회) ----
+    def product(self, product_id):
+        if not product_id:
+            return None
+        if self._products is None:
+            ids = {oi.product_id for oi in self.all_items() if oi.product_id}
+            self._products = {}
+            for chunk in _chunks(ids):
+                for p in Product.query.filter(Product.id.in_(chunk)).all():
+                    self._products[p.id] = p
+        if product_id not in self._products:
+            self._products[product_id] = db.session.get(Product, product_id)
+        return self._products[product_id]
+
+    def product_by_name(self, name):
+        """품목 없는 예전 주문(product_details 텍스트만 있음)용. 상품명이 같으면 id가 가장 작은 상품.
+        첫 호출 때 이 리포트 주문들의 상품명을 모두 모아 한 번에 읽음."""
+        name = (name or '').strip()
+        if not name:
+            return None
+        if self._products_by_name is None:
+            self._products_by_name = {}
+        if not self._names_loaded:
+            self._names_loaded = True
+            names = [n for o in self.orders for n in detail_product_names(o.product_details)]
+            load_products_by_name(names, into=self._products_by_name)
+        if name not in self._products_by_name:
+            load_products_by_name([name], into=self._products_by_name)
+        return self._products_by_name[name]
+
+    # ---- 카테고리 (정산 유형·면세 여부) ----
+    def category(self, name):
+        if self._categories is None:
+            self._categories = {c.name: c for c in Category.query.all()}
+        return self._categories.get(name)
+
+    # ---- 정산 전용 테이블 ----
+    def has_settlement(self, order_item_id):
+        if self._settled_item_ids is None:
+            ids = [oi.id for oi in self.all_items()]
+            self._settled_item_ids = set()
+            for chunk in _chunks(ids):
+                rows = db.session.query(Settlement.order_item_id).filter(Settlement.order_item_id.in_(chunk)).all()
+                self._settled_item_ids.update(r[0] for r in rows)
+        return order_item_id in self._settled_item_ids
+
+    def mark_settled(self, order_item_id):
+        if self._settled_item_ids is not None:
+            self._settled_item_ids.add(order_item_id)
+
+
+def load_order_report(query):
+    """Order 쿼리(필터·정렬 적용된 상태) → OrderReport. 주문 1쿼리 + 품목 1쿼리(주문 900건당)."""
+    return OrderReport(query.all())
+
+
+def iter_order_reports(query, chunk_size=STREAM_CHUNK):
+    """대용량 내보내기용: 주문을 yield_per로 chunk_size건씩 읽어 OrderReport 단위로 생성.
+    한 번에 메모리에 올라가는 주문·품목이 chunk_size건 분량으로 일정.
+    상품명 → 상품 맵은 청크 간 공유 (상품명 조회는 처음 나온 이름만)."""
+    rows = iter(query.yield_per(chunk_size))
+    products_by_name = {}
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield OrderReport(chunk, products_by_name=products_by_name)
@@ -0,0 +1,162 @@
+# --------------------------------------------------------------------------------
+# 토스 결제 승인 확인(confirm) 응답 유실 보정
+# confirm 호출이 타임아웃·연결 오류(재시도 후에도)로 끝나면 토스에서는 승인됐을 수 있는데 주문은 만들어지지 않음
+# → 결제만 되고 주문이 없는 상태가 남음.
+# - payment_success: 실패 즉시 record_unconfirmed()로 paymentKey·orderId를 별도 트랜잭션에 기록한 뒤
+#   주문번호로 결제를 조회해 승인(DONE)이면 그대로 주문 생성, 결론이 나면 resolve()
+# - 백그라운드(PAYMENT_RECONCILE_SECONDS 간격): 아직 pending인 기록을 다시 조회
+#   주문 있음 → finalized / 승인됐는데 주문 없음 → 전액 취소(refunded) / 승인 안 됨·만료 → not_paid
+#   조회 실패·승인 진행 중이면 백오프 후 재시도, 한도 초과 시 failed (관리자 확인)
+# - 기록 후 PAYMENT_RECONCILE_DELAY_SECONDS 동안은 건드리지 않음 = 요청의 리스 (같은 요청이 아직 조회·주문 생성 중일 수 있음)
+#   gunicorn 워커 timeout(300초)보다 길게 → 요청이 살아 있는 동안에는 백그라운드가 취소하지 않음
+#   같은 주문번호로 결제 완료 화면이 다시 열리면 리스를 새로 잡음
+# - 행 점유는 next_check_at 조건부 UPDATE(리스) → 워커 여러 개여도 같은 결제를 동시에 처리하지 않음
+#   (취소 API는 주문번호 기반 멱등키라 중복 호출돼도 한 번만 취소됨)
+# --------------------------------------------------------------------------------
+import os
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from delivery_system import db_delivery
+from models import Order, PaymentReconcile, _now_kst
+
+db = db_delivery
+
+PAYMENT_RECONCILE_SECONDS = int(os.getenv("PAYMENT_RECONCILE_SECONDS", "120"))
+PAYMENT_RECONCILE_DELAY_SECONDS = 360     # gunicorn_config.timeout(300) + 여유
+PAYMENT_RECONCILE_BACKOFF_SECONDS = 120     # 120s, 240s, 480s ... (최대 1시간)
+PAYMENT_RECONCILE_MAX_ATTEMPTS = 12
+PAYMENT_RECONCILE_BATCH = 20
+PAYMENT_RECONCILE_JOB_ID = "payment_reconcile"
+
+PAID_STATUSES = ("DONE",)
+UNPAID_STATUSES = ("ABORTED", "EXPIRED")
+CANCELED_STATUSES = ("CANCELED", "PARTIAL_CANCELED")
+
+
+def record_unconfirmed(order_id, payment_key, user_id, amount, error):
+    """confirm 응답을 받지 못한 결제 기록 + 요청의 리스(next_check_at = 지금 + DELAY).
+    이미 pending이면 리스만 갱신. 요청 세션과 별도 트랜잭션 → 이후 오류와 무관하게 남음."""
+    table = PaymentReconcile.__table__
+    now = _now_kst()
+    lease_until = now + timedelta(seconds=PAYMENT_RECONCILE_DELAY_SECONDS)
+    try:
+        with db.engine.begin() as conn:
+            if conn.execute(select(table.c.id).where(table.c.order_id == order_id)).first() is None:
+                conn.execute(table.insert().values(
+                    order_id=order_id, payment_key=payment_key, user_id=user_id, amount=amount,
+                    status='pending', attempts=0, last_error=str(error)[:500], created_at=now,
+                    next_check_at=lease_until,
+                ))
+            else:
+                conn.execute(table.update().where(table.c.order_id == order_id, table.c.status == 'pending')
+                             .values(next_check_at=lease_until, last_error=str(error)[:500]))
+        return True
+    except Exception:
+        traceback.print_exc()
+        print(f"[PAYMENT RECONCILE] 기록 실패 orderId={order_id} paymentKey={payment_key}", flush=True)
+        return False
+
+
+def resolve(order_id, status, error=None):
+    """pending 기록을 결론 상태로. 반환: 바뀐 행 수."""
+    table = PaymentReconcile.__table__
+    values = {'status': status, 'resolved_at': _now_kst()}
+    if error is not None:
+        values['last_error'] = str(error)[:500]
+    with db.engine.begin() as conn:
+        res = conn.execute(table.update().where(table.c.order_id == order_id, table.c.status == 'pending').values(**values))
+    return res.rowcount
+
+
+def _claim(limit, now):
+    """확인할 기록 점유: next_check_at을 다음 재시도 시각으로 미뤄 둠 (처리 중 죽으면 그 시각에 다시 대상)."""
+    table = PaymentReconcile.__table__
+    claimed = []
+    with db.engine.begin() as conn:
+        rows = conn.execute(
+            select(table).where(table.c.status == 'pending', table.c.next_check_at <= now)
+            .order_by(table.c.next_check_at.asc()).limit(limit)
+        ).fetchall()
+        for row in rows:
+            backoff = min(PAYMENT_RECONCILE_BACKOFF_SECONDS * (2 ** row.attempts), 3600)
+            res = conn.execute(
+                table.update().where(table.c.id == row.id, table.c.next_check_at == row.next_check_at)
+                .values(next_check_at=now + timedelta(seconds=backoff), attempts=row.attempts + 1)
+            )
+            if res.rowcount == 1:
+                claimed.append(row)
+    return claimed
+
+
+def _retry_or_fail(row, error):
+    """이번 확인에서 결론이 안 남: 한도 전이면 pending 유지(점유 시 미룬 시각에 재시도), 넘으면 failed."""
+    if row.attempts + 1 >= PAYMENT_RECONCILE_MAX_ATTEMPTS:
+        resolve(row.order_id, 'failed', error)
+        print(f"[PAYMENT RECONCILE] 확인 실패 orderId={row.order_id} paymentKey={row.payment_key} — 관리자 확인 필요: {error}", flush=True)
+        return 'failed'
+    table = PaymentReconcile.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.id == row.id).values(last_error=str(error)[:500]))
+    return 'pending'
+
+
+def _reconcile_one(row, lookup, refund):
+    with db.engine.connect() as conn:
+        has_order = conn.execute(select(Order.__table__.c.id).where(Order.__table__.c.order_id == row.order_id)).first()
+    if has_order is not None:
+        resolve(row.order_id, 'finalized')
+        return 'finalized'
+    try:
+        payment = lookup(row.order_id)
+    except Exception as e:
+        return _retry_or_fail(row, f"조회 오류: {e!r}")
+    status = (payment or {}).get('status')
+    if payment is None or status in UNPAID_STATUSES:
+        resolve(row.order_id, 'not_paid', status or 'NOT_FOUND')
+        return 'not_paid'
+    if status in CANCELED_STATUSES:
+        resolve(row.order_id, 'refunded', status)
+        return 'refunded'
+    if status in PAID_STATUSES:
+        payment_key = payment.get('paymentKey') or row.payment_key
+        if refund(payment_key, row.order_id, "결제 확인 응답 지연으로 주문 미생성"):
+            resolve(row.order_id, 'refunded')
+            print(f"[PAYMENT RECONCILE] 주문 없는 승인 결제 전액 취소 orderId={row.order_id}", flush=True)
+            return 'refunded'
+        return _retry_or_fail(row, "취소 API 실패")
+    return _retry_or_fail(row, f"결제 상태 {status}")  # READY·IN_PROGRESS 등: 아직 진행 중
+
+
+def reconcile_payments(lookup, refund, limit=PAYMENT_RECONCILE_BATCH, now=None):
+    """lookup(orderId) → 토스 결제 dict 또는 None(결제 없음), 조회 오류는 예외.
+    refund(paymentKey, orderId, 사유) → 성공 여부. 반환: {결과 상태: 건수}."""
+    stats = {}
+    for row in _claim(limit, now or _now_kst()):
+        try:
+            result = _reconcile_one(row, lookup, refund)
+        except Exception:
+            traceback.print_exc()
+            result = 'error'
+        stats[result] = stats.get(result, 0) + 1
+    return stats
+
+
+def schedule_payment_reconcile(app, scheduler, lookup, refund):
+    """APScheduler에 결제 보정 작업 등록 (PAYMENT_RECONCILE_SECONDS 간격, 기동 60초 후 첫 실행)."""
+    def _job():
+        with app.app_context():
+            try:
+                stats = reconcile_payments(lookup, refund)
+                if stats:
+                    print(f"[PAYMENT RECONCILE] {stats}", flush=True)
+            except Exception:
+                traceback.print_exc()
+
+    scheduler.add_job(
+        _job, 'interval', seconds=PAYMENT_RECONCILE_SECONDS, id=PAYMENT_RECONCILE_JOB_ID,
+        replace_existing=True, coalesce=True, max_instances=1,
+        next_run_time=datetime.now(scheduler.timezone) + timedelta(seconds=60),
+    )
@@ -0,0 +1,235 @@
+# --------------------------------------------------------------------------------
+# 관리자 가격비교(최저가 조사) 백그라운드 작업
+# 붙여넣은 품명을 요청 안에서 한 줄씩 처리(줄마다 상품 조회 2회 + 네이버 호출 + 0.1초 대기)하던 것을
+# 백그라운드 작업으로 옮김 → 300줄을 넣어도 요청은 바로 반환, 탭에서 진행률을 SSE로 받음.
+# - 품명 → 상품 매칭: 상품명 1쿼리로 메모리 색인을 만든 뒤 한 번에 처리
+#   (정확히 일치 우선, 없으면 품명을 포함하는 상품 — 기존 filter_by().first() / ILIKE 순서와 같음)
+# - 네이버 호출: 스레드 풀 + 토큰 버킷(naver_price_refresh.limiter, 백그라운드 최저가 갱신과 같은 한도 공유)
+# - 결과: 기존 price_compare_cache/pc_<회원>_<ms>.json ({"results", "total_lines"}) 그대로 → 엑셀·적용·초기화 변경 없음
+# - 상태: price_compare_cache/job_<id>.json → gunicorn 워커 어느 쪽으로 들어와도 같은 디스크에서 조회
+# --------------------------------------------------------------------------------
+import os
+import json
+import uuid
+import time
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from models import Product
+from naver_price_refresh import limiter
+
+PRICE_COMPARE_WORKERS = int(os.getenv("PRICE_COMPARE_WORKERS", "4"))
+PRICE_COMPARE_STALE_SECONDS = 120         # 진행 기록이 이만큼 멈춘 실행 중 작업은 실패로 봄 (워커 재시작 등)
+PRICE_COMPARE_KEEP_SECONDS = 24 * 3600    # 작업 상태 파일 보관 시간
+PRICE_COMPARE_SAVE_INTERVAL = 0.5         # 진행률 기록 간격(초)
+SSE_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+SSE_STREAM_SECONDS = 300                  # 이후 브라우저가 재연결
+
+
+def split_names(raw_text):
+    """줄 단위로 분리, 각 줄은 앞뒤 공백만 제거(띄어쓰기 유지)."""
+    raw_cleaned = (raw_text or "").strip().replace("\r", "")
+    return [line.strip() for line in raw_cleaned.split("\n") if line.strip()]
+
+
+def match_products(names):
+    """품명 목록 → {품명: 현재 판매가 또는 None}. 상품 테이블 1쿼리."""
+    rows = Product.query.with_entities(Product.id, Product.name, Product.price).order_by(Product.id.asc()).all()
+    exact = {}
+    for row in rows:
+        if row.name is not None:
+            exact.setdefault(row.name, row)
+    lowered = [(row.name.lower(), row) for row in rows if row.name]
+    found = {}
+    for name in set(names):
+        row = exact.get(name)
+        if row is None:
+            needle = name.lower()
+            row = next((r for n, r in lowered if needle in n), None)
+        found[name] = row.price if row is not None else None
+    return found
+
+
+def _row(name, current_price, naver):
+    current_price_str = "{:,}원".format(current_price) if current_price is not None else "-"
+    return {
+        "품명": name,
+        "네이버 상품명": naver["네이버 상품명"],
+        "최저가": naver.get("최저가", "-"),
+        "최저가_숫자": naver.get("최저가_숫자"),
+        "현재_판매가": current_price,
+        "현재_판매가_표시": current_price_str,
+        "상품링크": naver.get("상품링크"),
+        "규격": naver.get("규격", "-"),
+        "택배비 포함 여부": naver.get("택배비 포함 여부", "-"),
+    }
+
+
+def compare_names(names, search, on_progress=None):
+    """search(품명) → 네이버 결과 목록 [{"네이버 상품명", "최저가", ...}, ...] (1건 이상, 예외는 '에러' 행).
+    search=None이면 네이버 호출 없이 'API 키 미설정' 행. 반환: 입력 순서대로 펼친 결과 행 목록.
+    on_progress(처리 건수)는 품명 하나가 끝날 때마다 호출됨 (풀 스레드에서)."""
+    prices = match_products(names)
+    if search is None:
+        return [_row(name, prices[name], {"네이버 상품명": "API 키 미설정"}) for name in names]
+    done = [0]
+    lock = threading.Lock()
+
+    def _fetch(name):
+        limiter.acquire()
+        try:
+            items = search(name)
+        except Exception:
+            items = [{"네이버 상품명": "에러"}]
+        with lock:
+            done[0] += 1
+            count = done[0]
+        if on_progress is not None:
+            on_progress(count)
+        return [_row(name, prices[name], item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max(1, PRICE_COMPARE_WORKERS), thread_name_prefix="price-compare") as pool:
+        return [row for rows in pool.map(_fetch, names) for row in rows]
+
+
+# --------------------------------------------------------------------------------
+# 백그라운드 작업
+# --------------------------------------------------------------------------------
+class PriceCompareJobs:
+    """cache_dir/job_<id>.json 에 상태(status, done, total, file_key), 완료 시 cache_dir/<file_key> 에 결과."""
+
+    def __init__(self):
+        self._app = None
+        self.cache_dir = None
+
+    def init_app(self, app):
+        self._app = app
+        self.cache_dir = os.path.join(app.instance_path, "price_compare_cache")
+
+    def _ensure_dir(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            self.cache_dir = os.path.join(tempfile.gettempdir(), "basket_uncle_price_compare")
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.cache_dir, f"job_{job_id}.json")
+
+    def _save(self, meta):
+        meta['updated_at'] = time.time()
+        tmp = f"{self._meta_path(meta['id'])}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path(meta['id']))
+
+    def get(self, job_id):
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._meta_path(job_id), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError, TypeError):
+            return None
+        if meta['status'] == 'running' and time.time() - meta.get('updated_at', 0) > PRICE_COMPARE_STALE_SECONDS:
+            meta['status'] = 'error'
+            meta['error'] = '작업이 중단되었습니다. 다시 실행해 주세요.'
+        return meta
+
+    def start(self, names, search, owner_id=None):
+        """품명 목록 조사를 별도 스레드(app context)에서 실행. 반환: 작업 상태 dict.
+        search는 request·current_user에 기대지 않아야 함 (compare_names 참고)."""
+        self._ensure_dir()
+        self.cleanup()
+        meta = {
+            'id': uuid.uuid4().hex, 'owner_id': owner_id, 'status': 'running',
+            'done': 0, 'total': len(names), 'rows': 0, 'file_key': None,
+            'created_at': time.time(), 'finished_at': None, 'error': None,
+        }
+        self._save(meta)
+        lock = threading.Lock()
+        saved_at = [0.0]
+
+        def _progress(count):
+            with lock:
+                meta['done'] = max(meta['done'], count)
+                if time.monotonic() - saved_at[0] < PRICE_COMPARE_SAVE_INTERVAL:
+                    return
+                saved_at[0] = time.monotonic()
+                try:
+                    self._save(meta)
+                except OSError:
+                    pass
+
+        def _run():
+            try:
+                with self._app.app_context():
+                    results = compare_names(names, search, on_progress=_progress)
+                file_key = "pc_{}_{}.json".format(owner_id or 0, int(time.time() * 1000))
+                with open(os.path.join(self.cache_dir, file_key), "w", encoding="utf-8") as f:
+                    json.dump({"results": results, "total_lines": len(names)}, f, ensure_ascii=False)
+                with lock:
+                    meta.update(status='done', done=len(names), rows=len(results), file_key=file_key)
+            except Exception as e:
+                traceback.print_exc()
+                with lock:
+                    meta['status'] = 'error'
+                    meta['error'] = f"{type(e).__name__}: {e}"[:300]
+            with lock:
+                meta['finished_at'] = time.time()
+                try:
+                    self._save(meta)
+                except Exception:
+                    traceback.print_exc()
+            elapsed = meta['finished_at'] - meta['created_at']
+            print(f"[PRICE COMPARE] {meta['id']} {meta['status']} ({meta['total']}건 → {meta['rows']}행, {elapsed:.1f}초)", flush=True)
+
+        threading.Thread(target=_run, name="price-compare-job", daemon=True).start()
+        return meta
+
+    def progress_events(self, job_id):
+        """SSE 응답 본문 생성기: 진행률이 바뀔 때마다 progress 이벤트, 끝나면 마지막 이벤트 후 종료.
+        DB·요청 컨텍스트를 쓰지 않음."""
+        yield "retry: 3000\n\n"
+        last = None
+        deadline = time.monotonic() + SSE_STREAM_SECONDS
+        pinged = time.monotonic()
+        while time.monotonic() < deadline:
+            meta = self.get(job_id)
+            if meta is None:
+                return
+            state = (meta['status'], meta['done'])
+            if state != last:
+                last = state
+                pinged = time.monotonic()
+                data = {k: meta.get(k) for k in ('status', 'done', 'total', 'rows', 'error')}
+                yield f"event: progress\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if meta['status'] != 'running':
+                    return
+            elif time.monotonic() - pinged >= SSE_KEEPALIVE_SECONDS:
+                pinged = time.monotonic()
+                yield ": ping\n\n"
+            time.sleep(SSE_POLL_SECONDS)
+
+    def cleanup(self):
+        """보관 시간이 지난 작업 상태 파일 삭제 (결과 파일은 기존처럼 '결과 초기화'에서 삭제)."""
+        now = time.time()
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if not (name.startswith('job_') and name.endswith('.json')):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if now - os.path.getmtime(path) > PRICE_COMPARE_KEEP_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+price_compare_jobs = PriceCompareJobs()
@@ -0,0 +1,125 @@
+# --------------------------------------------------------------------------------
+# 상품 검색 인덱스 (프로세스 내 2-gram 역색인)
+# - 상품명을 NFC·소문자·공백 제거로 정규화 → "삼겹살 500g" 과 "삼겹살500g" 이 같은 키
+# - 2-gram 역색인으로 후보만 모은 뒤 등급별로 정렬 (LIKE '%q%' 전체 스캔 없음):
+#     0: 정규화한 상품명에 검색어가 그대로 포함 (기존 검색 결과, 띄어쓰기 무시)
+#     1: 검색어 단어(공백 구분)가 순서와 무관하게 모두 포함
+#     2: 오타 허용 — 단어마다 한 글자 오타(2-gram 최대 2개 불일치)까지 허용 (4글자 이상 단어만)
+#   같은 등급 안에서는 최신 상품(id 큰 순)
+# - DB 종류와 무관하게 같은 결과 (SQLite·PostgreSQL 모두 확장 없이 동작)
+# - 인덱스는 app.py에서 SnapshotCache로 보관: 상품명·판매여부·노출시작이 바뀐 커밋에 무효화, TTL 경과 시 재생성
+# --------------------------------------------------------------------------------
+import os
+import re
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "60"))            # 초 (다른 워커의 변경 반영 주기)
+FUZZY_MIN_GRAMS = 3     # 2-gram이 이보다 적은 짧은 단어는 오타 허용 없이 그대로 포함돼야 함
+FUZZY_MISSING_GRAMS = 2  # 한 글자 오타 → 그 글자를 포함한 2-gram 최대 2개가 어긋남
+
+# 인덱스에 들어가는 Product 컬럼. 이외 컬럼(재고·조회수·최저가 등)만 바뀐 커밋은 인덱스를 무효화하지 않음
+SEARCH_INDEX_ATTRS = ('id', 'name', 'is_active', 'display_start_at')
+
+TIER_EXACT, TIER_TERMS, TIER_FUZZY = 0, 1, 2
+
+_WS = re.compile(r'\s+')
+
+
+def normalize(text):
+    """NFC + 소문자 + 공백 제거."""
+    return _WS.sub('', unicodedata.normalize('NFC', text or '').lower())
+
+
+def _grams(s):
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+class ProductSearchIndex:
+    """rows: (id, name, is_active, display_start_at) 목록. 위치(pos)는 id 내림차순 순번."""
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: r[0], reverse=True)
+        self._ids = array('q', (r[0] for r in rows))
+        self._names = [normalize(r[1]) for r in rows]
+        self._active = bytearray(1 if r[2] else 0 for r in rows)
+        self._display_start = [r[3] for r in rows]
+        postings = defaultdict(list)
+        for pos, name in enumerate(self._names):
+            for g in _grams(name):
+                postings[g].append(pos)
+        self._postings = {g: array('i', p) for g, p in postings.items()}
+        self._short = [pos for pos, name in enumerate(self._names) if len(name) < 2]  # 2-gram 없는 한 글자 이름
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _visible(self, pos, now):
+        if not self._active[pos]:
+            return False
+        start = self._display_start[pos]
+        return start is None or now is None or start <= now
+
+    def _term_positions(self, term):
+        """단어 하나 → 그 단어를 포함(또는 오타 허용 범위로 포함)하는 위치 집합."""
+        grams = _grams(term)
+        postings = [self._postings.get(g) for g in grams]
+        if len(grams) < FUZZY_MIN_GRAMS:
+            # 짧은 단어: 2-gram 모두 있어야 함 → posting 교집합
+            if any(p is None for p in postings):
+                return set()
+            postings.sort(key=len)
+            found = set(postings[0])
+            for p in postings[1:]:
+                found.intersection_update(p)
+            return found
+        need = max(2, len(grams) - FUZZY_MISSING_GRAMS)
+        hits = Counter()
+        for p in postings:
+            if p is not None:
+                hits.update(p)
+        return {pos for pos, n in hits.items() if n >= need}
+
+    def _char_positions(self, ch):
+        """한 글자 단어 → 그 글자가 들어간 2-gram의 posting 합집합 (+ 한 글자 이름)."""
+        found = set(pos for pos in self._short if ch in self._names[pos])
+        for g, p in self._postings.items():
+            if ch in g:
+                found.update(p)
+        return found
+
+    def search(self, q, now=None):
+        """검색어 → [(등급, 상품 id), ...] (등급 오름차순, 같은 등급은 id 내림차순). 판매중지·노출 전 상품 제외."""
+        nq = normalize(q)
+        if not nq:
+            return []
+        terms = list(dict.fromkeys(t for t in (normalize(w) for w in (q or '').split()) if t))
+        # 각 단어의 후보 집합 교집합 (작은 집합부터)
+        term_sets = sorted(
+            (self._term_positions(t) if len(t) > 1 else self._char_positions(t) for t in terms), key=len
+        )
+        candidates = term_sets[0]
+        for found in term_sets[1:]:
+            candidates = candidates & found
+        ranked = []
+        for pos in candidates:
+            if not self._visible(pos, now):
+                continue
+            name = self._names[pos]
+            if nq in name:
+                tier = TIER_EXACT
+            elif all(t in name for t in terms):
+                tier = TIER_TERMS
+            else:
+                tier = TIER_FUZZY
+            ranked.append((tier, pos))
+        ranked.sort()
+        return [(tier, self._ids[pos]) for tier, pos in ranked]
+
+    def stats(self):
+        return {
+            'products': len(self._ids),
+            'grams': len(self._postings),
+            'postings': sum(len(p) for p in self._postings.values()),
+        }
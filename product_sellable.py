@@ -0,0 +1,90 @@
+# --------------------------------------------------------------------------------
+# 상품 판매중 여부 (product.is_sellable) 유지
+# 목록 정렬 "판매중 먼저 → 최신순"을 (stock <= 0) | (deadline < now) 식 대신 저장된 컬럼으로 처리
+# → (category, is_sellable, id) 인덱스 순서 그대로 keyset 페이지 조회 (OFFSET 재스캔·재정렬 없음)
+# - ORM으로 재고·마감일이 바뀌면 flush 직전에 다시 계산 (신규 상품 포함)
+# - 재고 일괄 UPDATE(결제 차감·재고 초기화)는 같은 문장에서 sellable_clause로 함께 갱신
+# - 마감 시각이 지나는 것은 주기 작업(refresh_product_sellable, 1분)이 반영
+# --------------------------------------------------------------------------------
+import os
+import traceback
+
+from sqlalchemy import and_, event, or_, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from delivery_system import db_delivery
+from models import Product, _now_kst
+
+db = db_delivery
+
+SELLABLE_REFRESH_SECONDS = int(os.getenv("SELLABLE_REFRESH_SECONDS", "60"))
+SELLABLE_REFRESH_JOB_ID = "product_sellable_refresh"
+
+
+def is_sellable(stock, deadline, now):
+    """재고 있음(재고 미설정 포함) + 마감 전."""
+    return (stock is None or stock > 0) and (deadline is None or deadline >= now)
+
+
+def sellable_clause(now, stock=None):
+    """is_sellable과 같은 조건의 SQL 식. stock: 일괄 UPDATE에서 갱신 후 재고 식 (기본 Product.stock)."""
+    stock = Product.stock if stock is None else stock
+    return and_(
+        or_(Product.stock.is_(None), stock > 0),
+        or_(Product.deadline.is_(None), Product.deadline >= now),
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _track_product_sellable(session, flush_context, instances):
+    now = None
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Product):
+            continue
+        if obj not in session.new and not (_changed(obj, 'stock') or _changed(obj, 'deadline')):
+            continue
+        now = now or _now_kst()
+        value = is_sellable(obj.stock, obj.deadline, now)
+        if obj.is_sellable != value:
+            obj.is_sellable = value
+
+
+def _changed(obj, attr):
+    return sa_inspect(obj).attrs[attr].history.has_changes()
+
+
+def refresh_product_sellable(now=None):
+    """저장된 is_sellable이 현재 재고·마감과 다른 상품만 갱신 (주로 마감 시각 경과). 반환: 갱신 수."""
+    now = now or _now_kst()
+    clause = sellable_clause(now)
+    try:
+        stale = [pid for (pid,) in db.session.query(Product.id).filter(Product.is_sellable != clause).all()]
+        if not stale:
+            return 0
+        Product.query.filter(Product.id.in_(stale)).update(
+            {Product.is_sellable: clause}, synchronize_session=False
+        )
+        db.session.commit()
+        return len(stale)
+    except Exception:
+        db.session.rollback()
+        traceback.print_exc()
+        return 0
+
+
+def schedule_sellable_refresh(app, scheduler):
+    """APScheduler에 판매중 여부 갱신 작업 등록 (SELLABLE_REFRESH_SECONDS 간격, 기동 직후 1회)."""
+    from datetime import datetime
+
+    def _job():
+        with app.app_context():
+            n = refresh_product_sellable()
+            if n:
+                print(f"[SELLABLE] 판매중 여부 갱신 {n}건", flush=True)
+
+    scheduler.add_job(
+        _job, 'interval', seconds=SELLABLE_REFRESH_SECONDS, id=SELLABLE_REFRESH_JOB_ID,
+        replace_existing=True, coalesce=True, max_instances=1,
+        # 스케줄러 시간대(Asia/Seoul) 기준 aware 시각 — naive now()는 UTC 서버에서 9시간 전으로 해석됨
+        next_run_time=datetime.now(scheduler.timezone),
+    )
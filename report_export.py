@@ -0,0 +1,219 @@
+# --------------------------------------------------------------------------------
+# 관리자 대용량 리포트 내보내기 (엑셀·CSV)
+# - 행 생성기(DB에서 yield_per로 조금씩 읽음) → openpyxl write_only / csv 로 바로 기록
+#   (list of dict → DataFrame → BytesIO 처럼 데이터셋 사본을 여러 벌 만들지 않음)
+# - CSV: 응답 본문을 제너레이터로 스트리밍. 엑셀: 임시 파일에 쓴 뒤 파일 스트리밍, 응답 종료 시 삭제
+# - 백그라운드 작업: instance/exports/<job_id>.json(상태) + 결과 파일 → 요청 타임아웃과 무관,
+#   gunicorn 워커 어느 쪽으로 들어와도 같은 디스크에서 상태·파일 조회
+# --------------------------------------------------------------------------------
+import os
+import csv
+import json
+import uuid
+import time
+import tempfile
+import threading
+import traceback
+from itertools import chain
+from urllib.parse import quote
+
+from flask import Response, send_file, stream_with_context
+from openpyxl import Workbook
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'  # Flask가 charset=utf-8 을 붙임
+EXPORT_FORMATS = ('xlsx', 'csv')
+EXPORT_KEEP_SECONDS = int(os.getenv("EXPORT_KEEP_SECONDS", str(24 * 3600)))   # 백그라운드 결과 보관 시간
+CSV_FLUSH_ROWS = 500
+
+
+def clean_cell(val):
+    """엑셀/CSV 셀 값 정규화 (한글 깨짐 방지). bytes → UTF-8 문자열, None → ''."""
+    if val is None:
+        return ''
+    if isinstance(val, bytes):
+        return val.decode('utf-8', errors='replace')
+    return val
+
+
+def _peek(rows):
+    """행 제너레이터의 첫 행을 미리 꺼내 봄 → (행 존재 여부, 원래 순서의 반복자)."""
+    rows = iter(rows)
+    for first in rows:
+        return True, chain([first], rows)
+    return False, iter(())
+
+
+def write_xlsx(path, header, rows, sheet_name='Sheet1'):
+    """write_only 워크북: 행을 메모리에 모아두지 않고 순서대로 기록. 반환: 데이터 행 수."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append(list(header))
+    count = 0
+    for row in rows:
+        ws.append([clean_cell(v) for v in row])
+        count += 1
+    wb.save(path)
+    return count
+
+
+def write_csv(path, header, rows):
+    """UTF-8 BOM CSV (엑셀에서 바로 열어도 한글 유지). 반환: 데이터 행 수."""
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for row in rows:
+            w.writerow([clean_cell(v) for v in row])
+            count += 1
+    return count
+
+
+class _LineBuffer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, s):
+        self.parts.append(s)
+
+    def drain(self):
+        out, self.parts = ''.join(self.parts), []
+        return out
+
+
+def iter_csv(header, rows):
+    """CSV 본문을 CSV_FLUSH_ROWS 행 단위 청크로 생성 (첫 청크에 BOM)."""
+    buf = _LineBuffer()
+    w = csv.writer(buf)
+    buf.write('\ufeff')
+    w.writerow(header)
+    n = 0
+    for row in rows:
+        w.writerow([clean_cell(v) for v in row])
+        n += 1
+        if n % CSV_FLUSH_ROWS == 0:
+            yield buf.drain()
+    yield buf.drain()
+
+
+def _attachment(resp, filename):
+    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return resp
+
+
+def export_response(fmt, filename_base, header, rows, sheet_name='Sheet1'):
+    """요청 안에서 바로 내려받기. 행이 하나도 없으면 None (호출한 쪽에서 안내 후 리다이렉트)."""
+    has_rows, rows = _peek(rows)
+    if not has_rows:
+        return None
+    if fmt == 'csv':
+        resp = Response(stream_with_context(iter_csv(header, rows)), mimetype=CSV_MIMETYPE)
+        return _attachment(resp, f"{filename_base}.csv")
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+    os.close(fd)
+    try:
+        write_xlsx(path, header, rows, sheet_name)
+        resp = send_file(path, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=f"{filename_base}.xlsx")
+    except Exception:
+        os.remove(path)
+        raise
+    resp.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return _attachment(resp, f"{filename_base}.xlsx")
+
+
+# --------------------------------------------------------------------------------
+# 백그라운드 내보내기 작업
+# --------------------------------------------------------------------------------
+class ExportJobs:
+    """export_dir/<job_id>.json 에 상태, <job_id>.<fmt> 에 결과 파일. 완료 후 EXPORT_KEEP_SECONDS 지나면 정리."""
+
+    def __init__(self):
+        self._app = None
+        self.export_dir = None
+
+    def init_app(self, app):
+        self._app = app
+        self.export_dir = os.path.join(app.instance_path, "exports")
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.export_dir, f"{job_id}.json")
+
+    def _save(self, meta):
+        tmp = f"{self._meta_path(meta['id'])}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path(meta['id']))
+
+    def get(self, job_id):
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._meta_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def file_path(self, meta):
+        return os.path.join(self.export_dir, f"{meta['id']}.{meta['format']}")
+
+    def start(self, kind, fmt, filename_base, build, owner_id=None, sheet_name='Sheet1'):
+        """build() → (헤더, 행 반복자). 별도 스레드(app context)에서 파일로 기록. 반환: 작업 상태 dict.
+        build는 request·current_user에 기대지 않아야 함 (필요한 값은 호출 시점에 묶어서 넘길 것)."""
+        os.makedirs(self.export_dir, exist_ok=True)
+        self.cleanup()
+        fmt = fmt if fmt in EXPORT_FORMATS else 'xlsx'
+        meta = {
+            'id': uuid.uuid4().hex, 'kind': kind, 'format': fmt, 'owner_id': owner_id,
+            'filename': f"{filename_base}.{fmt}", 'status': 'running', 'rows': 0,
+            'created_at': time.time(), 'finished_at': None, 'error': None,
+        }
+        self._save(meta)
+
+        def _run():
+            path = self.file_path(meta)
+            try:
+                with self._app.app_context():
+                    header, rows = build()
+                    if fmt == 'csv':
+                        meta['rows'] = write_csv(path, header, rows)
+                    else:
+                        meta['rows'] = write_xlsx(path, header, rows, sheet_name)
+                meta['status'] = 'done'
+            except Exception as e:
+                traceback.print_exc()
+                meta['status'] = 'error'
+                meta['error'] = f"{type(e).__name__}: {e}"[:300]
+            meta['finished_at'] = time.time()
+            try:
+                self._save(meta)
+            except Exception:
+                traceback.print_exc()
+            print(f"[EXPORT] {meta['kind']} {meta['id']} {meta['status']} ({meta['rows']}행)", flush=True)
+
+        threading.Thread(target=_run, name=f"export-{kind}", daemon=True).start()
+        return meta
+
+    def cleanup(self):
+        """보관 시간이 지난 결과·상태 파일 삭제 (실행 중 작업은 생성 시각 기준 2배까지 유지)."""
+        now = time.time()
+        try:
+            names = os.listdir(self.export_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            meta = self.get(name[:-5])
+            if meta is None:
+                continue
+            ref = meta.get('finished_at') or (meta.get('created_at', 0) + EXPORT_KEEP_SECONDS)
+            if now - ref < EXPORT_KEEP_SECONDS:
+                continue
+            for p in (self.file_path(meta), self._meta_path(meta['id'])):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+
+export_jobs = ExportJobs()
@@ -0,0 +1,327 @@
+# --------------------------------------------------------------------------------
+# 버전 관리 스키마 마이그레이션
+# - 앱 기동 시 1회 run_migrations() → schema_version 테이블에 없는 버전만 순서대로 적용
+# - PostgreSQL은 pg_advisory_lock 으로 gunicorn 워커 여러 개가 동시에 기동해도 한 곳만 실행
+# - 요청 처리 경로에서는 DDL(ALTER TABLE)을 실행하지 않음 — 새 컬럼·인덱스는 여기에 버전을 추가
+# - 각 마이그레이션은 "없으면 추가" 방식이라, 예전 런타임 보정으로 일부만 반영된 DB에도 안전하게 적용됨
+# --------------------------------------------------------------------------------
+import traceback
+
+from sqlalchemy import inspect, text
+
+# pg_advisory_lock 키 (이 앱의 스키마 마이그레이션 전용 임의 고정값)
+SCHEMA_LOCK_KEY = 5_821_014
+
+MIGRATIONS = []  # [(version, description, fn(conn))]
+
+
+def migration(version, description):
+    def _register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return _register
+
+
+# ---- 헬퍼 ----
+def _col_type(conn, ddl):
+    """SQLite 기준으로 적힌 타입을 PostgreSQL에 맞게 보정 (DATETIME, BOOLEAN DEFAULT 0/1)."""
+    if conn.dialect.name == 'postgresql':
+        ddl = ddl.replace('DATETIME', 'TIMESTAMP')
+        ddl = ddl.replace('BOOLEAN DEFAULT 0', 'BOOLEAN DEFAULT false').replace('BOOLEAN DEFAULT 1', 'BOOLEAN DEFAULT true')
+    return ddl
+
+
+def add_columns(conn, table, columns):
+    """table에 없는 컬럼만 추가. 테이블이 없으면(=create_all이 모델 기준으로 새로 만들 테이블) 건너뜀."""
+    insp = inspect(conn)
+    if not insp.has_table(table):
+        return []
+    existing = {c['name'] for c in insp.get_columns(table)}
+    q = conn.dialect.identifier_preparer.quote
+    added = []
+    for name, ddl in columns:
+        if name in existing:
+            continue
+        conn.execute(text(f"ALTER TABLE {q(table)} ADD COLUMN {q(name)} {_col_type(conn, ddl)}"))
+        added.append(name)
+    if added:
+        print(f"[DB MIGRATION] {table} 컬럼 추가: {', '.join(added)}", flush=True)
+    return added
+
+
+def create_index(conn, name, table, columns):
+    if not inspect(conn).has_table(table):
+        return
+    q = conn.dialect.identifier_preparer.quote
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {q(name)} ON {q(table)} ({', '.join(q(c) for c in columns)})"))
+
+
+def create_trigram_index(conn, name, table, column):
+    """PostgreSQL 전용: pg_trgm GIN 인덱스 (ILIKE '%키워드%' 부분검색용). SQLite 등은 건너뜀.
+    확장 설치 권한이 없으면 경고만 남기고 넘어감 (검색은 인덱스 없이 그대로 동작)."""
+    if conn.dialect.name != 'postgresql' or not inspect(conn).has_table(table):
+        return False
+    q = conn.dialect.identifier_preparer.quote
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {q(name)} ON {q(table)} USING gin ({q(column)} gin_trgm_ops)"
+            ))
+        return True
+    except Exception as e:
+        print(f"[DB MIGRATION] {table}.{column} 트라이그램 인덱스 생략 (pg_trgm 사용 불가): {e}", flush=True)
+        return False
+
+
+# ---- 마이그레이션 목록 (버전은 절대 재사용·변경하지 말 것) ----
+@migration(1, "기존 런타임 컬럼 보정(_ensure_*, init_db, 기동 시 ALTER) 통합")
+def _m001_legacy_columns(conn):
+    add_columns(conn, 'product', [
+        ('description', 'VARCHAR(200)'), ('detail_image_url', 'TEXT'), ('badge', 'VARCHAR(50)'),
+        ('view_count', 'INTEGER DEFAULT 0'), ('supply_price', 'INTEGER'), ('consumer_price', 'INTEGER'),
+        ('supplier', 'VARCHAR(100)'), ('display_start_at', 'DATETIME'),
+        ('naver_lowest_price', 'INTEGER'), ('naver_lowest_link', 'TEXT'), ('naver_lowest_mall', 'TEXT'),
+        ('naver_lowest_updated_at', 'TEXT'), ('max_purchase_quantity', 'INTEGER DEFAULT 0'),
+        ('reset_time', 'VARCHAR(5)'), ('reset_to_quantity', 'INTEGER'), ('last_reset_at', 'DATETIME'),
+    ])
+    add_columns(conn, 'category', [
+        ('seller_name', 'VARCHAR(100)'), ('seller_inquiry_link', 'VARCHAR(500)'), ('order', 'INTEGER DEFAULT 0'),
+        ('description', 'VARCHAR(200)'), ('biz_name', 'VARCHAR(100)'), ('biz_representative', 'VARCHAR(50)'),
+        ('biz_reg_number', 'VARCHAR(50)'), ('biz_online_sales_number', 'VARCHAR(50)'), ('biz_address', 'VARCHAR(200)'),
+        ('biz_contact', 'VARCHAR(50)'), ('bank_name', 'VARCHAR(50)'), ('account_holder', 'VARCHAR(100)'),
+        ('settlement_account', 'VARCHAR(50)'), ('category_type', "VARCHAR(20) DEFAULT '입점형'"),
+        ('min_member_grade', 'INTEGER'), ('delivery_base_fee', 'INTEGER DEFAULT 1900'), ('delivery_free_over', 'INTEGER'),
+        ('delivery_extra_threshold', 'INTEGER'), ('delivery_extra_fee', 'INTEGER DEFAULT 1900'),
+        ('delivery_fee_per_item', 'INTEGER DEFAULT 0'),
+    ])
+    add_columns(conn, 'user', [
+        ('request_memo', 'VARCHAR(500)'), ('utm_source', 'VARCHAR(100)'), ('utm_medium', 'VARCHAR(100)'),
+        ('utm_campaign', 'VARCHAR(100)'), ('member_grade', 'INTEGER DEFAULT 1'), ('member_grade_overridden', 'INTEGER DEFAULT 0'),
+        ('points', 'INTEGER DEFAULT 0'), ('points_accumulated', 'INTEGER DEFAULT 0'), ('points_event', 'INTEGER DEFAULT 0'),
+        ('points_cash', 'INTEGER DEFAULT 0'), ('auth_provider', 'VARCHAR(20)'), ('auth_provider_id', 'VARCHAR(100)'),
+        ('created_at', 'DATETIME'), ('withdrawn_at', 'DATETIME'),
+    ])
+    add_columns(conn, 'order', [
+        ('delivery_fee', 'INTEGER DEFAULT 0'), ('status', "VARCHAR(20) DEFAULT '결제완료'"),
+        ('utm_source', 'VARCHAR(100)'), ('utm_medium', 'VARCHAR(100)'), ('utm_campaign', 'VARCHAR(100)'),
+        ('is_settled', 'INTEGER DEFAULT 0'), ('settled_at', 'DATETIME'), ('payment_method', 'VARCHAR(30)'),
+        ('settlement_status', "VARCHAR(20) DEFAULT '입금대기'"), ('points_used', 'INTEGER DEFAULT 0'),
+        ('quick_extra_fee', 'INTEGER DEFAULT 0'),
+    ])
+    add_columns(conn, 'order_item', [
+        ('item_status', "VARCHAR(30) DEFAULT '결제완료'"), ('status_message', 'TEXT'),
+        ('delivery_proof_image_url', 'VARCHAR(500)'), ('supply_price', 'INTEGER'), ('supplier', 'VARCHAR(100)'),
+        ('settlement_status', "VARCHAR(20) DEFAULT '입금대기'"), ('settled_at', 'DATETIME'),
+    ])
+    add_columns(conn, 'review', [
+        ('user_name', 'VARCHAR(50)'), ('product_name', 'VARCHAR(100)'), ('order_id', 'INTEGER'), ('category_id', 'INTEGER'),
+    ])
+    add_columns(conn, 'settlement', [('category_type', "VARCHAR(20) DEFAULT '입점형'"), ('supply_amount', 'INTEGER')])
+    add_columns(conn, 'point_log', [
+        ('point_type', "VARCHAR(20) DEFAULT 'accumulated'"), ('order_item_id', 'INTEGER'), ('adjusted_by', 'INTEGER'),
+    ])
+    add_columns(conn, 'user_message', [('image_url', 'VARCHAR(500)')])
+    add_columns(conn, 'restaurant_request', [('admin_notes', 'TEXT'), ('is_notice', 'INTEGER DEFAULT 0')])
+    add_columns(conn, 'partnership_inquiry', [
+        ('is_secret', 'BOOLEAN DEFAULT 1'), ('admin_notes', 'TEXT'), ('is_hidden', 'BOOLEAN DEFAULT 0'),
+        ('is_notice', 'INTEGER DEFAULT 0'),
+    ])
+    add_columns(conn, 'delivery_request', [
+        ('is_secret', 'INTEGER DEFAULT 0'), ('image_url', 'VARCHAR(500)'), ('is_notice', 'INTEGER DEFAULT 0'),
+    ])
+    add_columns(conn, 'free_board', [('is_notice', 'INTEGER DEFAULT 0')])
+    add_columns(conn, 'event_board_post', [('is_notice', 'INTEGER DEFAULT 0')])
+    add_columns(conn, 'main_display_config', [
+        ('main_latest_count', 'INTEGER DEFAULT 30'), ('main_closing_count', 'INTEGER DEFAULT 50'),
+    ])
+    add_columns(conn, 'delivery_zone', [
+        ('quick_region_names', 'TEXT'), ('use_quick_region_only', 'BOOLEAN DEFAULT 0'),
+        ('quick_region_polygon_json', 'TEXT'), ('quick_extra_fee', 'INTEGER DEFAULT 10000'), ('quick_extra_message', 'TEXT'),
+    ])
+    add_columns(conn, 'delivery_task', [
+        ('driver_pay_status', "VARCHAR(20) DEFAULT '미지급'"), ('driver_pay_date', 'DATETIME'), ('driver_fee', 'INTEGER'),
+    ])
+
+
+@migration(2, "구 settlement 테이블(settlement_no 없음) → category_settlement, 정산상태 명칭 변경")
+def _m002_settlement_legacy(conn):
+    insp = inspect(conn)
+    if insp.has_table('settlement'):
+        cols = {c['name'] for c in insp.get_columns('settlement')}
+        if 'settlement_no' not in cols:
+            # 새 settlement 테이블은 마이그레이션 후 create_all에서 생성
+            if insp.has_table('category_settlement'):
+                conn.execute(text("DROP TABLE category_settlement"))
+            conn.execute(text("ALTER TABLE settlement RENAME TO category_settlement"))
+            print("[DB MIGRATION] 구 settlement → category_settlement", flush=True)
+    if insp.has_table('order'):
+        conn.execute(text('UPDATE "order" SET settlement_status = \'입금대기\' WHERE settlement_status = \'정산대기\''))
+        conn.execute(text('UPDATE "order" SET settlement_status = \'입금완료\' WHERE settlement_status = \'정산완료\''))
+
+
+@migration(3, "order.status_changed_at (배송 시스템 증분 동기화)")
+def _m003_order_status_changed_at(conn):
+    add_columns(conn, 'order', [('status_changed_at', 'DATETIME')])
+    create_index(conn, 'ix_order_status_changed_at', 'order', ['status_changed_at'])
+
+
+@migration(4, "delivery_task 사진 저장소 컬럼 (photo_url, photo_hash, photo_thumb_url)")
+def _m004_delivery_task_photo(conn):
+    add_columns(conn, 'delivery_task', [
+        ('photo_url', 'VARCHAR(500)'), ('photo_hash', 'VARCHAR(64)'), ('photo_thumb_url', 'VARCHAR(500)'),
+    ])
+
+
+@migration(5, "delivery_task 관제 화면 인덱스 (상태+기사, 완료시각, 카테고리)")
+def _m005_delivery_task_indexes(conn):
+    create_index(conn, 'ix_delivery_task_status_driver', 'delivery_task', ['status', 'driver_id'])
+    create_index(conn, 'ix_delivery_task_completed_at', 'delivery_task', ['completed_at'])
+    create_index(conn, 'ix_delivery_task_category', 'delivery_task', ['category'])
+
+
+@migration(6, "delivery_task_item 채우기 (품목 테이블 도입 이전 입고분)")
+def _m006_backfill_delivery_task_items(conn):
+    from delivery_system import DeliveryTaskItem, logi_task_item_rows
+    rows = conn.execute(text(
+        "SELECT id, product_details FROM delivery_task t "
+        "WHERE NOT EXISTS (SELECT 1 FROM delivery_task_item i WHERE i.task_id = t.id)"
+    )).fetchall()
+    items = [item for r in rows for item in logi_task_item_rows(r.id, r.product_details)]
+    if items:
+        conn.execute(DeliveryTaskItem.__table__.insert(), items)
+        print(f"[DB MIGRATION] 기존 작업 {len(rows)}건 → 품목 {len(items)}개", flush=True)
+
+
+@migration(7, "기사 지급 집계 인덱스 (완료+기간+기사, 품목 키워드 pg_trgm)")
+def _m007_driver_payout_indexes(conn):
+    create_index(conn, 'ix_delivery_task_status_completed', 'delivery_task', ['status', 'completed_at', 'driver_id'])
+    create_trigram_index(conn, 'ix_delivery_task_details_trgm', 'delivery_task', 'product_details')
+
+
+@migration(8, "관리자 주문 리포트 인덱스 (order.created_at, order_item.order_id, settlement.order_item_id)")
+def _m008_order_report_indexes(conn):
+    create_index(conn, 'ix_order_created_at', 'order', ['created_at'])
+    create_index(conn, 'ix_order_item_order_id', 'order_item', ['order_id'])
+    create_index(conn, 'ix_settlement_order_item_id', 'settlement', ['order_item_id'])
+
+
+
+@migration(9, "product.is_sellable (판매중 여부) + 목록·후기 keyset 페이지 인덱스")
+def _m009_catalog_keyset(conn):
+    from models import Product, _now_kst
+    from product_sellable import sellable_clause
+    add_columns(conn, 'product', [('is_sellable', 'BOOLEAN DEFAULT 1')])
+    conn.execute(Product.__table__.update().values(is_sellable=sellable_clause(_now_kst())))
+    create_index(conn, 'ix_product_category_sellable', 'product', ['category', 'is_sellable', 'id'])
+    create_index(conn, 'ix_product_sellable', 'product', ['is_sellable', 'id'])
+    create_index(conn, 'ix_review_product_created', 'review', ['product_id', 'created_at', 'id'])
+    create_index(conn, 'ix_review_category_created', 'review', ['category_id', 'created_at', 'id'])
+
+
+
+@migration(10, "게시판 추천/비추천 수 컬럼(up_count, down_count) + 목록·추천순 인덱스, 레거시 추천 → 투표 이전")
+def _m010_board_vote_counts(conn):
+    # 예전 restaurant_recommend(추천만)를 restaurant_vote(up)로 한 번 이전 (상세 조회 때마다 하던 보정)
+    conn.execute(text(
+        "INSERT INTO restaurant_vote (user_id, restaurant_request_id, vote_type, created_at) "
+        "SELECT r.user_id, r.restaurant_request_id, 'up', r.created_at FROM restaurant_recommend r "
+        "WHERE NOT EXISTS (SELECT 1 FROM restaurant_vote v "
+        "WHERE v.user_id = r.user_id AND v.restaurant_request_id = r.restaurant_request_id)"
+    ))
+    for table, vote_table, fk in (('restaurant_request', 'restaurant_vote', 'restaurant_request_id'),
+                                  ('delivery_request', 'delivery_request_vote', 'delivery_request_id')):
+        add_columns(conn, table, [('up_count', 'INTEGER DEFAULT 0'), ('down_count', 'INTEGER DEFAULT 0')])
+        conn.execute(text(
+            f"UPDATE {table} SET "
+            f"up_count = (SELECT COUNT(*) FROM {vote_table} v WHERE v.{fk} = {table}.id AND v.vote_type = 'up'), "
+            f"down_count = (SELECT COUNT(*) FROM {vote_table} v WHERE v.{fk} = {table}.id AND v.vote_type = 'down')"
+        ))
+        create_index(conn, f'ix_{table}_rank', table, ['is_hidden', 'is_notice', 'up_count', 'id'])
+        create_index(conn, f'ix_{vote_table}_post', vote_table, [fk, 'vote_type'])
+    create_index(conn, 'ix_partnership_inquiry_list', 'partnership_inquiry', ['is_hidden', 'is_notice', 'id'])
+    create_index(conn, 'ix_free_board_list', 'free_board', ['is_hidden', 'is_notice', 'id'])
+
+
+
+@migration(11, "헤더 배지 인덱스 (cart.user_id, user_message 미읽음)")
+def _m011_header_badge_indexes(conn):
+    create_index(conn, 'ix_cart_user', 'cart', ['user_id'])
+    create_index(conn, 'ix_user_message_unread', 'user_message', ['user_id', 'read_at', 'id'])
+
+
+
+@migration(12, "네이버 최저가 백그라운드 갱신 (product.naver_lowest_list·source·checked_at)")
+def _m012_naver_price_refresh(conn):
+    add_columns(conn, 'product', [
+        ('naver_lowest_list', 'TEXT'), ('naver_lowest_source', 'VARCHAR(10)'), ('naver_lowest_checked_at', 'DATETIME'),
+    ])
+    # 기존 값 출처: 판매처(mall)가 있으면 API 조회로 채운 값 (수동 입력·엑셀 등록은 판매처 없이 저장됨)
+    conn.execute(text(
+        "UPDATE product SET naver_lowest_source = CASE WHEN naver_lowest_mall IS NOT NULL THEN 'api' "
+        "WHEN naver_lowest_price IS NOT NULL OR naver_lowest_link IS NOT NULL THEN 'manual' END "
+        "WHERE naver_lowest_source IS NULL"
+    ))
+    create_index(conn, 'ix_product_naver_checked', 'product', ['naver_lowest_checked_at'])
+
+
+# ---- 실행기 ----
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at VARCHAR(32))"
+    ))
+    conn.commit()
+
+
+def applied_versions(conn):
+    return {v for (v,) in conn.execute(text("SELECT version FROM schema_version")).fetchall()}
+
+
+def run_migrations(db):
+    """create_all(새 테이블) → 미적용 버전 순서대로 적용 → create_all(마이그레이션으로 비워진 테이블).
+    버전마다 한 트랜잭션(DDL + schema_version 기록). 실패하면 그 버전부터 중단하고 로그만 남김(서비스는 기동).
+    반환: 이번에 적용한 버전 목록."""
+    from datetime import datetime
+    applied_now = []
+    with db.engine.connect() as conn:
+        is_pg = conn.dialect.name == 'postgresql'
+        if is_pg:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {'k': SCHEMA_LOCK_KEY})
+            conn.commit()
+        try:
+            _ensure_version_table(conn)
+            db.metadata.create_all(bind=conn)
+            conn.commit()
+            done = applied_versions(conn)
+            conn.commit()
+            for version, description, fn in MIGRATIONS:
+                if version in done:
+                    continue
+                try:
+                    fn(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                        {'v': version, 'd': description[:200], 't': datetime.now().isoformat(timespec='seconds')},
+                    )
+                    conn.commit()
+                    applied_now.append(version)
+                    print(f"[DB MIGRATION] v{version} 적용: {description}", flush=True)
+                except Exception:
+                    conn.rollback()
+                    print(f"[DB MIGRATION] v{version} 실패 — 이후 버전 보류", flush=True)
+                    traceback.print_exc()
+                    break
+            if applied_now:
+                db.metadata.create_all(bind=conn)
+                conn.commit()
+        finally:
+            if is_pg:
+                try:
+                    conn.rollback()
+                    conn.execute(text("SELECT pg_advisory_unlock(:k)"), {'k': SCHEMA_LOCK_KEY})
+                    conn.commit()
+                except Exception:
+                    traceback.print_exc()
+    return applied_now
@@ -0,0 +1,92 @@
+"""
+상품 검색 벤치마크 (DB·앱 없이 실행)
+
+- 합성 상품명 N개(기본 1만·10만)로 기존 방식(SQLite LIKE '%q%' + COUNT, 메모리 DB)과
+  product_search.ProductSearchIndex(2-gram 역색인)를 비교한다.
+- 출력: 인덱스 생성 시간, 검색어별 결과 수(LIKE / 인덱스 정확일치 / 인덱스 전체), 평균·p95 응답 시간.
+  실제 서비스의 LIKE는 디스크·네트워크 왕복이 더해지므로 여기 수치가 하한에 가깝다.
+
+실행 (프로젝트 루트에서):
+    python scripts/bench_product_search.py
+    python scripts/bench_product_search.py --sizes=10000,100000 --repeat=20
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+ITEMS = ["삼겹살", "목살", "한우 등심", "닭가슴살", "고등어", "갈치", "청경채", "시금치", "대파", "양파",
+         "사과", "배", "딸기", "샤인머스캣", "감자", "고구마", "두부", "계란", "우유", "김치",
+         "깐마늘", "애호박", "새송이버섯", "오징어", "전복", "연어", "바나나", "블루베리", "쌀", "현미"]
+ORIGINS = ["국내산", "제주", "무농약", "유기농", "냉장", "냉동", "", "", ""]
+SPECS = ["500g", "1kg", "2kg", "1단", "1봉", "10구", "30구", "1팩", "3입", "1.5kg"]
+
+QUERIES = ["삼겹살", "삼겹살 500g", "삼겹살500g", "500g 삼겹살", "닭가슴쌀 500g", "국내산 한우", "한우등심",
+           "샤인머스켓", "머스캣 샤인", "블루베리", "새송이버섯 국산", "kg", "김", "배 1kg"]
+
+
+def _names(n, seed=42):
+    rnd = random.Random(seed)
+    return [f"{rnd.choice(ORIGINS)} {rnd.choice(ITEMS)} {rnd.choice(SPECS)}".strip() for _ in range(n)]
+
+
+def _timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return result, sum(samples) / len(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def bench(size, repeat):
+    from product_search import ProductSearchIndex, TIER_EXACT
+
+    rows = [(i + 1, name, True, None) for i, name in enumerate(_names(size))]
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE product (id INTEGER PRIMARY KEY, name TEXT, is_active BOOLEAN, display_start_at DATETIME)")
+    conn.executemany("INSERT INTO product VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+    t0 = time.perf_counter()
+    index = ProductSearchIndex(rows)
+    build_ms = (time.perf_counter() - t0) * 1000
+    stats = index.stats()
+    print(f"\n== 상품 {size:,}개 | 인덱스 생성 {build_ms:,.0f}ms (2-gram {stats['grams']:,}개, posting {stats['postings']:,}개)")
+    print(f"{'검색어':<14}{'LIKE건수':>9}{'정확':>8}{'전체':>8}{'LIKE avg/p95(ms)':>20}{'인덱스 avg/p95(ms)':>22}")
+
+    for q in QUERIES:
+        pattern = f"%{q}%"
+
+        def _like():
+            # 기존 search_view: COUNT + 첫 50개
+            total = conn.execute("SELECT COUNT(*) FROM product WHERE is_active = 1 AND name LIKE ?", (pattern,)).fetchone()[0]
+            conn.execute("SELECT id FROM product WHERE is_active = 1 AND name LIKE ? ORDER BY id DESC LIMIT 50", (pattern,)).fetchall()
+            return total
+
+        like_total, like_avg, like_p95 = _timed(_like, repeat)
+        ranked, idx_avg, idx_p95 = _timed(lambda: index.search(q), repeat)
+        exact = sum(1 for tier, _pid in ranked if tier == TIER_EXACT)
+        print(f"{q:<14}{like_total:>9,}{exact:>8,}{len(ranked):>8,}"
+              f"{like_avg:>12.2f} / {like_p95:<7.2f}{idx_avg:>12.2f} / {idx_p95:<7.2f}")
+
+
+def main() -> None:
+    sizes = [10000, 100000]
+    repeat = 10
+    for arg in sys.argv[1:]:
+        if arg.startswith("--sizes="):
+            sizes = [int(s) for s in arg.split("=", 1)[1].split(",") if s.strip()]
+        elif arg.startswith("--repeat="):
+            repeat = max(1, int(arg.split("=", 1)[1]))
+    for size in sizes:
+        bench(size, repeat)
+
+
+if __name__ == "__main__":
+    main()
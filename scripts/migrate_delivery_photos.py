@@ -0,0 +1,33 @@
+"""
+배송완료 사진 이전 (1회성)
+
+- delivery_task.photo_data 에 base64로 쌓여 있던 사진을 blob_store(Cloudinary 또는 static/uploads)로 옮기고
+  photo_url / photo_hash / photo_thumb_url 을 채운 뒤 photo_data 를 NULL 로 비운다.
+- 한 행씩 읽어 메모리 사용이 일정하고, 중간에 끊겨도 다시 실행하면 남은 행만 처리한다.
+
+실행 (프로젝트 루트에서):
+    python scripts/migrate_delivery_photos.py
+    python scripts/migrate_delivery_photos.py --batch=50
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main() -> None:
+    batch = 20
+    for arg in sys.argv[1:]:
+        if arg.startswith("--batch="):
+            batch = max(1, int(arg.split("=", 1)[1]))
+
+    from app import app
+    from delivery_system import logi_migrate_photo_blobs
+
+    with app.app_context():
+        moved, failed = logi_migrate_photo_blobs(batch_size=batch)
+    print(f"Done. 이전 {moved}건, 실패 {failed}건 (실패 행은 photo_data 유지)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# --------------------------------------------------------------------------------
+# 프로세스 내 스냅샷 캐시 (메인 페이지 등 조회 전용 데이터 모델)
+# - TTL이 지나면 기존 스냅샷을 그대로 응답하면서 백그라운드 스레드에서 재생성
+# - 관련 모델이 커밋되면 SQLAlchemy after_commit 훅으로 즉시 무효화 → 다음 요청에서 재생성
+# - 스냅샷은 별도 app context(=별도 세션)에서 만들어, 요청 세션의 commit/expire 영향을 받지 않음
+# --------------------------------------------------------------------------------
+import os
+import time
+import threading
+import traceback
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+MAIN_SNAPSHOT_TTL = int(os.getenv("MAIN_SNAPSHOT_TTL", "60"))  # 초
+
+
+class SnapshotCache:
+    """key → builder(key) 결과를 보관. 만료 시 stale 응답 + 백그라운드 재생성, invalidate() 시 전체 폐기."""
+
+    def __init__(self, app, builder, ttl=MAIN_SNAPSHOT_TTL, max_entries=16, name="snapshot"):
+        self.app = app
+        self.builder = builder
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries = OrderedDict()  # key -> (built_at, data)
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._refreshing = set()
+        self._generation = 0
+        self.builds = 0
+
+    def _build(self, key):
+        """새 app context(=새 DB 세션)에서 생성. 컨텍스트 종료 시 세션이 닫혀 객체는 로드된 값 그대로 분리됨."""
+        with self.app.app_context():
+            return self.builder(key)
+
+    def _store(self, key, data, generation):
+        with self._lock:
+            if generation != self._generation:
+                return  # 생성 도중 무효화됨 → 버림
+            self._entries[key] = (time.monotonic(), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.builds += 1
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            generation = self._generation
+
+        def _run():
+            try:
+                self._store(key, self._build(key), generation)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, name=f"{self.name}-refresh", daemon=True).start()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        if entry is not None:
+            if time.monotonic() - entry[0] > self.ttl:
+                self._refresh_in_background(key)
+            return entry[1]
+        # 스냅샷 없음: 동시 요청 중 하나만 생성, 나머지는 대기 후 결과 사용
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry[1]
+            data = self._build(key)
+            self._store(key, data, generation)
+            return data
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+def invalidate_on_commit(cache, models, ignore_attrs=()):
+    """models 중 하나라도 추가·수정·삭제된 트랜잭션이 커밋되면 cache.invalidate().
+    ignore_attrs에 있는 컬럼만 바뀐 수정(예: 조회수)은 무시."""
+    models = tuple(models)
+    ignore_attrs = frozenset(ignore_attrs)
+    flag = f"_snapshot_dirty_{id(cache)}"
+
+    def _is_relevant_update(obj):
+        changed = {a.key for a in sa_inspect(obj).attrs if a.history.has_changes()}
+        return bool(changed - ignore_attrs)
+
+    @event.listens_for(Session, "after_flush")
+    def _after_flush(session, flush_context):
+        if session.info.get(flag):
+            return
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, models):
+                session.info[flag] = True
+                return
+        for obj in session.dirty:
+            if isinstance(obj, models) and _is_relevant_update(obj):
+                session.info[flag] = True
+                return
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _bulk_write(orm_execute_state):
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, models):
+            orm_execute_state.session.info[flag] = True
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        if session.info.pop(flag, False):
+            cache.invalidate()
+
+    @event.listens_for(Session, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop(flag, None)
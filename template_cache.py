@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------------------
+# 컴파일된 템플릿 캐시 (render_template_string 대체)
+# Flask의 render_template_string은 요청마다 HEADER_HTML + content + FOOTER_HTML 전체를
+# Jinja로 다시 파싱·컴파일함. 여기서는 소스 해시 기준으로 프로세스당 1회만 컴파일하고
+# 크기 제한 LRU로 보관 (f-string으로 매번 달라지는 소스가 섞여도 메모리 무한 증가 없음).
+# --------------------------------------------------------------------------------
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+TEMPLATE_CACHE_MAX = int(os.getenv("TEMPLATE_CACHE_MAX", "256"))
+
+
+class TemplateRegistry:
+    """소스 해시 → 컴파일된 Jinja Template. Jinja 환경(app)별로 구분, LRU 제거, 적중/미적중 집계."""
+
+    def __init__(self, max_size=TEMPLATE_CACHE_MAX):
+        self.max_size = max(1, int(max_size))
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, env, source):
+        key = (id(env), hashlib.sha1(source.encode("utf-8")).hexdigest())
+        with self._lock:
+            tpl = self._templates.get(key)
+            if tpl is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return tpl
+            self.misses += 1
+        # 컴파일은 락 밖에서 (동시 미적중 시 중복 컴파일은 허용, 결과는 동일)
+        tpl = env.from_string(source)
+        with self._lock:
+            self._templates[key] = tpl
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+        return tpl
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._templates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_registry = TemplateRegistry()
+
+
+def render_template_string(source, **context):
+    """flask.render_template_string과 동일한 사용법. 컴파일 결과만 캐시하고 context processor는 요청마다 적용."""
+    app = current_app._get_current_object()
+    template = _registry.get(app.jinja_env, source)
+    app.update_template_context(context)
+    return template.render(context)
+
+
+def template_cache_stats():
+    """템플릿 캐시 현황 (관리자 디버그용)."""
+    return _registry.stats()
+
+
+def clear_template_cache():
+    _registry.clear()
@@ -0,0 +1,59 @@
+# --------------------------------------------------------------------------------
+# 테스트 공통 설정
+# app 모듈은 import 시점에 DATABASE_URL로 DB를 만들고 마이그레이션을 실행하므로
+# import 전에 임시 SQLite 파일·백그라운드 작업 끔을 환경변수로 지정.
+# 실행: 저장소 루트에서 python -m pytest -q
+# --------------------------------------------------------------------------------
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="basket_uncle_test_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_DB_DIR, "test.db")
+os.environ["BACKGROUND_JOBS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from models import Cart, Category, Product, User  # noqa: E402
+
+db = app_module.db
+
+
+@pytest.fixture(scope="session")
+def app():
+    return app_module.app
+
+
+@pytest.fixture
+def make_product(app):
+    """재고 stock인 상품 1개 생성 → Product (카테고리는 입점형 '테스트')."""
+    def _make(stock, price=1000, name=None):
+        with app.app_context():
+            if not Category.query.filter_by(name="테스트").first():
+                db.session.add(Category(name="테스트", tax_type="과세", order=99))
+            p = Product(category="테스트", name=name or f"테스트상품-{uuid.uuid4().hex[:8]}", price=price,
+                        stock=stock, is_active=True)
+            db.session.add(p)
+            db.session.commit()
+            return p.id
+    return _make
+
+
+@pytest.fixture
+def make_user_with_cart(app):
+    """장바구니에 (상품 id, 수량) 목록을 담은 회원 생성 → user id."""
+    def _make(lines):
+        with app.app_context():
+            u = User(email=f"{uuid.uuid4().hex[:12]}@test.local", name="테스트회원", phone="010-0000-0000")
+            db.session.add(u)
+            db.session.flush()
+            for pid, qty in lines:
+                p = db.session.get(Product, pid)
+                db.session.add(Cart(user_id=u.id, product_id=pid, product_name=p.name, product_category=p.category,
+                                    price=p.price, quantity=qty, tax_type="과세"))
+            db.session.commit()
+            return u.id
+    return _make
@@ -0,0 +1,35 @@
+# --------------------------------------------------------------------------------
+# 지오코딩 캐시 (geocode_cache.py)
+# 관리자 워밍업의 조회는 적중/미적중 통계에 넣지 않음 → 통계는 실제 요청의 적중률만
+# --------------------------------------------------------------------------------
+import time
+import uuid
+
+from geocode_cache import KIND_GEO, MISS, geocode_cache, start_warmup, warmup_status
+
+
+def _counters():
+    stats = geocode_cache.stats()
+    return stats["memory_hits"], stats["db_hits"], stats["misses"]
+
+
+def test_warmup_lookups_do_not_skew_hit_stats(app):
+    cached, fresh = f"캐시주소 {uuid.uuid4().hex[:8]}", f"새주소 {uuid.uuid4().hex[:8]}"
+    geocode_cache.put(KIND_GEO, cached, (37.5, 127.0), persist=False)
+
+    def _geocode(addr):  # app._geocode_address처럼 캐시 조회 후 저장
+        if geocode_cache.get(KIND_GEO, addr) is MISS:
+            geocode_cache.put(KIND_GEO, addr, (37.6, 127.1), persist=False)
+
+    before = _counters()
+    assert start_warmup(app, lambda: [cached, fresh], _geocode, delay_seconds=0)
+    deadline = time.monotonic() + 5
+    while warmup_status()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status = warmup_status()
+    assert (status["running"], status["done"], status["fetched"]) == (False, 2, 1)
+    assert _counters() == before
+    # 워밍업 밖(요청)의 조회는 그대로 집계
+    assert geocode_cache.get(KIND_GEO, fresh) == (37.6, 127.1)
+    assert _counters() == (before[0] + 1, before[1], before[2])
@@ -0,0 +1,53 @@
+# --------------------------------------------------------------------------------
+# 배송관제 대시보드 (/logi/) 사진보기
+# 저장소로 이전된 사진(photo_url)뿐 아니라 이전 전 base64(photo_data만 있는 행)도 버튼 표시
+# → /logi/api/photo 의 예전 데이터 분기로 열림. 목록 조회는 photo_data 원본을 읽지 않음
+# --------------------------------------------------------------------------------
+import uuid
+
+from sqlalchemy import event
+
+import app as app_module
+from delivery_system import DeliveryTask
+
+db = app_module.db
+
+
+def test_photo_button_for_migrated_and_legacy_photos(app):
+    tag = uuid.uuid4().hex[:8]
+    with app.app_context():
+        tasks = [
+            DeliveryTask(order_id=f"L{tag}-url", category="테스트", address=f"사진주소-{tag}", photo_url="/blob/a.jpg"),
+            DeliveryTask(order_id=f"L{tag}-legacy", category="테스트", address=f"사진주소-{tag}", photo_data="data:image/jpeg;base64,AAAA"),
+            DeliveryTask(order_id=f"L{tag}-none", category="테스트", address=f"사진주소-{tag}"),
+        ]
+        db.session.add_all(tasks)
+        db.session.commit()
+        url_id, legacy_id, none_id = (t.id for t in tasks)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+        sess['admin_username'] = 'admin'
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        res = client.get('/logi/', query_string={'q': f"사진주소-{tag}"})
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    html = res.get_data(as_text=True)
+    assert res.status_code == 200
+    assert f"viewPhoto('{url_id}')" in html
+    assert f"viewPhoto('{legacy_id}')" in html
+    assert f"viewPhoto('{none_id}')" not in html
+    assert not any("photo_data AS" in s for s in statements)
+
+    photo = client.get(f'/logi/api/photo/{legacy_id}').get_json()
+    assert photo == {"success": True, "photo": "data:image/jpeg;base64,AAAA"}
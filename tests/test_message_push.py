@@ -0,0 +1,42 @@
+# --------------------------------------------------------------------------------
+# 새 메시지 SSE (message_push.py)
+# - 스레드 워커가 아니면(sync 워커: wsgi.multithread=False) 스트림을 열지 않고 503 → 브라우저 폴링
+# - DB 커넥션 풀은 요청 스레드 수(GUNICORN_THREADS) 기준
+# --------------------------------------------------------------------------------
+import os
+
+import app as app_module
+
+db = app_module.db
+
+
+def _login(client, user_id=1):
+    with client.session_transaction() as s:
+        s['_user_id'] = str(user_id)
+        s['_fresh'] = True
+
+
+def test_stream_refused_on_single_threaded_server(app, make_user_with_cart):
+    client = app.test_client()
+    _login(client, make_user_with_cart([]))
+    r = client.get('/api/messages/stream', environ_overrides={'wsgi.multithread': False})
+    assert r.status_code == 503
+    assert r.get_json() == {"error": "stream_unavailable"}
+
+
+def test_stream_opens_on_threaded_server(app, make_user_with_cart):
+    client = app.test_client()
+    _login(client, make_user_with_cart([]))
+    r = client.get('/api/messages/stream', environ_overrides={'wsgi.multithread': True}, buffered=False)
+    try:
+        assert r.status_code == 200
+        assert r.mimetype == 'text/event-stream'
+        assert next(r.response).startswith(b'retry:')
+    finally:
+        r.close()
+
+
+def test_db_pool_sized_for_request_threads(app):
+    threads = int(os.getenv("DB_POOL_SIZE") or os.getenv("GUNICORN_THREADS") or "32")
+    with app.app_context():
+        assert db.engine.pool.size() == threads
@@ -0,0 +1,86 @@
+# --------------------------------------------------------------------------------
+# 결제 완료 후 주문 확정(_finalize_order_from_cart)
+# - 동시 결제: 재고 K개 상품을 N명이 동시에 결제하면 정확히 K건만 주문 생성, 재고는 0 (초과 판매 없음)
+# - 쿼리 수: 장바구니 줄 수가 늘어도 실행되는 SQL 문장 수는 같음 (줄마다 조회·INSERT 없음)
+# --------------------------------------------------------------------------------
+import threading
+import uuid
+
+from sqlalchemy import event
+
+import app as app_module
+from models import Cart, Order, OrderItem, Product, Settlement, User
+
+db = app_module.db
+
+
+def _checkout(app, user_id):
+    """한 회원의 장바구니로 주문 확정. 반환: 생성된 Order id 또는 None."""
+    with app.test_request_context("/order/payment/success"):
+        user = db.session.get(User, user_id)
+        items = Cart.query.filter_by(user_id=user_id).all()
+        order = app_module._finalize_order_from_cart(user, items, "T" + uuid.uuid4().hex[:20], payment_key="test")
+        order_id = order.id if order is not None else None
+        db.session.remove()
+        return order_id
+
+
+def test_parallel_checkouts_never_oversell(app, make_product, make_user_with_cart):
+    stock, buyers = 5, 20
+    pid = make_product(stock)
+    user_ids = [make_user_with_cart([(pid, 1)]) for _ in range(buyers)]
+    barrier = threading.Barrier(buyers)
+    results, errors = [], []
+
+    def _run(uid):
+        barrier.wait()
+        try:
+            results.append(_checkout(app, uid))
+        except Exception as e:  # DB 잠금 오류 등도 실패로 집계 (성공 수 검사에서 드러남)
+            errors.append(e)
+
+    threads = [threading.Thread(target=_run, args=(uid,)) for uid in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    succeeded = [oid for oid in results if oid is not None]
+    assert len(succeeded) == stock
+    with app.app_context():
+        assert db.session.get(Product, pid).stock == 0
+        assert Order.query.filter(Order.user_id.in_(user_ids)).count() == stock
+        # 실패한 회원의 장바구니는 그대로 (주문·장바구니 삭제 모두 롤백)
+        assert Cart.query.filter(Cart.user_id.in_(user_ids)).count() == buyers - stock
+
+
+def _count_statements(app, user_id):
+    """주문 확정 동안 DB로 나간 SQL 문장 수 (before_cursor_execute 기준, executemany는 1건)."""
+    count = [0]
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        count[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        assert _checkout(app, user_id) is not None
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return count[0]
+
+
+def test_statement_count_independent_of_cart_size(app, make_product, make_user_with_cart):
+    one = make_user_with_cart([(make_product(100), 1)])
+    ten = make_user_with_cart([(make_product(100), 2) for _ in range(10)])
+    assert _count_statements(app, ten) == _count_statements(app, one)
+    with app.app_context():
+        order = Order.query.filter_by(user_id=ten).one()
+        items = OrderItem.query.filter_by(order_id=order.id).all()
+        settlements = Settlement.query.filter_by(order_id=order.id).all()
+        assert len(items) == len(settlements) == 10
+        assert {s.order_item_id for s in settlements} == {oi.id for oi in items}
+        assert all(s.settlement_no == "N" + str(s.order_item_id).zfill(10) for s in settlements)
+        assert all(oi.cancelled is False and oi.quantity == 2 for oi in items)
@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------------------
+# 관리자 주문 리포트 (order_report.py)
+# - 품목 없는 예전 주문의 상품명 조회: 리포트당 상품 IN 쿼리 1회, 스트리밍 청크 간 재조회 없음
+# --------------------------------------------------------------------------------
+import uuid
+
+from sqlalchemy import event
+
+import app as app_module
+from models import Order, Product
+from order_report import iter_order_reports, load_order_report
+
+db = app_module.db
+
+
+def _legacy_orders(app, names, count):
+    """품목(OrderItem) 없이 product_details 텍스트만 있는 주문 count건 → 주문 order_id 접두어."""
+    prefix = "LEGACY" + uuid.uuid4().hex[:8]
+    with app.app_context():
+        for n in range(count):
+            picked = [names[(n + k) % len(names)] for k in range(3)]
+            details = f"[테스트] {picked[0]}(1), {picked[1]}(2) | [기타] {picked[2]}(3)"
+            db.session.add(Order(order_id=f"{prefix}-{n}", product_details=details, status='결제완료', total_price=0))
+        db.session.commit()
+    return prefix
+
+
+def _count_product_selects(app, fn):
+    count = [0]
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM product" in statement:
+            count[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", _on_execute)
+        try:
+            result = fn()
+        finally:
+            event.remove(engine, "before_cursor_execute", _on_execute)
+    return count[0], result
+
+
+def _lookup_all(reports):
+    found = {}
+    for report in reports:
+        for o in report.orders:
+            for part in o.product_details.split(' | '):
+                for item in part.split('] ', 1)[1].split(', '):
+                    name = item.rsplit('(', 1)[0]
+                    p = report.product_by_name(name)
+                    found[name] = p.id if p else None
+    return found
+
+
+def test_product_by_name_loads_all_names_in_one_query(app, make_product):
+    names = [f"옛상품-{uuid.uuid4().hex[:6]}" for _ in range(12)]
+    first_ids = {n: make_product(10, name=n) for n in names[:10]}
+    make_product(10, name=names[0])  # 같은 이름 중복 → id가 가장 작은 상품
+    prefix = _legacy_orders(app, names, 40)
+
+    queries, found = _count_product_selects(app, lambda: _lookup_all(
+        [load_order_report(Order.query.filter(Order.order_id.like(prefix + '%')).order_by(Order.id))]
+    ))
+    assert queries == 1
+    assert found == {**first_ids, names[10]: None, names[11]: None}
+
+
+def test_streaming_chunks_share_product_map(app, make_product):
+    names = [f"옛상품-{uuid.uuid4().hex[:6]}" for _ in range(5)]
+    for n in names:
+        make_product(10, name=n)
+    prefix = _legacy_orders(app, names, 30)
+
+    queries, found = _count_product_selects(app, lambda: _lookup_all(list(iter_order_reports(
+        Order.query.filter(Order.order_id.like(prefix + '%')).order_by(Order.id), chunk_size=7,
+    ))))
+    assert queries == 1  # 5개 청크, 상품명은 첫 청크에서 모두 나옴
+    with app.app_context():
+        assert found == {n: Product.query.filter_by(name=n).one().id for n in names}
@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------
+# 토스 승인 확인(confirm) 응답 유실 보정
+# - confirm 연결 오류 → 주문번호 조회가 승인(DONE)이면 같은 요청에서 주문 생성, 기록은 finalized
+# - 조회도 실패 → 실패 화면 + paymentKey·orderId 기록(pending) 유지, 리스 동안 백그라운드는 건드리지 않음
+# - 백그라운드: 승인됐는데 주문 없음 → 전액 취소(refunded) / 결제 없음 → not_paid / 조회 오류 → 재시도
+# --------------------------------------------------------------------------------
+import uuid
+from datetime import timedelta
+
+import pytest
+import requests
+
+import app as app_module
+import payment_reconcile
+from models import Order, PaymentReconcile, Product, _now_kst
+
+db = app_module.db
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+
+@pytest.fixture
+def toss(monkeypatch):
+    """integration_http 대체: confirm은 항상 연결 오류, 주문번호 조회는 toss['lookup'] 결과, 취소 호출은 기록."""
+    state = {'lookup': None, 'cancels': [], 'lookup_kwargs': []}
+
+    def _post(name, url, **kwargs):
+        if url.endswith('/confirm'):
+            raise requests.ConnectionError("reset by peer")
+        state['cancels'].append(url)
+        return _Response(200, {})
+
+    def _get(name, url, **kwargs):
+        state['lookup_kwargs'].append(kwargs)
+        lookup = state['lookup']
+        if isinstance(lookup, Exception):
+            raise lookup
+        return _Response(404, {}) if lookup is None else _Response(200, lookup)
+
+    monkeypatch.setattr(app_module.integration_http, "post", _post)
+    monkeypatch.setattr(app_module.integration_http, "get", _get)
+    return state
+
+
+def _pay(app, user_id, oid, pk, amount):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+    return client.get('/payment/success', query_string={'paymentKey': pk, 'orderId': oid, 'amount': amount})
+
+
+def _record(app, oid):
+    with app.app_context():
+        return PaymentReconcile.query.filter_by(order_id=oid).first()
+
+
+def test_confirm_error_with_done_payment_creates_order(app, toss, make_product, make_user_with_cart):
+    pid = make_product(3, price=1000)
+    uid = make_user_with_cart([(pid, 2)])
+    oid, pk = "T" + uuid.uuid4().hex[:20], "pk-" + uuid.uuid4().hex[:8]
+    toss['lookup'] = {'status': 'DONE', 'paymentKey': pk, 'orderId': oid, 'totalAmount': 2000}
+
+    res = _pay(app, uid, oid, pk, 2000)
+
+    assert res.status_code == 200
+    assert toss['cancels'] == []
+    with app.app_context():
+        assert Order.query.filter_by(order_id=oid).count() == 1
+        assert db.session.get(Product, pid).stock == 1
+    assert _record(app, oid).status == 'finalized'
+
+
+def test_confirm_and_lookup_error_keeps_record(app, toss, make_product, make_user_with_cart):
+    pid = make_product(3)
+    uid = make_user_with_cart([(pid, 1)])
+    oid, pk = "T" + uuid.uuid4().hex[:20], "pk-" + uuid.uuid4().hex[:8]
+    toss['lookup'] = requests.ConnectionError("still down")
+
+    res = _pay(app, uid, oid, pk, 1000)
+
+    assert res.status_code == 302 and '/payment/fail' in res.headers['Location']
+    record = _record(app, oid)
+    assert (record.status, record.payment_key, record.user_id, record.amount) == ('pending', pk, uid, 1000)
+    # 요청 안 조회는 짧게 1번, 기록은 워커 timeout(300초)보다 오래 백그라운드가 건드리지 않음 (요청의 리스)
+    assert toss['lookup_kwargs'][-1]['retries'] == 0
+    assert record.next_check_at - record.created_at >= timedelta(seconds=300)
+    with app.app_context():
+        assert payment_reconcile.reconcile_payments(lambda oid: {'status': 'DONE'}, lambda *a: True) == {}
+        assert Order.query.filter_by(order_id=oid).count() == 0
+
+
+def _pending(app, oid, pk="pk-test", attempts=0):
+    with app.app_context():
+        db.session.add(PaymentReconcile(order_id=oid, payment_key=pk, status='pending', attempts=attempts,
+                                        next_check_at=_now_kst() - timedelta(seconds=1)))
+        db.session.commit()
+
+
+def test_reconcile_refunds_paid_payment_without_order(app):
+    paid, unpaid, flaky = ("R" + uuid.uuid4().hex[:20] for _ in range(3))
+    for oid in (paid, unpaid, flaky):
+        _pending(app, oid)
+    payments = {paid: {'status': 'DONE', 'paymentKey': 'pk-real'}, unpaid: None}
+    refunds = []
+
+    def _lookup(oid):
+        if oid not in payments:
+            raise requests.Timeout("timeout")
+        return payments[oid]
+
+    with app.app_context():
+        stats = payment_reconcile.reconcile_payments(_lookup, lambda pk, oid, reason: refunds.append((pk, oid)) or True)
+
+    assert stats == {'refunded': 1, 'not_paid': 1, 'pending': 1}
+    assert refunds == [('pk-real', paid)]
+    assert _record(app, paid).status == 'refunded'
+    assert _record(app, unpaid).status == 'not_paid'
+    record = _record(app, flaky)
+    assert record.status == 'pending' and record.attempts == 1 and record.next_check_at > _now_kst()
+    # 재시도 시각 전에는 다시 점유하지 않음
+    with app.app_context():
+        assert payment_reconcile.reconcile_payments(_lookup, lambda *a: True) == {}
@@ -0,0 +1,47 @@
+# --------------------------------------------------------------------------------
+# 관리자 가격비교 진행률 SSE (/admin/price_compare/progress)
+# 스레드 워커가 아니면 503 (작업 내내 워커를 붙잡지 않음) → 화면은 잠시 후 새로고침으로 진행률 확인
+# --------------------------------------------------------------------------------
+import time
+import uuid
+
+import app as app_module
+from models import User
+
+db = app_module.db
+
+
+def _admin_client(app):
+    with app.app_context():
+        u = User(email=f"{uuid.uuid4().hex[:12]}@test.local", name="관리자", is_admin=True)
+        db.session.add(u)
+        db.session.commit()
+        user_id = u.id
+    jobs = app_module.price_compare_jobs
+    jobs._ensure_dir()
+    meta = {'id': uuid.uuid4().hex, 'owner_id': user_id, 'status': 'running', 'done': 0, 'total': 3,
+            'rows': 0, 'file_key': None, 'created_at': time.time(), 'finished_at': None, 'error': None}
+    jobs._save(meta)
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['_user_id'] = str(user_id)
+        s['_fresh'] = True
+        s['price_compare_job'] = meta['id']
+    return client
+
+
+def test_progress_stream_refused_on_single_threaded_server(app):
+    r = _admin_client(app).get('/admin/price_compare/progress', environ_overrides={'wsgi.multithread': False})
+    assert r.status_code == 503
+    assert r.get_json() == {"error": "stream_unavailable"}
+
+
+def test_progress_stream_opens_on_threaded_server(app):
+    r = _admin_client(app).get('/admin/price_compare/progress', environ_overrides={'wsgi.multithread': True},
+                               buffered=False)
+    try:
+        assert r.status_code == 200
+        assert r.mimetype == 'text/event-stream'
+        assert next(r.response).startswith(b'retry:')
+    finally:
+        r.close()
@@ -0,0 +1,27 @@
+# --------------------------------------------------------------------------------
+# 백그라운드 작업 예약 시각 (APScheduler, timezone="Asia/Seoul")
+# 서버 시간대(UTC 호스트 등)와 무관하게 첫 실행 시각이 '지금' 기준이어야 함
+# --------------------------------------------------------------------------------
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from naver_price_refresh import NAVER_PRICE_JOB_ID, schedule_naver_price_refresh
+from product_sellable import SELLABLE_REFRESH_JOB_ID, schedule_sellable_refresh
+
+
+def _first_run_in(scheduler, job_id):
+    """예약된 첫 실행까지 남은 초."""
+    return (scheduler.get_job(job_id).next_run_time - datetime.now(timezone.utc)).total_seconds()
+
+
+def test_sellable_refresh_runs_now(app):
+    scheduler = BackgroundScheduler(timezone="Asia/Seoul")
+    schedule_sellable_refresh(app, scheduler)
+    assert -5 < _first_run_in(scheduler, SELLABLE_REFRESH_JOB_ID) <= 1
+
+
+def test_naver_price_refresh_runs_after_30_seconds(app):
+    scheduler = BackgroundScheduler(timezone="Asia/Seoul")
+    schedule_naver_price_refresh(app, scheduler, lambda name: None)
+    assert 25 < _first_run_in(scheduler, NAVER_PRICE_JOB_ID) <= 31
@@ -0,0 +1,33 @@
+# --------------------------------------------------------------------------------
+# 컴파일된 템플릿 캐시 (template_cache.py)
+# 주문마다 값이 다른 화면도 템플릿 소스는 고정 → 두 번째 렌더부터 컴파일 없이 캐시 적중
+# --------------------------------------------------------------------------------
+import uuid
+
+import app as app_module
+from template_cache import template_cache_stats
+
+
+class _Ok:
+    status_code = 200
+    text = "{}"
+
+    def json(self):
+        return {}
+
+
+def _pay(app, user_id, amount):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+    oid = "T" + uuid.uuid4().hex[:20]
+    res = client.get('/payment/success', query_string={'paymentKey': 'pk-' + oid, 'orderId': oid, 'amount': amount})
+    assert res.status_code == 200 and oid in res.get_data(as_text=True)
+
+
+def test_payment_success_page_reuses_compiled_template(app, monkeypatch, make_product, make_user_with_cart):
+    monkeypatch.setattr(app_module.integration_http, "post", lambda *a, **kw: _Ok())
+    _pay(app, make_user_with_cart([(make_product(5), 1)]), 1000)
+    misses = template_cache_stats()["misses"]
+    _pay(app, make_user_with_cart([(make_product(5), 2)]), 2000)
+    assert template_cache_stats()["misses"] == misses
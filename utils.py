@@ -8,9 +8,12 @@ import tempfile
 import shutil
 import sqlite3
 import subprocess
+import heapq
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
-import requests
+import integration_http
+from sqlalchemy import text
 
 from config import (
     MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, MAIL_USE_TLS, DEFAULT_MAIL_FROM,
@@ -23,6 +26,7 @@ from config import (
 )
 from delivery_system import db_delivery
 from models import Product
+from product_sellable import sellable_clause
 
 db = db_delivery
 
@@ -247,7 +251,7 @@ def send_kakao_alimtalk(phone, customer_name, coupon_code=None, template_code=No
         "Content-Type": "application/json",
     }
     try:
-        r = requests.post(KAKAO_ALIMTALK_API_URL, json=payload, headers=headers, timeout=15)
+        r = integration_http.post("kakao_alimtalk", KAKAO_ALIMTALK_API_URL, json=payload, headers=headers)
         success = r.status_code in (200, 201)
         err = None if success else (r.text or str(r.status_code))
         try:
@@ -723,11 +727,11 @@ def run_backup():
         tag_name = f"backup-{ts}"
         headers = {"Authorization": f"token {GITHUB_BACKUP_TOKEN}", "Accept": "application/vnd.github.v3+json"}
         create_url = f"https://api.github.com/repos/{repo}/releases"
-        r = requests.post(create_url, headers=headers, json={
+        r = integration_http.post("github", create_url, headers=headers, json={
             "tag_name": tag_name,
             "name": f"Backup {datetime.now().strftime('%Y-%m-%d %H:%M')}",
             "body": "자동 백업 (바구니삼촌) — pg_dump/DB + 엑셀·리포트",
-        }, timeout=30)
+        }, timeout=(5, 30))
         if r.status_code not in (200, 201):
             return False, f"GitHub Release 생성 실패: {r.status_code} {r.text[:200]}"
         data = r.json()
@@ -735,7 +739,7 @@ def run_backup():
         if not upload_url:
             return False, "upload_url 없음"
         with open(zip_path, "rb") as f:
-            up = requests.post(f"{upload_url}?name={zip_name}", headers={**headers, "Content-Type": "application/zip"}, data=f, timeout=120)
+            up = integration_http.post("github", f"{upload_url}?name={zip_name}", headers={**headers, "Content-Type": "application/zip"}, data=f)
         if up.status_code not in (200, 201):
             return False, f"GitHub 업로드 실패: {up.status_code} {up.text[:200]}"
         return True, f"GitHub 백업 완료: {repo} release {tag_name}"
@@ -764,39 +768,141 @@ def get_daangn_today_message(template=None, extra_line=""):
     return msg
 
 
-# 메인 페이지 로딩 시 매 요청마다 실행되지 않도록 재고 리셋 호출 억제 (최소 2분 간격)
-_last_stock_reset_run = None
+# --------------------------------------------------------------------------------
+# 상품 재고 초기화 (스케줄러 작업)
+# 요청 경로에서 실행하지 않음. 상품별 초기화 시각을 작은 우선순위 큐(heap)에 두고
+# 가장 이른 시각에만 깨어나 일괄 UPDATE 1회. 여러 워커 중 1곳만 실행되도록 잠금.
+# --------------------------------------------------------------------------------
+STOCK_RESET_JOB_ID = "product_stock_reset"
+_STOCK_RESET_LOCK_KEY = 7300421  # PostgreSQL advisory lock 키 (임의 고정값)
+_STOCK_RESET_LOCK_FILE = os.path.join(tempfile.gettempdir(), "basket_uncle_stock_reset.lock")
 
+_stock_reset_app = None
+_stock_reset_scheduler = None
+_stock_reset_heap = []  # [(다음 초기화 시각, reset_time 문자열)]
 
-def run_product_stock_reset():
-    """마감일 없고 재고 초기화 시간이 설정된 상품: 해당 시각이 지나면 당일 1회 재고를 reset_to_quantity로 복원."""
-    global _last_stock_reset_run
-    now = datetime.now()
-    if _last_stock_reset_run is not None and (now - _last_stock_reset_run).total_seconds() < 120:
-        return
-    _last_stock_reset_run = now
 
-    today = now.date()
+def _parse_reset_time(value):
     try:
-        products = Product.query.filter(
-            Product.deadline.is_(None),
-            Product.reset_time.isnot(None),
-            Product.reset_to_quantity.isnot(None),
-        ).all()
-        for p in products:
-            if not p.reset_time or p.reset_to_quantity is None:
-                continue
-            try:
-                t = datetime.strptime(p.reset_time.strip()[:5], "%H:%M").time()
-            except (ValueError, TypeError):
-                continue
-            if now.time() < t:
-                continue
-            if p.last_reset_at and p.last_reset_at.date() >= today:
-                continue
-            p.stock = p.reset_to_quantity
-            p.last_reset_at = now
-        if products:
-            db.session.commit()
+        return datetime.strptime((value or "").strip()[:5], "%H:%M").time()
+    except (ValueError, TypeError):
+        return None
+
+
+def _stock_reset_candidates():
+    """재고 초기화 대상(마감일 없음 + 초기화 시각·수량 설정) 상품 필터."""
+    return (
+        Product.deadline.is_(None),
+        Product.reset_time.isnot(None),
+        Product.reset_to_quantity.isnot(None),
+    )
+
+
+def _distinct_reset_times():
+    rows = db.session.query(Product.reset_time).filter(*_stock_reset_candidates()).distinct().all()
+    return [r[0] for r in rows if _parse_reset_time(r[0]) is not None]
+
+
+def run_product_stock_reset(now=None):
+    """마감일 없고 재고 초기화 시간이 설정된 상품: 해당 시각이 지나면 당일 1회 재고를 reset_to_quantity로 복원.
+    대상 상품 전체를 UPDATE ... WHERE last_reset_at < 오늘 0시 한 문장으로 처리. 반환: 초기화된 상품 수."""
+    now = now or datetime.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        due = [rt for rt in _distinct_reset_times() if _parse_reset_time(rt) <= now.time()]
+        if not due:
+            return 0
+        count = Product.query.filter(
+            *_stock_reset_candidates(),
+            Product.reset_time.in_(due),
+            db.or_(Product.last_reset_at.is_(None), Product.last_reset_at < today_start),
+        ).update({
+            Product.stock: Product.reset_to_quantity,
+            Product.last_reset_at: now,
+            Product.is_sellable: sellable_clause(now, Product.reset_to_quantity),
+        }, synchronize_session=False)
+        db.session.commit()
+        return count
     except Exception:
         db.session.rollback()
+        return 0
+
+
+def _rebuild_stock_reset_heap(now):
+    """상품별 다음 초기화 시각을 heap으로 재구성. 오늘 시각이 지났으면 내일 같은 시각."""
+    heap = []
+    for rt in _distinct_reset_times():
+        at = datetime.combine(now.date(), _parse_reset_time(rt))
+        if at <= now:
+            at += timedelta(days=1)
+        heapq.heappush(heap, (at, rt))
+    _stock_reset_heap[:] = heap
+    return heap[0][0] if heap else None
+
+
+@contextmanager
+def _stock_reset_lock():
+    """워커 간 단일 실행 잠금. PostgreSQL: 트랜잭션 advisory lock(커밋 시 해제), 그 외: 파일 잠금(같은 호스트 워커)."""
+    if (db.engine.dialect.name or "") == "postgresql":
+        got = db.session.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": _STOCK_RESET_LOCK_KEY}).scalar()
+        try:
+            yield bool(got)
+        finally:
+            db.session.rollback()
+        return
+    try:
+        import fcntl
+    except ImportError:  # Windows 로컬 실행: 단일 프로세스
+        yield True
+        return
+    fh = open(_STOCK_RESET_LOCK_FILE, "w")
+    try:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+    finally:
+        fh.close()
+
+
+def _stock_reset_job():
+    with _stock_reset_app.app_context():
+        try:
+            with _stock_reset_lock() as acquired:
+                if acquired:
+                    run_product_stock_reset()
+        except Exception:
+            db.session.rollback()
+        reschedule_product_stock_reset()
+
+
+def reschedule_product_stock_reset():
+    """heap을 다시 만들고, 가장 이른 초기화 시각에 작업이 한 번 깨어나도록 예약. 상품 초기화 시각 변경 후에도 호출."""
+    if _stock_reset_scheduler is None:
+        return None
+    from apscheduler.triggers.date import DateTrigger  # type: ignore[reportMissingImports]
+    next_at = _rebuild_stock_reset_heap(datetime.now())
+    if next_at is None:
+        job = _stock_reset_scheduler.get_job(STOCK_RESET_JOB_ID)
+        if job:
+            job.remove()
+        return None
+    _stock_reset_scheduler.add_job(
+        # next_at은 서버 로컬 시각(naive) → 스케줄러 시간대와 무관하도록 aware로 변환
+        _stock_reset_job, DateTrigger(run_date=next_at.astimezone()), id=STOCK_RESET_JOB_ID,
+        replace_existing=True, misfire_grace_time=3600, coalesce=True,
+    )
+    return next_at
+
+
+def schedule_product_stock_reset(app, scheduler):
+    """APScheduler에 재고 초기화 작업 등록. 기동 직후 1회(밀린 초기화 반영) 실행 후 다음 시각 예약."""
+    global _stock_reset_app, _stock_reset_scheduler
+    _stock_reset_app = app
+    _stock_reset_scheduler = scheduler
+    scheduler.add_job(_stock_reset_job, id=STOCK_RESET_JOB_ID, replace_existing=True)
@@ -0,0 +1,152 @@
+# --------------------------------------------------------------------------------
+# 조회수 버퍼 (일별 페이지뷰 DailyStat, 상품 조회수 Product.view_count)
+# 요청마다 같은 행을 읽고-더하고-커밋하던 방식 대신, 프로세스 메모리에 누적 후
+# N초마다(및 종료 시) 한 트랜잭션에서 가산형 UPSERT/UPDATE로 반영.
+# gunicorn 워커마다 자기 버퍼를 따로 flush하고, SQL이 "기존값 + 증분"이므로 워커 간 충돌 없음.
+# --------------------------------------------------------------------------------
+import os
+import atexit
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+
+from sqlalchemy import func, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from delivery_system import db_delivery
+from models import DailyStat, Product
+
+db = db_delivery
+
+VIEW_COUNTER_FLUSH_SECONDS = int(os.getenv("VIEW_COUNTER_FLUSH_SECONDS", "30"))
+
+# page_type → DailyStat 컬럼
+PAGE_VIEW_COLUMNS = {
+    'main': 'main_views',
+    'category': 'category_views',
+    'product': 'product_views',
+    'cart': 'cart_views',
+}
+
+
+class ViewCounterBuffer:
+    """페이지뷰·상품 조회수 증분을 메모리에 모았다가 주기적으로 DB에 더함."""
+
+    def __init__(self, flush_interval=VIEW_COUNTER_FLUSH_SECONDS):
+        self.flush_interval = max(1, int(flush_interval))
+        self._app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pages = defaultdict(Counter)  # stat_date -> Counter({column: n})
+        self._products = Counter()          # product_id -> n
+        self._pid = None
+
+    def init_app(self, app):
+        self._app = app
+        atexit.register(self.flush)
+
+    def _ensure_flusher(self):
+        """워커 프로세스별로 flush 스레드 1개 (fork 이후 첫 증가 시 시작)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._run, name="view-counter-flush", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def incr_page(self, page_type, stat_date):
+        col = PAGE_VIEW_COLUMNS.get(page_type)
+        if not col:
+            return
+        with self._lock:
+            self._pages[stat_date][col] += 1
+        self._ensure_flusher()
+
+    def incr_product(self, product_id):
+        if not product_id:
+            return
+        with self._lock:
+            self._products[int(product_id)] += 1
+        self._ensure_flusher()
+
+    def pending_page_views(self):
+        """아직 DB에 반영되지 않은 일별 페이지뷰 {date: {column: n}} (관리자 통계 합산용)."""
+        with self._lock:
+            return {d: dict(c) for d, c in self._pages.items()}
+
+    def pending_product_views(self):
+        """아직 DB에 반영되지 않은 상품 조회수 {product_id: n}."""
+        with self._lock:
+            return dict(self._products)
+
+    def _swap(self):
+        with self._lock:
+            pages, self._pages = self._pages, defaultdict(Counter)
+            products, self._products = self._products, Counter()
+        return pages, products
+
+    def _restore(self, pages, products):
+        """flush 실패 시 증분을 버퍼로 되돌림 (다음 주기에 재시도)."""
+        with self._lock:
+            for d, cnt in pages.items():
+                self._pages[d].update(cnt)
+            self._products.update(products)
+
+    def flush(self):
+        if self._app is None:
+            return
+        with self._flush_lock:
+            pages, products = self._swap()
+            if not pages and not products:
+                return
+            try:
+                with self._app.app_context():
+                    with db.engine.begin() as conn:
+                        for stat_date, deltas in pages.items():
+                            _upsert_daily_stat(conn, stat_date, dict(deltas))
+                        if products:
+                            _add_product_view_counts(conn, products)
+            except Exception:
+                traceback.print_exc()
+                self._restore(pages, products)
+
+
+def _upsert_daily_stat(conn, stat_date, deltas):
+    """DailyStat 한 행에 증분 가산. PostgreSQL/SQLite는 ON CONFLICT, 그 외는 UPDATE 후 없으면 INSERT."""
+    table = DailyStat.__table__
+    values = {col: 0 for col in PAGE_VIEW_COLUMNS.values()}
+    values.update(deltas)
+    values['stat_date'] = stat_date
+    dialect = conn.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        ins = (pg_insert if dialect == 'postgresql' else sqlite_insert)(table).values(**values)
+        conn.execute(ins.on_conflict_do_update(
+            index_elements=[table.c.stat_date],
+            set_={col: func.coalesce(table.c[col], 0) + ins.excluded[col] for col in deltas},
+        ))
+        return
+    upd = table.update().where(table.c.stat_date == stat_date).values(
+        {col: func.coalesce(table.c[col], 0) + n for col, n in deltas.items()}
+    )
+    if conn.execute(upd).rowcount == 0:
+        conn.execute(table.insert().values(**values))
+
+
+def _add_product_view_counts(conn, products):
+    table = Product.__table__
+    stmt = table.update().where(table.c.id == bindparam('b_pid')).values(
+        view_count=func.coalesce(table.c.view_count, 0) + bindparam('b_n')
+    )
+    conn.execute(stmt, [{'b_pid': pid, 'b_n': n} for pid, n in products.items()])
+
+
+view_counters = ViewCounterBuffer()